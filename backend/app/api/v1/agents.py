@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
+from app.core.archive import ARCHIVES
 from app.core.dependencies import get_current_user, require_workspace_member
-from app.core.store import STORE
-from app.domain.schemas import AgentRunCreateIn, AgentRunOut, AgentRunTimelineOut
+from app.core.ids import page_after
+from app.core.pagination import MAX_PAGE_SIZE, fetch_size, paginate
+from app.core.records import as_datetime
+from app.domain.schemas import AgentRunCreateIn, AgentRunOut, AgentRunTimelineOut, RunStatus
+from app.repositories import REPOSITORIES
 from app.services.orchestration.orchestrator import ORCHESTRATOR_SERVICE
 
 router = APIRouter(tags=["agents"])
@@ -81,7 +86,7 @@ def _timeline_out(item: dict[str, object]) -> AgentRunTimelineOut:
         summary=str(item["summary"]),
         status=str(item["status"]),
         metadata=dict(item.get("metadata", {})),
-        created_at=datetime.fromisoformat(str(item["created_at"])),
+        created_at=as_datetime(item["created_at"]),
     )
 
 
@@ -92,7 +97,7 @@ def list_agent_roles() -> dict[str, list[dict[str, str]]]:
 
 @router.post("/agent-runs", response_model=AgentRunOut)
 async def run_agent(payload: AgentRunCreateIn, user: dict[str, object] = Depends(get_current_user)) -> AgentRunOut:
-    require_workspace_member(payload.workspace_id, str(user["id"]))
+    await asyncio.to_thread(require_workspace_member, payload.workspace_id, str(user["id"]))
     record = await ORCHESTRATOR_SERVICE.execute(payload)
     return AgentRunOut(
         id=str(record["id"]),
@@ -101,19 +106,31 @@ async def run_agent(payload: AgentRunCreateIn, user: dict[str, object] = Depends
         role_key=str(record["role_key"]),
         status=str(record["status"]),
         output=record.get("output"),
-        created_at=datetime.fromisoformat(str(record["created_at"])),
-        updated_at=datetime.fromisoformat(str(record["updated_at"])),
+        created_at=as_datetime(record["created_at"]),
+        updated_at=as_datetime(record["updated_at"]),
     )
 
 
 @router.get("/agent-runs", response_model=list[AgentRunOut])
-def list_runs(workspace_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[AgentRunOut]:
+def list_runs(
+    workspace_id: str,
+    response: Response,
+    status_value: RunStatus | None = Query(default=None, alias="status"),
+    task_id: str | None = None,
+    created_after: datetime | None = None,
+    after: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    user: dict[str, object] = Depends(get_current_user),
+) -> list[AgentRunOut]:
     require_workspace_member(workspace_id, str(user["id"]))
-    runs = [
-        run
-        for run in STORE.agent_runs.values()
-        if run.get("workspace_id") == workspace_id and "role_key" in run
-    ]
+    runs = REPOSITORIES.agent_runs.list_by_workspace(
+        workspace_id,
+        status=status_value.value if status_value is not None else None,
+        task_id=task_id,
+        created_after=created_after,
+        after=after,
+        limit=fetch_size(limit),
+    )
     return [
         AgentRunOut(
             id=str(run["id"]),
@@ -122,17 +139,17 @@ def list_runs(workspace_id: str, user: dict[str, object] = Depends(get_current_u
             role_key=str(run["role_key"]),
             status=str(run["status"]),
             output=run.get("output"),
-            created_at=datetime.fromisoformat(str(run["created_at"])),
-            updated_at=datetime.fromisoformat(str(run["updated_at"])),
+            created_at=as_datetime(run["created_at"]),
+            updated_at=as_datetime(run["updated_at"]),
         )
-        for run in runs
+        for run in paginate(response, runs, limit)
     ]
 
 
 @router.get("/agent-runs/{run_id}", response_model=AgentRunOut)
 def get_run(run_id: str, user: dict[str, object] = Depends(get_current_user)) -> AgentRunOut:
-    run = STORE.agent_runs.get(run_id)
-    if run is None or "role_key" not in run:
+    run = REPOSITORIES.agent_runs.get(run_id)
+    if run is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
     require_workspace_member(str(run["workspace_id"]), str(user["id"]))
     return AgentRunOut(
@@ -142,15 +159,21 @@ def get_run(run_id: str, user: dict[str, object] = Depends(get_current_user)) ->
         role_key=str(run["role_key"]),
         status=str(run["status"]),
         output=run.get("output"),
-        created_at=datetime.fromisoformat(str(run["created_at"])),
-        updated_at=datetime.fromisoformat(str(run["updated_at"])),
+        created_at=as_datetime(run["created_at"]),
+        updated_at=as_datetime(run["updated_at"]),
     )
 
 
 @router.get("/agent-runs/{run_id}/events")
-def get_run_events(run_id: str, user: dict[str, object] = Depends(get_current_user)) -> dict[str, object]:
-    run = STORE.agent_runs.get(run_id)
-    if run is None or "role_key" not in run:
+def get_run_events(
+    run_id: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    action: list[str] | None = Query(default=None),
+    user: dict[str, object] = Depends(get_current_user),
+) -> dict[str, object]:
+    run = REPOSITORIES.agent_runs.get(run_id)
+    if run is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
     require_workspace_member(str(run["workspace_id"]), str(user["id"]))
     events = [
@@ -160,18 +183,26 @@ def get_run_events(run_id: str, user: dict[str, object] = Depends(get_current_us
             "created_at": log["created_at"],
             "payload": log.get("payload", {}),
         }
-        for log in STORE.audit_logs
-        if log.get("entity_type") == "agent_run" and log.get("entity_id") == run_id
+        for log in REPOSITORIES.audit_logs.query(
+            entity_type="agent_run", entity_id=run_id, actions=action, since=since, until=until
+        )
     ]
     return {"run_id": run_id, "events": events}
 
 
 @router.get("/agent-runs/{run_id}/timeline", response_model=list[AgentRunTimelineOut])
-def get_run_timeline(run_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[AgentRunTimelineOut]:
-    run = STORE.agent_runs.get(run_id)
-    if run is None or "role_key" not in run:
+def get_run_timeline(
+    run_id: str,
+    after: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=1000),
+    user: dict[str, object] = Depends(get_current_user),
+) -> list[AgentRunTimelineOut]:
+    run = REPOSITORIES.agent_runs.get(run_id)
+    if run is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
     require_workspace_member(str(run["workspace_id"]), str(user["id"]))
-    timeline = STORE.agent_run_timelines.get(run_id, [])
-    ordered = sorted(timeline, key=lambda item: str(item.get("created_at", "")))
-    return [_timeline_out(item) for item in ordered]
+    # Stages are appended as they happen and carry time-ordered ids, so the list is already ordered.
+    timeline = list(REPOSITORIES.entries.rows("agent_run_timelines", run_id)) or ARCHIVES.read(
+        "agent_run_timelines", run_id
+    )
+    return [_timeline_out(item) for item in page_after(timeline, after, limit)]
@@ -2,11 +2,13 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
 from app.core.dependencies import get_current_user, require_workspace_member
+from app.core.pagination import MAX_PAGE_SIZE, matching, paginate, take
 from app.core.store import STORE
 from app.domain.schemas import ApprovalCreateIn, ApprovalDecisionIn, ApprovalOut, ApprovalStatus
+from app.repositories import REPOSITORIES
 from app.services.orchestration.approval import create_audit, enforce_external_action_policy
 from app.services.orchestration.event_bus import EVENT_BUS
 
@@ -27,8 +29,12 @@ def create_approval(payload: ApprovalCreateIn, user: dict[str, object] = Depends
         "decision_note": None,
         "created_at": STORE.now_iso(),
     }
-    STORE.approvals[approval_id] = record
-    EVENT_BUS.publish("approval.requested", payload.workspace_id, {"approval_id": approval_id})
+    REPOSITORIES.approvals.put(record)
+    EVENT_BUS.publish(
+        "approval.requested",
+        payload.workspace_id,
+        {"approval_id": approval_id, "status": ApprovalStatus.pending.value},
+    )
     return ApprovalOut(
         id=approval_id,
         workspace_id=payload.workspace_id,
@@ -42,9 +48,26 @@ def create_approval(payload: ApprovalCreateIn, user: dict[str, object] = Depends
 
 
 @router.get("", response_model=list[ApprovalOut])
-def list_approvals(workspace_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[ApprovalOut]:
+def list_approvals(
+    workspace_id: str,
+    response: Response,
+    status_value: ApprovalStatus | None = Query(default=None, alias="status"),
+    task_id: str | None = None,
+    created_after: datetime | None = None,
+    after: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    user: dict[str, object] = Depends(get_current_user),
+) -> list[ApprovalOut]:
     require_workspace_member(workspace_id, str(user["id"]))
-    approvals = [approval for approval in STORE.approvals.values() if approval["workspace_id"] == workspace_id]
+    approvals = take(
+        matching(
+            REPOSITORIES.approvals.iter_workspace(workspace_id, after=after),
+            created_after=created_after,
+            status=status_value.value if status_value is not None else None,
+            task_id=task_id,
+        ),
+        limit,
+    )
     return [
         ApprovalOut(
             id=str(approval["id"]),
@@ -56,7 +79,7 @@ def list_approvals(workspace_id: str, user: dict[str, object] = Depends(get_curr
             decision_note=approval.get("decision_note"),
             created_at=datetime.fromisoformat(str(approval["created_at"])),
         )
-        for approval in approvals
+        for approval in paginate(response, approvals, limit)
     ]
 
 
@@ -66,7 +89,7 @@ def approve(
     payload: ApprovalDecisionIn,
     user: dict[str, object] = Depends(get_current_user),
 ) -> ApprovalOut:
-    approval = STORE.approvals.get(approval_id)
+    approval = REPOSITORIES.approvals.get(approval_id)
     if approval is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Approval not found")
     workspace_id = str(approval["workspace_id"])
@@ -76,10 +99,19 @@ def approve(
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    approval["status"] = ApprovalStatus.approved.value
-    approval["decision_note"] = payload.note
+    with REPOSITORIES.workspace_lock(workspace_id):
+        # Re-read under the lock: another worker may have decided it since the lookup above.
+        approval = REPOSITORIES.approvals.get(approval_id) or approval
+        previous_status = str(approval["status"])
+        approval["status"] = ApprovalStatus.approved.value
+        approval["decision_note"] = payload.note
+        REPOSITORIES.approvals.put(approval)
     create_audit(workspace_id, "user", str(user["id"]), "approval.approve", "approval", approval_id, approval)
-    EVENT_BUS.publish("approval.approved", workspace_id, {"approval_id": approval_id})
+    EVENT_BUS.publish(
+        "approval.approved",
+        workspace_id,
+        {"approval_id": approval_id, "status": ApprovalStatus.approved.value, "previous_status": previous_status},
+    )
     return ApprovalOut(
         id=str(approval["id"]),
         workspace_id=workspace_id,
@@ -98,15 +130,24 @@ def reject(
     payload: ApprovalDecisionIn,
     user: dict[str, object] = Depends(get_current_user),
 ) -> ApprovalOut:
-    approval = STORE.approvals.get(approval_id)
+    approval = REPOSITORIES.approvals.get(approval_id)
     if approval is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Approval not found")
     workspace_id = str(approval["workspace_id"])
     require_workspace_member(workspace_id, str(user["id"]))
-    approval["status"] = ApprovalStatus.rejected.value
-    approval["decision_note"] = payload.note
+    with REPOSITORIES.workspace_lock(workspace_id):
+        # Re-read under the lock: another worker may have decided it since the lookup above.
+        approval = REPOSITORIES.approvals.get(approval_id) or approval
+        previous_status = str(approval["status"])
+        approval["status"] = ApprovalStatus.rejected.value
+        approval["decision_note"] = payload.note
+        REPOSITORIES.approvals.put(approval)
     create_audit(workspace_id, "user", str(user["id"]), "approval.reject", "approval", approval_id, approval)
-    EVENT_BUS.publish("approval.rejected", workspace_id, {"approval_id": approval_id})
+    EVENT_BUS.publish(
+        "approval.rejected",
+        workspace_id,
+        {"approval_id": approval_id, "status": ApprovalStatus.rejected.value, "previous_status": previous_status},
+    )
     return ApprovalOut(
         id=str(approval["id"]),
         workspace_id=workspace_id,
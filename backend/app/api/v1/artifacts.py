@@ -2,11 +2,13 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
 from app.core.dependencies import get_current_user, require_workspace_member
+from app.core.pagination import MAX_PAGE_SIZE, fetch_size, paginate
 from app.core.store import STORE
-from app.domain.schemas import ArtifactCreateIn, ArtifactOut, ArtifactUpdateIn
+from app.domain.schemas import ArtifactCreateIn, ArtifactOut, ArtifactType, ArtifactUpdateIn
+from app.repositories import REPOSITORIES
 from app.services.agents.document_generator import DocumentGenerator
 from app.services.orchestration.approval import create_audit
 from app.services.orchestration.event_bus import EVENT_BUS
@@ -29,7 +31,7 @@ def create_artifact(payload: ArtifactCreateIn, user: dict[str, object] = Depends
         "metadata": payload.metadata,
         "created_at": STORE.now_iso(),
     }
-    STORE.artifacts[artifact_id] = record
+    REPOSITORIES.artifacts.add(record)
     EVENT_BUS.publish("artifact.created", payload.workspace_id, {"artifact_id": artifact_id})
     create_audit(payload.workspace_id, "user", str(user["id"]), "artifact.create", "artifact", artifact_id, record)
     return ArtifactOut(
@@ -45,9 +47,25 @@ def create_artifact(payload: ArtifactCreateIn, user: dict[str, object] = Depends
 
 
 @router.get("", response_model=list[ArtifactOut])
-def list_artifacts(workspace_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[ArtifactOut]:
+def list_artifacts(
+    workspace_id: str,
+    response: Response,
+    type: ArtifactType | None = None,
+    task_id: str | None = None,
+    created_after: datetime | None = None,
+    after: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    user: dict[str, object] = Depends(get_current_user),
+) -> list[ArtifactOut]:
     require_workspace_member(workspace_id, str(user["id"]))
-    artifacts = [artifact for artifact in STORE.artifacts.values() if artifact["workspace_id"] == workspace_id]
+    artifacts = REPOSITORIES.artifacts.list_by_workspace(
+        workspace_id,
+        type=type.value if type is not None else None,
+        task_id=task_id,
+        created_after=created_after,
+        after=after,
+        limit=fetch_size(limit),
+    )
     return [
         ArtifactOut(
             id=str(a["id"]),
@@ -59,13 +77,13 @@ def list_artifacts(workspace_id: str, user: dict[str, object] = Depends(get_curr
             metadata=dict(a.get("metadata", {})),
             created_at=datetime.fromisoformat(str(a["created_at"])),
         )
-        for a in artifacts
+        for a in paginate(response, artifacts, limit)
     ]
 
 
 @router.get("/{artifact_id}", response_model=ArtifactOut)
 def get_artifact(artifact_id: str, user: dict[str, object] = Depends(get_current_user)) -> ArtifactOut:
-    artifact = STORE.artifacts.get(artifact_id)
+    artifact = REPOSITORIES.artifacts.get(artifact_id)
     if artifact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Artifact not found")
     require_workspace_member(str(artifact["workspace_id"]), str(user["id"]))
@@ -88,7 +106,7 @@ def update_artifact(
     user: dict[str, object] = Depends(get_current_user),
 ) -> ArtifactOut:
     """Update an existing artifact (title, content, metadata)."""
-    artifact = STORE.artifacts.get(artifact_id)
+    artifact = REPOSITORIES.artifacts.get(artifact_id)
     if artifact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Artifact not found")
     require_workspace_member(str(artifact["workspace_id"]), str(user["id"]))
@@ -100,6 +118,7 @@ def update_artifact(
     if payload.metadata is not None:
         artifact["metadata"] = payload.metadata
     artifact["updated_at"] = STORE.now_iso()
+    REPOSITORIES.artifacts.save(artifact)
 
     create_audit(
         str(artifact["workspace_id"]),
@@ -130,7 +149,7 @@ async def generate_document_from_artifact(
     user: dict[str, object] = Depends(get_current_user),
 ) -> ArtifactOut:
     """Generate a formatted Markdown document from an artifact."""
-    artifact = STORE.artifacts.get(artifact_id)
+    artifact = REPOSITORIES.artifacts.get(artifact_id)
     if artifact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Artifact not found")
     require_workspace_member(str(artifact["workspace_id"]), str(user["id"]))
@@ -147,6 +166,7 @@ async def generate_document_from_artifact(
     artifact["metadata"]["format"] = "markdown"
     artifact["metadata"]["generated_at"] = STORE.now_iso()
     artifact["updated_at"] = STORE.now_iso()
+    REPOSITORIES.artifacts.save(artifact)
 
     return ArtifactOut(
         id=str(artifact["id"]),
@@ -168,7 +188,7 @@ async def export_artifact_as_markdown(
     """Export artifact as Markdown file download."""
     from fastapi.responses import Response
 
-    artifact = STORE.artifacts.get(artifact_id)
+    artifact = REPOSITORIES.artifacts.get(artifact_id)
     if artifact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Artifact not found")
     require_workspace_member(str(artifact["workspace_id"]), str(user["id"]))
@@ -200,7 +220,7 @@ async def generate_document_from_agent_run(
     """Generate a Markdown document from an agent run output."""
     require_workspace_member(workspace_id, str(user["id"]))
 
-    run = STORE.agent_runs.get(run_id)
+    run = REPOSITORIES.agent_runs.get(run_id)
     if run is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent run not found")
 
@@ -233,7 +253,7 @@ async def generate_document_from_agent_run(
         },
         "created_at": STORE.now_iso(),
     }
-    STORE.artifacts[artifact_id] = record
+    REPOSITORIES.artifacts.add(record)
 
     create_audit(
         workspace_id,
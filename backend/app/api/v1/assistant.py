@@ -83,15 +83,15 @@ async def assistant_chat_stream(
             yield f"data: {json.dumps({'type': 'start', 'message_id': 'streaming'})}\n\n"
 
             # Get workspace context
-            from app.core.store import STORE
+            from app.repositories import REPOSITORIES
             from app.services.assistants.workspace_assistant import get_agent_service_client
 
-            tasks = [task for task in STORE.tasks.values() if str(task.get("workspace_id")) == workspace_id]
+            tasks = REPOSITORIES.tasks.list_by_workspace(workspace_id)
             completed_tasks = [task for task in tasks if str(task.get("status")) == "done"][:6]
             open_tasks = [task for task in tasks if str(task.get("status")) != "done"][:8]
-            files = STORE.workspace_files.get(workspace_id, [])[:8]
-            artifacts = [item for item in STORE.artifacts.values() if str(item.get("workspace_id")) == workspace_id][:6]
-            members = STORE.workspace_members.get(workspace_id, [])
+            files = (REPOSITORIES.entries.get("workspace_files", workspace_id) or [])[:8]
+            artifacts = REPOSITORIES.artifacts.list_by_workspace(workspace_id)[:6]
+            members = REPOSITORIES.workspaces.list_members(workspace_id)
 
             workspace_context = (
                 "Workspace snapshot:\n"
@@ -112,8 +112,8 @@ async def assistant_chat_stream(
 
             # Build task context
             task_context = ""
-            if payload.task_id and payload.task_id in STORE.tasks:
-                task = STORE.tasks[payload.task_id]
+            task = REPOSITORIES.tasks.get(payload.task_id) if payload.task_id else None
+            if task is not None:
                 task_context = (
                     "\nFocused task:\n"
                     f"- title: {task.get('title')}\n"
@@ -3,8 +3,8 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from app.core.dependencies import get_current_user, require_workspace_member
-from app.core.store import STORE
 from app.domain.schemas import IntegrationActionIn, IntegrationConnectOut
+from app.repositories import REPOSITORIES
 from app.services.integrations.github import GITHUB_INTEGRATION
 from app.services.integrations.linear import LINEAR_INTEGRATION
 from app.services.orchestration.approval import create_audit
@@ -57,4 +57,5 @@ def create_linear_issue(payload: IntegrationActionIn, user: dict[str, object] =
 @router.get("/{workspace_id}/accounts")
 def list_accounts(workspace_id: str, user: dict[str, object] = Depends(get_current_user)) -> dict[str, object]:
     require_workspace_member(workspace_id, str(user["id"]))
-    return {"workspace_id": workspace_id, "accounts": STORE.integration_accounts.get(workspace_id, [])}
+    accounts = REPOSITORIES.entries.get("integration_accounts", workspace_id) or []
+    return {"workspace_id": workspace_id, "accounts": accounts}
@@ -5,10 +5,12 @@ from datetime import datetime
 from fastapi import APIRouter, Depends
 
 from app.core.dependencies import get_current_user, require_workspace_member
-from app.core.store import STORE
-from app.domain.schemas import AutonomyScore, EvalRunOut
+from app.core.metrics import METRICS
+from app.domain.schemas import AutonomyScore, EvalRunOut, RunStatus
+from app.repositories import REPOSITORIES
 from app.services.orchestration.autonomy import compute_autonomy
 from app.services.orchestration.proactive import PROACTIVE_ENGINE
+from app.services.orchestration.projections import PROJECTIONS
 
 router = APIRouter(tags=["metrics"])
 
@@ -16,14 +18,9 @@ router = APIRouter(tags=["metrics"])
 @router.get("/autonomy-scores", response_model=list[AutonomyScore])
 def autonomy_scores(workspace_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[AutonomyScore]:
     require_workspace_member(workspace_id, str(user["id"]))
-    run_count = len([r for r in STORE.agent_runs.values() if r.get("workspace_id") == workspace_id and "role_key" in r])
-    successes = len(
-        [
-            r
-            for r in STORE.agent_runs.values()
-            if r.get("workspace_id") == workspace_id and r.get("status") == "completed" and "role_key" in r
-        ]
-    )
+    runs = PROJECTIONS.counts(workspace_id).runs
+    run_count = runs.total()
+    successes = runs[RunStatus.completed.value]
     computed = compute_autonomy(successes, max(run_count, 1))
     return [
         AutonomyScore(
@@ -53,8 +50,7 @@ def eval_runs(workspace_id: str, user: dict[str, object] = Depends(get_current_u
             cost_per_task=item.get("cost_per_task"),
             created_at=datetime.fromisoformat(str(item["created_at"])),
         )
-        for item in STORE.eval_runs
-        if item.get("workspace_id") == workspace_id
+        for item in REPOSITORIES.entries.rows("eval_runs", workspace_id)
     ]
 
 
@@ -63,3 +59,8 @@ def proactive_signals(workspace_id: str, user: dict[str, object] = Depends(get_c
     require_workspace_member(workspace_id, str(user["id"]))
     signals = [signal.__dict__ for signal in PROACTIVE_ENGINE.detect_stalled_tasks(workspace_id)]
     return {"workspace_id": workspace_id, "signals": signals}
+
+
+@router.get("/runtime-metrics")
+def runtime_metrics(user: dict[str, object] = Depends(get_current_user)) -> dict[str, dict[str, float]]:
+    return METRICS.snapshot()
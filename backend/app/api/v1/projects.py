@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from app.core.dependencies import get_current_user, require_workspace_member
 from app.core.store import STORE
 from app.domain.schemas import ProjectCreateIn, ProjectOut
+from app.repositories import REPOSITORIES
 from app.services.orchestration.event_bus import EVENT_BUS
 
 router = APIRouter(prefix="/projects", tags=["projects"])
@@ -23,7 +24,7 @@ def create_project(payload: ProjectCreateIn, user: dict[str, object] = Depends(g
         "description": payload.description,
         "created_at": STORE.now_iso(),
     }
-    STORE.projects[project_id] = record
+    REPOSITORIES.projects.add(record)
     EVENT_BUS.publish("project.created", payload.workspace_id, {"project_id": project_id})
     return ProjectOut(
         id=project_id,
@@ -37,7 +38,7 @@ def create_project(payload: ProjectCreateIn, user: dict[str, object] = Depends(g
 @router.get("", response_model=list[ProjectOut])
 def list_projects(workspace_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[ProjectOut]:
     require_workspace_member(workspace_id, str(user["id"]))
-    projects = [project for project in STORE.projects.values() if project["workspace_id"] == workspace_id]
+    projects = REPOSITORIES.projects.list_by_workspace(workspace_id)
     return [
         ProjectOut(
             id=str(project["id"]),
@@ -52,7 +53,7 @@ def list_projects(workspace_id: str, user: dict[str, object] = Depends(get_curre
 
 @router.get("/{project_id}", response_model=ProjectOut)
 def get_project(project_id: str, user: dict[str, object] = Depends(get_current_user)) -> ProjectOut:
-    project = STORE.projects.get(project_id)
+    project = REPOSITORIES.projects.get(project_id)
     if project is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
     require_workspace_member(str(project["workspace_id"]), str(user["id"]))
@@ -3,8 +3,8 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends
 
 from app.core.dependencies import get_current_user, require_workspace_member
-from app.core.store import STORE
 from app.domain.schemas import EvidencePackOut, SearchHybridIn, SearchResultOut
+from app.repositories import REPOSITORIES
 from app.services.retrieval.hybrid import build_evidence_pack, reciprocal_rank_fusion
 
 router = APIRouter(prefix="/search", tags=["search"])
@@ -19,30 +19,24 @@ def search_hybrid(payload: SearchHybridIn, user: dict[str, object] = Depends(get
     sparse: list[tuple[str, float, str]] = []
     graph: list[tuple[str, float, str]] = []
 
-    for task in STORE.tasks.values():
-        if task["workspace_id"] != payload.workspace_id:
-            continue
+    for task in REPOSITORIES.tasks.list_by_workspace(payload.workspace_id):
         title = str(task["title"])
         score = 0.9 if query in title.lower() else 0.4
         dense.append((f"task:{task['id']}", score, title))
 
-    for artifact in STORE.artifacts.values():
-        if artifact["workspace_id"] != payload.workspace_id:
-            continue
+    for artifact in REPOSITORIES.artifacts.list_by_workspace(payload.workspace_id):
         title = str(artifact["title"])
         score = 0.95 if query in title.lower() else 0.35
         sparse.append((f"artifact:{artifact['id']}", score, title))
 
-    for file_item in STORE.workspace_files.get(payload.workspace_id, []):
+    for file_item in REPOSITORIES.entries.get("workspace_files", payload.workspace_id) or []:
         name = str(file_item.get("name", "uploaded-file"))
         text = str(file_item.get("extracted_text", ""))
         haystack = f"{name}\n{text}".lower()
         score = 0.9 if query in haystack else 0.28
         sparse.append((f"file:{file_item['id']}", score, name))
 
-    for decision in STORE.decisions.values():
-        if decision["workspace_id"] != payload.workspace_id:
-            continue
+    for decision in REPOSITORIES.decisions.iter_workspace(payload.workspace_id):
         question = str(decision["question"])
         score = 0.92 if query in question.lower() else 0.3
         graph.append((f"decision:{decision['id']}", score, question))
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import heapq
 from datetime import datetime
+from itertools import islice
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
 
+from app.core.archive import ARCHIVES
 from app.core.dependencies import get_current_user, require_workspace_member
+from app.core.ids import insert_by_id, page_after
+from app.core.pagination import MAX_PAGE_SIZE, fetch_size, matching, paginate, take
+from app.core.records import TaskRecord, as_datetime
 from app.core.store import STORE
 from app.domain.schemas import (
     ActivityItem,
@@ -20,11 +27,13 @@ from app.domain.schemas import (
     TaskCommentOut,
     TaskCreateIn,
     TaskOut,
+    TaskPriority,
     TaskSubtaskCreateIn,
     TaskSubtaskOut,
     TaskSubtaskUpdateIn,
     TaskUpdateIn,
 )
+from app.repositories import REPOSITORIES
 from app.services.orchestration.approval import create_audit
 from app.services.orchestration.event_bus import EVENT_BUS
 from app.services.orchestration.orchestrator import ORCHESTRATOR_SERVICE
@@ -45,19 +54,18 @@ def _task_out(task: dict[str, object]) -> TaskOut:
         assignee_user_id=task.get("assignee_user_id"),
         assignee_agent_role=task.get("assignee_agent_role"),
         proof_exempt=bool(task.get("proof_exempt", False)),
-        created_at=datetime.fromisoformat(str(task["created_at"])),
-        updated_at=datetime.fromisoformat(str(task["updated_at"])),
+        created_at=as_datetime(task["created_at"]),
+        updated_at=as_datetime(task["updated_at"]),
     )
 
 
 def _has_cycle(task_id: str, depends_on_task_id: str) -> bool:
-    graph = STORE.task_dependencies
-
     def dfs(current: str, target: str, visited: set[str]) -> bool:
         if current == target:
             return True
         visited.add(current)
-        for nxt in graph.get(current, set()):
+        # Other workspaces may be adding edges; ``tuple()`` copies the list in one step.
+        for nxt in tuple(REPOSITORIES.entries.get("task_dependencies", current) or ()):
             if nxt not in visited and dfs(nxt, target, visited):
                 return True
         return False
@@ -66,14 +74,14 @@ def _has_cycle(task_id: str, depends_on_task_id: str) -> bool:
 
 
 def _get_workspace_id_for_task(task_id: str) -> str:
-    task = STORE.tasks.get(task_id)
+    task = REPOSITORIES.tasks.get(task_id)
     if task is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     return str(task["workspace_id"])
 
 
 def _workspace_status_keys(workspace_id: str) -> set[str]:
-    statuses = STORE.workspace_task_statuses.get(workspace_id) or []
+    statuses = REPOSITORIES.entries.get("workspace_task_statuses", workspace_id) or []
     return {str(item["key"]) for item in statuses}
 
 
@@ -89,7 +97,7 @@ def _task_timeline_out(item: dict[str, object]) -> TaskAgentTimelineOut:
         summary=str(item["summary"]),
         status=str(item["status"]),
         metadata=dict(item.get("metadata", {})),
-        created_at=datetime.fromisoformat(str(item["created_at"])),
+        created_at=as_datetime(item["created_at"]),
     )
 
 
@@ -117,37 +125,55 @@ def _agent_run_out(run: dict[str, object]) -> AgentRunOut:
         role_key=str(run["role_key"]),
         status=str(run["status"]),
         output=run.get("output"),
-        created_at=datetime.fromisoformat(str(run["created_at"])),
-        updated_at=datetime.fromisoformat(str(run["updated_at"])),
+        created_at=as_datetime(run["created_at"]),
+        updated_at=as_datetime(run["updated_at"]),
     )
 
 
-def _normalize_subtask_order(task_id: str) -> list[dict[str, object]]:
-    items = STORE.task_subtasks.get(task_id, [])
-    items.sort(key=lambda entry: int(entry.get("order", 0)))
+def _subtasks(task_id: str) -> list[dict[str, object]]:
+    return REPOSITORIES.entries.get("task_subtasks", task_id) or []
+
+
+def _save_subtasks(task_id: str, current: list[dict[str, object]]) -> list[dict[str, object]]:
+    # Callers hold the workspace lock. The sorted list replaces the stored one instead of sorting
+    # in place, so a reader iterating the previous list never sees it emptied mid-sort.
+    items = sorted(current, key=lambda entry: int(entry.get("order", 0)))
     for index, item in enumerate(items):
         item["order"] = index
+    REPOSITORIES.entries.put("task_subtasks", task_id, items)
     return items
 
 
+def _actions_required(workspace_id: str) -> list[dict[str, object]]:
+    return REPOSITORIES.entries.get("workspace_actions_required", workspace_id) or []
+
+
+def _add_action_required(workspace_id: str, action: dict[str, object]) -> None:
+    with REPOSITORIES.workspace_lock(workspace_id):
+        actions = _actions_required(workspace_id)
+        action["id"] = STORE.new_id()
+        insert_by_id(actions, action)
+        REPOSITORIES.entries.put("workspace_actions_required", workspace_id, actions)
+
+
 async def _run_assigned_agent(
     workspace_id: str,
     task_id: str,
     role_key: str,
     trigger_reason: str,
 ) -> None:
+    # Runs as a background task on the event loop; repository reads and writes go to a thread.
+    runs = await asyncio.to_thread(REPOSITORIES.agent_runs.list_by_task, task_id)
     active_exists = any(
-        run.get("task_id") == task_id
-        and str(run.get("workspace_id")) == workspace_id
+        str(run.get("workspace_id")) == workspace_id
         and str(run.get("role_key")) == role_key
         and str(run.get("status")) == "running"
-        for run in STORE.agent_runs.values()
-        if "role_key" in run
+        for run in runs
     )
     if active_exists:
         return
 
-    task = STORE.tasks.get(task_id)
+    task = await asyncio.to_thread(REPOSITORIES.tasks.get, task_id)
     if task is None:
         return
 
@@ -170,7 +196,6 @@ async def _run_assigned_agent(
     open_questions = output.get("open_questions") if isinstance(output, dict) else []
     if isinstance(open_questions, list) and open_questions:
         action = {
-            "id": STORE.new_id(),
             "workspace_id": workspace_id,
             "title": f"AI needs clarification: {task.get('title')}",
             "description": "Assigned AI agent requested clarifications before completing this task.",
@@ -182,8 +207,12 @@ async def _run_assigned_agent(
             "task_id": task_id,
             "created_by": "system",
         }
-        STORE.workspace_actions_required[workspace_id].append(action)
-        EVENT_BUS.publish("workspace.action_required.created", workspace_id, {"action_id": action["id"]})
+        await asyncio.to_thread(_add_action_required, workspace_id, action)
+        EVENT_BUS.publish(
+            "workspace.action_required.created",
+            workspace_id,
+            {"action_id": action["id"], "status": "open", "target_user_id": action["target_user_id"]},
+        )
 
 
 def _upsert_action_required_for_task(
@@ -199,49 +228,58 @@ def _upsert_action_required_for_task(
     if not isinstance(target_user_id, str) or not target_user_id:
         return
 
-    actions = STORE.workspace_actions_required.setdefault(workspace_id, [])
-    existing = next(
-        (
-            item
-            for item in actions
-            if str(item.get("kind")) == kind
-            and str(item.get("task_id")) == str(task["id"])
-            and str(item.get("target_user_id")) == target_user_id
-            and str(item.get("status")) != "done"
-        ),
-        None,
-    )
+    with REPOSITORIES.workspace_lock(workspace_id):
+        actions = _actions_required(workspace_id)
+        existing = next(
+            (
+                item
+                for item in actions
+                if str(item.get("kind")) == kind
+                and str(item.get("task_id")) == str(task["id"])
+                and str(item.get("target_user_id")) == target_user_id
+                and str(item.get("status")) != "done"
+            ),
+            None,
+        )
+        previous_status = None
+        if existing is not None:
+            previous_status = str(existing["status"])
+            existing["title"] = title
+            existing["description"] = description
+            existing["severity"] = severity
+            existing["status"] = "open"
+        else:
+            action = {
+                "id": STORE.new_id(),
+                "workspace_id": workspace_id,
+                "title": title,
+                "description": description,
+                "severity": severity,
+                "status": "open",
+                "created_at": STORE.now_iso(),
+                "target_user_id": target_user_id,
+                "kind": kind,
+                "task_id": str(task["id"]),
+                "created_by": "system",
+            }
+            insert_by_id(actions, action)
+        REPOSITORIES.entries.put("workspace_actions_required", workspace_id, actions)
     if existing is not None:
-        existing["title"] = title
-        existing["description"] = description
-        existing["severity"] = severity
-        existing["status"] = "open"
         EVENT_BUS.publish(
             "workspace.action_required.updated",
             workspace_id,
-            {"action_id": existing["id"], "status": "open"},
+            {"action_id": existing["id"], "status": "open", "previous_status": previous_status, "target_user_id": target_user_id},
+        )
+    else:
+        EVENT_BUS.publish(
+            "workspace.action_required.created",
+            workspace_id,
+            {"action_id": action["id"], "status": "open", "target_user_id": target_user_id},
         )
-        return
-
-    action = {
-        "id": STORE.new_id(),
-        "workspace_id": workspace_id,
-        "title": title,
-        "description": description,
-        "severity": severity,
-        "status": "open",
-        "created_at": STORE.now_iso(),
-        "target_user_id": target_user_id,
-        "kind": kind,
-        "task_id": str(task["id"]),
-        "created_by": "system",
-    }
-    actions.append(action)
-    EVENT_BUS.publish("workspace.action_required.created", workspace_id, {"action_id": action["id"]})
 
 
 @router.post("", response_model=TaskOut)
-async def create_task(
+def create_task(
     payload: TaskCreateIn,
     background_tasks: BackgroundTasks,
     user: dict[str, object] = Depends(get_current_user),
@@ -252,23 +290,22 @@ async def create_task(
     if status_keys and selected_status not in status_keys:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown task status")
     task_id = STORE.new_id()
-    now = STORE.now_iso()
-    record: dict[str, object] = {
-        "id": task_id,
-        "workspace_id": payload.workspace_id,
-        "project_id": payload.project_id,
-        "title": payload.title,
-        "description": payload.description,
-        "status": selected_status or "todo",
-        "priority": payload.priority.value,
-        "acceptance_criteria": payload.acceptance_criteria,
-        "assignee_user_id": payload.assignee_user_id,
-        "assignee_agent_role": payload.assignee_agent_role,
-        "proof_exempt": False,
-        "created_at": now,
-        "updated_at": now,
-    }
-    STORE.tasks[task_id] = record
+    now = STORE.now()
+    record = TaskRecord(
+        id=task_id,
+        workspace_id=payload.workspace_id,
+        project_id=payload.project_id,
+        title=payload.title,
+        description=payload.description,
+        status=selected_status or "todo",
+        priority=payload.priority.value,
+        acceptance_criteria=payload.acceptance_criteria,
+        assignee_user_id=payload.assignee_user_id,
+        assignee_agent_role=payload.assignee_agent_role,
+        created_at=now,
+        updated_at=now,
+    )
+    REPOSITORIES.tasks.add(record)
     if record.get("assignee_user_id"):
         _upsert_action_required_for_task(
             payload.workspace_id,
@@ -295,21 +332,45 @@ async def create_task(
             str(record["assignee_agent_role"]),
             "task_created",
         )
-    EVENT_BUS.publish("task.created", payload.workspace_id, {"task_id": task_id})
+    EVENT_BUS.publish(
+        "task.created",
+        payload.workspace_id,
+        {"task_id": task_id, "project_id": payload.project_id, "status": record["status"]},
+    )
     create_audit(payload.workspace_id, "user", str(user["id"]), "task.create", "task", task_id, payload.model_dump())
     return _task_out(record)
 
 
 @router.get("", response_model=list[TaskOut])
-def list_tasks(workspace_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[TaskOut]:
+def list_tasks(
+    workspace_id: str,
+    response: Response,
+    status_key: str | None = Query(default=None, alias="status"),
+    assignee: str | None = None,
+    priority: TaskPriority | None = None,
+    project_id: str | None = None,
+    created_after: datetime | None = None,
+    after: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    user: dict[str, object] = Depends(get_current_user),
+) -> list[TaskOut]:
     require_workspace_member(workspace_id, str(user["id"]))
-    tasks = [task for task in STORE.tasks.values() if task["workspace_id"] == workspace_id]
-    return [_task_out(task) for task in tasks]
+    tasks = REPOSITORIES.tasks.list_by_workspace(
+        workspace_id,
+        status=status_key,
+        assignee=assignee,
+        priority=priority.value if priority is not None else None,
+        project_id=project_id,
+        created_after=created_after,
+        after=after,
+        limit=fetch_size(limit),
+    )
+    return [_task_out(task) for task in paginate(response, tasks, limit)]
 
 
 @router.get("/{task_id}", response_model=TaskOut)
 def get_task(task_id: str, user: dict[str, object] = Depends(get_current_user)) -> TaskOut:
-    task = STORE.tasks.get(task_id)
+    task = REPOSITORIES.tasks.get(task_id)
     if task is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     require_workspace_member(str(task["workspace_id"]), str(user["id"]))
@@ -317,41 +378,44 @@ def get_task(task_id: str, user: dict[str, object] = Depends(get_current_user))
 
 
 @router.patch("/{task_id}", response_model=TaskOut)
-async def update_task(
+def update_task(
     task_id: str,
     payload: TaskUpdateIn,
     background_tasks: BackgroundTasks,
     user: dict[str, object] = Depends(get_current_user),
 ) -> TaskOut:
-    task = STORE.tasks.get(task_id)
+    task = REPOSITORIES.tasks.get(task_id)
     if task is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     workspace_id = str(task["workspace_id"])
     require_workspace_member(workspace_id, str(user["id"]))
 
-    if payload.status is not None:
-        new_status = payload.status.strip().lower().replace(" ", "_")
-        status_keys = _workspace_status_keys(workspace_id)
-        if status_keys and new_status not in status_keys:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown task status")
-    if payload.status == "done":
-        artifact_exists = any(artifact.get("task_id") == task_id for artifact in STORE.artifacts.values())
-        proof_exempt = payload.proof_exempt if payload.proof_exempt is not None else bool(task["proof_exempt"])
-        if not artifact_exists and not proof_exempt:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Task requires proof-of-work artifact before marking done",
-            )
-
-    for field, value in payload.model_dump(exclude_none=True).items():
-        if field == "status":
-            task[field] = str(value).strip().lower().replace(" ", "_")
-        elif field == "priority":
-            task[field] = value.value if hasattr(value, "value") else value
-        else:
-            task[field] = value
-
-    task["updated_at"] = STORE.now_iso()
+    with REPOSITORIES.workspace_lock(workspace_id):
+        previous_status = str(task["status"])
+        if payload.status is not None:
+            new_status = payload.status.strip().lower().replace(" ", "_")
+            status_keys = _workspace_status_keys(workspace_id)
+            if status_keys and new_status not in status_keys:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown task status")
+        if payload.status == "done":
+            artifact_exists = REPOSITORIES.artifacts.exists_for_task(task_id)
+            proof_exempt = payload.proof_exempt if payload.proof_exempt is not None else bool(task["proof_exempt"])
+            if not artifact_exists and not proof_exempt:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Task requires proof-of-work artifact before marking done",
+                )
+
+        for field, value in payload.model_dump(exclude_none=True).items():
+            if field == "status":
+                task[field] = str(value).strip().lower().replace(" ", "_")
+            elif field == "priority":
+                task[field] = value.value if hasattr(value, "value") else value
+            else:
+                task[field] = value
+
+        task["updated_at"] = STORE.now()
+        REPOSITORIES.tasks.save(task)
     if task.get("assignee_user_id"):
         _upsert_action_required_for_task(
             workspace_id,
@@ -384,7 +448,14 @@ async def update_task(
             role_key,
             "task_updated",
         )
-    EVENT_BUS.publish("task.updated", workspace_id, {"task_id": task_id, "fields": payload.model_dump(exclude_none=True)})
+    event_payload: dict[str, object] = {
+        "task_id": task_id,
+        "project_id": task.get("project_id"),
+        "fields": payload.model_dump(exclude_none=True),
+    }
+    if str(task["status"]) != previous_status:
+        event_payload.update(status=str(task["status"]), previous_status=previous_status)
+    EVENT_BUS.publish("task.updated", workspace_id, event_payload)
     create_audit(workspace_id, "user", str(user["id"]), "task.update", "task", task_id, payload.model_dump(exclude_none=True))
     return _task_out(task)
 
@@ -395,21 +466,24 @@ def add_dependency(
     payload: DependencyCreateIn,
     user: dict[str, object] = Depends(get_current_user),
 ) -> ActivityItem:
-    task = STORE.tasks.get(task_id)
+    task = REPOSITORIES.tasks.get(task_id)
     if task is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    depends_on = STORE.tasks.get(payload.depends_on_task_id)
+    depends_on = REPOSITORIES.tasks.get(payload.depends_on_task_id)
     if depends_on is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dependency task not found")
     workspace_id = str(task["workspace_id"])
     require_workspace_member(workspace_id, str(user["id"]))
 
-    if _has_cycle(task_id, payload.depends_on_task_id):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Dependency cycle detected")
-
-    STORE.task_dependencies[task_id].add(payload.depends_on_task_id)
+    with REPOSITORIES.workspace_lock(workspace_id, str(depends_on["workspace_id"])):
+        if _has_cycle(task_id, payload.depends_on_task_id):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Dependency cycle detected")
+        dependencies = list(REPOSITORIES.entries.get("task_dependencies", task_id) or ())
+        if payload.depends_on_task_id not in dependencies:
+            dependencies.append(payload.depends_on_task_id)
+            REPOSITORIES.entries.put("task_dependencies", task_id, dependencies)
     EVENT_BUS.publish("task.dependency.added", workspace_id, {"task_id": task_id, "depends_on": payload.depends_on_task_id})
-    now = datetime.fromisoformat(STORE.now_iso())
+    now = STORE.now()
     return ActivityItem(
         id=STORE.new_id(),
         type="dependency_added",
@@ -419,37 +493,53 @@ def add_dependency(
 
 
 @router.get("/{task_id}/activity", response_model=list[ActivityItem])
-def task_activity(task_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[ActivityItem]:
+def task_activity(
+    task_id: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    action: list[str] | None = Query(default=None),
+    limit: int | None = Query(default=None, ge=1, le=1000),
+    user: dict[str, object] = Depends(get_current_user),
+) -> list[ActivityItem]:
     workspace_id = _get_workspace_id_for_task(task_id)
     require_workspace_member(workspace_id, str(user["id"]))
-    logs = [log for log in STORE.audit_logs if log.get("entity_type") == "task" and log.get("entity_id") == task_id]
+    logs = REPOSITORIES.audit_logs.query(
+        entity_type="task", entity_id=task_id, actions=action, since=since, until=until, limit=limit
+    )
     return [
         ActivityItem(
             id=str(log["id"]),
             type=str(log["action"]),
             content=str(log.get("payload", {})),
-            created_at=datetime.fromisoformat(str(log["created_at"])),
+            created_at=as_datetime(log["created_at"]),
         )
         for log in logs
     ]
 
 
 @router.get("/{task_id}/agent-timeline", response_model=list[TaskAgentTimelineOut])
-def task_agent_timeline(task_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[TaskAgentTimelineOut]:
+def task_agent_timeline(
+    task_id: str,
+    after: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=1000),
+    user: dict[str, object] = Depends(get_current_user),
+) -> list[TaskAgentTimelineOut]:
     workspace_id = _get_workspace_id_for_task(task_id)
     require_workspace_member(workspace_id, str(user["id"]))
 
-    run_ids = [
-        str(run["id"])
-        for run in STORE.agent_runs.values()
-        if run.get("task_id") == task_id and str(run.get("workspace_id")) == workspace_id and "role_key" in run
+    # Each run's stages are id-ordered already; merging keeps the combined feed ordered without a sort.
+    timelines = [
+        page_after(
+            list(REPOSITORIES.entries.rows("agent_run_timelines", str(run["id"])))
+            or ARCHIVES.read("agent_run_timelines", str(run["id"])),
+            after,
+            None,
+        )
+        for run in REPOSITORIES.agent_runs.list_by_task(task_id)
+        if str(run.get("workspace_id")) == workspace_id
     ]
-    timeline_items: list[dict[str, object]] = []
-    for run_id in run_ids:
-        timeline_items.extend(STORE.agent_run_timelines.get(run_id, []))
-
-    ordered = sorted(timeline_items, key=lambda item: str(item.get("created_at", "")))
-    return [_task_timeline_out(item) for item in ordered]
+    ordered = heapq.merge(*timelines, key=lambda item: str(item["id"]))
+    return [_task_timeline_out(item) for item in islice(ordered, limit)]
 
 
 @router.post("/{task_id}/agent-revision", response_model=AgentRunOut)
@@ -458,11 +548,11 @@ async def request_agent_revision(
     payload: TaskAgentRevisionIn,
     user: dict[str, object] = Depends(get_current_user),
 ) -> AgentRunOut:
-    task = STORE.tasks.get(task_id)
+    task = await asyncio.to_thread(REPOSITORIES.tasks.get, task_id)
     if task is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     workspace_id = str(task["workspace_id"])
-    require_workspace_member(workspace_id, str(user["id"]))
+    await asyncio.to_thread(require_workspace_member, workspace_id, str(user["id"]))
     role_key = str(task.get("assignee_agent_role") or "").strip()
     if not role_key:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task is not assigned to an AI agent")
@@ -488,8 +578,8 @@ async def request_agent_revision(
 def list_subtasks(task_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[TaskSubtaskOut]:
     workspace_id = _get_workspace_id_for_task(task_id)
     require_workspace_member(workspace_id, str(user["id"]))
-    items = _normalize_subtask_order(task_id)
-    return [_task_subtask_out(item) for item in items]
+    # Every write stores the list in order already.
+    return [_task_subtask_out(item) for item in _subtasks(task_id)]
 
 
 @router.post("/{task_id}/subtasks", response_model=list[TaskSubtaskOut])
@@ -500,24 +590,24 @@ def create_subtask(
 ) -> list[TaskSubtaskOut]:
     workspace_id = _get_workspace_id_for_task(task_id)
     require_workspace_member(workspace_id, str(user["id"]))
-    items = STORE.task_subtasks.setdefault(task_id, [])
-    order = payload.order if payload.order is not None else len(items)
     now = STORE.now_iso()
-    subtask = {
-        "id": STORE.new_id(),
-        "task_id": task_id,
-        "workspace_id": workspace_id,
-        "title": payload.title.strip(),
-        "description": payload.description.strip() if isinstance(payload.description, str) else None,
-        "status": "todo",
-        "order": order,
-        "assignee_user_id": payload.assignee_user_id,
-        "assignee_agent_role": payload.assignee_agent_role,
-        "created_at": now,
-        "updated_at": now,
-    }
-    items.append(subtask)
-    normalized = _normalize_subtask_order(task_id)
+    with REPOSITORIES.workspace_lock(workspace_id):
+        items = _subtasks(task_id)
+        order = payload.order if payload.order is not None else len(items)
+        subtask = {
+            "id": STORE.new_id(),
+            "task_id": task_id,
+            "workspace_id": workspace_id,
+            "title": payload.title.strip(),
+            "description": payload.description.strip() if isinstance(payload.description, str) else None,
+            "status": "todo",
+            "order": order,
+            "assignee_user_id": payload.assignee_user_id,
+            "assignee_agent_role": payload.assignee_agent_role,
+            "created_at": now,
+            "updated_at": now,
+        }
+        normalized = _save_subtasks(task_id, [*items, subtask])
     EVENT_BUS.publish("task.subtask.created", workspace_id, {"task_id": task_id, "subtask_id": subtask["id"]})
     return [_task_subtask_out(item) for item in normalized]
 
@@ -531,15 +621,16 @@ def update_subtask(
 ) -> list[TaskSubtaskOut]:
     workspace_id = _get_workspace_id_for_task(task_id)
     require_workspace_member(workspace_id, str(user["id"]))
-    items = STORE.task_subtasks.setdefault(task_id, [])
-    target = next((item for item in items if str(item["id"]) == subtask_id), None)
-    if target is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subtask not found")
-
-    for field, value in payload.model_dump(exclude_unset=True).items():
-        target[field] = value
-    target["updated_at"] = STORE.now_iso()
-    normalized = _normalize_subtask_order(task_id)
+    with REPOSITORIES.workspace_lock(workspace_id):
+        items = _subtasks(task_id)
+        target = next((item for item in items if str(item["id"]) == subtask_id), None)
+        if target is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subtask not found")
+
+        for field, value in payload.model_dump(exclude_unset=True).items():
+            target[field] = value
+        target["updated_at"] = STORE.now_iso()
+        normalized = _save_subtasks(task_id, items)
     EVENT_BUS.publish("task.subtask.updated", workspace_id, {"task_id": task_id, "subtask_id": subtask_id})
     return [_task_subtask_out(item) for item in normalized]
 
@@ -552,21 +643,22 @@ def delete_subtask(
 ) -> list[TaskSubtaskOut]:
     workspace_id = _get_workspace_id_for_task(task_id)
     require_workspace_member(workspace_id, str(user["id"]))
-    items = STORE.task_subtasks.setdefault(task_id, [])
-    if not any(str(item["id"]) == subtask_id for item in items):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subtask not found")
-    STORE.task_subtasks[task_id] = [item for item in items if str(item["id"]) != subtask_id]
-    normalized = _normalize_subtask_order(task_id)
+    with REPOSITORIES.workspace_lock(workspace_id):
+        items = _subtasks(task_id)
+        if not any(str(item["id"]) == subtask_id for item in items):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subtask not found")
+        normalized = _save_subtasks(task_id, [item for item in items if str(item["id"]) != subtask_id])
     EVENT_BUS.publish("task.subtask.deleted", workspace_id, {"task_id": task_id, "subtask_id": subtask_id})
     return [_task_subtask_out(item) for item in normalized]
 
 
 @router.get("/{task_id}/proof-check", response_model=ProofCheckOut)
 def proof_check(task_id: str, user: dict[str, object] = Depends(get_current_user)) -> ProofCheckOut:
-    workspace_id = _get_workspace_id_for_task(task_id)
-    task = STORE.tasks[task_id]
-    require_workspace_member(workspace_id, str(user["id"]))
-    has_artifact = any(artifact.get("task_id") == task_id for artifact in STORE.artifacts.values())
+    task = REPOSITORIES.tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    require_workspace_member(str(task["workspace_id"]), str(user["id"]))
+    has_artifact = REPOSITORIES.artifacts.exists_for_task(task_id)
     proof_exempt = bool(task.get("proof_exempt", False))
     return ProofCheckOut(
         task_id=task_id,
@@ -587,12 +679,13 @@ def add_comment(
     comment = {
         "id": STORE.new_id(),
         "task_id": task_id,
+        "workspace_id": workspace_id,
         "author_user_id": str(user["id"]),
         "author_username": str(user["username"]),
         "content": payload.content,
         "created_at": STORE.now_iso(),
     }
-    STORE.task_comments[task_id].append(comment)
+    REPOSITORIES.entries.append("task_comments", task_id, comment)
     EVENT_BUS.publish("task.comment.created", workspace_id, {"task_id": task_id, "comment_id": comment["id"]})
     return TaskCommentOut(
         id=str(comment["id"]),
@@ -605,9 +698,19 @@ def add_comment(
 
 
 @router.get("/{task_id}/comments", response_model=list[TaskCommentOut])
-def list_comments(task_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[TaskCommentOut]:
+def list_comments(
+    task_id: str,
+    response: Response,
+    created_after: datetime | None = None,
+    after: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    user: dict[str, object] = Depends(get_current_user),
+) -> list[TaskCommentOut]:
     workspace_id = _get_workspace_id_for_task(task_id)
     require_workspace_member(workspace_id, str(user["id"]))
+    comments = take(
+        matching(REPOSITORIES.entries.rows("task_comments", task_id, after=after), created_after=created_after), limit
+    )
     return [
         TaskCommentOut(
             id=str(comment["id"]),
@@ -617,7 +720,7 @@ def list_comments(task_id: str, user: dict[str, object] = Depends(get_current_us
             content=str(comment["content"]),
             created_at=datetime.fromisoformat(str(comment["created_at"])),
         )
-        for comment in STORE.task_comments.get(task_id, [])
+        for comment in paginate(response, comments, limit)
     ]
 
 
@@ -632,6 +735,7 @@ def add_attachment(
     attachment = {
         "id": STORE.new_id(),
         "task_id": task_id,
+        "workspace_id": workspace_id,
         "author_user_id": str(user["id"]),
         "author_username": str(user["username"]),
         "file_name": payload.file_name,
@@ -639,7 +743,7 @@ def add_attachment(
         "mime_type": payload.mime_type,
         "created_at": STORE.now_iso(),
     }
-    STORE.task_attachments[task_id].append(attachment)
+    REPOSITORIES.entries.append("task_attachments", task_id, attachment)
     EVENT_BUS.publish("task.attachment.created", workspace_id, {"task_id": task_id, "attachment_id": attachment["id"]})
     return TaskAttachmentOut(
         id=str(attachment["id"]),
@@ -668,5 +772,5 @@ def list_attachments(task_id: str, user: dict[str, object] = Depends(get_current
             mime_type=attachment.get("mime_type"),
             created_at=datetime.fromisoformat(str(attachment["created_at"])),
         )
-        for attachment in STORE.task_attachments.get(task_id, [])
+        for attachment in REPOSITORIES.entries.rows("task_attachments", task_id)
     ]
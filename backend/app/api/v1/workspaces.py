@@ -1,20 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
 from pathlib import Path
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
 
 from app.api.v1.agents import DEFAULT_AGENT_PROFILES
 from app.core.config import get_settings
 from app.core.dependencies import get_current_user, require_workspace_member
+from app.core.ids import insert_by_id, iter_after
+from app.core.pagination import MAX_PAGE_SIZE, matching, paginate, take
+from app.core.records import as_datetime
 from app.core.store import STORE
 from app.domain.schemas import (
     ActionRequiredOut,
     ActionRequiredUpdateIn,
     APIMessage,
+    ApprovalStatus,
+    AuditLogOut,
     FileProcessingStatus,
+    RunStatus,
     TaskStatusCreateIn,
     TaskStatusOut,
     TaskStatusUpdateIn,
@@ -31,9 +38,12 @@ from app.domain.schemas import (
     WorkspaceProfileOut,
     WorkspaceProfileUpdateIn,
     WorkspaceSettingsUpdateIn,
+    WorkspaceSummaryOut,
 )
+from app.repositories import REPOSITORIES
 from app.services.memory.team_cortex import TEAM_CORTEX
 from app.services.orchestration.event_bus import EVENT_BUS
+from app.services.orchestration.projections import PROJECTIONS
 from app.services.retrieval.file_text import (
     ALLOWED_EXTENSIONS,
     extract_text_from_file,
@@ -79,8 +89,37 @@ def _workspace_out(workspace_id: str, workspace: dict[str, object]) -> Workspace
     )
 
 
+def _member_profiles(workspace_id: str) -> dict[str, dict[str, object]]:
+    return REPOSITORIES.entries.get("workspace_member_profiles", workspace_id) or {}
+
+
 def _member_profile(workspace_id: str, user_id: str) -> dict[str, object] | None:
-    return STORE.workspace_member_profiles.get(workspace_id, {}).get(user_id)
+    return _member_profiles(workspace_id).get(user_id)
+
+
+def _task_statuses(workspace_id: str) -> list[dict[str, object]]:
+    return REPOSITORIES.entries.get("workspace_task_statuses", workspace_id) or [
+        dict(item) for item in DEFAULT_TASK_STATUSES
+    ]
+
+
+def _workspace_agents(workspace_id: str) -> list[dict[str, object]]:
+    return REPOSITORIES.entries.get("workspace_agents", workspace_id) or []
+
+
+def _actions_required(workspace_id: str) -> list[dict[str, object]]:
+    return REPOSITORIES.entries.get("workspace_actions_required", workspace_id) or []
+
+
+def _save_file(workspace_id: str, item: dict[str, object]) -> None:
+    with REPOSITORIES.workspace_lock(workspace_id):
+        files = REPOSITORIES.entries.get("workspace_files", workspace_id) or []
+        index = next((index for index, existing in enumerate(files) if existing["id"] == item["id"]), None)
+        if index is None:
+            insert_by_id(files, item)
+        else:
+            files[index] = item
+        REPOSITORIES.entries.put("workspace_files", workspace_id, files)
 
 
 def _create_workspace_agent(workspace_id: str, payload: WorkspaceAgentCreateIn) -> WorkspaceAgentOut:
@@ -99,10 +138,13 @@ def _create_workspace_agent(workspace_id: str, payload: WorkspaceAgentCreateIn)
         "avatar_key": payload.avatar_key or defaults["avatar_key"],
         "status": payload.status,
         "created_at": STORE.now_iso(),
-        "x": float(10 + len(STORE.workspace_agents[workspace_id]) * 8),
         "y": float(58),
     }
-    STORE.workspace_agents[workspace_id].append(agent)
+    with REPOSITORIES.workspace_lock(workspace_id):
+        agents = _workspace_agents(workspace_id)
+        agent["x"] = float(10 + len(agents) * 8)
+        agents.append(agent)
+        REPOSITORIES.entries.put("workspace_agents", workspace_id, agents)
     EVENT_BUS.publish("workspace.agent.created", workspace_id, {"agent_id": agent["id"], "role_key": payload.role_key})
     return _workspace_agent_out(agent)
 
@@ -120,7 +162,7 @@ def _workspace_invite_url(token: str) -> str:
 
 
 def _initial_status_key(workspace_id: str) -> str:
-    statuses = STORE.workspace_task_statuses.get(workspace_id) or DEFAULT_TASK_STATUSES
+    statuses = _task_statuses(workspace_id)
     defaults = [item for item in statuses if bool(item.get("is_default"))]
     if defaults:
         return str(defaults[0]["key"])
@@ -140,22 +182,29 @@ def create_workspace(payload: WorkspaceCreateIn, user: dict[str, object] = Depen
         "invite_token": invite_token,
         "created_at": STORE.now_iso(),
     }
-    STORE.workspaces[workspace_id] = record
-    STORE.workspace_members[workspace_id].append(
-        {"workspace_id": workspace_id, "user_id": str(user["id"]), "role": "owner"}
-    )
-    STORE.workspace_member_profiles[workspace_id][str(user["id"])] = {
-        "nickname": str(user["username"]),
-        "avatar_key": "char1",
-        "updated_at": STORE.now_iso(),
-    }
-    STORE.workspace_invites[invite_token] = {
-        "workspace_id": workspace_id,
-        "created_by": str(user["id"]),
-        "created_at": STORE.now_iso(),
-        "revoked": False,
-    }
-    STORE.workspace_task_statuses[workspace_id] = [dict(item) for item in DEFAULT_TASK_STATUSES]
+    REPOSITORIES.workspaces.add(record)
+    REPOSITORIES.workspaces.add_member(workspace_id, str(user["id"]), "owner")
+    with REPOSITORIES.workspace_lock(workspace_id):
+        profiles = _member_profiles(workspace_id)
+        profiles[str(user["id"])] = {
+            "nickname": str(user["username"]),
+            "avatar_key": "char1",
+            "updated_at": STORE.now_iso(),
+        }
+        REPOSITORIES.entries.put("workspace_member_profiles", workspace_id, profiles)
+        REPOSITORIES.entries.put(
+            "workspace_invites",
+            invite_token,
+            {
+                "workspace_id": workspace_id,
+                "created_by": str(user["id"]),
+                "created_at": STORE.now_iso(),
+                "revoked": False,
+            },
+        )
+        REPOSITORIES.entries.put(
+            "workspace_task_statuses", workspace_id, [dict(item) for item in DEFAULT_TASK_STATUSES]
+        )
     EVENT_BUS.publish("workspace.created", workspace_id, {"workspace_id": workspace_id})
     return _workspace_out(workspace_id, record)
 
@@ -163,30 +212,39 @@ def create_workspace(payload: WorkspaceCreateIn, user: dict[str, object] = Depen
 @router.get("", response_model=list[WorkspaceOut])
 def list_workspaces(user: dict[str, object] = Depends(get_current_user)) -> list[WorkspaceOut]:
     user_id = str(user["id"])
-    workspace_ids = [
-        str(member["workspace_id"])
-        for members in STORE.workspace_members.values()
-        for member in members
-        if str(member["user_id"]) == user_id
-    ]
-    out: list[WorkspaceOut] = []
-    for workspace_id in workspace_ids:
-        workspace = STORE.workspaces.get(workspace_id)
-        if workspace is None:
-            continue
-        out.append(_workspace_out(workspace_id, workspace))
-    return out
+    return [_workspace_out(str(workspace["id"]), workspace) for workspace in REPOSITORIES.workspaces.list_for_user(user_id)]
 
 
 @router.get("/{workspace_id}", response_model=WorkspaceOut)
 def get_workspace(workspace_id: str, user: dict[str, object] = Depends(get_current_user)) -> WorkspaceOut:
     require_workspace_member(workspace_id, str(user["id"]))
-    workspace = STORE.workspaces.get(workspace_id)
+    workspace = REPOSITORIES.workspaces.get(workspace_id)
     if workspace is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
     return _workspace_out(workspace_id, workspace)
 
 
+@router.get("/{workspace_id}/summary", response_model=WorkspaceSummaryOut)
+def get_workspace_summary(workspace_id: str, user: dict[str, object] = Depends(get_current_user)) -> WorkspaceSummaryOut:
+    require_workspace_member(workspace_id, str(user["id"]))
+    counts = PROJECTIONS.counts(workspace_id)
+    open_actions = dict(counts.open_actions_by_user)
+    unassigned = open_actions.pop("", 0)
+    return WorkspaceSummaryOut(
+        workspace_id=workspace_id,
+        tasks_total=counts.tasks.total(),
+        tasks_by_status=dict(counts.tasks),
+        pending_approvals=counts.approvals[ApprovalStatus.pending.value],
+        open_actions_required=counts.open_actions_by_user.total(),
+        open_actions_by_user=open_actions,
+        unassigned_open_actions=unassigned,
+        running_agent_runs=counts.runs[RunStatus.running.value],
+        agent_runs_by_status=dict(counts.runs),
+        last_event_id=counts.last_event_id,
+        updated_at=counts.updated_at,
+    )
+
+
 @router.patch("/{workspace_id}/settings", response_model=WorkspaceOut)
 def update_workspace_settings(
     workspace_id: str,
@@ -194,21 +252,59 @@ def update_workspace_settings(
     user: dict[str, object] = Depends(get_current_user),
 ) -> WorkspaceOut:
     _require_admin(workspace_id, str(user["id"]))
-    workspace = STORE.workspaces.get(workspace_id)
+    workspace = REPOSITORIES.workspaces.get(workspace_id)
     if workspace is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
     for field, value in payload.model_dump(exclude_none=True).items():
         workspace[field] = value
+    REPOSITORIES.workspaces.save(workspace)
     return _workspace_out(workspace_id, workspace)
 
 
+@router.get("/{workspace_id}/audit-logs", response_model=list[AuditLogOut])
+def list_audit_logs(
+    workspace_id: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    action: list[str] | None = Query(default=None),
+    entity_type: str | None = None,
+    entity_id: str | None = None,
+    limit: int = Query(default=200, ge=1, le=1000),
+    user: dict[str, object] = Depends(get_current_user),
+) -> list[AuditLogOut]:
+    _require_admin(workspace_id, str(user["id"]))
+    logs = REPOSITORIES.audit_logs.query(
+        workspace_id=workspace_id,
+        entity_type=entity_type,
+        entity_id=entity_id,
+        actions=action,
+        since=since,
+        until=until,
+        limit=limit,
+    )
+    return [
+        AuditLogOut(
+            id=str(log["id"]),
+            workspace_id=str(log["workspace_id"]),
+            actor_type=str(log["actor_type"]),
+            actor_id=str(log["actor_id"]),
+            action=str(log["action"]),
+            entity_type=str(log["entity_type"]),
+            entity_id=str(log["entity_id"]),
+            payload=dict(log.get("payload") or {}),
+            created_at=as_datetime(log["created_at"]),
+        )
+        for log in logs
+    ]
+
+
 @router.get("/{workspace_id}/members", response_model=list[WorkspaceMemberOut])
 def list_members(workspace_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[WorkspaceMemberOut]:
     require_workspace_member(workspace_id, str(user["id"]))
-    members = STORE.workspace_members.get(workspace_id, [])
+    members = REPOSITORIES.workspaces.list_members(workspace_id)
     out: list[WorkspaceMemberOut] = []
     for member in members:
-        member_user = STORE.users.get(str(member["user_id"]), {})
+        member_user = REPOSITORIES.users.get(str(member["user_id"])) or {}
         profile = _member_profile(workspace_id, str(member["user_id"])) or {}
         out.append(
             WorkspaceMemberOut(
@@ -233,15 +329,17 @@ def remove_member(
     if requester["role"] == "owner" and str(user["id"]) == member_user_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Owner cannot remove self")
 
-    members = STORE.workspace_members.get(workspace_id, [])
-    target = next((member for member in members if str(member["user_id"]) == member_user_id), None)
-    if target is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Member not found")
-    if str(target["role"]) == "owner":
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Owner cannot be removed")
-
-    STORE.workspace_members[workspace_id] = [member for member in members if str(member["user_id"]) != member_user_id]
-    STORE.workspace_member_profiles.get(workspace_id, {}).pop(member_user_id, None)
+    with REPOSITORIES.workspace_lock(workspace_id):
+        target = REPOSITORIES.workspaces.membership(workspace_id, member_user_id)
+        if target is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Member not found")
+        if str(target["role"]) == "owner":
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Owner cannot be removed")
+
+        REPOSITORIES.workspaces.remove_member(workspace_id, member_user_id)
+        profiles = _member_profiles(workspace_id)
+        if profiles.pop(member_user_id, None) is not None:
+            REPOSITORIES.entries.put("workspace_member_profiles", workspace_id, profiles)
     EVENT_BUS.publish("workspace.member.removed", workspace_id, {"user_id": member_user_id})
     return APIMessage(message="Member removed")
 
@@ -254,11 +352,14 @@ def update_my_profile(
 ) -> WorkspaceProfileOut:
     require_workspace_member(workspace_id, str(user["id"]))
     now = STORE.now_iso()
-    STORE.workspace_member_profiles[workspace_id][str(user["id"])] = {
-        "nickname": payload.nickname.strip(),
-        "avatar_key": payload.avatar_key.strip(),
-        "updated_at": now,
-    }
+    with REPOSITORIES.workspace_lock(workspace_id):
+        profiles = _member_profiles(workspace_id)
+        profiles[str(user["id"])] = {
+            "nickname": payload.nickname.strip(),
+            "avatar_key": payload.avatar_key.strip(),
+            "updated_at": now,
+        }
+        REPOSITORIES.entries.put("workspace_member_profiles", workspace_id, profiles)
     EVENT_BUS.publish("workspace.member.profile.updated", workspace_id, {"user_id": str(user["id"])})
     return WorkspaceProfileOut(
         workspace_id=workspace_id,
@@ -274,12 +375,17 @@ def get_my_profile(workspace_id: str, user: dict[str, object] = Depends(get_curr
     require_workspace_member(workspace_id, str(user["id"]))
     profile = _member_profile(workspace_id, str(user["id"]))
     if profile is None:
-        profile = {
-            "nickname": str(user["username"]),
-            "avatar_key": "char1",
-            "updated_at": STORE.now_iso(),
-        }
-        STORE.workspace_member_profiles[workspace_id][str(user["id"])] = profile
+        with REPOSITORIES.workspace_lock(workspace_id):
+            profiles = _member_profiles(workspace_id)
+            profile = profiles.get(str(user["id"]))
+            if profile is None:
+                profile = {
+                    "nickname": str(user["username"]),
+                    "avatar_key": "char1",
+                    "updated_at": STORE.now_iso(),
+                }
+                profiles[str(user["id"])] = profile
+                REPOSITORIES.entries.put("workspace_member_profiles", workspace_id, profiles)
     return WorkspaceProfileOut(
         workspace_id=workspace_id,
         user_id=str(user["id"]),
@@ -294,19 +400,20 @@ def get_invite_link(
     workspace_id: str, user: dict[str, object] = Depends(get_current_user)
 ) -> WorkspaceInviteOut:
     _require_admin(workspace_id, str(user["id"]))
-    workspace = STORE.workspaces.get(workspace_id)
+    workspace = REPOSITORIES.workspaces.get(workspace_id)
     if workspace is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
-    token = str(workspace["invite_token"])
-    invite = STORE.workspace_invites.get(token)
-    if invite is None:
-        invite = {
-            "workspace_id": workspace_id,
-            "created_by": str(user["id"]),
-            "created_at": STORE.now_iso(),
-            "revoked": False,
-        }
-        STORE.workspace_invites[token] = invite
+    with REPOSITORIES.workspace_lock(workspace_id):
+        token = str(workspace["invite_token"])
+        invite = REPOSITORIES.entries.get("workspace_invites", token)
+        if invite is None:
+            invite = {
+                "workspace_id": workspace_id,
+                "created_by": str(user["id"]),
+                "created_at": STORE.now_iso(),
+                "revoked": False,
+            }
+            REPOSITORIES.entries.put("workspace_invites", token, invite)
     return WorkspaceInviteOut(
         workspace_id=workspace_id,
         token=token,
@@ -321,25 +428,32 @@ def refresh_invite_link(
     workspace_id: str, user: dict[str, object] = Depends(get_current_user)
 ) -> WorkspaceInviteOut:
     _require_admin(workspace_id, str(user["id"]))
-    workspace = STORE.workspaces.get(workspace_id)
+    workspace = REPOSITORIES.workspaces.get(workspace_id)
     if workspace is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
-    previous = workspace.get("invite_token")
-    if isinstance(previous, str) and previous in STORE.workspace_invites:
-        STORE.workspace_invites[previous]["revoked"] = True
-    token = uuid4().hex[:16]
-    workspace["invite_token"] = token
-    STORE.workspace_invites[token] = {
-        "workspace_id": workspace_id,
-        "created_by": str(user["id"]),
-        "created_at": STORE.now_iso(),
-        "revoked": False,
-    }
+    with REPOSITORIES.workspace_lock(workspace_id):
+        previous = workspace.get("invite_token")
+        previous_invite = None
+        if isinstance(previous, str):
+            previous_invite = REPOSITORIES.entries.get("workspace_invites", previous)
+        if previous_invite is not None:
+            previous_invite["revoked"] = True
+            REPOSITORIES.entries.put("workspace_invites", str(previous), previous_invite)
+        token = uuid4().hex[:16]
+        workspace["invite_token"] = token
+        REPOSITORIES.workspaces.save(workspace)
+        invite = {
+            "workspace_id": workspace_id,
+            "created_by": str(user["id"]),
+            "created_at": STORE.now_iso(),
+            "revoked": False,
+        }
+        REPOSITORIES.entries.put("workspace_invites", token, invite)
     return WorkspaceInviteOut(
         workspace_id=workspace_id,
         token=token,
         invite_url=_workspace_invite_url(token),
-        created_at=datetime.fromisoformat(str(STORE.workspace_invites[token]["created_at"])),
+        created_at=datetime.fromisoformat(str(invite["created_at"])),
         revoked=False,
     )
 
@@ -347,11 +461,11 @@ def refresh_invite_link(
 @router.get("/invitations/{token}", response_model=WorkspaceOut)
 def get_invitation(token: str, user: dict[str, object] = Depends(get_current_user)) -> WorkspaceOut:
     _ = user
-    invite = STORE.workspace_invites.get(token)
+    invite = REPOSITORIES.entries.get("workspace_invites", token)
     if invite is None or bool(invite.get("revoked", False)):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invite not found")
     workspace_id = str(invite["workspace_id"])
-    workspace = STORE.workspaces.get(workspace_id)
+    workspace = REPOSITORIES.workspaces.get(workspace_id)
     if workspace is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
     return _workspace_out(workspace_id, workspace)
@@ -359,24 +473,25 @@ def get_invitation(token: str, user: dict[str, object] = Depends(get_current_use
 
 @router.post("/invitations/{token}/accept", response_model=WorkspaceOut)
 def accept_invitation(token: str, user: dict[str, object] = Depends(get_current_user)) -> WorkspaceOut:
-    invite = STORE.workspace_invites.get(token)
+    invite = REPOSITORIES.entries.get("workspace_invites", token)
     if invite is None or bool(invite.get("revoked", False)):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invite not found")
     workspace_id = str(invite["workspace_id"])
-    workspace = STORE.workspaces.get(workspace_id)
+    workspace = REPOSITORIES.workspaces.get(workspace_id)
     if workspace is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
 
-    user_id = str(user["id"])
-    members = STORE.workspace_members[workspace_id]
-    if not any(str(member["user_id"]) == user_id for member in members):
-        members.append({"workspace_id": workspace_id, "user_id": user_id, "role": "member"})
-    if user_id not in STORE.workspace_member_profiles[workspace_id]:
-        STORE.workspace_member_profiles[workspace_id][user_id] = {
-            "nickname": str(user["username"]),
-            "avatar_key": "char2",
-            "updated_at": STORE.now_iso(),
-        }
+    with REPOSITORIES.workspace_lock(workspace_id):
+        user_id = str(user["id"])
+        REPOSITORIES.workspaces.add_member(workspace_id, user_id, "member")
+        profiles = _member_profiles(workspace_id)
+        if user_id not in profiles:
+            profiles[user_id] = {
+                "nickname": str(user["username"]),
+                "avatar_key": "char2",
+                "updated_at": STORE.now_iso(),
+            }
+            REPOSITORIES.entries.put("workspace_member_profiles", workspace_id, profiles)
     EVENT_BUS.publish("workspace.member.joined", workspace_id, {"user_id": user_id})
     return _workspace_out(workspace_id, workspace)
 
@@ -384,10 +499,11 @@ def accept_invitation(token: str, user: dict[str, object] = Depends(get_current_
 @router.get("/{workspace_id}/task-statuses", response_model=list[TaskStatusOut])
 def list_task_statuses(workspace_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[TaskStatusOut]:
     require_workspace_member(workspace_id, str(user["id"]))
-    statuses = STORE.workspace_task_statuses.get(workspace_id)
+    statuses = REPOSITORIES.entries.get("workspace_task_statuses", workspace_id)
     if not statuses:
-        statuses = [dict(item) for item in DEFAULT_TASK_STATUSES]
-        STORE.workspace_task_statuses[workspace_id] = statuses
+        with REPOSITORIES.workspace_lock(workspace_id):
+            statuses = _task_statuses(workspace_id)
+            REPOSITORIES.entries.put("workspace_task_statuses", workspace_id, statuses)
     return [TaskStatusOut(**status) for status in statuses]
 
 
@@ -398,11 +514,13 @@ def add_task_status(
     user: dict[str, object] = Depends(get_current_user),
 ) -> list[TaskStatusOut]:
     _require_admin(workspace_id, str(user["id"]))
-    statuses = STORE.workspace_task_statuses.setdefault(workspace_id, [dict(item) for item in DEFAULT_TASK_STATUSES])
-    key = payload.key.strip().lower().replace(" ", "_")
-    if any(str(item["key"]) == key for item in statuses):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Status key already exists")
-    statuses.append({"key": key, "label": payload.label.strip(), "order": len(statuses), "is_default": False})
+    with REPOSITORIES.workspace_lock(workspace_id):
+        statuses = _task_statuses(workspace_id)
+        key = payload.key.strip().lower().replace(" ", "_")
+        if any(str(item["key"]) == key for item in statuses):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Status key already exists")
+        statuses.append({"key": key, "label": payload.label.strip(), "order": len(statuses), "is_default": False})
+        REPOSITORIES.entries.put("workspace_task_statuses", workspace_id, statuses)
     EVENT_BUS.publish("workspace.task_status.created", workspace_id, {"key": key})
     return [TaskStatusOut(**item) for item in statuses]
 
@@ -415,21 +533,23 @@ def update_task_status(
     user: dict[str, object] = Depends(get_current_user),
 ) -> list[TaskStatusOut]:
     _require_admin(workspace_id, str(user["id"]))
-    statuses = STORE.workspace_task_statuses.setdefault(workspace_id, [dict(item) for item in DEFAULT_TASK_STATUSES])
-    target = next((item for item in statuses if str(item["key"]) == status_key), None)
-    if target is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Status not found")
-
-    if payload.label is not None:
-        target["label"] = payload.label.strip()
-
-    if payload.order is not None:
-        current_index = statuses.index(target)
-        next_index = max(0, min(len(statuses) - 1, payload.order))
-        statuses.pop(current_index)
-        statuses.insert(next_index, target)
-        for index, item in enumerate(statuses):
-            item["order"] = index
+    with REPOSITORIES.workspace_lock(workspace_id):
+        statuses = _task_statuses(workspace_id)
+        target = next((item for item in statuses if str(item["key"]) == status_key), None)
+        if target is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Status not found")
+
+        if payload.label is not None:
+            target["label"] = payload.label.strip()
+
+        if payload.order is not None:
+            # Reordered into a new list so task writers validating against the old one never see it mid-move.
+            next_index = max(0, min(len(statuses) - 1, payload.order))
+            statuses = [item for item in statuses if item is not target]
+            statuses.insert(next_index, target)
+            for index, item in enumerate(statuses):
+                item["order"] = index
+        REPOSITORIES.entries.put("workspace_task_statuses", workspace_id, statuses)
 
     EVENT_BUS.publish("workspace.task_status.updated", workspace_id, {"key": status_key})
     return [TaskStatusOut(**item) for item in statuses]
@@ -442,29 +562,50 @@ def remove_task_status(
     user: dict[str, object] = Depends(get_current_user),
 ) -> list[TaskStatusOut]:
     _require_admin(workspace_id, str(user["id"]))
-    statuses = STORE.workspace_task_statuses.setdefault(workspace_id, [dict(item) for item in DEFAULT_TASK_STATUSES])
-    target = next((item for item in statuses if str(item["key"]) == status_key), None)
-    if target is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Status not found")
-    if bool(target.get("is_default")):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Default status cannot be removed")
-
-    initial_key = _initial_status_key(workspace_id)
-    for task in STORE.tasks.values():
-        if str(task.get("workspace_id")) == workspace_id and str(task.get("status")) == status_key:
-            task["status"] = initial_key
-            task["updated_at"] = STORE.now_iso()
-
-    STORE.workspace_task_statuses[workspace_id] = [item for item in statuses if str(item["key"]) != status_key]
-    for index, item in enumerate(STORE.workspace_task_statuses[workspace_id]):
-        item["order"] = index
-    EVENT_BUS.publish("workspace.task_status.removed", workspace_id, {"key": status_key, "reassigned_to": initial_key})
-    return [TaskStatusOut(**item) for item in STORE.workspace_task_statuses[workspace_id]]
+    with REPOSITORIES.workspace_lock(workspace_id):
+        statuses = _task_statuses(workspace_id)
+        target = next((item for item in statuses if str(item["key"]) == status_key), None)
+        if target is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Status not found")
+        if bool(target.get("is_default")):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Default status cannot be removed")
+
+        initial_key = _initial_status_key(workspace_id)
+        reassigned = REPOSITORIES.tasks.reassign_status(workspace_id, status_key, initial_key)
+
+        statuses = [item for item in statuses if str(item["key"]) != status_key]
+        for index, item in enumerate(statuses):
+            item["order"] = index
+        REPOSITORIES.entries.put("workspace_task_statuses", workspace_id, statuses)
+    EVENT_BUS.publish(
+        "workspace.task_status.removed",
+        workspace_id,
+        {"key": status_key, "reassigned_to": initial_key, "reassigned": reassigned},
+    )
+    return [TaskStatusOut(**item) for item in statuses]
 
 
 @router.get("/{workspace_id}/files", response_model=list[WorkspaceFileOut])
-def list_workspace_files(workspace_id: str, user: dict[str, object] = Depends(get_current_user)) -> list[WorkspaceFileOut]:
+def list_workspace_files(
+    workspace_id: str,
+    response: Response,
+    type: str | None = None,
+    processing_status: FileProcessingStatus | None = None,
+    created_after: datetime | None = None,
+    after: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    user: dict[str, object] = Depends(get_current_user),
+) -> list[WorkspaceFileOut]:
     require_workspace_member(workspace_id, str(user["id"]))
+    files = take(
+        matching(
+            iter_after(REPOSITORIES.entries.get("workspace_files", workspace_id) or [], after),
+            created_after=created_after,
+            type=type,
+            processing_status=processing_status.value if processing_status is not None else None,
+        ),
+        limit,
+    )
     return [
         WorkspaceFileOut(
             id=str(item["id"]),
@@ -479,7 +620,7 @@ def list_workspace_files(workspace_id: str, user: dict[str, object] = Depends(ge
             created_at=datetime.fromisoformat(str(item["created_at"])),
             updated_at=datetime.fromisoformat(str(item["updated_at"])) if item.get("updated_at") else None,
         )
-        for item in STORE.workspace_files.get(workspace_id, [])
+        for item in paginate(response, files, limit)
     ]
 
 
@@ -503,7 +644,8 @@ async def upload_workspace_file(
     file: UploadFile = File(...),
     user: dict[str, object] = Depends(get_current_user),
 ) -> WorkspaceFileOut:
-    require_workspace_member(workspace_id, str(user["id"]))
+    # Repository calls block (a Postgres or Redis round trip); keep them off the loop.
+    await asyncio.to_thread(require_workspace_member, workspace_id, str(user["id"]))
     filename = file.filename or "uploaded-file"
     extension = normalize_extension(filename)
     if extension not in ALLOWED_EXTENSIONS:
@@ -525,7 +667,7 @@ async def upload_workspace_file(
         "object_key": None,
         "extracted_text": "",
     }
-    STORE.workspace_files[workspace_id].append(item)
+    await asyncio.to_thread(_save_file, workspace_id, item)
 
     try:
         content = await file.read()
@@ -584,7 +726,8 @@ async def upload_workspace_file(
         item["updated_at"] = STORE.now_iso()
         EVENT_BUS.publish("workspace.file.processing", workspace_id, {"file_id": file_id, "status": "embedding"})
 
-        TEAM_CORTEX.add_evidence(
+        await asyncio.to_thread(
+            TEAM_CORTEX.add_evidence,
             workspace_id=workspace_id,
             task_id=None,
             run_id=None,
@@ -608,6 +751,9 @@ async def upload_workspace_file(
         item["processing_error"] = str(exc)
         item["updated_at"] = STORE.now_iso()
         raise
+    finally:
+        # Intermediate processing states are not saved; the outcome is.
+        await asyncio.to_thread(_save_file, workspace_id, item)
 
     return WorkspaceFileOut(
         id=str(item["id"]),
@@ -626,11 +772,24 @@ async def upload_workspace_file(
 
 @router.get("/{workspace_id}/actions-required", response_model=list[ActionRequiredOut])
 def list_actions_required(
-    workspace_id: str, user: dict[str, object] = Depends(get_current_user)
+    workspace_id: str,
+    response: Response,
+    status_value: str | None = Query(default=None, alias="status"),
+    severity: str | None = None,
+    created_after: datetime | None = None,
+    after: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    user: dict[str, object] = Depends(get_current_user),
 ) -> list[ActionRequiredOut]:
     member = require_workspace_member(workspace_id, str(user["id"]))
     user_id = str(user["id"])
     is_admin = str(member["role"]) in {"owner", "admin"}
+    visible = (
+        item
+        for item in iter_after(_actions_required(workspace_id), after)
+        if is_admin or item.get("target_user_id") in {None, user_id}
+    )
+    actions = take(matching(visible, created_after=created_after, status=status_value, severity=severity), limit)
     return [
         ActionRequiredOut(
             id=str(item["id"]),
@@ -641,8 +800,7 @@ def list_actions_required(
             status=str(item["status"]),
             created_at=datetime.fromisoformat(str(item["created_at"])),
         )
-        for item in STORE.workspace_actions_required.get(workspace_id, [])
-        if is_admin or item.get("target_user_id") in {None, user_id}
+        for item in paginate(response, actions, limit)
     ]
 
 
@@ -671,16 +829,27 @@ def update_action_required(
     member = require_workspace_member(workspace_id, str(user["id"]))
     user_id = str(user["id"])
     is_admin = str(member["role"]) in {"owner", "admin"}
-    action = next(
-        (item for item in STORE.workspace_actions_required.get(workspace_id, []) if str(item["id"]) == action_id), None
+    with REPOSITORIES.workspace_lock(workspace_id):
+        actions = _actions_required(workspace_id)
+        action = next((item for item in actions if str(item["id"]) == action_id), None)
+        if action is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Action not found")
+        target_user_id = action.get("target_user_id")
+        if target_user_id and not is_admin and str(target_user_id) != user_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to update this action")
+        previous_status = str(action["status"])
+        action["status"] = payload.status
+        REPOSITORIES.entries.put("workspace_actions_required", workspace_id, actions)
+    EVENT_BUS.publish(
+        "workspace.action_required.updated",
+        workspace_id,
+        {
+            "action_id": action_id,
+            "status": payload.status,
+            "previous_status": previous_status,
+            "target_user_id": action.get("target_user_id"),
+        },
     )
-    if action is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Action not found")
-    target_user_id = action.get("target_user_id")
-    if target_user_id and not is_admin and str(target_user_id) != user_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to update this action")
-    action["status"] = payload.status
-    EVENT_BUS.publish("workspace.action_required.updated", workspace_id, {"action_id": action_id, "status": payload.status})
     return ActionRequiredOut(
         id=str(action["id"]),
         workspace_id=workspace_id,
@@ -697,7 +866,7 @@ def list_workspace_agents(
     workspace_id: str, user: dict[str, object] = Depends(get_current_user)
 ) -> list[WorkspaceAgentOut]:
     require_workspace_member(workspace_id, str(user["id"]))
-    return [_workspace_agent_out(agent) for agent in STORE.workspace_agents.get(workspace_id, [])]
+    return [_workspace_agent_out(agent) for agent in _workspace_agents(workspace_id)]
 
 
 @router.post("/{workspace_id}/agents", response_model=WorkspaceAgentOut)
@@ -717,11 +886,13 @@ def bootstrap_workspace_agents(
     user: dict[str, object] = Depends(get_current_user),
 ) -> list[WorkspaceAgentOut]:
     _require_admin(workspace_id, str(user["id"]))
-    if STORE.workspace_agents.get(workspace_id):
-        return [_workspace_agent_out(agent) for agent in STORE.workspace_agents[workspace_id]]
-    created: list[WorkspaceAgentOut] = []
-    for agent_payload in payload.agents:
-        created.append(_create_workspace_agent(workspace_id, agent_payload))
+    with REPOSITORIES.workspace_lock(workspace_id):
+        existing = _workspace_agents(workspace_id)
+        if existing:
+            return [_workspace_agent_out(agent) for agent in existing]
+        created: list[WorkspaceAgentOut] = []
+        for agent_payload in payload.agents:
+            created.append(_create_workspace_agent(workspace_id, agent_payload))
     return created
 
 
@@ -733,13 +904,15 @@ def update_workspace_agent(
     user: dict[str, object] = Depends(get_current_user),
 ) -> WorkspaceAgentOut:
     _require_admin(workspace_id, str(user["id"]))
-    agents = STORE.workspace_agents.get(workspace_id, [])
-    target = next((agent for agent in agents if str(agent["id"]) == agent_id), None)
-    if target is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
-
-    for field, value in payload.model_dump(exclude_none=True).items():
-        target[field] = value
+    with REPOSITORIES.workspace_lock(workspace_id):
+        agents = _workspace_agents(workspace_id)
+        target = next((agent for agent in agents if str(agent["id"]) == agent_id), None)
+        if target is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
+
+        for field, value in payload.model_dump(exclude_none=True).items():
+            target[field] = value
+        REPOSITORIES.entries.put("workspace_agents", workspace_id, agents)
     EVENT_BUS.publish(
         "workspace.agent.updated", workspace_id, {"agent_id": agent_id, "fields": payload.model_dump(exclude_none=True)}
     )
@@ -753,9 +926,12 @@ def delete_workspace_agent(
     user: dict[str, object] = Depends(get_current_user),
 ) -> APIMessage:
     _require_admin(workspace_id, str(user["id"]))
-    agents = STORE.workspace_agents.get(workspace_id, [])
-    if not any(str(agent["id"]) == agent_id for agent in agents):
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
-    STORE.workspace_agents[workspace_id] = [agent for agent in agents if str(agent["id"]) != agent_id]
+    with REPOSITORIES.workspace_lock(workspace_id):
+        agents = _workspace_agents(workspace_id)
+        if not any(str(agent["id"]) == agent_id for agent in agents):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
+        REPOSITORIES.entries.put(
+            "workspace_agents", workspace_id, [agent for agent in agents if str(agent["id"]) != agent_id]
+        )
     EVENT_BUS.publish("workspace.agent.deleted", workspace_id, {"agent_id": agent_id})
     return APIMessage(message="Agent deleted")
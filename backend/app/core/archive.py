@@ -0,0 +1,272 @@
+"""Compressed on-disk segments for rows evicted from in-memory collections.
+
+Each collection archives into its own directory of ``segment-<seq>.arc`` files. A segment is a
+magic header followed by two ``<length:u32><crc32:u32>`` frames: a small pickled header (partition
+keys, tags, time range, row count, caller metadata) and the zlib-compressed pickle of
+``{partition: [rows...]}``. Headers are read once on open so lookups know which segments hold a
+partition without decompressing anything; decoded segments are kept in a small LRU cache.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import pickle
+import struct
+import threading
+import zlib
+from collections import OrderedDict, defaultdict
+from collections.abc import Collection, Iterator, Mapping
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MAGIC = b"KOBOARC1"
+_FRAME = struct.Struct("<II")
+_COMPRESSION_LEVEL = 6
+
+
+@dataclass(slots=True, frozen=True)
+class ArchiveSegment:
+    seq: int
+    path: Path
+    partitions: frozenset[str]
+    tags: frozenset[str]
+    rows: int
+    first_at: datetime | None
+    last_at: datetime | None
+    size_bytes: int
+    meta: dict[str, Any] = field(default_factory=dict)
+
+    def overlaps(self, since: datetime | None, until: datetime | None) -> bool:
+        if since is not None and self.last_at is not None and self.last_at < since:
+            return False
+        if until is not None and self.first_at is not None and self.first_at >= until:
+            return False
+        return True
+
+
+def _read_frame(handle: BinaryIO) -> bytes | None:
+    header = handle.read(_FRAME.size)
+    if len(header) < _FRAME.size:
+        return None
+    length, crc = _FRAME.unpack(header)
+    payload = handle.read(length)
+    if len(payload) < length or zlib.crc32(payload) != crc:
+        return None
+    return payload
+
+
+def _frame(payload: bytes) -> bytes:
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+class SegmentArchive:
+    def __init__(self, directory: str | os.PathLike[str], *, cache_segments: int = 4) -> None:
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._segments: dict[int, ArchiveSegment] = {}
+        self._by_partition: dict[str, list[int]] = defaultdict(list)
+        self._by_tag: dict[str, list[int]] = defaultdict(list)
+        self._cache: OrderedDict[int, dict[str, list[Any]]] = OrderedDict()
+        self._cache_size = max(cache_segments, 0)
+        self._next_seq = 1
+        self._load_headers()
+
+    def _load_headers(self) -> None:
+        for path in sorted(self._dir.glob("segment-*.arc")):
+            segment = self._read_header(path)
+            if segment is None:
+                logger.warning("archive_segment_invalid path=%s", path)
+                continue
+            self._register(segment)
+        for tmp in self._dir.glob("segment-*.tmp"):
+            tmp.unlink(missing_ok=True)
+
+    @staticmethod
+    def _read_header(path: Path) -> ArchiveSegment | None:
+        with open(path, "rb") as handle:
+            if handle.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+                return None
+            payload = _read_frame(handle)
+        if payload is None:
+            return None
+        header = pickle.loads(payload)
+        return ArchiveSegment(path=path, size_bytes=path.stat().st_size, **header)
+
+    def _register(self, segment: ArchiveSegment) -> None:
+        self._segments[segment.seq] = segment
+        for partition in segment.partitions:
+            self._by_partition[partition].append(segment.seq)
+        for tag in segment.tags:
+            self._by_tag[tag].append(segment.seq)
+        self._next_seq = max(self._next_seq, segment.seq + 1)
+
+    def write(
+        self,
+        partitions: Mapping[str, list[Any]],
+        *,
+        first_at: datetime | None = None,
+        last_at: datetime | None = None,
+        tags: Collection[str] = (),
+        meta: Mapping[str, Any] | None = None,
+    ) -> ArchiveSegment:
+        """Durably write one segment; rows may be dropped from memory once this returns."""
+        body = zlib.compress(pickle.dumps(dict(partitions), protocol=pickle.HIGHEST_PROTOCOL), _COMPRESSION_LEVEL)
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+        header = {
+            "seq": seq,
+            "partitions": frozenset(partitions),
+            "tags": frozenset(tags),
+            "rows": sum(len(rows) for rows in partitions.values()),
+            "first_at": first_at,
+            "last_at": last_at,
+            "meta": dict(meta or {}),
+        }
+        path = self._dir / f"segment-{seq:010d}.arc"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as handle:
+            handle.write(ARCHIVE_MAGIC)
+            handle.write(_frame(pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)))
+            handle.write(_frame(body))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp, path)
+        segment = ArchiveSegment(path=path, size_bytes=path.stat().st_size, **header)
+        with self._lock:
+            self._register(segment)
+        return segment
+
+    def load(self, seq: int) -> dict[str, list[Any]]:
+        with self._lock:
+            cached = self._cache.get(seq)
+            if cached is not None:
+                self._cache.move_to_end(seq)
+                return cached
+            segment = self._segments[seq]
+        with open(segment.path, "rb") as handle:
+            handle.read(len(ARCHIVE_MAGIC))
+            _read_frame(handle)
+            body = _read_frame(handle)
+        if body is None:
+            logger.warning("archive_segment_corrupt path=%s", segment.path)
+            return {}
+        partitions: dict[str, list[Any]] = pickle.loads(zlib.decompress(body))
+        with self._lock:
+            if self._cache_size:
+                self._cache[seq] = partitions
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return partitions
+
+    def segments(
+        self,
+        *,
+        partition: str | None = None,
+        tag: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[ArchiveSegment]:
+        """Segments (oldest first) that may hold rows for ``partition`` / ``tag`` in the time range."""
+        with self._lock:
+            if partition is not None:
+                seqs: Collection[int] = list(self._by_partition.get(partition, ()))
+            elif tag is not None:
+                seqs = list(self._by_tag.get(tag, ()))
+            else:
+                seqs = sorted(self._segments)
+            candidates = [self._segments[seq] for seq in seqs]
+        if tag is not None and partition is not None:
+            candidates = [segment for segment in candidates if tag in segment.tags]
+        return [segment for segment in candidates if segment.overlaps(since, until)]
+
+    def read(self, partition: str) -> list[Any]:
+        """Every archived row of ``partition``, oldest first."""
+        rows: list[Any] = []
+        for segment in self.segments(partition=partition):
+            rows.extend(self.load(segment.seq).get(partition, ()))
+        return rows
+
+    def tail(self, partition: str, limit: int) -> list[Any]:
+        """The newest ``limit`` archived rows of ``partition``, oldest first."""
+        rows: list[Any] = []
+        for segment in reversed(self.segments(partition=partition)):
+            rows[:0] = self.load(segment.seq).get(partition, ())
+            if len(rows) >= limit:
+                break
+        return rows[-limit:] if limit > 0 else []
+
+    def __contains__(self, partition: object) -> bool:
+        return partition in self._by_partition
+
+    def __iter__(self) -> Iterator[ArchiveSegment]:
+        with self._lock:
+            return iter(sorted(self._segments.values(), key=lambda segment: segment.seq))
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(segment.size_bytes for segment in self._segments.values())
+
+    @property
+    def rows(self) -> int:
+        return sum(segment.rows for segment in self._segments.values())
+
+
+class ArchiveRegistry:
+    """One ``SegmentArchive`` per collection name under a shared root directory."""
+
+    def __init__(self) -> None:
+        self._root: Path | None = None
+        self._archives: dict[str, SegmentArchive] = {}
+
+    def open(self, root: str | os.PathLike[str]) -> None:
+        self._root = Path(root)
+        self._archives.clear()
+
+    def close(self) -> None:
+        self._root = None
+        self._archives.clear()
+
+    @property
+    def enabled(self) -> bool:
+        return self._root is not None
+
+    def get(self, name: str) -> SegmentArchive | None:
+        if self._root is None:
+            return None
+        archive = self._archives.get(name)
+        if archive is None:
+            archive = self._archives[name] = SegmentArchive(self._root / name)
+        return archive
+
+    def read(self, name: str, partition: str) -> list[Any]:
+        archive = self.get(name)
+        if archive is None or partition not in archive:
+            return []
+        return archive.read(partition)
+
+    def with_archived(self, name: str, partition: str, live: list[Any]) -> list[Any]:
+        """Archived rows of ``partition`` followed by ``live``, without rows present in both.
+
+        Rows can be in both after a crash between archiving and the next snapshot.
+        """
+        archived = self.read(name, partition)
+        if not archived:
+            return live
+        live_ids = {row["id"] for row in live}
+        return [row for row in archived if row["id"] not in live_ids] + live
+
+    def tail(self, name: str, partition: str, limit: int) -> list[Any]:
+        archive = self.get(name)
+        if archive is None or partition not in archive:
+            return []
+        return archive.tail(partition, limit)
+
+
+ARCHIVES = ArchiveRegistry()
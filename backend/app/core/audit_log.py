@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Callable, Collection, Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Protocol
+
+from app.core.records import AuditRecord, as_datetime
+
+DEFAULT_SEGMENT_SIZE = 8192
+
+
+def _created_at(row: AuditRecord) -> datetime:
+    return row.created_at
+
+
+def _bound(value: datetime | str | None) -> datetime | None:
+    return None if value is None else as_datetime(value)
+
+
+def entity_tag(entity_type: str, entity_id: str) -> str:
+    """Archive tag under which a segment advertises rows for one entity."""
+    return f"{entity_type}:{entity_id}"
+
+
+class ArchiveReader(Protocol):
+    def segments(
+        self,
+        *,
+        partition: str | None = None,
+        tag: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> Sequence[Any]: ...
+
+    def load(self, seq: int) -> Mapping[str, list[Any]]: ...
+
+
+@dataclass(slots=True)
+class AuditSegment:
+    """Fixed-capacity, time-ordered run of audit rows. Only the newest segment accepts appends."""
+
+    rows: list[AuditRecord] = field(default_factory=list)
+    sealed: bool = False
+
+    @property
+    def start(self) -> datetime | None:
+        return _created_at(self.rows[0]) if self.rows else None
+
+    @property
+    def end(self) -> datetime | None:
+        return _created_at(self.rows[-1]) if self.rows else None
+
+
+class AuditLog:
+    """Append-only audit log split into time-ordered segments.
+
+    Rows are indexed per ``(entity_type, entity_id)``, per workspace and per ``(workspace_id, action)``
+    (mirroring the ``AuditLog`` indexes in ``prisma/schema.prisma``). Every index bucket is kept in
+    append order, which is also ``created_at`` order, so time-range lookups bisect the bucket and
+    the cost of a query is proportional to the rows it returns rather than to the log size.
+    Appended rows are stored as ``AuditRecord``; plain dicts are converted on the way in.
+
+    Every row has a log position (its append sequence number). Retention evicts the oldest sealed
+    segments into an archive (see ``app.core.retention``); positions keep counting from where they
+    were, and queries whose range reaches past the in-memory rows read the archived segments too.
+    """
+
+    def __init__(self, segment_size: int = DEFAULT_SEGMENT_SIZE) -> None:
+        self._segment_size = max(1, segment_size)
+        self._segments: list[AuditSegment] = [AuditSegment()]
+        self._by_entity: dict[tuple[str, str], list[AuditRecord]] = defaultdict(list)
+        self._by_workspace: dict[str, list[AuditRecord]] = defaultdict(list)
+        self._by_workspace_action: dict[tuple[str, str], list[AuditRecord]] = defaultdict(list)
+        # Positions ``[_base, _size)`` are in memory; everything before ``_base`` was archived.
+        self._base = 0
+        self._size = 0
+        # Appends come from every workspace's handlers; positions must be handed out one at a time.
+        self._lock = threading.Lock()
+        # Called with ``(position, row)`` for every append; set by the store's write-ahead log.
+        self.journal: Callable[[int, AuditRecord], None] | None = None
+        self.archive: ArchiveReader | None = None
+
+    def append(self, data: Mapping[str, Any]) -> AuditRecord:
+        row = AuditRecord.from_mapping(data)
+        with self._lock:
+            segment = self._segments[-1]
+            if len(segment.rows) >= self._segment_size:
+                segment.sealed = True
+                segment = AuditSegment()
+                self._segments.append(segment)
+            segment.rows.append(row)
+            workspace_id = row.workspace_id
+            self._by_entity[(row.entity_type, row.entity_id)].append(row)
+            self._by_workspace[workspace_id].append(row)
+            self._by_workspace_action[(workspace_id, row.action)].append(row)
+            self._size += 1
+            if self.journal is not None:
+                self.journal(self._size - 1, row)
+        return row
+
+    def __len__(self) -> int:
+        return self._size - self._base
+
+    @property
+    def next_position(self) -> int:
+        return self._size
+
+    @property
+    def base_position(self) -> int:
+        return self._base
+
+    def attach_archive(self, archive: ArchiveReader | None, archived_through: int = 0) -> None:
+        """Read evicted rows from ``archive``; an empty log starts counting at ``archived_through``."""
+        self.archive = archive
+        if self._size == 0 and archived_through:
+            self._base = self._size = archived_through
+
+    def sealed_segments(self) -> list[AuditSegment]:
+        return [segment for segment in self._segments if segment.sealed]
+
+    def evict_oldest(self, count: int) -> list[AuditSegment]:
+        """Drop the ``count`` oldest sealed segments from memory and the indexes."""
+        with self._lock:
+            return self._evict_oldest_locked(count)
+
+    def _evict_oldest_locked(self, count: int) -> list[AuditSegment]:
+        evicted = [segment for segment in self._segments[:count] if segment.sealed]
+        if not evicted:
+            return []
+        # Evicted rows are the oldest ones, so they form a prefix of every bucket they are in.
+        prefixes: dict[tuple[str, Any], int] = defaultdict(int)
+        for segment in evicted:
+            for row in segment.rows:
+                prefixes[("entity", (row.entity_type, row.entity_id))] += 1
+                prefixes[("workspace", row.workspace_id)] += 1
+                prefixes[("action", (row.workspace_id, row.action))] += 1
+        indexes: dict[str, dict[Any, list[AuditRecord]]] = {
+            "entity": self._by_entity,
+            "workspace": self._by_workspace,
+            "action": self._by_workspace_action,
+        }
+        for (index_name, key), dropped in prefixes.items():
+            buckets = indexes[index_name]
+            bucket = buckets[key]
+            if dropped >= len(bucket):
+                del buckets[key]
+            else:
+                del bucket[:dropped]
+        del self._segments[: len(evicted)]
+        self._base += sum(len(segment.rows) for segment in evicted)
+        return evicted
+
+    def snapshot_state(self) -> dict[str, Any]:
+        return {"base": self._base, "rows": list(self)}
+
+    def restore(self, state: Mapping[str, Any] | Sequence[Any]) -> None:
+        """Load a ``snapshot_state()`` (or a plain row list), skipping positions already archived."""
+        if isinstance(state, Mapping):
+            base, rows = int(state["base"]), state["rows"]
+        else:
+            base, rows = 0, state
+        if base > self._size and not len(self):
+            self._base = self._size = base
+        for position, row in enumerate(rows, start=base):
+            if position >= self._size:
+                self.append(row)
+
+    def __iter__(self) -> Iterator[AuditRecord]:
+        for segment in self._segments:
+            yield from segment.rows
+
+    @property
+    def segments(self) -> list[AuditSegment]:
+        return self._segments
+
+    def by_entity(self, entity_type: str, entity_id: str, **filters: Any) -> list[AuditRecord]:
+        return self.query(entity_type=entity_type, entity_id=entity_id, **filters)
+
+    def by_workspace(self, workspace_id: str, **filters: Any) -> list[AuditRecord]:
+        return self.query(workspace_id=workspace_id, **filters)
+
+    def query(
+        self,
+        *,
+        workspace_id: str | None = None,
+        entity_type: str | None = None,
+        entity_id: str | None = None,
+        actions: Collection[str] | None = None,
+        since: datetime | str | None = None,
+        until: datetime | str | None = None,
+        limit: int | None = None,
+    ) -> list[AuditRecord]:
+        """Return rows matching every given filter, oldest first.
+
+        ``since`` is inclusive and ``until`` exclusive. ``limit`` keeps the newest rows.
+        """
+        lower, upper = _bound(since), _bound(until)
+        action_set = set(actions) if actions else None
+
+        # ``exact`` means bucket membership already satisfies every filter, so ``limit`` can be
+        # applied to the bisected span before any row is touched.
+        if entity_type is not None and entity_id is not None:
+            buckets = [self._by_entity.get((entity_type, entity_id), [])]
+            exact = workspace_id is None and action_set is None
+        elif workspace_id is not None and action_set is not None:
+            buckets = [self._by_workspace_action.get((workspace_id, action), []) for action in action_set]
+            exact = entity_type is None and entity_id is None
+        elif workspace_id is not None:
+            buckets = [self._by_workspace.get(workspace_id, [])]
+            exact = entity_type is None and entity_id is None
+        else:
+            exact = entity_type is None and entity_id is None and action_set is None
+            buckets = [
+                segment.rows
+                for segment in self._segments
+                if segment.rows
+                and (lower is None or _created_at(segment.rows[-1]) >= lower)
+                and (upper is None or _created_at(segment.rows[0]) < upper)
+            ]
+
+        spans: list[list[AuditRecord]] = []
+        for bucket in buckets:
+            rows: list[AuditRecord] = []
+            start = bisect_left(bucket, lower, key=_created_at) if lower is not None else 0
+            stop = bisect_left(bucket, upper, key=_created_at) if upper is not None else len(bucket)
+            if limit is not None and exact and len(buckets) == 1:
+                start = max(start, stop - max(limit, 0))
+            for row in bucket[start:stop]:
+                if workspace_id is not None and row.workspace_id != workspace_id:
+                    continue
+                if entity_type is not None and row.entity_type != entity_type:
+                    continue
+                if entity_id is not None and row.entity_id != entity_id:
+                    continue
+                if action_set is not None and row.action not in action_set:
+                    continue
+                rows.append(row)
+            spans.append(rows)
+        if len(spans) == 1:
+            rows = spans[0]
+        else:
+            # Every span is already time-ordered, so a k-way merge replaces a sort.
+            rows = list(heapq.merge(*spans, key=_created_at))
+        if self.archive is not None and self._base and (limit is None or len(rows) < limit):
+            first = next((segment.rows[0] for segment in self._segments if segment.rows), None)
+            if first is None or lower is None or lower < _created_at(first):
+                needed = limit - len(rows) if limit is not None else None
+                archived = self._query_archive(workspace_id, entity_type, entity_id, action_set, lower, upper, needed)
+                rows = archived + rows
+        if limit is not None:
+            rows = rows[-limit:] if limit > 0 else []
+        return rows
+
+    def _query_archive(
+        self,
+        workspace_id: str | None,
+        entity_type: str | None,
+        entity_id: str | None,
+        action_set: set[str] | None,
+        lower: datetime | None,
+        upper: datetime | None,
+        needed: int | None,
+    ) -> list[AuditRecord]:
+        assert self.archive is not None
+        tag = entity_tag(entity_type, entity_id) if entity_type is not None and entity_id is not None else None
+        blocks: list[list[AuditRecord]] = []
+        found = 0
+        # Archived segments are evicted whole and in order, so segment order is time order: walking
+        # them newest first lets a limited query stop once it has enough rows.
+        for segment in reversed(self.archive.segments(partition=workspace_id, tag=tag, since=lower, until=upper)):
+            if needed is not None and found >= needed:
+                break
+            partitions = self.archive.load(segment.seq)
+            spans = [partitions.get(workspace_id, [])] if workspace_id is not None else list(partitions.values())
+            block: list[AuditRecord] = []
+            for row in heapq.merge(*spans, key=_created_at):
+                if lower is not None and row.created_at < lower:
+                    continue
+                if upper is not None and row.created_at >= upper:
+                    continue
+                if entity_type is not None and row.entity_type != entity_type:
+                    continue
+                if entity_id is not None and row.entity_id != entity_id:
+                    continue
+                if action_set is not None and row.action not in action_set:
+                    continue
+                block.append(row)
+            blocks.append(block)
+            found += len(block)
+        return [row for block in reversed(blocks) for row in block]
+
+    def count(self, entity_type: str, entity_id: str) -> int:
+        return len(self._by_entity.get((entity_type, entity_id), ()))
+
+    def latest(self, entity_type: str, entity_id: str) -> AuditRecord | None:
+        bucket = self._by_entity.get((entity_type, entity_id))
+        return bucket[-1] if bucket else None
@@ -4,7 +4,7 @@ from fastapi import HTTPException, Request, status
 
 from app.core.config import get_settings
 from app.core.security import TokenError, decode_token
-from app.core.store import STORE
+from app.repositories import REPOSITORIES
 
 
 def get_current_user(request: Request) -> dict[str, object]:
@@ -20,15 +20,14 @@ def get_current_user(request: Request) -> dict[str, object]:
     user_id = payload.get("sub")
     if not isinstance(user_id, str):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid user")
-    user = STORE.users.get(user_id)
+    user = REPOSITORIES.users.get(user_id)
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 
 def require_workspace_member(workspace_id: str, user_id: str) -> dict[str, object]:
-    members = STORE.workspace_members.get(workspace_id, [])
-    for member in members:
-        if member["user_id"] == user_id:
-            return member
+    member = REPOSITORIES.workspaces.membership(workspace_id, user_id)
+    if member is not None:
+        return member
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a workspace member")
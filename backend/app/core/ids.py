@@ -0,0 +1,99 @@
+"""Time-ordered identifiers.
+
+``uuid7()`` returns RFC 9562 version 7 UUIDs: a 48-bit Unix millisecond timestamp, a 12-bit
+counter and 62 random bits. The counter is re-seeded every millisecond and incremented for ids
+minted within the same one, so ids from one process are strictly increasing and their canonical
+string forms sort in creation order. That lets id-keyed containers stay ordered by appending and
+lets an id double as a pagination cursor.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from bisect import bisect_right, insort
+from collections.abc import Iterator, Mapping, MutableSequence, Sequence
+from datetime import UTC, datetime
+from itertools import islice
+from typing import Any
+from uuid import UUID
+
+_COUNTER_BITS = 12
+_COUNTER_MAX = (1 << _COUNTER_BITS) - 1
+# Seeds leave the top counter bit clear so a millisecond can mint at least 2048 ids before
+# borrowing the next one.
+_SEED_MASK = _COUNTER_MAX >> 1
+
+
+class _UUID7Generator:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._counter = 0
+
+    def __call__(self) -> str:
+        random_bits = int.from_bytes(os.urandom(8))
+        now_ms = time.time_ns() // 1_000_000
+        with self._lock:
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._counter = random_bits >> 52 & _SEED_MASK
+            else:
+                # Same millisecond, or the clock stepped back: keep counting from the last id.
+                self._counter += 1
+                if self._counter > _COUNTER_MAX:
+                    self._last_ms += 1
+                    self._counter = random_bits >> 52 & _SEED_MASK
+            timestamp, counter = self._last_ms, self._counter
+        value = (
+            timestamp << 80
+            | 0x7 << 76
+            | counter << 64
+            | 0b10 << 62
+            | random_bits & ((1 << 62) - 1)
+        )
+        return str(UUID(int=value))
+
+
+uuid7 = _UUID7Generator()
+
+
+def uuid7_time(value: str) -> datetime | None:
+    """Creation time embedded in a version 7 id, or ``None`` for any other id."""
+    try:
+        parsed = UUID(value)
+    except ValueError:
+        return None
+    if parsed.version != 7:
+        return None
+    return datetime.fromtimestamp((parsed.int >> 80) / 1000, tz=UTC)
+
+
+def page_after(records: Sequence[Mapping[str, Any]], after: str | None, limit: int | None) -> list[Any]:
+    """Slice of id-ordered ``records`` that follows the ``after`` id, found by bisection."""
+    start = bisect_right(records, after, key=_record_id) if after is not None else 0
+    stop = len(records) if limit is None else start + max(limit, 0)
+    return list(records[start:stop])
+
+
+def iter_after(records: Sequence[Mapping[str, Any]], after: str | None) -> Iterator[Any]:
+    """Lazily iterate id-ordered ``records`` from just past the ``after`` id."""
+    start = bisect_right(records, after, key=_record_id) if after is not None else 0
+    return islice(records, start, None)
+
+
+def insert_by_id(records: MutableSequence[Any], record: Mapping[str, Any]) -> None:
+    """Add ``record`` to id-ordered ``records``, keeping the order ``page_after`` bisects on.
+
+    Usually an append, but an id minted before its writer took the lock, or by another process,
+    can be older than the last row.
+    """
+    if not records or _record_id(records[-1]) < _record_id(record):
+        records.append(record)
+    else:
+        insort(records, record, key=_record_id)
+
+
+def _record_id(record: Mapping[str, Any]) -> str:
+    return str(record["id"])
@@ -0,0 +1,52 @@
+"""Per-workspace write locks for the in-memory store.
+
+Sync route handlers run concurrently in FastAPI's threadpool, so every read-modify-write of
+workspace state (check-then-insert, in-place reorders, list rebuilds) runs under the lock of the
+workspace it touches. Workspaces hash onto a fixed pool of re-entrant locks: writes to different
+workspaces rarely share a lock and proceed independently, writes within one workspace serialize.
+
+Locks are held for short, non-blocking critical sections only; never across an ``await`` or I/O.
+"""
+
+from __future__ import annotations
+
+import threading
+import zlib
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from app.core.metrics import METRICS, MetricsRegistry
+
+DEFAULT_SHARDS = 64
+
+
+class ShardLocks:
+    def __init__(self, shards: int = DEFAULT_SHARDS, *, metrics: MetricsRegistry = METRICS) -> None:
+        self._locks = [threading.RLock() for _ in range(max(1, shards))]
+        self._metrics = metrics
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def shard_of(self, key: str) -> int:
+        # crc32 rather than ``hash()`` so the mapping is stable across processes.
+        return zlib.crc32(key.encode()) % len(self._locks)
+
+    @contextmanager
+    def hold(self, *keys: str) -> Iterator[None]:
+        """Hold the locks of every key; shards are taken in index order so callers cannot deadlock."""
+        locks = [self._locks[shard] for shard in sorted({self.shard_of(key) for key in keys})]
+        for index, lock in enumerate(locks):
+            if not lock.acquire(blocking=False):
+                self._metrics.inc("store.shard_lock.contended")
+                try:
+                    lock.acquire()
+                except BaseException:
+                    for held in reversed(locks[:index]):
+                        held.release()
+                    raise
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
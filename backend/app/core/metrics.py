@@ -0,0 +1,46 @@
+"""Process-local runtime counters and gauges.
+
+Names are dotted (``retention.audit_logs.bytes_reclaimed``). ``METRICS.snapshot()`` is served by
+``GET /runtime-metrics``.
+"""
+
+from __future__ import annotations
+
+import threading
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self._gauges[name] = value
+
+    def add_gauge(self, name: str, delta: float) -> None:
+        with self._lock:
+            self._gauges[name] = self._gauges.get(name, 0) + delta
+
+    def counter(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def gauge(self, name: str) -> float | None:
+        return self._gauges.get(name)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {"counters": counters, "gauges": dict(self._gauges)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+
+METRICS = MetricsRegistry()
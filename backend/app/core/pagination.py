@@ -0,0 +1,55 @@
+"""Cursor pagination for list endpoints.
+
+Listings are served in id order, which is creation order (see ``app.core.ids``). With ``limit`` a
+response holds at most that many records; when more match, the id of the last one is returned in
+the ``X-Next-Cursor`` header and is passed back as ``after`` for the next page. Bodies stay plain
+JSON arrays, so callers that send no ``limit`` keep receiving the whole collection.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Mapping
+from datetime import datetime
+from itertools import islice
+from typing import Any, TypeVar
+
+from fastapi import Response
+
+from app.core.records import as_datetime
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 500
+
+RecordT = TypeVar("RecordT", bound=Mapping[str, Any])
+
+
+def matching(
+    records: Iterable[RecordT], *, created_after: datetime | None = None, **expected: Any
+) -> Iterator[RecordT]:
+    """Records whose fields equal every non-``None`` value in ``expected``, created after ``created_after``."""
+    wanted = [(name, value) for name, value in expected.items() if value is not None]
+    since = as_datetime(created_after) if created_after is not None else None
+    for record in records:
+        if any(record.get(name) != value for name, value in wanted):
+            continue
+        if since is not None and as_datetime(record["created_at"]) <= since:
+            continue
+        yield record
+
+
+def fetch_size(limit: int | None) -> int | None:
+    """Rows to read for a page: one extra tells whether another page follows."""
+    return None if limit is None else limit + 1
+
+
+def take(records: Iterable[RecordT], limit: int | None) -> list[RecordT]:
+    return list(islice(records, fetch_size(limit)))
+
+
+def paginate(response: Response, records: list[RecordT], limit: int | None) -> list[RecordT]:
+    """Trim a ``fetch_size(limit)`` read to ``limit`` and set the next cursor on ``response``."""
+    if limit is None or len(records) <= limit:
+        return records
+    page = records[:limit]
+    response.headers[NEXT_CURSOR_HEADER] = str(page[-1]["id"])
+    return page
@@ -0,0 +1,348 @@
+"""Snapshot + write-ahead log persistence for ``InMemoryStore``.
+
+The data directory holds ``snapshot-<seq>.bin`` files and ``wal-<seq>.log`` segments. A snapshot
+with sequence ``n`` contains everything journaled to segments before ``n``; recovery loads the
+newest valid snapshot and replays segments ``>= n`` in order. Journal ops are idempotent against
+a snapshot taken while writes continue (puts and keyed entries overwrite, membership changes are
+idempotent, audit appends carry their log position and list appends are de-duplicated by id), so
+snapshots never stop the world.
+
+WAL segments are sequences of frames: ``<length:u32><crc32:u32><pickle payload>``; a torn or
+corrupt frame ends replay of its segment. A snapshot is a magic header followed by one frame.
+
+``open`` takes an exclusive lock on ``<dir>/LOCK``, so a second process (e.g. another
+``uvicorn --workers`` worker) cannot replay and append to the same log.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import gc
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from app.core.config import Settings
+from app.core.store import STORE, InMemoryStore
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"KOBOSNP1"
+_FRAME = struct.Struct("<II")
+_SNAPSHOT_ATTEMPTS = 3
+_CHUNK_SIZE = 1 << 20
+
+
+@dataclass(slots=True)
+class RecoveryStats:
+    snapshot_seq: int | None
+    snapshot_seconds: float
+    replayed_ops: int
+    replay_seconds: float
+    torn_frames: int
+
+
+@dataclass(slots=True)
+class SnapshotStats:
+    seq: int
+    bytes_written: int
+    seconds: float
+    segments_removed: int
+
+
+def _frame(payload: bytes) -> bytes:
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+class _ChecksumWriter:
+    """File-like sink that tracks length and CRC32 of everything pickled through it."""
+
+    def __init__(self, handle: BinaryIO) -> None:
+        self._handle = handle
+        self.length = 0
+        self.crc = 0
+
+    def write(self, data: bytes) -> int:
+        self.crc = zlib.crc32(data, self.crc)
+        self.length += len(data)
+        return self._handle.write(data)
+
+
+def _seq(path: Path) -> int:
+    return int(path.stem.split("-", 1)[1])
+
+
+class StorePersistence:
+    def __init__(
+        self,
+        store: InMemoryStore,
+        directory: str | os.PathLike[str],
+        *,
+        snapshot_interval_seconds: float = 300,
+        sync_ms: int = 50,
+    ) -> None:
+        self._store = store
+        self._dir = Path(directory)
+        self._snapshot_interval = snapshot_interval_seconds
+        self._sync_interval = sync_ms / 1000
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._buffer = bytearray()
+        self._fd: int | None = None
+        self._dir_lock: int | None = None
+        self._seq = 0
+        self._stopped = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def _paths(self, prefix: str) -> list[Path]:
+        suffix = ".bin" if prefix == "snapshot" else ".log"
+        return sorted(self._dir.glob(f"{prefix}-*{suffix}"), key=_seq)
+
+    def _segment_path(self, seq: int) -> Path:
+        return self._dir / f"wal-{seq:010d}.log"
+
+    def recover(self) -> RecoveryStats:
+        """Load the newest valid snapshot and replay the WAL into the (empty) store."""
+        self._dir.mkdir(parents=True, exist_ok=True)
+        # Recovery allocates millions of long-lived objects and no cycles; collector passes over
+        # the growing heap would roughly double load time.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._recover()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def _recover(self) -> RecoveryStats:
+        started = time.perf_counter()
+        snapshot_seq: int | None = None
+        for path in reversed(self._paths("snapshot")):
+            state = self._load_snapshot(path)
+            if state is not None:
+                self._store.restore(state)
+                snapshot_seq = _seq(path)
+                break
+            logger.warning("store_snapshot_invalid path=%s", path)
+        snapshot_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        replayed = torn = 0
+        segments = [path for path in self._paths("wal") if snapshot_seq is None or _seq(path) >= snapshot_seq]
+        for path in segments:
+            count, truncated = self._replay_segment(path)
+            replayed += count
+            if truncated:
+                torn += 1
+                logger.warning("store_wal_torn_frame path=%s replayed=%s", path, count)
+        existing = [_seq(path) for path in (*self._paths("wal"), *self._paths("snapshot"))]
+        self._seq = max(existing, default=0) + 1
+        return RecoveryStats(
+            snapshot_seq=snapshot_seq,
+            snapshot_seconds=snapshot_seconds,
+            replayed_ops=replayed,
+            replay_seconds=time.perf_counter() - started,
+            torn_frames=torn,
+        )
+
+    def _replay_segment(self, path: Path) -> tuple[int, bool]:
+        """Apply every intact frame of ``path``; the flag is set when it ends in a torn frame."""
+        count = 0
+        with open(path, "rb", buffering=_CHUNK_SIZE) as handle:
+            while header := handle.read(_FRAME.size):
+                if len(header) < _FRAME.size:
+                    return count, True
+                length, crc = _FRAME.unpack(header)
+                payload = handle.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return count, True
+                self._store.apply(pickle.loads(payload))
+                count += 1
+        return count, False
+
+    @staticmethod
+    def _load_snapshot(path: Path) -> dict[str, Any] | None:
+        # Streamed twice (checksum, then unpickle) so the file is never held in memory whole.
+        with open(path, "rb") as handle:
+            header = handle.read(len(SNAPSHOT_MAGIC) + _FRAME.size)
+            if len(header) < len(SNAPSHOT_MAGIC) + _FRAME.size or not header.startswith(SNAPSHOT_MAGIC):
+                return None
+            length, expected_crc = _FRAME.unpack_from(header, len(SNAPSHOT_MAGIC))
+            crc, remaining = 0, length
+            while remaining:
+                chunk = handle.read(min(remaining, _CHUNK_SIZE))
+                if not chunk:
+                    return None
+                crc = zlib.crc32(chunk, crc)
+                remaining -= len(chunk)
+            if crc != expected_crc:
+                return None
+            handle.seek(len(header))
+            return pickle.load(handle)
+
+    def open(self, *, background: bool = True) -> RecoveryStats:
+        self._lock_dir()
+        stats = self.recover()
+        self._open_segment()
+        self._store.attach_journal(self._journal)
+        if background:
+            self._start(self._flush_periodically, "store-wal-flusher")
+            if self._snapshot_interval > 0:
+                self._start(self._snapshot_periodically, "store-snapshotter")
+        logger.info(
+            "store_recovered snapshot_seq=%s replayed_ops=%s seconds=%.3f",
+            stats.snapshot_seq,
+            stats.replayed_ops,
+            stats.snapshot_seconds + stats.replay_seconds,
+        )
+        return stats
+
+    def _lock_dir(self) -> None:
+        self._dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self._dir / "LOCK", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise RuntimeError(
+                f"{self._dir} is in use by another process; the memory store backend serves one API worker, "
+                "use STORE_BACKEND=redis or postgres to run several"
+            ) from None
+        self._dir_lock = fd
+
+    def _start(self, target: Any, name: str) -> None:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _open_segment(self) -> None:
+        self._fd = os.open(self._segment_path(self._seq), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def _journal(self, op: tuple[Any, ...]) -> None:
+        frame = _frame(pickle.dumps(op, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._buffer += frame
+            if self._sync_interval <= 0:
+                self._write_locked()
+                if self._fd is not None:
+                    os.fsync(self._fd)
+
+    def _write_locked(self) -> None:
+        if self._buffer and self._fd is not None:
+            view = memoryview(self._buffer)
+            while view:
+                view = view[os.write(self._fd, view) :]
+            view.release()
+            self._buffer = bytearray()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write_locked()
+            fd = self._fd
+        if fd is not None:
+            try:
+                os.fsync(fd)
+            except OSError:
+                # The segment was rotated and closed between the write and the fsync.
+                pass
+
+    def _flush_periodically(self) -> None:
+        while not self._stopped.wait(max(self._sync_interval, 0.01)):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("store_wal_flush_failed")
+
+    def _snapshot_periodically(self) -> None:
+        while not self._stopped.wait(self._snapshot_interval):
+            try:
+                self.snapshot()
+            except Exception:
+                logger.exception("store_snapshot_failed")
+
+    def snapshot(self) -> SnapshotStats:
+        with self._snapshot_lock:
+            started = time.perf_counter()
+            with self._lock:
+                self._write_locked()
+                if self._fd is not None:
+                    os.fsync(self._fd)
+                    os.close(self._fd)
+                self._seq += 1
+                seq = self._seq
+                self._open_segment()
+
+            path = self._dir / f"snapshot-{seq:010d}.bin"
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "wb") as handle:
+                for attempt in range(1, _SNAPSHOT_ATTEMPTS + 1):
+                    handle.seek(0)
+                    handle.truncate()
+                    handle.write(SNAPSHOT_MAGIC + _FRAME.pack(0, 0))
+                    writer = _ChecksumWriter(handle)
+                    try:
+                        pickle.dump(self._store.snapshot_state(), writer, protocol=pickle.HIGHEST_PROTOCOL)
+                        break
+                    except RuntimeError:
+                        # A collection changed size while being copied or pickled; take a fresh copy.
+                        if attempt == _SNAPSHOT_ATTEMPTS:
+                            raise
+                handle.seek(len(SNAPSHOT_MAGIC))
+                handle.write(_FRAME.pack(writer.length, writer.crc))
+                handle.flush()
+                os.fsync(handle.fileno())
+            bytes_written = len(SNAPSHOT_MAGIC) + _FRAME.size + writer.length
+            os.replace(tmp, path)
+            self._fsync_dir()
+
+            removed = 0
+            for old in (*self._paths("snapshot"), *self._paths("wal")):
+                if _seq(old) < seq:
+                    old.unlink(missing_ok=True)
+                    removed += 1
+            return SnapshotStats(
+                seq=seq, bytes_written=bytes_written, seconds=time.perf_counter() - started, segments_removed=removed
+            )
+
+    def _fsync_dir(self) -> None:
+        fd = os.open(self._dir, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self, *, snapshot: bool = True) -> None:
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads.clear()
+        if snapshot:
+            self.snapshot()
+        self._store.attach_journal(None)
+        with self._lock:
+            self._write_locked()
+            if self._fd is not None:
+                os.fsync(self._fd)
+                os.close(self._fd)
+                self._fd = None
+        if self._dir_lock is not None:
+            os.close(self._dir_lock)
+            self._dir_lock = None
+
+
+def build_store_persistence(settings: Settings, store: InMemoryStore = STORE) -> StorePersistence | None:
+    if settings.store_backend != "memory" or not settings.store_data_dir:
+        return None
+    return StorePersistence(
+        store,
+        settings.store_data_dir,
+        snapshot_interval_seconds=settings.store_snapshot_interval_seconds,
+        sync_ms=settings.store_wal_sync_ms,
+    )
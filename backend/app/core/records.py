@@ -0,0 +1,209 @@
+"""Compact typed records for the store's high-volume entities.
+
+Tasks, agent runs, run timeline stages, evidence entries and audit rows are slotted dataclasses
+with native ``datetime`` timestamps and interned enum-like strings (status, priority, role keys,
+actions, workspace ids) instead of ``dict[str, Any]`` rows carrying ISO strings. They keep the
+``MutableMapping`` interface (``record["status"]``, ``.get``, ``in``, ``dict(record)``, ``**record``)
+so code written against dict rows keeps working; keys that are not fields go to a lazily created
+``extra`` dict.
+"""
+
+from __future__ import annotations
+
+import sys
+from collections.abc import Iterator, Mapping, MutableMapping
+from dataclasses import dataclass, field, fields
+from datetime import UTC, datetime
+from typing import Any, ClassVar, Self
+
+
+def as_datetime(value: object) -> datetime:
+    """Timestamps are stored as aware datetimes; ISO strings and naive values are read as UTC."""
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    return value if value.tzinfo is not None else value.replace(tzinfo=UTC)
+
+
+_FIELD_NAMES: dict[type, tuple[str, ...]] = {}
+
+
+def _field_names(cls: type) -> tuple[str, ...]:
+    names = _FIELD_NAMES.get(cls)
+    if names is None:
+        names = _FIELD_NAMES[cls] = tuple(item.name for item in fields(cls) if item.name != "extra")
+    return names
+
+
+def _rebuild(cls: type[MappingRecord], values: tuple[Any, ...]) -> MappingRecord:
+    return cls(*values)
+
+
+class MappingRecord(MutableMapping[str, Any]):
+    __slots__ = ()
+
+    _interned: ClassVar[frozenset[str]] = frozenset()
+    _timestamps: ClassVar[frozenset[str]] = frozenset({"created_at", "updated_at"})
+
+    extra: dict[str, Any] | None
+
+    def __post_init__(self) -> None:
+        for name in self._interned:
+            value = getattr(self, name)
+            if type(value) is str:
+                object.__setattr__(self, name, sys.intern(value))
+        for name in self._timestamps:
+            value = getattr(self, name, None)
+            if value is not None and not (isinstance(value, datetime) and value.tzinfo is not None):
+                object.__setattr__(self, name, as_datetime(value))
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Rebuilt through ``__init__`` so strings are re-interned when a snapshot or WAL is loaded.
+        return _rebuild, (type(self), (*(getattr(self, name) for name in _field_names(type(self))), self.extra))
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]) -> Self:
+        if isinstance(data, cls):
+            return data
+        names = _field_names(cls)
+        record = cls(**{key: value for key, value in data.items() if key in names})
+        for key, value in data.items():
+            if key not in names:
+                record[key] = value
+        return record
+
+    def _is_field(self, key: str) -> bool:
+        return key in _field_names(type(self))
+
+    def __getitem__(self, key: str) -> Any:
+        if self._is_field(key):
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if not self._is_field(key):
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+            return
+        if key in self._timestamps and value is not None:
+            value = as_datetime(value)
+        elif key in self._interned and type(value) is str:
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return (isinstance(key, str) and self._is_field(key)) or (self.extra is not None and key in self.extra)
+
+    def __delitem__(self, key: str) -> None:
+        if self._is_field(key):
+            raise TypeError(f"{type(self).__name__}.{key} is a field and cannot be removed")
+        if self.extra is None or key not in self.extra:
+            raise KeyError(key)
+        del self.extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from _field_names(type(self))
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(_field_names(type(self))) + (len(self.extra) if self.extra else 0)
+
+    def to_dict(self) -> dict[str, Any]:
+        return dict(self.items())
+
+
+@dataclass(slots=True)
+class TaskRecord(MappingRecord):
+    _interned: ClassVar[frozenset[str]] = frozenset(
+        {"workspace_id", "project_id", "status", "priority", "assignee_user_id", "assignee_agent_role"}
+    )
+
+    id: str
+    workspace_id: str
+    title: str
+    status: str
+    priority: str
+    created_at: datetime
+    updated_at: datetime
+    project_id: str | None = None
+    description: str | None = None
+    acceptance_criteria: list[str] = field(default_factory=list)
+    assignee_user_id: str | None = None
+    assignee_agent_role: str | None = None
+    proof_exempt: bool = False
+    extra: dict[str, Any] | None = None
+
+
+@dataclass(slots=True)
+class AgentRunRecord(MappingRecord):
+    _interned: ClassVar[frozenset[str]] = frozenset({"workspace_id", "task_id", "role_key", "status"})
+
+    id: str
+    workspace_id: str
+    role_key: str
+    status: str
+    created_at: datetime
+    updated_at: datetime
+    task_id: str | None = None
+    output: dict[str, Any] | None = None
+    extra: dict[str, Any] | None = None
+
+
+@dataclass(slots=True)
+class TimelineStage(MappingRecord):
+    _interned: ClassVar[frozenset[str]] = frozenset(
+        {"run_id", "workspace_id", "task_id", "stage", "agent_role", "title", "status"}
+    )
+    _timestamps: ClassVar[frozenset[str]] = frozenset({"created_at"})
+
+    id: str
+    run_id: str
+    workspace_id: str
+    stage: str
+    agent_role: str
+    title: str
+    summary: str
+    status: str
+    created_at: datetime
+    task_id: str | None = None
+    metadata: dict[str, Any] = field(default_factory=dict)
+    extra: dict[str, Any] | None = None
+
+
+@dataclass(slots=True)
+class EvidenceEntry(MappingRecord):
+    _interned: ClassVar[frozenset[str]] = frozenset({"workspace_id", "task_id", "run_id", "source_type"})
+    _timestamps: ClassVar[frozenset[str]] = frozenset({"created_at"})
+
+    id: str
+    workspace_id: str
+    claim: str
+    source_type: str
+    source_ref: str
+    confidence: float
+    created_at: datetime
+    task_id: str | None = None
+    run_id: str | None = None
+    extra: dict[str, Any] | None = None
+
+
+@dataclass(slots=True)
+class AuditRecord(MappingRecord):
+    _interned: ClassVar[frozenset[str]] = frozenset(
+        {"workspace_id", "actor_type", "actor_id", "action", "entity_type", "entity_id"}
+    )
+    _timestamps: ClassVar[frozenset[str]] = frozenset({"created_at"})
+
+    id: str
+    workspace_id: str
+    actor_type: str
+    actor_id: str
+    action: str
+    entity_type: str
+    entity_id: str
+    created_at: datetime
+    payload: dict[str, Any] = field(default_factory=dict)
+    extra: dict[str, Any] | None = None
@@ -0,0 +1,540 @@
+"""Retention policies and the background compactor for unbounded in-memory collections.
+
+Each managed collection has a ``RetentionPolicy`` (max age, max row count, approximate memory
+budget). The ``Compactor`` periodically plans which of the oldest rows fall outside the policy,
+writes them to the collection's ``SegmentArchive`` (see ``app.core.archive``), and only then drops
+them from memory, so a reader never sees a row disappear before it is readable from the archive.
+Without an archive directory only the event outbox is compacted: its rows are events every consumer
+has acknowledged, while the other collections would lose rows for good, so they stay unbounded.
+
+Row sizes are estimated by walking a sample of rows with ``sys.getsizeof``; ``bytes_reclaimed``
+and the memory budget use that estimate, not allocator-level accounting.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable, Mapping
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass, field, fields, is_dataclass
+from datetime import UTC, datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Protocol
+
+from app.core.archive import ARCHIVES, ArchiveRegistry, SegmentArchive
+from app.core.audit_log import AuditLog, AuditSegment, entity_tag
+from app.core.config import Settings
+from app.core.metrics import METRICS, MetricsRegistry
+from app.core.records import as_datetime
+from app.core.store import STORE, InMemoryStore
+
+logger = logging.getLogger(__name__)
+
+_SAMPLE_SIZE = 32
+# Collections whose evicted rows are only kept by the archive.
+ARCHIVED_COLLECTIONS = frozenset(
+    {"audit_logs", "evidence_entries", "agent_run_timelines", "workspace_assistant_messages"}
+)
+
+# Entered with the rows a commit removes, around their removal and its journal entry; the lock the
+# collection's writers hold, so an append journaled at the same time cannot be reordered around it.
+RowsLock = Callable[[list[Any]], AbstractContextManager[Any]]
+
+
+def _no_lock(rows: list[Any]) -> AbstractContextManager[Any]:
+    return nullcontext()
+
+
+@dataclass(slots=True, frozen=True)
+class RetentionPolicy:
+    max_age_seconds: float | None = None
+    max_count: int | None = None
+    max_bytes: int | None = None
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]) -> RetentionPolicy:
+        unknown = set(data) - {item.name for item in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown retention policy keys: {sorted(unknown)}")
+        return cls(
+            max_age_seconds=float(data["max_age_seconds"]) if data.get("max_age_seconds") is not None else None,
+            max_count=int(data["max_count"]) if data.get("max_count") is not None else None,
+            max_bytes=int(data["max_bytes"]) if data.get("max_bytes") is not None else None,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_age_seconds is not None or self.max_count is not None or self.max_bytes is not None
+
+
+def estimate_bytes(value: Any, _depth: int = 0) -> int:
+    """Approximate deep size of a row: containers, strings, records and slotted dataclasses."""
+    size = sys.getsizeof(value)
+    if _depth > 6 or isinstance(value, str | bytes | int | float | bool | datetime) or value is None:
+        return size
+    if isinstance(value, Mapping):
+        return size + sum(
+            estimate_bytes(key, _depth + 1) + estimate_bytes(item, _depth + 1) for key, item in value.items()
+        )
+    if isinstance(value, list | tuple | set | frozenset):
+        return size + sum(estimate_bytes(item, _depth + 1) for item in value)
+    if is_dataclass(value):
+        return size + sum(estimate_bytes(getattr(value, item.name), _depth + 1) for item in fields(value))
+    return size
+
+
+def _row_time(row: Any) -> datetime:
+    value = row.created_at if hasattr(row, "created_at") else row["created_at"]
+    return as_datetime(value)
+
+
+@dataclass(slots=True)
+class EvictionPlan:
+    """Rows selected for eviction, grouped by archive partition; ``commit`` drops them from memory."""
+
+    partitions: dict[str, list[Any]]
+    rows: int
+    commit: Callable[[], None]
+    first_at: datetime | None = None
+    last_at: datetime | None = None
+    tags: set[str] = field(default_factory=set)
+    meta: dict[str, Any] = field(default_factory=dict)
+
+
+class RetainedCollection(Protocol):
+    name: str
+
+    def size(self) -> int: ...
+
+    def sample(self, limit: int) -> list[Any]: ...
+
+    def plan(self, cutoff: datetime | None, excess: int) -> EvictionPlan | None: ...
+
+
+def _spread(rows: list[Any], limit: int) -> list[Any]:
+    if len(rows) <= limit:
+        return list(rows)
+    step = len(rows) / limit
+    return [rows[int(index * step)] for index in range(limit)]
+
+
+class ListRetention:
+    """Time-ordered list; the oldest rows are a prefix."""
+
+    def __init__(
+        self,
+        name: str,
+        rows: Callable[[], list[Any]],
+        partition_of: Callable[[Any], str],
+        *,
+        trim: Callable[[int], None] | None = None,
+        limit: Callable[[], int] | None = None,
+        lock: RowsLock = _no_lock,
+    ) -> None:
+        self.name = name
+        self._rows = rows
+        self._partition_of = partition_of
+        self._trim = trim
+        self._lock = lock
+        # How many of the oldest rows may go at all, e.g. those every consumer has acknowledged.
+        self._limit = limit
+
+    def size(self) -> int:
+        return len(self._rows())
+
+    def sample(self, limit: int) -> list[Any]:
+        return _spread(self._rows(), limit)
+
+    def plan(self, cutoff: datetime | None, excess: int) -> EvictionPlan | None:
+        rows = self._rows()
+        count = len(rows)
+        evict = min(max(excess, 0), count)
+        if cutoff is not None:
+            while evict < count and _row_time(rows[evict]) < cutoff:
+                evict += 1
+        if self._limit is not None:
+            evict = min(evict, self._limit())
+        if not evict:
+            return None
+        selected = rows[:evict]
+        partitions: dict[str, list[Any]] = {}
+        for row in selected:
+            partitions.setdefault(self._partition_of(row), []).append(row)
+
+        def commit() -> None:
+            # Writers only append, so the selected rows are still the prefix.
+            with self._lock(selected):
+                if self._trim is not None:
+                    self._trim(evict)
+                else:
+                    del rows[:evict]
+
+        return EvictionPlan(
+            partitions=partitions,
+            rows=evict,
+            commit=commit,
+            first_at=_row_time(selected[0]),
+            last_at=_row_time(selected[-1]),
+        )
+
+
+class PartitionedRetention:
+    """``dict[partition, list[row]]`` with time-ordered lists.
+
+    With ``whole_partitions`` a partition (e.g. one run's timeline) is evicted as a unit once its
+    newest row is past the age cutoff or while the oldest partitions are needed to cover the excess;
+    otherwise the globally oldest rows are evicted across partitions.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        partitions: Callable[[], dict[str, list[Any]]],
+        *,
+        whole_partitions: bool = False,
+        changed: Callable[[str], None] | None = None,
+        lock: RowsLock = _no_lock,
+    ) -> None:
+        self.name = name
+        self._partitions = partitions
+        self._whole = whole_partitions
+        # Called with each partition key the eviction shortened or removed, e.g. to journal it.
+        self._changed = changed
+        self._lock = lock
+
+    def size(self) -> int:
+        return sum(len(rows) for rows in list(self._partitions().values()))
+
+    def sample(self, limit: int) -> list[Any]:
+        rows: list[Any] = []
+        for bucket in list(self._partitions().values()):
+            rows.extend(bucket[:1])
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def plan(self, cutoff: datetime | None, excess: int) -> EvictionPlan | None:
+        partitions = self._partitions()
+        selected: dict[str, int] = {}
+        if self._whole:
+            taken = 0
+            # Insertion order is creation order (keys are time-ordered ids of the owning entity).
+            for key, rows in list(partitions.items()):
+                if not rows:
+                    continue
+                if taken < excess or (cutoff is not None and _row_time(rows[-1]) < cutoff):
+                    selected[key] = len(rows)
+                    taken += len(rows)
+        else:
+            snapshot = [(key, rows, len(rows)) for key, rows in list(partitions.items()) if rows]
+            if cutoff is not None:
+                for key, rows, count in snapshot:
+                    index = 0
+                    while index < count and _row_time(rows[index]) < cutoff:
+                        index += 1
+                    if index:
+                        selected[key] = index
+            remaining = excess - sum(selected.values())
+            if remaining > 0:
+                heads = [
+                    (_row_time(rows[start]), key, start)
+                    for key, rows, count in snapshot
+                    if (start := selected.get(key, 0)) < count
+                ]
+                heapq.heapify(heads)
+                lengths = {key: count for key, _rows, count in snapshot}
+                while remaining > 0 and heads:
+                    _, key, index = heapq.heappop(heads)
+                    selected[key] = index + 1
+                    remaining -= 1
+                    if index + 1 < lengths[key]:
+                        heapq.heappush(heads, (_row_time(partitions[key][index + 1]), key, index + 1))
+        if not selected:
+            return None
+
+        chosen = {key: partitions[key][:count] for key, count in selected.items()}
+        times = [_row_time(rows[0]) for rows in chosen.values()] + [_row_time(rows[-1]) for rows in chosen.values()]
+
+        def commit() -> None:
+            for key, evicted in chosen.items():
+                with self._lock(evicted):
+                    rows = partitions.get(key)
+                    if rows is None:
+                        continue
+                    # Usually the prefix, but a late row can have been inserted ahead of it by id.
+                    gone = {id(row) for row in evicted}
+                    rows[:] = [row for row in rows if id(row) not in gone]
+                    if not rows:
+                        partitions.pop(key, None)
+                    if self._changed is not None:
+                        self._changed(key)
+
+        return EvictionPlan(
+            partitions=chosen,
+            rows=sum(selected.values()),
+            commit=commit,
+            first_at=min(times),
+            last_at=max(times),
+        )
+
+
+class AuditLogRetention:
+    """Evicts whole sealed ``AuditLog`` segments, archived per workspace and tagged per entity."""
+
+    name = "audit_logs"
+
+    def __init__(self, log: AuditLog) -> None:
+        self._log = log
+
+    def attach_archive(self, archive: SegmentArchive) -> None:
+        # Positions already archived are skipped when a snapshot taken before the eviction is loaded.
+        archived_through = max((segment.meta.get("end_position", 0) for segment in archive), default=0)
+        self._log.attach_archive(archive, archived_through)
+
+    def size(self) -> int:
+        return len(self._log)
+
+    def sample(self, limit: int) -> list[Any]:
+        rows: list[Any] = []
+        for segment in list(self._log.segments):
+            rows.extend(_spread(segment.rows, max(1, limit // max(len(self._log.segments), 1))))
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def plan(self, cutoff: datetime | None, excess: int) -> EvictionPlan | None:
+        chosen: list[AuditSegment] = []
+        taken = 0
+        for segment in self._log.sealed_segments():
+            if taken < excess or (cutoff is not None and segment.rows[-1].created_at < cutoff):
+                chosen.append(segment)
+                taken += len(segment.rows)
+            else:
+                break
+        if not chosen:
+            return None
+        partitions: dict[str, list[Any]] = {}
+        tags: set[str] = set()
+        for segment in chosen:
+            for row in segment.rows:
+                partitions.setdefault(row.workspace_id, []).append(row)
+                tags.add(entity_tag(row.entity_type, row.entity_id))
+        return EvictionPlan(
+            partitions=partitions,
+            rows=taken,
+            commit=lambda: self._log.evict_oldest(len(chosen)),
+            first_at=chosen[0].rows[0].created_at,
+            last_at=chosen[-1].rows[-1].created_at,
+            tags=tags,
+            meta={"end_position": self._log.base_position + taken},
+        )
+
+
+@dataclass(slots=True)
+class CompactionStats:
+    collection: str
+    rows_before: int
+    rows_evicted: int
+    bytes_reclaimed: int
+    archive_bytes: int
+    seconds: float
+
+
+class Compactor:
+    def __init__(
+        self,
+        collections: list[tuple[RetainedCollection, RetentionPolicy]],
+        *,
+        archive_dir: str | os.PathLike[str] | None = None,
+        archives: ArchiveRegistry = ARCHIVES,
+        interval_seconds: float = 60,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self._collections = [(collection, policy) for collection, policy in collections if policy.enabled]
+        self._archive_dir = archive_dir
+        self._archives = archives
+        self._interval = interval_seconds
+        self._metrics = metrics
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def open(self) -> None:
+        """Open the archives; call before the store is recovered so archived audit rows are skipped."""
+        if self._archive_dir is None:
+            return
+        self._archives.open(self._archive_dir)
+        for collection, _policy in self._collections:
+            attach = getattr(collection, "attach_archive", None)
+            archive = self._archives.get(collection.name)
+            if attach is not None and archive is not None:
+                attach(archive)
+
+    def run_once(self, now: datetime | None = None) -> list[CompactionStats]:
+        now = now or datetime.now(UTC)
+        results: list[CompactionStats] = []
+        with self._lock:
+            for collection, policy in self._collections:
+                stats = self._compact(collection, policy, now)
+                if stats is not None:
+                    results.append(stats)
+        self._metrics.inc("retention.compactions")
+        return results
+
+    def _compact(self, collection: RetainedCollection, policy: RetentionPolicy, now: datetime) -> CompactionStats | None:
+        started = time.perf_counter()
+        prefix = f"retention.{collection.name}"
+        size = collection.size()
+        sample = collection.sample(_SAMPLE_SIZE)
+        row_bytes = sum(estimate_bytes(row) for row in sample) / len(sample) if sample else 0.0
+        self._metrics.set_gauge(f"{prefix}.rows", size)
+        self._metrics.set_gauge(f"{prefix}.bytes_estimate", round(size * row_bytes))
+
+        excess = 0
+        if policy.max_count is not None:
+            excess = max(excess, size - policy.max_count)
+        if policy.max_bytes is not None and row_bytes:
+            excess = max(excess, size - int(policy.max_bytes // row_bytes))
+        cutoff = now - timedelta(seconds=policy.max_age_seconds) if policy.max_age_seconds is not None else None
+        plan = collection.plan(cutoff, excess)
+        if plan is None:
+            return None
+
+        archive_bytes = 0
+        archive = self._archives.get(collection.name)
+        if archive is not None:
+            segment = archive.write(
+                plan.partitions, first_at=plan.first_at, last_at=plan.last_at, tags=plan.tags, meta=plan.meta
+            )
+            archive_bytes = segment.size_bytes
+            self._metrics.inc(f"{prefix}.rows_archived", plan.rows)
+            self._metrics.inc(f"{prefix}.archive_bytes_written", archive_bytes)
+        else:
+            self._metrics.inc(f"{prefix}.rows_dropped", plan.rows)
+        plan.commit()
+
+        reclaimed = round(plan.rows * row_bytes)
+        self._metrics.inc(f"{prefix}.bytes_reclaimed", reclaimed)
+        self._metrics.set_gauge(f"{prefix}.rows", collection.size())
+        stats = CompactionStats(
+            collection=collection.name,
+            rows_before=size,
+            rows_evicted=plan.rows,
+            bytes_reclaimed=reclaimed,
+            archive_bytes=archive_bytes,
+            seconds=time.perf_counter() - started,
+        )
+        logger.info(
+            "retention_compacted collection=%s rows=%s bytes_reclaimed=%s archived_bytes=%s",
+            stats.collection,
+            stats.rows_evicted,
+            stats.bytes_reclaimed,
+            stats.archive_bytes,
+        )
+        return stats
+
+    def start(self) -> None:
+        if self._thread is not None or not self._collections or self._interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._run_periodically, name="store-compactor", daemon=True)
+        self._thread.start()
+
+    def _run_periodically(self) -> None:
+        while not self._stopped.wait(self._interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("retention_compaction_failed")
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self._archives.close()
+
+
+class Outbox(Protocol):
+    @property
+    def outbox(self) -> list[Any]: ...
+
+    def trimmable_outbox(self) -> int: ...
+
+    def trim_outbox(self, count: int) -> None: ...
+
+
+def retention_archive_dir(settings: Settings) -> Path | None:
+    if settings.retention_archive_dir:
+        return Path(settings.retention_archive_dir)
+    if settings.store_data_dir:
+        return Path(settings.store_data_dir) / "archive"
+    return None
+
+
+def _workspace_rows_lock(store: InMemoryStore, rows: list[Any]) -> AbstractContextManager[Any]:
+    return store.workspace_lock(*{str(row["workspace_id"]) for row in rows})
+
+
+def build_compactor(
+    settings: Settings, store: InMemoryStore = STORE, outbox: Outbox | None = None
+) -> Compactor | None:
+    policies = {name: RetentionPolicy.from_mapping(value) for name, value in settings.retention_policies.items()}
+    archive_dir = retention_archive_dir(settings)
+    workspace_rows_lock = partial(_workspace_rows_lock, store)
+    collections: dict[str, RetainedCollection] = {
+        "audit_logs": AuditLogRetention(store.audit_logs),
+        # Evictions are journaled so WAL replay does not bring archived rows back.
+        "evidence_entries": ListRetention(
+            "evidence_entries",
+            lambda: store.evidence_entries,
+            lambda row: str(row.task_id or ""),
+            trim=partial(store.evict_rows, "evidence_entries"),
+            lock=workspace_rows_lock,
+        ),
+        "agent_run_timelines": PartitionedRetention(
+            "agent_run_timelines",
+            lambda: store.agent_run_timelines,
+            whole_partitions=True,
+            changed=partial(store.journal_entry, "agent_run_timelines"),
+            lock=workspace_rows_lock,
+        ),
+        "workspace_assistant_messages": PartitionedRetention(
+            "workspace_assistant_messages",
+            lambda: store.workspace_assistant_messages,
+            changed=partial(store.journal_entry, "workspace_assistant_messages"),
+            lock=workspace_rows_lock,
+        ),
+    }
+    if outbox is not None:
+        collections["event_outbox"] = ListRetention(
+            "event_outbox",
+            lambda: outbox.outbox,
+            lambda event: str(event.workspace_id),
+            trim=outbox.trim_outbox,
+            limit=outbox.trimmable_outbox,
+        )
+    unknown = set(policies) - set(collections)
+    if unknown:
+        raise ValueError(f"Retention policies for unknown collections: {sorted(unknown)}")
+    if archive_dir is None:
+        unarchived = sorted(name for name, policy in policies.items() if policy.enabled and name in ARCHIVED_COLLECTIONS)
+        if unarchived:
+            logger.warning(
+                "retention_disabled_without_archive collections=%s set STORE_DATA_DIR or RETENTION_ARCHIVE_DIR",
+                ",".join(unarchived),
+            )
+            policies = {name: policy for name, policy in policies.items() if name not in ARCHIVED_COLLECTIONS}
+    configured = [(collections[name], policy) for name, policy in policies.items() if policy.enabled]
+    if not configured:
+        return None
+    return Compactor(
+        configured,
+        archive_dir=archive_dir,
+        interval_seconds=settings.retention_compact_interval_seconds,
+    )
@@ -0,0 +1,277 @@
+"""Cross-process fan-out for API workers that share one Redis.
+
+With ``SHARED_STATE_BACKEND=redis`` every worker publishes workspace events and presence changes to
+Redis pub/sub channels ``<prefix>:fanout:<topic>:<key>`` and receives everyone else's on a listener
+thread. Messages carry the publishing node id so a worker skips its own; local delivery never goes
+through Redis. Publishing only enqueues: a sender thread pipelines queued messages, so callers on
+the event loop or in the threadpool never wait on the network.
+
+Presence participants are also kept in one hash per workspace (``<prefix>:presence:<workspace>``) so
+a client joining on any worker gets a snapshot of the whole room; entries of workers that stopped
+heartbeating are dropped.
+
+Workspace data itself lives in the store backend (``STORE_BACKEND``); with ``redis`` or ``postgres``
+every worker reads and writes the same records, so any number of API workers can share a prefix.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+from uuid import uuid4
+
+import redis
+
+from app.core.config import Settings
+from app.core.metrics import METRICS, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+FanoutHandler = Callable[[str, dict[str, Any]], None]
+
+_SEND_BATCH = 256
+_RETRY_SECONDS = 1.0
+
+
+class RedisFanout:
+    def __init__(
+        self,
+        url: str,
+        *,
+        prefix: str = "kobo",
+        node_id: str | None = None,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.node_id = node_id or uuid4().hex
+        self._channel_prefix = f"{prefix}:fanout:"
+        self._metrics = metrics
+        self._handlers: dict[str, list[FanoutHandler]] = defaultdict(list)
+        self._outgoing: queue.SimpleQueue[tuple[str, str] | None] = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._subscribed = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def on(self, topic: str, handler: FanoutHandler) -> None:
+        """Call ``handler(key, data)`` on the listener thread for each message other nodes publish."""
+        self._handlers[topic].append(handler)
+
+    def publish(self, topic: str, key: str, data: dict[str, Any]) -> None:
+        message = json.dumps({"origin": self.node_id, "data": data}, default=str, separators=(",", ":"))
+        self._outgoing.put((f"{self._channel_prefix}{topic}:{key}", message))
+
+    def start(self, *, timeout: float = 5.0) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._listen, name="kobo-fanout-listen", daemon=True),
+            threading.Thread(target=self._send, name="kobo-fanout-send", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        # Block until subscribed so events published right after startup are not missed.
+        if not self._subscribed.wait(timeout):
+            logger.warning("fanout_subscribe_timeout node=%s", self.node_id)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._outgoing.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        self._subscribed.clear()
+        self.client.close()
+
+    def _send(self) -> None:
+        while True:
+            item = self._outgoing.get()
+            batch: list[tuple[str, str]] = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= _SEND_BATCH:
+                    break
+                try:
+                    item = self._outgoing.get_nowait()
+                except queue.Empty:
+                    item = None
+            if batch:
+                self._send_batch(batch)
+            if item is None and self._stop.is_set():
+                return
+
+    def _send_batch(self, batch: list[tuple[str, str]]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for channel, message in batch:
+            pipe.publish(channel, message)
+        try:
+            pipe.execute()
+        except redis.RedisError:
+            logger.exception("fanout_publish_failed messages=%s", len(batch))
+            self._metrics.inc("fanout.publish_errors")
+            self._metrics.inc("fanout.dropped", len(batch))
+            return
+        self._metrics.inc("fanout.published", len(batch))
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(f"{self._channel_prefix}*")
+                # The subscribe confirmation arrives on the first read; wait for it before reporting ready.
+                pubsub.get_message(ignore_subscribe_messages=False, timeout=_RETRY_SECONDS)
+                self._subscribed.set()
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=0.5)
+                    if message is not None:
+                        self._dispatch(str(message["channel"]), str(message["data"]))
+            except redis.RedisError:
+                logger.exception("fanout_listen_failed node=%s", self.node_id)
+                self._metrics.inc("fanout.listen_errors")
+                self._stop.wait(_RETRY_SECONDS)
+            finally:
+                pubsub.close()
+
+    def _dispatch(self, channel: str, raw: str) -> None:
+        topic, _, key = channel[len(self._channel_prefix) :].partition(":")
+        try:
+            message = json.loads(raw)
+        except json.JSONDecodeError:
+            self._metrics.inc("fanout.malformed")
+            return
+        if message.get("origin") == self.node_id:
+            return
+        self._metrics.inc("fanout.received")
+        for handler in self._handlers.get(topic, ()):
+            try:
+                handler(key, message["data"])
+            except Exception:
+                logger.exception("fanout_handler_failed topic=%s", topic)
+
+
+class RedisPresenceDirectory:
+    """Participants of every worker's presence rooms, one hash per workspace.
+
+    Each entry names the worker holding the participant's socket, and every worker refreshes a
+    liveness key (``<prefix>:presence_node:<node>``, expiring after ``node_ttl`` seconds) with each
+    write and from a heartbeat thread. Entries of a worker whose key has expired, one that crashed or lost Redis,
+    are left out of ``participants`` and deleted, so its people do not linger in other workers' rooms.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        *,
+        prefix: str = "kobo",
+        node_id: str | None = None,
+        node_ttl: float = 30.0,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self._client = client
+        self._prefix = f"{prefix}:presence:"
+        self._node_prefix = f"{prefix}:presence_node:"
+        self.node_id = node_id or uuid4().hex
+        self.node_ttl = node_ttl
+        self._metrics = metrics
+        self._stop = threading.Event()
+        self._heartbeat: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._heartbeat is not None:
+            return
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._beat_periodically, name="kobo-presence-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout=5)
+            self._heartbeat = None
+        try:
+            self._client.delete(f"{self._node_prefix}{self.node_id}")
+        except redis.RedisError:
+            logger.warning("presence_node_unregister_failed node=%s", self.node_id)
+
+    def _beat_periodically(self) -> None:
+        while not self._stop.wait(self.node_ttl / 3):
+            try:
+                self._client.set(f"{self._node_prefix}{self.node_id}", "1", px=int(self.node_ttl * 1000))
+            except redis.RedisError:
+                logger.exception("presence_heartbeat_failed node=%s", self.node_id)
+                self._metrics.inc("presence.heartbeat_errors")
+
+    def _entry(self, participant: dict[str, Any]) -> str:
+        return json.dumps({"node": self.node_id, "participant": participant})
+
+    def put(self, workspace_id: str, participant: dict[str, Any]) -> None:
+        self.put_many(workspace_id, [participant])
+
+    def put_many(self, workspace_id: str, participants: list[dict[str, Any]]) -> None:
+        if not participants:
+            return
+        mapping = {str(participant["id"]): self._entry(participant) for participant in participants}
+        # Writing also vouches for this worker, in the same round trip.
+        pipe = self._client.pipeline(transaction=False)
+        pipe.hset(f"{self._prefix}{workspace_id}", mapping=mapping)
+        pipe.set(f"{self._node_prefix}{self.node_id}", "1", px=int(self.node_ttl * 1000))
+        pipe.execute()
+
+    def remove(self, workspace_id: str, participant_id: str) -> None:
+        self._client.hdel(f"{self._prefix}{workspace_id}", participant_id)
+
+    def participants(self, workspace_id: str) -> list[dict[str, Any]]:
+        key = f"{self._prefix}{workspace_id}"
+        entries = [json.loads(raw) for raw in self._client.hvals(key)]
+        nodes = sorted({str(entry["node"]) for entry in entries if "node" in entry})
+        alive = dict(zip(nodes, self._client.mget([f"{self._node_prefix}{node}" for node in nodes]), strict=True)) if nodes else {}
+        found: list[dict[str, Any]] = []
+        stale: list[str] = []
+        for entry in entries:
+            if "node" not in entry:
+                # Written before entries named their worker.
+                found.append(entry)
+            elif alive.get(str(entry["node"])) is not None:
+                found.append(entry["participant"])
+            else:
+                stale.append(str(entry["participant"]["id"]))
+        if stale:
+            self._client.hdel(key, *stale)
+            self._metrics.inc("presence.stale_removed", len(stale))
+        return found
+
+
+@dataclass(slots=True)
+class SharedState:
+    fanout: RedisFanout
+    presence: RedisPresenceDirectory
+
+    def start(self) -> None:
+        self.fanout.start()
+        self.presence.start()
+
+    def close(self) -> None:
+        self.presence.close()
+        self.fanout.close()
+
+
+def build_shared_state(settings: Settings) -> SharedState | None:
+    backend = settings.shared_state_backend.strip().lower()
+    if backend == "local":
+        return None
+    if backend != "redis":
+        raise ValueError(f"Unsupported shared state backend: {backend}")
+    fanout = RedisFanout(settings.redis_url, prefix=settings.redis_key_prefix)
+    presence = RedisPresenceDirectory(
+        fanout.client,
+        prefix=settings.redis_key_prefix,
+        node_id=fanout.node_id,
+        node_ttl=settings.presence_node_ttl_seconds,
+    )
+    return SharedState(fanout=fanout, presence=presence)
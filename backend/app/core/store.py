@@ -1,18 +1,225 @@
 from __future__ import annotations
 
+import threading
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
-from dataclasses import dataclass, field
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, field, fields
 from datetime import UTC, datetime
+from functools import partial
+from itertools import islice
 from typing import Any
-from uuid import uuid4
+
+from app.core.audit_log import AuditLog
+from app.core.ids import uuid7
+from app.core.locks import ShardLocks
+from app.core.records import EvidenceEntry, TimelineStage
+
+_MISSING = object()
+
+
+def _index_keys(record: Mapping[str, Any]) -> tuple[Any, Any]:
+    return record.get("workspace_id"), record.get("task_id")
+
+
+def _shard_key(key: str, record: Mapping[str, Any]) -> str:
+    # Workspace-owned rows lock their workspace; workspaces and users lock their own key.
+    workspace_id = record.get("workspace_id")
+    return str(workspace_id) if workspace_id is not None else key
+
+
+def _insert_sorted(bucket: list[str], key: str) -> None:
+    # Keys from ``STORE.new_id()`` are time-ordered, so this is almost always an append.
+    if not bucket or bucket[-1] < key:
+        bucket.append(key)
+        return
+    position = bisect_left(bucket, key)
+    if position == len(bucket) or bucket[position] != key:
+        bucket.insert(position, key)
+
+
+def _remove_sorted(bucket: list[str], key: str) -> None:
+    position = bisect_left(bucket, key)
+    if position < len(bucket) and bucket[position] == key:
+        del bucket[position]
+
+
+class IndexedTable(dict[str, dict[str, Any]]):
+    """Keyed collection that keeps workspace->ids and task->ids indexes in sync on every write.
+
+    Records are indexed by their ``workspace_id`` and ``task_id`` fields at insertion time; both
+    are treated as immutable for the lifetime of a record. Index buckets are kept sorted by key;
+    since ids are time-ordered (see ``app.core.ids``) that is creation order, so lookups return
+    records oldest first without sorting and ``after=<id>`` resumes a listing from a cursor.
+
+    Writes hold the record's workspace lock (see ``app.core.locks``) so index updates and the
+    journal entry of one workspace stay in order while other workspaces write concurrently.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._by_workspace: dict[str, list[str]] = defaultdict(list)
+        self._by_task: dict[str, list[str]] = defaultdict(list)
+        self.locks = ShardLocks(1)
+        # Called with ``(key, record)`` on every write and ``(key, None)`` on delete.
+        self.journal: Callable[[str, dict[str, Any] | None], None] | None = None
+
+    def _index(self, key: str, record: Mapping[str, Any]) -> None:
+        workspace_id = record.get("workspace_id")
+        if workspace_id is not None:
+            _insert_sorted(self._by_workspace[str(workspace_id)], key)
+        task_id = record.get("task_id")
+        if task_id is not None:
+            _insert_sorted(self._by_task[str(task_id)], key)
+
+    def _unindex(self, key: str, record: Mapping[str, Any]) -> None:
+        for bucket_key, buckets in (
+            (record.get("workspace_id"), self._by_workspace),
+            (record.get("task_id"), self._by_task),
+        ):
+            if bucket_key is None:
+                continue
+            bucket = buckets.get(str(bucket_key))
+            if bucket is not None:
+                _remove_sorted(bucket, key)
+                if not bucket:
+                    del buckets[str(bucket_key)]
+
+    def __setitem__(self, key: str, record: dict[str, Any]) -> None:
+        with self.locks.hold(_shard_key(key, record)):
+            previous = super().get(key)
+            if previous is not None and _index_keys(previous) == _index_keys(record):
+                super().__setitem__(key, record)
+            else:
+                if previous is not None:
+                    self._unindex(key, previous)
+                super().__setitem__(key, record)
+                self._index(key, record)
+            if self.journal is not None:
+                self.journal(key, record)
+
+    def __delitem__(self, key: str) -> None:
+        with self.locks.hold(_shard_key(key, super().__getitem__(key))):
+            record = super().__getitem__(key)
+            super().__delitem__(key)
+            self._unindex(key, record)
+            if self.journal is not None:
+                self.journal(key, None)
+
+    def pop(self, key: str, default: Any = _MISSING) -> Any:
+        if key not in self:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        record = super().__getitem__(key)
+        del self[key]
+        return record
+
+    def setdefault(self, key: str, default: dict[str, Any] | None = None) -> dict[str, Any]:
+        if key not in self:
+            self[key] = default if default is not None else {}
+        return super().__getitem__(key)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for key, record in dict(*args, **kwargs).items():
+            self[key] = record
+
+    def clear(self) -> None:
+        super().clear()
+        self._by_workspace.clear()
+        self._by_task.clear()
+
+    def by_workspace(
+        self, workspace_id: str, *, after: str | None = None, limit: int | None = None
+    ) -> list[dict[str, Any]]:
+        """Records of ``workspace_id`` in key order, starting after the ``after`` key."""
+        return self._page(self._by_workspace.get(workspace_id), after, limit)
+
+    def by_task(self, task_id: str, *, after: str | None = None, limit: int | None = None) -> list[dict[str, Any]]:
+        return self._page(self._by_task.get(task_id), after, limit)
+
+    def iter_workspace(self, workspace_id: str, *, after: str | None = None) -> Iterator[dict[str, Any]]:
+        """Lazy ``by_workspace``: filtered, limited listings stop reading once the page is full."""
+        bucket = self._by_workspace.get(workspace_id)
+        if not bucket:
+            return
+        start = bisect_right(bucket, after) if after is not None else 0
+        get = super().get
+        for key in islice(bucket, start, None):
+            record = get(key)
+            if record is not None:
+                yield record
+
+    def count_by_workspace(self, workspace_id: str) -> int:
+        return len(self._by_workspace.get(workspace_id, ()))
+
+    def has_task(self, task_id: str) -> bool:
+        return bool(self._by_task.get(task_id))
+
+    def _page(self, bucket: list[str] | None, after: str | None, limit: int | None) -> list[dict[str, Any]]:
+        if not bucket:
+            return []
+        start = bisect_right(bucket, after) if after is not None else 0
+        stop = len(bucket) if limit is None else start + max(limit, 0)
+        get = super().get
+        return [record for record in (get(key) for key in bucket[start:stop]) if record is not None]
+
+
+OP_PUT = "put"
+OP_AUDIT = "audit"
+OP_MEMBER_ADD = "member_add"
+OP_MEMBER_REMOVE = "member_remove"
+# Keyed collections that handlers change in place (comments, subtasks, statuses, profiles, ...)
+# journal the whole value of the changed key; replaying it overwrites, so it is idempotent.
+OP_ENTRY = "entry"
+# Append-only lists (evidence) journal each row and, when retention evicts, the evicted ids.
+OP_APPEND = "append"
+OP_EVICT = "evict"
+
+# Rebuilt from ``users`` / ``workspace_members`` on restore, or runtime-only; never persisted.
+_DERIVED_FIELDS = frozenset(
+    {"users_by_username", "user_memberships", "journal", "locks", "membership_lock", "replayed_ids"}
+)
+
+
+def _journal_put(
+    journal: Callable[[tuple[Any, ...]], None], table_name: str, key: str, record: dict[str, Any] | None
+) -> None:
+    journal((OP_PUT, table_name, key, record))
+
+
+def _journal_audit(journal: Callable[[tuple[Any, ...]], None], position: int, row: dict[str, Any]) -> None:
+    journal((OP_AUDIT, position, row))
+
+
+def _row_id(row: Any) -> str:
+    # Rows are mappings (dicts, ``MappingRecord``s) except outbox events, which expose ``id``.
+    return str(row["id"] if isinstance(row, Mapping) else row.id)
+
+
+def _plain_copy(value: Any) -> Any:
+    if isinstance(value, AuditLog):
+        return value.snapshot_state()
+    if isinstance(value, IndexedTable):
+        # Records are shared, not copied; the snapshot writer retries if one changes mid-pickle.
+        return dict(list(value.items()))
+    if isinstance(value, dict):
+        return {
+            key: item.copy() if isinstance(item, dict | list | set) else item for key, item in list(value.items())
+        }
+    if isinstance(value, list):
+        return list(value)
+    return value
 
 
 @dataclass(slots=True)
 class InMemoryStore:
-    users: dict[str, dict[str, Any]] = field(default_factory=dict)
+    users: IndexedTable = field(default_factory=IndexedTable)
     users_by_username: dict[str, str] = field(default_factory=dict)
-    workspaces: dict[str, dict[str, Any]] = field(default_factory=dict)
+    workspaces: IndexedTable = field(default_factory=IndexedTable)
     workspace_members: dict[str, list[dict[str, Any]]] = field(default_factory=lambda: defaultdict(list))
+    user_memberships: dict[str, dict[str, dict[str, Any]]] = field(default_factory=lambda: defaultdict(dict))
     workspace_member_profiles: dict[str, dict[str, dict[str, Any]]] = field(
         default_factory=lambda: defaultdict(dict)
     )
@@ -21,28 +228,202 @@ class InMemoryStore:
     workspace_agents: dict[str, list[dict[str, Any]]] = field(default_factory=lambda: defaultdict(list))
     workspace_files: dict[str, list[dict[str, Any]]] = field(default_factory=lambda: defaultdict(list))
     workspace_actions_required: dict[str, list[dict[str, Any]]] = field(default_factory=lambda: defaultdict(list))
-    projects: dict[str, dict[str, Any]] = field(default_factory=dict)
-    tasks: dict[str, dict[str, Any]] = field(default_factory=dict)
+    projects: IndexedTable = field(default_factory=IndexedTable)
+    tasks: IndexedTable = field(default_factory=IndexedTable)
     task_subtasks: dict[str, list[dict[str, Any]]] = field(default_factory=lambda: defaultdict(list))
-    task_dependencies: dict[str, set[str]] = field(default_factory=lambda: defaultdict(set))
+    task_dependencies: dict[str, list[str]] = field(default_factory=lambda: defaultdict(list))
     task_comments: dict[str, list[dict[str, Any]]] = field(default_factory=lambda: defaultdict(list))
     task_attachments: dict[str, list[dict[str, Any]]] = field(default_factory=lambda: defaultdict(list))
-    artifacts: dict[str, dict[str, Any]] = field(default_factory=dict)
-    evidence_entries: list[dict[str, Any]] = field(default_factory=list)
-    agent_runs: dict[str, dict[str, Any]] = field(default_factory=dict)
-    agent_run_timelines: dict[str, list[dict[str, Any]]] = field(default_factory=lambda: defaultdict(list))
+    artifacts: IndexedTable = field(default_factory=IndexedTable)
+    evidence_entries: list[EvidenceEntry] = field(default_factory=list)
+    agent_runs: IndexedTable = field(default_factory=IndexedTable)
+    agent_run_timelines: dict[str, list[TimelineStage]] = field(default_factory=lambda: defaultdict(list))
     workspace_assistant_messages: dict[str, list[dict[str, Any]]] = field(default_factory=lambda: defaultdict(list))
-    approvals: dict[str, dict[str, Any]] = field(default_factory=dict)
-    decisions: dict[str, dict[str, Any]] = field(default_factory=dict)
+    approvals: IndexedTable = field(default_factory=IndexedTable)
+    decisions: IndexedTable = field(default_factory=IndexedTable)
+    council_sessions: IndexedTable = field(default_factory=IndexedTable)
     integration_accounts: dict[str, list[dict[str, Any]]] = field(default_factory=lambda: defaultdict(list))
-    audit_logs: list[dict[str, Any]] = field(default_factory=list)
+    audit_logs: AuditLog = field(default_factory=AuditLog)
     eval_runs: list[dict[str, Any]] = field(default_factory=list)
+    # The in-memory event bus outbox and each consumer's last acknowledged event id, when the
+    # bus keeps them here (``InMemoryEventBus.persist_outbox``).
+    event_outbox: list[Any] = field(default_factory=list)
+    consumer_positions: dict[str, str] = field(default_factory=dict)
+    journal: Callable[[tuple[Any, ...]], None] | None = field(default=None, repr=False, compare=False)
+    locks: ShardLocks = field(default_factory=ShardLocks, repr=False, compare=False)
+    # Guards ``user_memberships``, which is keyed by user and so spans workspaces.
+    membership_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    # Ids of rows in each append-only list while the WAL is replayed, to skip rows the snapshot holds.
+    replayed_ids: dict[str, set[str]] = field(default_factory=dict, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.set_locks(self.locks)
+
+    def set_locks(self, locks: ShardLocks) -> None:
+        """Use ``locks`` for workspace writes, including the tables' own index updates."""
+        self.locks = locks
+        for item in fields(self):
+            value = getattr(self, item.name)
+            if isinstance(value, IndexedTable):
+                value.locks = locks
+
+    def workspace_lock(self, *workspace_ids: str) -> AbstractContextManager[None]:
+        """Serialize a read-modify-write of workspace state with other writers of the same workspaces."""
+        return self.locks.hold(*workspace_ids)
+
+    def membership(self, workspace_id: str, user_id: str) -> dict[str, Any] | None:
+        memberships = self.user_memberships.get(user_id)
+        return memberships.get(workspace_id) if memberships else None
+
+    def user_workspace_ids(self, user_id: str) -> list[str]:
+        return list(self.user_memberships.get(user_id, ()))
+
+    def add_member(self, workspace_id: str, user_id: str, role: str) -> dict[str, Any]:
+        with self.locks.hold(workspace_id), self.membership_lock:
+            existing = self.membership(workspace_id, user_id)
+            if existing is not None:
+                return existing
+            member = {"workspace_id": workspace_id, "user_id": user_id, "role": role}
+            self.workspace_members[workspace_id].append(member)
+            self.user_memberships[user_id][workspace_id] = member
+            if self.journal is not None:
+                self.journal((OP_MEMBER_ADD, workspace_id, user_id, role))
+            return member
+
+    def remove_member(self, workspace_id: str, user_id: str) -> dict[str, Any] | None:
+        with self.locks.hold(workspace_id), self.membership_lock:
+            memberships = self.user_memberships.get(user_id)
+            member = memberships.pop(workspace_id, None) if memberships else None
+            if member is None:
+                return None
+            if not memberships:
+                del self.user_memberships[user_id]
+            # Rebuilt rather than edited in place so unlocked readers iterate a stable list.
+            self.workspace_members[workspace_id] = [
+                item for item in self.workspace_members.get(workspace_id, []) if item is not member
+            ]
+            if self.journal is not None:
+                self.journal((OP_MEMBER_REMOVE, workspace_id, user_id))
+            return member
+
+    def attach_journal(self, journal: Callable[[tuple[Any, ...]], None] | None) -> None:
+        """Route every journaled mutation (see ``OP_*``) to ``journal``; ``None`` detaches."""
+        self.journal = journal
+        for item in fields(self):
+            value = getattr(self, item.name)
+            if isinstance(value, IndexedTable):
+                value.journal = partial(_journal_put, journal, item.name) if journal is not None else None
+        self.audit_logs.journal = partial(_journal_audit, journal) if journal is not None else None
+        # Replay is over once the journal is attached.
+        self.replayed_ids.clear()
+
+    def journal_entry(self, collection: str, key: str) -> None:
+        """Journal ``collection[key]`` as it is now, or its removal when absent.
+
+        Call after changing the value, under the lock that serializes its writers (the workspace
+        lock), so journal order matches the order of the changes.
+        """
+        if self.journal is not None:
+            self.journal((OP_ENTRY, collection, key, getattr(self, collection).get(key)))
+
+    def append_row(self, collection: str, row: Any) -> None:
+        getattr(self, collection).append(row)
+        if self.journal is not None:
+            self.journal((OP_APPEND, collection, row))
+
+    def evict_rows(self, collection: str, count: int) -> None:
+        """Drop the oldest ``count`` rows of an append-only list (retention has archived them).
+
+        Call under the lock the list's writers append under, as for ``journal_entry``.
+        """
+        rows = getattr(self, collection)
+        evicted = [_row_id(row) for row in rows[:count]]
+        del rows[:count]
+        if self.journal is not None:
+            self.journal((OP_EVICT, collection, evicted))
+
+    def apply(self, op: tuple[Any, ...]) -> None:
+        kind = op[0]
+        if kind == OP_PUT:
+            _, table_name, key, record = op
+            table: IndexedTable = getattr(self, table_name)
+            if record is None:
+                table.pop(key, None)
+                return
+            table[key] = record
+            if table_name == "users":
+                self.users_by_username[str(record["username"])] = key
+        elif kind == OP_AUDIT:
+            _, position, row = op
+            # Rows already captured by the snapshot are skipped; the log is append-only.
+            if position >= self.audit_logs.next_position:
+                self.audit_logs.append(row)
+        elif kind == OP_MEMBER_ADD:
+            self.add_member(op[1], op[2], op[3])
+        elif kind == OP_MEMBER_REMOVE:
+            self.remove_member(op[1], op[2])
+        elif kind == OP_ENTRY:
+            _, collection, key, value = op
+            target = getattr(self, collection)
+            if value is None:
+                target.pop(key, None)
+            else:
+                target[key] = value
+        elif kind == OP_APPEND:
+            _, collection, row = op
+            rows = getattr(self, collection)
+            seen = self._replayed(collection)
+            # A snapshot taken while writes continued may already hold the row.
+            if _row_id(row) not in seen:
+                rows.append(row)
+                seen.add(_row_id(row))
+        elif kind == OP_EVICT:
+            _, collection, evicted = op
+            ids = set(evicted)
+            rows = getattr(self, collection)
+            rows[:] = [row for row in rows if _row_id(row) not in ids]
+            self._replayed(collection).difference_update(ids)
+        else:
+            raise ValueError(f"Unknown journal op: {kind!r}")
+
+    def _replayed(self, collection: str) -> set[str]:
+        seen = self.replayed_ids.get(collection)
+        if seen is None:
+            seen = self.replayed_ids[collection] = {_row_id(row) for row in getattr(self, collection)}
+        return seen
+
+    def snapshot_state(self) -> dict[str, Any]:
+        """Shallow copy of every persisted collection as plain containers, safe to pickle."""
+        return {
+            item.name: _plain_copy(getattr(self, item.name))
+            for item in fields(self)
+            if item.name not in _DERIVED_FIELDS
+        }
+
+    def restore(self, state: Mapping[str, Any]) -> None:
+        for name, value in state.items():
+            target = getattr(self, name, None)
+            if isinstance(target, AuditLog):
+                target.restore(value)
+            elif isinstance(target, dict):
+                target.update(value)
+            elif isinstance(target, list):
+                target.extend(value)
+        for user_id, user in self.users.items():
+            self.users_by_username[str(user["username"])] = user_id
+        for workspace_id, members in self.workspace_members.items():
+            for member in members:
+                self.user_memberships[str(member["user_id"])][workspace_id] = member
 
     def new_id(self) -> str:
-        return str(uuid4())
+        """Time-ordered (UUIDv7) id; ids sort in creation order."""
+        return uuid7()
+
+    def now(self) -> datetime:
+        return datetime.now(UTC)
 
     def now_iso(self) -> str:
-        return datetime.now(UTC).isoformat()
+        return self.now().isoformat()
 
 
 STORE = InMemoryStore()
@@ -108,6 +108,20 @@ class WorkspaceOut(BaseModel):
     created_at: datetime
 
 
+class WorkspaceSummaryOut(BaseModel):
+    workspace_id: str
+    tasks_total: int
+    tasks_by_status: dict[str, int]
+    pending_approvals: int
+    open_actions_required: int
+    open_actions_by_user: dict[str, int]
+    unassigned_open_actions: int
+    running_agent_runs: int
+    agent_runs_by_status: dict[str, int]
+    last_event_id: str | None = None
+    updated_at: datetime
+
+
 class WorkspaceMemberOut(BaseModel):
     workspace_id: str
     user_id: str
@@ -247,6 +261,18 @@ class ActivityItem(BaseModel):
     created_at: datetime
 
 
+class AuditLogOut(BaseModel):
+    id: str
+    workspace_id: str
+    actor_type: str
+    actor_id: str
+    action: str
+    entity_type: str
+    entity_id: str
+    payload: dict[str, Any] = Field(default_factory=dict)
+    created_at: datetime
+
+
 class ProofCheckOut(BaseModel):
     task_id: str
     has_artifact: bool
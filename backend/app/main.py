@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import asyncio
 import json
-from dataclasses import dataclass, field
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,9 +10,36 @@ from app.api.v1.router import api_router
 from app.core.config import get_settings
 from app.core.dependencies import require_workspace_member
 from app.core.logging import configure_logging
+from app.core.metrics import METRICS
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.persistence import build_store_persistence
+from app.core.retention import build_compactor
 from app.core.security import TokenError, decode_token
+from app.core.shared_state import build_shared_state
 from app.core.store import STORE
-from app.services.orchestration.event_bus import EVENT_BUS
+from app.repositories import REPOSITORIES
+from app.services.orchestration.event_bus import (
+    EVENT_BUS,
+    Event,
+    EventFilter,
+    SlowConsumer,
+    Subscription,
+    SubscriptionClosed,
+    coalesce_events,
+)
+from app.services.orchestration.projections import PROJECTIONS
+from app.services.realtime.connections import (
+    CLOSE_IDLE,
+    CONNECTIONS,
+    PING,
+    ConnectionLease,
+    Liveness,
+)
+from app.services.realtime.interest import ENCODINGS as PRESENCE_ENCODINGS
+from app.services.realtime.interest import View
+from app.services.realtime.positions import POSITIONS
+from app.services.realtime.presence import PRESENCE
+from app.workers.consumers import build_consumer_runtime
 
 settings = get_settings()
 configure_logging()
@@ -25,24 +51,62 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 app.include_router(api_router, prefix=settings.api_prefix)
 
 
-@dataclass
-class PresenceState:
-    connections: set[WebSocket] = field(default_factory=set)
-    participants: dict[str, dict[str, object]] = field(default_factory=dict)
-    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+STORE_PERSISTENCE = build_store_persistence(settings)
+if STORE_PERSISTENCE is not None and not EVENT_BUS.distributed:
+    # Consumers in this process then resume from their last acknowledged event after a restart.
+    EVENT_BUS.persist_outbox(STORE)
+STORE_COMPACTOR = build_compactor(settings, outbox=EVENT_BUS)
+SHARED_STATE = build_shared_state(settings)
+if SHARED_STATE is not None:
+    if not EVENT_BUS.distributed:
+        EVENT_BUS.attach_fanout(SHARED_STATE.fanout)
+    PRESENCE.attach(SHARED_STATE)
+PROJECTIONS.attach(EVENT_BUS)
+EVENT_CONSUMERS = build_consumer_runtime(settings, EVENT_BUS) if settings.event_consumers_in_api else None
+
+
+@app.on_event("startup")
+def _recover_store() -> None:
+    # Archives are opened first so recovery skips audit rows that were already archived.
+    if STORE_COMPACTOR is not None:
+        STORE_COMPACTOR.open()
+    if STORE_PERSISTENCE is not None:
+        STORE_PERSISTENCE.open()
+    if STORE_COMPACTOR is not None:
+        STORE_COMPACTOR.start()
+    if SHARED_STATE is not None:
+        SHARED_STATE.start()
+    EVENT_BUS.start()
+
+
+@app.on_event("startup")
+async def _start_event_consumers() -> None:
+    if EVENT_CONSUMERS is not None:
+        EVENT_CONSUMERS.start()
 
 
-PRESENCE_ROOMS: dict[str, PresenceState] = {}
+@app.on_event("shutdown")
+async def _stop_event_consumers() -> None:
+    if EVENT_CONSUMERS is not None:
+        await EVENT_CONSUMERS.stop()
 
 
-def _room(workspace_id: str) -> PresenceState:
-    if workspace_id not in PRESENCE_ROOMS:
-        PRESENCE_ROOMS[workspace_id] = PresenceState()
-    return PRESENCE_ROOMS[workspace_id]
+@app.on_event("shutdown")
+def _close_repositories() -> None:
+    POSITIONS.flush_all()
+    EVENT_BUS.close()
+    if SHARED_STATE is not None:
+        SHARED_STATE.close()
+    REPOSITORIES.close()
+    if STORE_COMPACTOR is not None:
+        STORE_COMPACTOR.close()
+    if STORE_PERSISTENCE is not None:
+        STORE_PERSISTENCE.close()
 
 
 def _auth_websocket(websocket: WebSocket) -> dict[str, object] | None:
@@ -56,12 +120,11 @@ def _auth_websocket(websocket: WebSocket) -> dict[str, object] | None:
     user_id = payload.get("sub")
     if not isinstance(user_id, str):
         return None
-    return STORE.users.get(user_id)
+    return REPOSITORIES.users.get(user_id)
 
 
 async def _send_presence_snapshot(websocket: WebSocket, workspace_id: str) -> None:
-    room = _room(workspace_id)
-    agents = STORE.workspace_agents.get(workspace_id, [])
+    agents = await asyncio.to_thread(REPOSITORIES.entries.get, "workspace_agents", workspace_id) or []
     agent_participants = [
         {
             "id": str(agent["id"]),
@@ -75,31 +138,30 @@ async def _send_presence_snapshot(websocket: WebSocket, workspace_id: str) -> No
         }
         for agent in agents
     ]
-    await websocket.send_text(
-        json.dumps(
-            {
-                "type": "presence.snapshot",
-                "participants": list(room.participants.values()) + agent_participants,
-            }
-        )
-    )
-
-
-async def _broadcast_presence(workspace_id: str, payload: dict[str, object]) -> None:
-    room = _room(workspace_id)
-    dead: list[WebSocket] = []
-    message = json.dumps(payload)
-    for connection in room.connections:
-        try:
-            await connection.send_text(message)
-        except RuntimeError:
-            dead.append(connection)
-    for connection in dead:
-        room.connections.discard(connection)
+    PRESENCE.snapshot(workspace_id, websocket, await PRESENCE.participants(workspace_id) + agent_participants)
+
+
+def _event_frame(workspace_id: str, events: list[Event], *, coalesce: bool) -> str:
+    if coalesce:
+        kept = coalesce_events(events)
+        if len(kept) < len(events):
+            METRICS.inc(f"events.{workspace_id}.frame_coalesced", len(events) - len(kept))
+        events = kept
+    METRICS.inc(f"events.{workspace_id}.frames")
+    if len(events) == 1:
+        return events[0].to_json()
+    # Events are encoded once when first sent; frames only join the shared encodings.
+    return '{"type":"events.batch","events":[' + ",".join(event.to_json() for event in events) + "]}"
 
 
 @app.websocket("/ws/workspaces/{workspace_id}/events")
-async def workspace_events(websocket: WebSocket, workspace_id: str) -> None:
+async def workspace_events(
+    websocket: WebSocket,
+    workspace_id: str,
+    last_event_id: str | None = None,
+    coalesce: bool | None = None,
+    types: str | None = None,
+) -> None:
     user = _auth_websocket(websocket)
     if user is None:
         await websocket.close(code=1008)
@@ -111,29 +173,78 @@ async def workspace_events(websocket: WebSocket, workspace_id: str) -> None:
         return
 
     await websocket.accept()
-    queue = EVENT_BUS.subscribe(workspace_id)
+    lease = CONNECTIONS.acquire(workspace_id, str(user["id"]), "events")
+    if not isinstance(lease, ConnectionLease):
+        await websocket.close(code=lease)
+        return
+    # Reconnecting clients pass the id of the last event they handled and get what they missed.
+    # ``types=task.*,agent.run.*`` and any ``<entity>_id=...`` narrow what this socket receives.
+    entity_ids = {key: value for key, value in websocket.query_params.items() if key != "last_event_id"}
+    event_filter = EventFilter.parse(types, entity_ids)
+    subscription = EVENT_BUS.subscribe(workspace_id, last_event_id=last_event_id, event_filter=event_filter)
+    liveness = CONNECTIONS.liveness()
+    # Clients only send pongs on this socket; reading is how a disconnect is noticed while idle.
+    watcher = asyncio.create_task(_close_on_disconnect(websocket, subscription, liveness))
+    batch: asyncio.Task[list[Event]] | None = None
     try:
+        if subscription.resync_required:
+            await websocket.send_text(json.dumps({"type": "events.resync_required", "workspace_id": workspace_id}))
+        window = settings.event_frame_window_ms / 1000
+        coalesce_frames = settings.event_frame_coalesce if coalesce is None else coalesce
+        loop = asyncio.get_running_loop()
+        heartbeat = CONNECTIONS.heartbeat_seconds
+        next_ping = loop.time() + heartbeat
         while True:
-            event = await queue.get()
-            await websocket.send_text(
-                json.dumps(
-                    {
-                        "id": event.id,
-                        "type": event.type,
-                        "workspace_id": event.workspace_id,
-                        "payload": event.payload,
-                        "created_at": event.created_at.isoformat(),
-                    }
-                )
-            )
-    except WebSocketDisconnect:
+            # The pending read is kept across heartbeats: cancelling it could drop events it holds.
+            if batch is None:
+                batch = asyncio.create_task(subscription.get_batch(settings.event_frame_max_events, window))
+            done, _ = await asyncio.wait({batch}, timeout=max(next_ping - loop.time(), 0) if heartbeat else None)
+            if done:
+                events, batch = batch.result(), None
+                await websocket.send_text(_event_frame(workspace_id, events, coalesce=coalesce_frames))
+            # Pings go out on schedule even while events flow: only the replies show the client is there.
+            if heartbeat and loop.time() >= next_ping:
+                if liveness.expired():
+                    METRICS.inc("websockets.reaped")
+                    await _close_quietly(websocket, CLOSE_IDLE)
+                    return
+                await websocket.send_text(PING)
+                next_ping = loop.time() + heartbeat
+    except SlowConsumer:
+        await websocket.close(code=1013)
+    except (SubscriptionClosed, WebSocketDisconnect):
         return
+    finally:
+        watcher.cancel()
+        if batch is not None:
+            batch.cancel()
+        EVENT_BUS.unsubscribe(subscription)
+        CONNECTIONS.release(lease)
+
+
+async def _close_on_disconnect(websocket: WebSocket, subscription: Subscription, liveness: Liveness) -> None:
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            liveness.touch()
+    except RuntimeError:
+        pass
+    subscription.close()
+
+
+async def _close_quietly(websocket: WebSocket, code: int) -> None:
+    # A half-open peer never acknowledges the close; do not wait on it.
+    try:
+        await asyncio.wait_for(websocket.close(code=code), 1.0)
+    except (TimeoutError, RuntimeError, OSError):
+        pass
 
 
 @app.websocket("/ws/workspaces/{workspace_id}/presence")
-async def workspace_presence(websocket: WebSocket, workspace_id: str) -> None:
+async def workspace_presence(
+    websocket: WebSocket, workspace_id: str, encoding: str = "full", view: str | None = None
+) -> None:
     user = _auth_websocket(websocket)
-    if user is None:
+    if user is None or encoding not in PRESENCE_ENCODINGS:
         await websocket.close(code=1008)
         return
     try:
@@ -143,30 +254,54 @@ async def workspace_presence(websocket: WebSocket, workspace_id: str) -> None:
         return
 
     await websocket.accept()
-    room = _room(workspace_id)
-    profile = STORE.workspace_member_profiles.get(workspace_id, {}).get(str(user["id"]), {})
+    lease = CONNECTIONS.acquire(workspace_id, str(user["id"]), "presence")
+    if not isinstance(lease, ConnectionLease):
+        await websocket.close(code=lease)
+        return
+    try:
+        await _serve_presence(websocket, workspace_id, user, encoding, view)
+    finally:
+        # Released even when joining or leaving the room fails, e.g. on a shared-state Redis error.
+        CONNECTIONS.release(lease)
+
+
+async def _serve_presence(
+    websocket: WebSocket, workspace_id: str, user: dict[str, object], encoding: str, view: str | None
+) -> None:
+    profiles = await asyncio.to_thread(REPOSITORIES.entries.get, "workspace_member_profiles", workspace_id)
+    profile = (profiles or {}).get(str(user["id"]), {})
+    # Another tab of this user may have moved since its position was last saved.
+    x, y = POSITIONS.latest(workspace_id, str(user["id"])) or (profile.get("x", 15.0), profile.get("y", 70.0))
     participant_id = f"user:{user['id']}"
     participant = {
         "id": participant_id,
         "kind": "user",
         "name": str(profile.get("nickname", user["username"])),
         "status": "online",
-        "x": float(profile.get("x", 15.0)),
-        "y": float(profile.get("y", 70.0)),
+        "x": float(x),
+        "y": float(y),
         "avatar_key": str(profile.get("avatar_key", "char2")),
     }
 
-    async with room.lock:
-        room.connections.add(websocket)
-        room.participants[participant_id] = participant
-
-    await _send_presence_snapshot(websocket, workspace_id)
-    await _broadcast_presence(workspace_id, {"type": "presence.joined", "participant": participant})
-    EVENT_BUS.publish("workspace.presence.joined", workspace_id, {"participant_id": participant_id})
-
+    liveness = CONNECTIONS.liveness()
     try:
+        # ``encoding=delta|binary`` and ``view=x0,y0,x1,y1`` (or ``presence.view`` messages) trim what
+        # this socket receives in large rooms.
+        await PRESENCE.join(workspace_id, websocket, participant, encoding=encoding, view=View.parse(view))
+        await _send_presence_snapshot(websocket, workspace_id)
+        await PRESENCE.broadcast(workspace_id, {"type": "presence.joined", "participant": participant})
+        EVENT_BUS.publish("workspace.presence.joined", workspace_id, {"participant_id": participant_id})
         while True:
-            raw = await websocket.receive_text()
+            try:
+                raw = await asyncio.wait_for(websocket.receive_text(), CONNECTIONS.heartbeat_seconds or None)
+            except TimeoutError:
+                if liveness.expired():
+                    METRICS.inc("websockets.reaped")
+                    await _close_quietly(websocket, CLOSE_IDLE)
+                    break
+                PRESENCE.ping(workspace_id, websocket)
+                continue
+            liveness.touch()
             try:
                 data = json.loads(raw)
             except json.JSONDecodeError:
@@ -183,20 +318,20 @@ async def workspace_presence(websocket: WebSocket, workspace_id: str) -> None:
                 status_value = data.get("status")
                 if isinstance(status_value, str) and status_value in {"offline", "online", "working", "idle"}:
                     participant["status"] = status_value
-                STORE.workspace_member_profiles.setdefault(workspace_id, {}).setdefault(str(user["id"]), {})
-                STORE.workspace_member_profiles[workspace_id][str(user["id"])]["x"] = participant["x"]
-                STORE.workspace_member_profiles[workspace_id][str(user["id"])]["y"] = participant["y"]
-                room.participants[participant_id] = participant
-                await _broadcast_presence(workspace_id, {"type": "presence.updated", "participant": participant})
+                POSITIONS.record(workspace_id, str(user["id"]), participant["x"], participant["y"])
+                await PRESENCE.update(workspace_id, participant)
+            elif message_type == "presence.view":
+                PRESENCE.set_view(workspace_id, websocket, View.parse(data.get("view")))
             elif message_type == "presence.status":
                 status_value = data.get("status")
                 if isinstance(status_value, str) and status_value in {"offline", "online", "working", "idle"}:
                     participant["status"] = status_value
-                    room.participants[participant_id] = participant
-                    await _broadcast_presence(workspace_id, {"type": "presence.updated", "participant": participant})
-    except WebSocketDisconnect:
-        async with room.lock:
-            room.connections.discard(websocket)
-            room.participants.pop(participant_id, None)
-        await _broadcast_presence(workspace_id, {"type": "presence.left", "participant_id": participant_id})
+                    await PRESENCE.update(workspace_id, participant)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the socket was closed under us, e.g. evicted as a slow client.
+        pass
+    finally:
+        await POSITIONS.flush(workspace_id, str(user["id"]))
+        await PRESENCE.leave(workspace_id, websocket, participant_id)
+        await PRESENCE.broadcast(workspace_id, {"type": "presence.left", "participant_id": participant_id})
         EVENT_BUS.publish("workspace.presence.left", workspace_id, {"participant_id": participant_id})
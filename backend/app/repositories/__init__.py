@@ -0,0 +1,27 @@
+"""Persistence repositories selected by ``settings.store_backend``."""
+
+from __future__ import annotations
+
+from app.core.config import get_settings
+from app.repositories.base import Repositories
+
+
+def build_repositories(backend: str | None = None) -> Repositories:
+    settings = get_settings()
+    selected = (backend or settings.store_backend).strip().lower()
+    if selected == "memory":
+        from app.repositories.memory import build_memory_repositories
+
+        return build_memory_repositories()
+    if selected == "postgres":
+        from app.repositories.postgres import build_postgres_repositories
+
+        return build_postgres_repositories(settings)
+    if selected == "redis":
+        from app.repositories.redis import build_redis_repositories
+
+        return build_redis_repositories(settings)
+    raise ValueError(f"Unsupported store backend: {selected}")
+
+
+REPOSITORIES = build_repositories()
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Collection, Iterator, Mapping, MutableMapping
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Protocol
+
+from app.core.records import EvidenceEntry, TimelineStage
+
+# Plain dicts, or the typed records from ``app.core.records`` for high-volume entities.
+Record = MutableMapping[str, Any]
+
+# Rows of these entry collections are read back as their typed records.
+ROW_TYPES: dict[str, Callable[[Mapping[str, Any]], Record]] = {
+    "agent_run_timelines": TimelineStage.from_mapping,
+    "evidence_entries": EvidenceEntry.from_mapping,
+}
+
+# Workspace listings return records in id (creation) order. ``after`` is a cursor: the id of the
+# last record already seen. ``limit`` caps the rows read; filters apply before it.
+
+
+class UserRepository(Protocol):
+    def get(self, user_id: str) -> Record | None: ...
+
+    def get_by_username(self, username: str) -> Record | None: ...
+
+    def add(self, record: Record) -> None: ...
+
+
+class WorkspaceRepository(Protocol):
+    def get(self, workspace_id: str) -> Record | None: ...
+
+    def add(self, record: Record) -> None: ...
+
+    def save(self, record: Record) -> None: ...
+
+    def membership(self, workspace_id: str, user_id: str) -> Record | None: ...
+
+    def list_members(self, workspace_id: str) -> list[Record]: ...
+
+    def list_for_user(self, user_id: str) -> list[Record]: ...
+
+    def add_member(self, workspace_id: str, user_id: str, role: str) -> Record: ...
+
+    def remove_member(self, workspace_id: str, user_id: str) -> Record | None: ...
+
+
+class ProjectRepository(Protocol):
+    def get(self, project_id: str) -> Record | None: ...
+
+    def add(self, record: Record) -> None: ...
+
+    def list_by_workspace(self, workspace_id: str) -> list[Record]: ...
+
+
+class TaskRepository(Protocol):
+    def get(self, task_id: str) -> Record | None: ...
+
+    def add(self, record: Record) -> None: ...
+
+    def save(self, record: Record) -> None: ...
+
+    def list_by_workspace(
+        self,
+        workspace_id: str,
+        *,
+        status: str | None = None,
+        assignee: str | None = None,
+        priority: str | None = None,
+        project_id: str | None = None,
+        created_after: datetime | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        """``assignee`` matches either the assigned user id or the assigned agent role."""
+        ...
+
+    def reassign_status(self, workspace_id: str, from_status: str, to_status: str) -> int: ...
+
+
+class ArtifactRepository(Protocol):
+    def get(self, artifact_id: str) -> Record | None: ...
+
+    def add(self, record: Record) -> None: ...
+
+    def save(self, record: Record) -> None: ...
+
+    def list_by_workspace(
+        self,
+        workspace_id: str,
+        *,
+        type: str | None = None,
+        task_id: str | None = None,
+        created_after: datetime | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> list[Record]: ...
+
+    def list_by_task(self, task_id: str) -> list[Record]: ...
+
+    def exists_for_task(self, task_id: str) -> bool: ...
+
+
+class AgentRunRepository(Protocol):
+    def get(self, run_id: str) -> Record | None: ...
+
+    def add(self, record: Record) -> None: ...
+
+    def save(self, record: Record) -> None: ...
+
+    def list_by_workspace(
+        self,
+        workspace_id: str,
+        *,
+        status: str | None = None,
+        task_id: str | None = None,
+        created_after: datetime | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> list[Record]: ...
+
+    def list_by_task(self, task_id: str) -> list[Record]: ...
+
+
+class AuditLogRepository(Protocol):
+    def append(self, row: Record) -> None: ...
+
+    def query(
+        self,
+        *,
+        workspace_id: str | None = None,
+        entity_type: str | None = None,
+        entity_id: str | None = None,
+        actions: Collection[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> list[Record]: ...
+
+    def flush(self) -> None: ...
+
+
+class RecordRepository(Protocol):
+    """Records without a typed repository of their own (approvals, decisions, council sessions)."""
+
+    def get(self, record_id: str) -> Record | None: ...
+
+    def put(self, record: Record) -> None: ...
+
+    def iter_workspace(self, workspace_id: str, *, after: str | None = None) -> Iterator[Record]: ...
+
+
+class EntryRepository(Protocol):
+    """The other workspace collections, named after their ``InMemoryStore`` fields.
+
+    Keyed collections (task statuses, member profiles, agents, files, subtasks, actions required,
+    ...) hold one value per key, usually a workspace or task id: read-modify-writes ``get`` it,
+    change it and ``put`` it back under ``Repositories.workspace_lock`` of the owning workspace.
+    Row collections (comments, attachments, timelines, assistant history, evidence) only grow;
+    ``append`` needs no lock and rows, which carry ``workspace_id``, come back in id order.
+    """
+
+    def get(self, collection: str, key: str) -> Any | None: ...
+
+    def put(self, collection: str, key: str, value: Any) -> None:
+        """Replace the value of ``key``; ``None`` removes it."""
+        ...
+
+    def append(self, collection: str, key: str, row: Record) -> None: ...
+
+    def rows(self, collection: str, key: str, *, after: str | None = None) -> Iterator[Record]: ...
+
+    def tail(self, collection: str, key: str, count: int) -> list[Record]:
+        """The newest ``count`` rows, oldest first."""
+        ...
+
+
+class WorkspaceLocks(Protocol):
+    def hold(self, *workspace_ids: str) -> AbstractContextManager[None]: ...
+
+
+def held_by_thread(state: threading.local) -> set[str]:
+    """Lock keys the current thread holds, so shared locks can be re-entered like ``RLock``s."""
+    held: set[str] | None = getattr(state, "held", None)
+    if held is None:
+        held = state.held = set()
+    return held
+
+
+@dataclass(slots=True)
+class Repositories:
+    """Persistence surface used by routers and services instead of touching ``STORE`` directly."""
+
+    backend: str
+    users: UserRepository
+    workspaces: WorkspaceRepository
+    projects: ProjectRepository
+    tasks: TaskRepository
+    artifacts: ArtifactRepository
+    agent_runs: AgentRunRepository
+    audit_logs: AuditLogRepository
+    approvals: RecordRepository
+    decisions: RecordRepository
+    council_sessions: RecordRepository
+    entries: EntryRepository
+    locks: WorkspaceLocks
+    on_close: Callable[[], None] | None = None
+
+    def workspace_lock(self, *workspace_ids: str) -> AbstractContextManager[None]:
+        """Serialize a read-modify-write of workspace state with every worker sharing this backend."""
+        return self.locks.hold(*workspace_ids)
+
+    def close(self) -> None:
+        self.audit_logs.flush()
+        if self.on_close is not None:
+            self.on_close()
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+from collections.abc import Collection, Iterator
+from contextlib import AbstractContextManager
+from datetime import datetime
+from typing import Any
+
+from app.core.ids import insert_by_id, iter_after
+from app.core.pagination import matching, take
+from app.core.store import STORE, IndexedTable, InMemoryStore
+from app.repositories.base import Record, Repositories
+
+# Row collections kept as one list across workspaces (retention trims them oldest first); their
+# rows are looked up by ``workspace_id``.
+_SHARED_ROW_LISTS = frozenset({"evidence_entries", "eval_runs"})
+
+
+class MemoryUserRepository:
+    def __init__(self, store: InMemoryStore) -> None:
+        self._store = store
+
+    def get(self, user_id: str) -> Record | None:
+        return self._store.users.get(user_id)
+
+    def get_by_username(self, username: str) -> Record | None:
+        user_id = self._store.users_by_username.get(username)
+        return self._store.users.get(user_id) if user_id is not None else None
+
+    def add(self, record: Record) -> None:
+        self._store.users[str(record["id"])] = record
+        self._store.users_by_username[str(record["username"])] = str(record["id"])
+
+
+class MemoryWorkspaceRepository:
+    def __init__(self, store: InMemoryStore) -> None:
+        self._store = store
+
+    def get(self, workspace_id: str) -> Record | None:
+        return self._store.workspaces.get(workspace_id)
+
+    def add(self, record: Record) -> None:
+        self._store.workspaces[str(record["id"])] = record
+
+    def save(self, record: Record) -> None:
+        self._store.workspaces[str(record["id"])] = record
+
+    def membership(self, workspace_id: str, user_id: str) -> Record | None:
+        return self._store.membership(workspace_id, user_id)
+
+    def list_members(self, workspace_id: str) -> list[Record]:
+        return list(self._store.workspace_members.get(workspace_id, []))
+
+    def list_for_user(self, user_id: str) -> list[Record]:
+        workspaces = (self._store.workspaces.get(workspace_id) for workspace_id in self._store.user_workspace_ids(user_id))
+        return [workspace for workspace in workspaces if workspace is not None]
+
+    def add_member(self, workspace_id: str, user_id: str, role: str) -> Record:
+        return self._store.add_member(workspace_id, user_id, role)
+
+    def remove_member(self, workspace_id: str, user_id: str) -> Record | None:
+        return self._store.remove_member(workspace_id, user_id)
+
+
+class MemoryProjectRepository:
+    def __init__(self, store: InMemoryStore) -> None:
+        self._store = store
+
+    def get(self, project_id: str) -> Record | None:
+        return self._store.projects.get(project_id)
+
+    def add(self, record: Record) -> None:
+        self._store.projects[str(record["id"])] = record
+
+    def list_by_workspace(self, workspace_id: str) -> list[Record]:
+        return self._store.projects.by_workspace(workspace_id)
+
+
+class MemoryTaskRepository:
+    def __init__(self, store: InMemoryStore) -> None:
+        self._store = store
+
+    def get(self, task_id: str) -> Record | None:
+        return self._store.tasks.get(task_id)
+
+    def add(self, record: Record) -> None:
+        self._store.tasks[str(record["id"])] = record
+
+    def save(self, record: Record) -> None:
+        # Records are mutated in place; re-assigning keeps index order and journals the write.
+        self._store.tasks[str(record["id"])] = record
+
+    def list_by_workspace(
+        self,
+        workspace_id: str,
+        *,
+        status: str | None = None,
+        assignee: str | None = None,
+        priority: str | None = None,
+        project_id: str | None = None,
+        created_after: datetime | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        tasks = self._store.tasks.iter_workspace(workspace_id, after=after)
+        if assignee is not None:
+            tasks = (task for task in tasks if assignee in (task.get("assignee_user_id"), task.get("assignee_agent_role")))
+        return take(
+            matching(tasks, created_after=created_after, status=status, priority=priority, project_id=project_id),
+            limit,
+        )
+
+    def reassign_status(self, workspace_id: str, from_status: str, to_status: str) -> int:
+        moved = 0
+        for task in self.list_by_workspace(workspace_id, status=from_status):
+            task["status"] = to_status
+            task["updated_at"] = self._store.now()
+            self.save(task)
+            moved += 1
+        return moved
+
+
+class MemoryArtifactRepository:
+    def __init__(self, store: InMemoryStore) -> None:
+        self._store = store
+
+    def get(self, artifact_id: str) -> Record | None:
+        return self._store.artifacts.get(artifact_id)
+
+    def add(self, record: Record) -> None:
+        self._store.artifacts[str(record["id"])] = record
+
+    def save(self, record: Record) -> None:
+        self._store.artifacts[str(record["id"])] = record
+
+    def list_by_workspace(
+        self,
+        workspace_id: str,
+        *,
+        type: str | None = None,
+        task_id: str | None = None,
+        created_after: datetime | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        artifacts = self._store.artifacts.iter_workspace(workspace_id, after=after)
+        return take(matching(artifacts, created_after=created_after, type=type, task_id=task_id), limit)
+
+    def list_by_task(self, task_id: str) -> list[Record]:
+        return self._store.artifacts.by_task(task_id)
+
+    def exists_for_task(self, task_id: str) -> bool:
+        return self._store.artifacts.has_task(task_id)
+
+
+class MemoryAgentRunRepository:
+    """Agent runs only; council sessions saved by older versions share ``STORE.agent_runs`` but
+    carry no ``role_key``."""
+
+    def __init__(self, store: InMemoryStore) -> None:
+        self._store = store
+
+    def get(self, run_id: str) -> Record | None:
+        run = self._store.agent_runs.get(run_id)
+        return run if run is not None and "role_key" in run else None
+
+    def add(self, record: Record) -> None:
+        self._store.agent_runs[str(record["id"])] = record
+
+    def save(self, record: Record) -> None:
+        self._store.agent_runs[str(record["id"])] = record
+
+    def list_by_workspace(
+        self,
+        workspace_id: str,
+        *,
+        status: str | None = None,
+        task_id: str | None = None,
+        created_after: datetime | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        runs = (run for run in self._store.agent_runs.iter_workspace(workspace_id, after=after) if "role_key" in run)
+        return take(matching(runs, created_after=created_after, status=status, task_id=task_id), limit)
+
+    def list_by_task(self, task_id: str) -> list[Record]:
+        return [run for run in self._store.agent_runs.by_task(task_id) if "role_key" in run]
+
+
+class MemoryAuditLogRepository:
+    def __init__(self, store: InMemoryStore) -> None:
+        self._store = store
+
+    def append(self, row: Record) -> None:
+        self._store.audit_logs.append(row)
+
+    def query(
+        self,
+        *,
+        workspace_id: str | None = None,
+        entity_type: str | None = None,
+        entity_id: str | None = None,
+        actions: Collection[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        return self._store.audit_logs.query(
+            workspace_id=workspace_id,
+            entity_type=entity_type,
+            entity_id=entity_id,
+            actions=actions,
+            since=since,
+            until=until,
+            limit=limit,
+        )
+
+    def flush(self) -> None:
+        return None
+
+
+class MemoryRecordRepository:
+    def __init__(self, table: IndexedTable) -> None:
+        self._table = table
+
+    def get(self, record_id: str) -> Record | None:
+        return self._table.get(record_id)
+
+    def put(self, record: Record) -> None:
+        self._table[str(record["id"])] = record
+
+    def iter_workspace(self, workspace_id: str, *, after: str | None = None) -> Iterator[Record]:
+        return self._table.iter_workspace(workspace_id, after=after)
+
+
+class MemoryWorkspaceLocks:
+    """The store's own workspace locks, which retention and the tables' index updates also take."""
+
+    def __init__(self, store: InMemoryStore) -> None:
+        self._store = store
+
+    def hold(self, *workspace_ids: str) -> AbstractContextManager[None]:
+        return self._store.workspace_lock(*workspace_ids)
+
+
+class MemoryEntryRepository:
+    """Values are the store's own objects: a ``get`` returns the live value, changed in place and
+    handed back to ``put``, which journals it."""
+
+    def __init__(self, store: InMemoryStore) -> None:
+        self._store = store
+
+    def get(self, collection: str, key: str) -> Any | None:
+        return getattr(self._store, collection).get(key)
+
+    def put(self, collection: str, key: str, value: Any) -> None:
+        target = getattr(self._store, collection)
+        if value is None:
+            target.pop(key, None)
+        else:
+            target[key] = value
+        self._store.journal_entry(collection, key)
+
+    def append(self, collection: str, key: str, row: Record) -> None:
+        # The row's workspace lock is the one retention trims under.
+        with self._store.workspace_lock(str(row["workspace_id"])):
+            if collection in _SHARED_ROW_LISTS:
+                self._store.append_row(collection, row)
+                return
+            insert_by_id(getattr(self._store, collection)[key], row)
+            self._store.journal_entry(collection, key)
+
+    def rows(self, collection: str, key: str, *, after: str | None = None) -> Iterator[Record]:
+        if collection in _SHARED_ROW_LISTS:
+            return (
+                row
+                for row in getattr(self._store, collection)
+                if row["workspace_id"] == key and (after is None or str(row["id"]) > after)
+            )
+        return iter_after(getattr(self._store, collection).get(key, ()), after)
+
+    def tail(self, collection: str, key: str, count: int) -> list[Record]:
+        if collection in _SHARED_ROW_LISTS:
+            return list(self.rows(collection, key))[-count:] if count > 0 else []
+        return list(getattr(self._store, collection).get(key, ()))[-count:] if count > 0 else []
+
+
+def build_memory_repositories(store: InMemoryStore = STORE) -> Repositories:
+    return Repositories(
+        backend="memory",
+        users=MemoryUserRepository(store),
+        workspaces=MemoryWorkspaceRepository(store),
+        projects=MemoryProjectRepository(store),
+        tasks=MemoryTaskRepository(store),
+        artifacts=MemoryArtifactRepository(store),
+        agent_runs=MemoryAgentRunRepository(store),
+        audit_logs=MemoryAuditLogRepository(store),
+        approvals=MemoryRecordRepository(store.approvals),
+        decisions=MemoryRecordRepository(store.decisions),
+        council_sessions=MemoryRecordRepository(store.council_sessions),
+        entries=MemoryEntryRepository(store),
+        locks=MemoryWorkspaceLocks(store),
+    )
@@ -0,0 +1,850 @@
+"""Postgres repositories over the tables defined in ``prisma/schema.prisma``.
+
+Table and column names follow Prisma's defaults (quoted model names, camelCase columns). Prisma
+``DateTime`` columns are ``timestamp(3)`` without time zone, so every connection runs in UTC and
+naive values read back are treated as UTC.
+
+Collections without a model of their own are JSON in ``StoreEntry`` / ``StoreRow`` / ``StoreRecord``.
+Workspace locks are session advisory locks held on a connection of a separate, lock-only pool for
+the critical section.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from collections.abc import Collection, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from typing import Any
+from uuid import uuid4
+
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+from psycopg_pool import ConnectionPool
+
+from app.core.config import Settings
+from app.core.records import AgentRunRecord, AuditRecord, TaskRecord, as_datetime
+from app.repositories.base import ROW_TYPES, Record, Repositories, held_by_thread
+
+logger = logging.getLogger(__name__)
+
+_SCAN_BATCH = 200
+
+
+def _json(value: Any) -> Jsonb | None:
+    if value is None:
+        return None
+    return Jsonb(value, dumps=lambda obj: json.dumps(obj, default=str))
+
+
+def _iso(value: datetime | None) -> str | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.isoformat()
+
+
+def _now() -> datetime:
+    return datetime.now(UTC)
+
+
+def _page_query(
+    table: str,
+    columns: str,
+    clauses: list[str],
+    params: list[Any],
+    *,
+    created_after: datetime | None,
+    after: str | None,
+    limit: int | None,
+) -> tuple[str, list[Any]]:
+    """Keyset page ordered by ``("createdAt", id)``; the cursor row's sort key is looked up by id."""
+    if created_after is not None:
+        clauses.append('"createdAt" > %s')
+        params.append(as_datetime(created_after))
+    if after is not None:
+        clauses.append(f'("createdAt", id) > (SELECT "createdAt", id FROM "{table}" WHERE id = %s)')
+        params.append(after)
+    query = f'SELECT {columns} FROM "{table}" WHERE {" AND ".join(clauses)} ORDER BY "createdAt", id'
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, params
+
+
+class PostgresDatabase:
+    """Thin wrapper around a psycopg connection pool with dict rows and autocommit."""
+
+    def __init__(self, dsn: str, *, min_size: int, max_size: int) -> None:
+        self.pool = ConnectionPool(
+            dsn,
+            min_size=min_size,
+            max_size=max_size,
+            kwargs={"autocommit": True, "row_factory": dict_row, "options": "-c TimeZone=UTC"},
+            open=True,
+        )
+
+    def fetch_all(self, query: str, params: Sequence[Any] = ()) -> list[dict[str, Any]]:
+        with self.pool.connection() as conn:
+            return list(conn.execute(query, params).fetchall())
+
+    def fetch_one(self, query: str, params: Sequence[Any] = ()) -> dict[str, Any] | None:
+        with self.pool.connection() as conn:
+            return conn.execute(query, params).fetchone()
+
+    def execute(self, query: str, params: Sequence[Any] = ()) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute(query, params).rowcount
+
+    def execute_many(self, query: str, params_seq: Iterable[Sequence[Any]]) -> None:
+        with self.pool.connection() as conn:
+            with conn.transaction():
+                with conn.cursor() as cursor:
+                    cursor.executemany(query, params_seq)
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class PostgresUserRepository:
+    def __init__(self, db: PostgresDatabase) -> None:
+        self._db = db
+
+    @staticmethod
+    def _record(row: dict[str, Any] | None) -> Record | None:
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "username": row["username"],
+            "password_hash": row["passwordHash"],
+            "created_at": _iso(row["createdAt"]),
+        }
+
+    def get(self, user_id: str) -> Record | None:
+        return self._record(
+            self._db.fetch_one('SELECT id, username, "passwordHash", "createdAt" FROM "User" WHERE id = %s', (user_id,))
+        )
+
+    def get_by_username(self, username: str) -> Record | None:
+        return self._record(
+            self._db.fetch_one(
+                'SELECT id, username, "passwordHash", "createdAt" FROM "User" WHERE username = %s', (username,)
+            )
+        )
+
+    def add(self, record: Record) -> None:
+        created_at = as_datetime(record["created_at"])
+        self._db.execute(
+            'INSERT INTO "User" (id, username, "passwordHash", "createdAt", "updatedAt") VALUES (%s, %s, %s, %s, %s)',
+            (record["id"], record["username"], record["password_hash"], created_at, created_at),
+        )
+
+
+class PostgresWorkspaceRepository:
+    _COLUMNS = 'id, name, slug, description, template, "inviteToken", "createdAt"'
+
+    def __init__(self, db: PostgresDatabase) -> None:
+        self._db = db
+
+    @staticmethod
+    def _record(row: dict[str, Any]) -> Record:
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "slug": row["slug"],
+            "description": row["description"],
+            "template": row["template"],
+            "invite_token": row["inviteToken"],
+            "created_at": _iso(row["createdAt"]),
+        }
+
+    @staticmethod
+    def _member(row: dict[str, Any]) -> Record:
+        return {"workspace_id": row["workspaceId"], "user_id": row["userId"], "role": row["role"]}
+
+    def get(self, workspace_id: str) -> Record | None:
+        row = self._db.fetch_one(
+            f'SELECT {self._COLUMNS} FROM "Workspace" WHERE id = %s AND "deletedAt" IS NULL', (workspace_id,)
+        )
+        return self._record(row) if row is not None else None
+
+    def add(self, record: Record) -> None:
+        created_at = as_datetime(record["created_at"])
+        self._db.execute(
+            'INSERT INTO "Workspace" (id, name, slug, description, template, "inviteToken", "createdAt", "updatedAt") '
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+            (
+                record["id"],
+                record["name"],
+                record["slug"],
+                record.get("description"),
+                record.get("template"),
+                record.get("invite_token"),
+                created_at,
+                created_at,
+            ),
+        )
+
+    def save(self, record: Record) -> None:
+        self._db.execute(
+            'UPDATE "Workspace" SET name = %s, slug = %s, description = %s, template = %s, "inviteToken" = %s, '
+            '"updatedAt" = %s WHERE id = %s',
+            (
+                record["name"],
+                record["slug"],
+                record.get("description"),
+                record.get("template"),
+                record.get("invite_token"),
+                _now(),
+                record["id"],
+            ),
+        )
+
+    def membership(self, workspace_id: str, user_id: str) -> Record | None:
+        row = self._db.fetch_one(
+            'SELECT "workspaceId", "userId", role::text AS role FROM "WorkspaceMember" '
+            'WHERE "workspaceId" = %s AND "userId" = %s',
+            (workspace_id, user_id),
+        )
+        return self._member(row) if row is not None else None
+
+    def list_members(self, workspace_id: str) -> list[Record]:
+        rows = self._db.fetch_all(
+            'SELECT "workspaceId", "userId", role::text AS role FROM "WorkspaceMember" '
+            'WHERE "workspaceId" = %s ORDER BY "createdAt", id',
+            (workspace_id,),
+        )
+        return [self._member(row) for row in rows]
+
+    def list_for_user(self, user_id: str) -> list[Record]:
+        columns = ", ".join(f"w.{column.strip()}" for column in self._COLUMNS.split(","))
+        rows = self._db.fetch_all(
+            f'SELECT {columns} FROM "WorkspaceMember" m JOIN "Workspace" w ON w.id = m."workspaceId" '
+            'WHERE m."userId" = %s AND w."deletedAt" IS NULL ORDER BY m."createdAt", m.id',
+            (user_id,),
+        )
+        return [self._record(row) for row in rows]
+
+    def add_member(self, workspace_id: str, user_id: str, role: str) -> Record:
+        self._db.execute(
+            'INSERT INTO "WorkspaceMember" (id, "workspaceId", "userId", role) VALUES (%s, %s, %s, %s::"WorkspaceRole") '
+            'ON CONFLICT ("workspaceId", "userId") DO NOTHING',
+            (str(uuid4()), workspace_id, user_id, role),
+        )
+        member = self.membership(workspace_id, user_id)
+        assert member is not None
+        return member
+
+    def remove_member(self, workspace_id: str, user_id: str) -> Record | None:
+        row = self._db.fetch_one(
+            'DELETE FROM "WorkspaceMember" WHERE "workspaceId" = %s AND "userId" = %s '
+            'RETURNING "workspaceId", "userId", role::text AS role',
+            (workspace_id, user_id),
+        )
+        return self._member(row) if row is not None else None
+
+
+class PostgresProjectRepository:
+    _COLUMNS = 'id, "workspaceId", name, description, "createdAt"'
+
+    def __init__(self, db: PostgresDatabase) -> None:
+        self._db = db
+
+    @staticmethod
+    def _record(row: dict[str, Any]) -> Record:
+        return {
+            "id": row["id"],
+            "workspace_id": row["workspaceId"],
+            "name": row["name"],
+            "description": row["description"],
+            "created_at": _iso(row["createdAt"]),
+        }
+
+    def get(self, project_id: str) -> Record | None:
+        row = self._db.fetch_one(
+            f'SELECT {self._COLUMNS} FROM "Project" WHERE id = %s AND "deletedAt" IS NULL', (project_id,)
+        )
+        return self._record(row) if row is not None else None
+
+    def add(self, record: Record) -> None:
+        created_at = as_datetime(record["created_at"])
+        self._db.execute(
+            'INSERT INTO "Project" (id, "workspaceId", name, description, "createdAt", "updatedAt") '
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            (record["id"], record["workspace_id"], record["name"], record.get("description"), created_at, created_at),
+        )
+
+    def list_by_workspace(self, workspace_id: str) -> list[Record]:
+        rows = self._db.fetch_all(
+            f'SELECT {self._COLUMNS} FROM "Project" WHERE "workspaceId" = %s AND "deletedAt" IS NULL '
+            'ORDER BY "createdAt", id',
+            (workspace_id,),
+        )
+        return [self._record(row) for row in rows]
+
+
+class PostgresTaskRepository:
+    _COLUMNS = (
+        'id, "workspaceId", "projectId", title, description, status, priority::text AS priority, '
+        '"acceptanceCriteria", "assigneeUserId", "assigneeAgentRole", "proofExempt", "createdAt", "updatedAt"'
+    )
+
+    def __init__(self, db: PostgresDatabase) -> None:
+        self._db = db
+
+    @staticmethod
+    def _record(row: dict[str, Any]) -> TaskRecord:
+        return TaskRecord(
+            id=row["id"],
+            workspace_id=row["workspaceId"],
+            project_id=row["projectId"],
+            title=row["title"],
+            description=row["description"],
+            status=row["status"],
+            priority=row["priority"],
+            acceptance_criteria=list(row["acceptanceCriteria"] or []),
+            assignee_user_id=row["assigneeUserId"],
+            assignee_agent_role=row["assigneeAgentRole"],
+            proof_exempt=bool(row["proofExempt"]),
+            created_at=row["createdAt"],
+            updated_at=row["updatedAt"],
+        )
+
+    def get(self, task_id: str) -> Record | None:
+        row = self._db.fetch_one(f'SELECT {self._COLUMNS} FROM "Task" WHERE id = %s AND "deletedAt" IS NULL', (task_id,))
+        return self._record(row) if row is not None else None
+
+    def add(self, record: Record) -> None:
+        self._db.execute(
+            'INSERT INTO "Task" (id, "workspaceId", "projectId", title, description, status, priority, '
+            '"acceptanceCriteria", "assigneeUserId", "assigneeAgentRole", "proofExempt", "createdAt", "updatedAt") '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s::"TaskPriority", %s, %s, %s, %s, %s, %s)',
+            (
+                record["id"],
+                record["workspace_id"],
+                record.get("project_id"),
+                record["title"],
+                record.get("description"),
+                record["status"],
+                record["priority"],
+                _json(list(record.get("acceptance_criteria") or [])),
+                record.get("assignee_user_id"),
+                record.get("assignee_agent_role"),
+                bool(record.get("proof_exempt", False)),
+                as_datetime(record["created_at"]),
+                as_datetime(record["updated_at"]),
+            ),
+        )
+
+    def save(self, record: Record) -> None:
+        self._db.execute(
+            'UPDATE "Task" SET title = %s, description = %s, status = %s, priority = %s::"TaskPriority", '
+            '"acceptanceCriteria" = %s, "assigneeUserId" = %s, "assigneeAgentRole" = %s, "proofExempt" = %s, '
+            '"updatedAt" = %s WHERE id = %s',
+            (
+                record["title"],
+                record.get("description"),
+                record["status"],
+                record["priority"],
+                _json(list(record.get("acceptance_criteria") or [])),
+                record.get("assignee_user_id"),
+                record.get("assignee_agent_role"),
+                bool(record.get("proof_exempt", False)),
+                as_datetime(record["updated_at"]),
+                record["id"],
+            ),
+        )
+
+    def list_by_workspace(
+        self,
+        workspace_id: str,
+        *,
+        status: str | None = None,
+        assignee: str | None = None,
+        priority: str | None = None,
+        project_id: str | None = None,
+        created_after: datetime | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        # Served by @@index([workspaceId, status]) or @@index([workspaceId, createdAt]).
+        clauses = ['"workspaceId" = %s', '"deletedAt" IS NULL']
+        params: list[Any] = [workspace_id]
+        if status is not None:
+            clauses.append("status = %s")
+            params.append(status)
+        if assignee is not None:
+            clauses.append('("assigneeUserId" = %s OR "assigneeAgentRole" = %s)')
+            params.extend((assignee, assignee))
+        if priority is not None:
+            clauses.append('priority = %s::"TaskPriority"')
+            params.append(priority)
+        if project_id is not None:
+            clauses.append('"projectId" = %s')
+            params.append(project_id)
+        query, params = _page_query(
+            "Task", self._COLUMNS, clauses, params, created_after=created_after, after=after, limit=limit
+        )
+        return [self._record(row) for row in self._db.fetch_all(query, params)]
+
+    def reassign_status(self, workspace_id: str, from_status: str, to_status: str) -> int:
+        return self._db.execute(
+            'UPDATE "Task" SET status = %s, "updatedAt" = %s WHERE "workspaceId" = %s AND status = %s',
+            (to_status, _now(), workspace_id, from_status),
+        )
+
+
+class PostgresArtifactRepository:
+    _COLUMNS = 'id, "workspaceId", "taskId", type::text AS type, title, content, metadata, "createdAt", "updatedAt"'
+
+    def __init__(self, db: PostgresDatabase) -> None:
+        self._db = db
+
+    @staticmethod
+    def _record(row: dict[str, Any]) -> Record:
+        return {
+            "id": row["id"],
+            "workspace_id": row["workspaceId"],
+            "task_id": row["taskId"],
+            "type": row["type"],
+            "title": row["title"],
+            "content": row["content"],
+            "metadata": dict(row["metadata"] or {}),
+            "created_at": _iso(row["createdAt"]),
+            "updated_at": _iso(row["updatedAt"]),
+        }
+
+    def get(self, artifact_id: str) -> Record | None:
+        row = self._db.fetch_one(f'SELECT {self._COLUMNS} FROM "Artifact" WHERE id = %s', (artifact_id,))
+        return self._record(row) if row is not None else None
+
+    def add(self, record: Record) -> None:
+        created_at = as_datetime(record["created_at"])
+        self._db.execute(
+            'INSERT INTO "Artifact" (id, "workspaceId", "taskId", type, title, content, metadata, "createdAt", "updatedAt") '
+            'VALUES (%s, %s, %s, %s::"ArtifactType", %s, %s, %s, %s, %s)',
+            (
+                record["id"],
+                record["workspace_id"],
+                record.get("task_id"),
+                record["type"],
+                record["title"],
+                record["content"],
+                _json(record.get("metadata") or {}),
+                created_at,
+                created_at,
+            ),
+        )
+
+    def save(self, record: Record) -> None:
+        self._db.execute(
+            'UPDATE "Artifact" SET title = %s, content = %s, metadata = %s, "updatedAt" = %s WHERE id = %s',
+            (
+                record["title"],
+                record["content"],
+                _json(record.get("metadata") or {}),
+                as_datetime(record.get("updated_at") or record["created_at"]),
+                record["id"],
+            ),
+        )
+
+    def list_by_workspace(
+        self,
+        workspace_id: str,
+        *,
+        type: str | None = None,
+        task_id: str | None = None,
+        created_after: datetime | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        clauses = ['"workspaceId" = %s']
+        params: list[Any] = [workspace_id]
+        if type is not None:
+            clauses.append('type = %s::"ArtifactType"')
+            params.append(type)
+        if task_id is not None:
+            clauses.append('"taskId" = %s')
+            params.append(task_id)
+        query, params = _page_query(
+            "Artifact", self._COLUMNS, clauses, params, created_after=created_after, after=after, limit=limit
+        )
+        return [self._record(row) for row in self._db.fetch_all(query, params)]
+
+    def list_by_task(self, task_id: str) -> list[Record]:
+        rows = self._db.fetch_all(
+            f'SELECT {self._COLUMNS} FROM "Artifact" WHERE "taskId" = %s ORDER BY "createdAt", id', (task_id,)
+        )
+        return [self._record(row) for row in rows]
+
+    def exists_for_task(self, task_id: str) -> bool:
+        row = self._db.fetch_one('SELECT EXISTS (SELECT 1 FROM "Artifact" WHERE "taskId" = %s) AS found', (task_id,))
+        return bool(row and row["found"])
+
+
+class PostgresAgentRunRepository:
+    _COLUMNS = 'id, "workspaceId", "taskId", "roleKey", status::text AS status, output, "createdAt", "updatedAt"'
+
+    def __init__(self, db: PostgresDatabase) -> None:
+        self._db = db
+
+    @staticmethod
+    def _record(row: dict[str, Any]) -> AgentRunRecord:
+        return AgentRunRecord(
+            id=row["id"],
+            workspace_id=row["workspaceId"],
+            task_id=row["taskId"],
+            role_key=row["roleKey"],
+            status=row["status"],
+            output=row["output"],
+            created_at=row["createdAt"],
+            updated_at=row["updatedAt"],
+        )
+
+    @staticmethod
+    def _confidence(record: Record) -> float | None:
+        output = record.get("output")
+        if isinstance(output, dict) and isinstance(output.get("confidence_score"), int | float):
+            return float(output["confidence_score"])
+        return None
+
+    def get(self, run_id: str) -> Record | None:
+        row = self._db.fetch_one(f'SELECT {self._COLUMNS} FROM "AgentRun" WHERE id = %s', (run_id,))
+        return self._record(row) if row is not None else None
+
+    def add(self, record: Record) -> None:
+        self._db.execute(
+            'INSERT INTO "AgentRun" (id, "workspaceId", "taskId", "roleKey", status, "confidenceScore", output, '
+            '"createdAt", "updatedAt") VALUES (%s, %s, %s, %s, %s::"RunStatus", %s, %s, %s, %s)',
+            (
+                record["id"],
+                record["workspace_id"],
+                record.get("task_id"),
+                record["role_key"],
+                record["status"],
+                self._confidence(record),
+                _json(record.get("output")),
+                as_datetime(record["created_at"]),
+                as_datetime(record["updated_at"]),
+            ),
+        )
+
+    def save(self, record: Record) -> None:
+        self._db.execute(
+            'UPDATE "AgentRun" SET status = %s::"RunStatus", "confidenceScore" = %s, output = %s, "updatedAt" = %s '
+            "WHERE id = %s",
+            (
+                record["status"],
+                self._confidence(record),
+                _json(record.get("output")),
+                as_datetime(record["updated_at"]),
+                record["id"],
+            ),
+        )
+
+    def list_by_workspace(
+        self,
+        workspace_id: str,
+        *,
+        status: str | None = None,
+        task_id: str | None = None,
+        created_after: datetime | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        clauses = ['"workspaceId" = %s']
+        params: list[Any] = [workspace_id]
+        if status is not None:
+            clauses.append('status = %s::"RunStatus"')
+            params.append(status)
+        if task_id is not None:
+            clauses.append('"taskId" = %s')
+            params.append(task_id)
+        query, params = _page_query(
+            "AgentRun", self._COLUMNS, clauses, params, created_after=created_after, after=after, limit=limit
+        )
+        return [self._record(row) for row in self._db.fetch_all(query, params)]
+
+    def list_by_task(self, task_id: str) -> list[Record]:
+        rows = self._db.fetch_all(
+            f'SELECT {self._COLUMNS} FROM "AgentRun" WHERE "taskId" = %s ORDER BY "createdAt", id', (task_id,)
+        )
+        return [self._record(row) for row in rows]
+
+
+class PostgresAuditLogRepository:
+    """Audit rows are buffered and written in batches; reads flush first so callers see their own writes."""
+
+    _INSERT = (
+        'INSERT INTO "AuditLog" (id, "workspaceId", "actorType", "actorId", action, "entityType", "entityId", '
+        'payload, "createdAt") VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)'
+    )
+    _COLUMNS = 'id, "workspaceId", "actorType", "actorId", action, "entityType", "entityId", payload, "createdAt"'
+
+    def __init__(self, db: PostgresDatabase, *, batch_size: int, flush_interval_seconds: float) -> None:
+        self._db = db
+        self._batch_size = max(1, batch_size)
+        self._buffer: list[tuple[Any, ...]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically,
+            args=(max(0.01, flush_interval_seconds),),
+            name="audit-log-flusher",
+            daemon=True,
+        )
+        self._flusher.start()
+
+    @staticmethod
+    def _record(row: dict[str, Any]) -> AuditRecord:
+        return AuditRecord(
+            id=row["id"],
+            workspace_id=row["workspaceId"],
+            actor_type=row["actorType"],
+            actor_id=row["actorId"],
+            action=row["action"],
+            entity_type=row["entityType"],
+            entity_id=row["entityId"],
+            payload=dict(row["payload"] or {}),
+            created_at=row["createdAt"],
+        )
+
+    def append(self, row: Record) -> None:
+        params = (
+            row["id"],
+            row["workspace_id"],
+            row["actor_type"],
+            row["actor_id"],
+            row["action"],
+            row["entity_type"],
+            str(row["entity_id"]),
+            _json(row.get("payload") or {}),
+            as_datetime(row["created_at"]),
+        )
+        with self._lock:
+            self._buffer.append(params)
+            full = len(self._buffer) >= self._batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        # Appends only hold ``_lock`` long enough to enqueue; ``_write_lock`` makes a reader's flush
+        # wait for any batch already in flight.
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if batch:
+                self._db.execute_many(self._INSERT, batch)
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self._stopped.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("audit_log_flush_failed")
+
+    def close(self) -> None:
+        self._stopped.set()
+        self.flush()
+
+    def query(
+        self,
+        *,
+        workspace_id: str | None = None,
+        entity_type: str | None = None,
+        entity_id: str | None = None,
+        actions: Collection[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        self.flush()
+        # Filters are emitted in index order: (entityType, entityId) and (workspaceId, action).
+        conditions: list[str] = []
+        params: list[Any] = []
+        if entity_type is not None:
+            conditions.append('"entityType" = %s')
+            params.append(entity_type)
+        if entity_id is not None:
+            conditions.append('"entityId" = %s')
+            params.append(entity_id)
+        if workspace_id is not None:
+            conditions.append('"workspaceId" = %s')
+            params.append(workspace_id)
+        if actions:
+            conditions.append("action = ANY(%s)")
+            params.append(list(actions))
+        if since is not None:
+            conditions.append('"createdAt" >= %s')
+            params.append(as_datetime(since))
+        if until is not None:
+            conditions.append('"createdAt" < %s')
+            params.append(as_datetime(until))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        if limit is None:
+            rows = self._db.fetch_all(f'SELECT {self._COLUMNS} FROM "AuditLog" {where} ORDER BY "createdAt", id', params)
+        else:
+            rows = self._db.fetch_all(
+                f'SELECT {self._COLUMNS} FROM "AuditLog" {where} ORDER BY "createdAt" DESC, id DESC LIMIT %s',
+                [*params, max(limit, 0)],
+            )
+            rows.reverse()
+        return [self._record(row) for row in rows]
+
+
+class PostgresRecordRepository:
+    def __init__(self, db: PostgresDatabase, kind: str) -> None:
+        self._db = db
+        self._kind = kind
+
+    def get(self, record_id: str) -> Record | None:
+        row = self._db.fetch_one('SELECT value FROM "StoreRecord" WHERE kind = %s AND id = %s', (self._kind, record_id))
+        return dict(row["value"]) if row is not None else None
+
+    def put(self, record: Record) -> None:
+        self._db.execute(
+            'INSERT INTO "StoreRecord" (kind, id, "workspaceId", value, "updatedAt") VALUES (%s, %s, %s, %s, %s) '
+            'ON CONFLICT (kind, id) DO UPDATE SET value = EXCLUDED.value, "updatedAt" = EXCLUDED."updatedAt"',
+            (self._kind, str(record["id"]), str(record["workspace_id"]), _json(dict(record)), _now()),
+        )
+
+    def iter_workspace(self, workspace_id: str, *, after: str | None = None) -> Iterator[Record]:
+        # Served by @@index([kind, workspaceId, id]), a batch at a time.
+        while True:
+            rows = self._db.fetch_all(
+                'SELECT id, value FROM "StoreRecord" WHERE kind = %s AND "workspaceId" = %s AND id > %s '
+                "ORDER BY id LIMIT %s",
+                (self._kind, workspace_id, after or "", _SCAN_BATCH),
+            )
+            for row in rows:
+                yield dict(row["value"])
+            if len(rows) < _SCAN_BATCH:
+                return
+            after = rows[-1]["id"]
+
+
+class PostgresEntryRepository:
+    def __init__(self, db: PostgresDatabase) -> None:
+        self._db = db
+
+    def get(self, collection: str, key: str) -> Any | None:
+        row = self._db.fetch_one(
+            'SELECT value FROM "StoreEntry" WHERE collection = %s AND key = %s', (collection, key)
+        )
+        return row["value"] if row is not None else None
+
+    def put(self, collection: str, key: str, value: Any) -> None:
+        if value is None:
+            self._db.execute('DELETE FROM "StoreEntry" WHERE collection = %s AND key = %s', (collection, key))
+            return
+        self._db.execute(
+            'INSERT INTO "StoreEntry" (collection, key, value, "updatedAt") VALUES (%s, %s, %s, %s) '
+            'ON CONFLICT (collection, key) DO UPDATE SET value = EXCLUDED.value, "updatedAt" = EXCLUDED."updatedAt"',
+            (collection, key, _json(value), _now()),
+        )
+
+    def append(self, collection: str, key: str, row: Record) -> None:
+        self._db.execute(
+            'INSERT INTO "StoreRow" (collection, key, id, value) VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING',
+            (collection, key, str(row["id"]), _json(dict(row))),
+        )
+
+    def rows(self, collection: str, key: str, *, after: str | None = None) -> Iterator[Record]:
+        factory = ROW_TYPES.get(collection, dict)
+        while True:
+            rows = self._db.fetch_all(
+                'SELECT id, value FROM "StoreRow" WHERE collection = %s AND key = %s AND id > %s ORDER BY id LIMIT %s',
+                (collection, key, after or "", _SCAN_BATCH),
+            )
+            for row in rows:
+                yield factory(row["value"])
+            if len(rows) < _SCAN_BATCH:
+                return
+            after = rows[-1]["id"]
+
+    def tail(self, collection: str, key: str, count: int) -> list[Record]:
+        if count <= 0:
+            return []
+        factory = ROW_TYPES.get(collection, dict)
+        rows = self._db.fetch_all(
+            'SELECT value FROM "StoreRow" WHERE collection = %s AND key = %s ORDER BY id DESC LIMIT %s',
+            (collection, key, count),
+        )
+        return [factory(row["value"]) for row in reversed(rows)]
+
+
+class PostgresWorkspaceLocks:
+    """Session advisory locks, one per workspace, re-entrant within a thread."""
+
+    def __init__(self, db: PostgresDatabase) -> None:
+        # Its own pool: a locked section queries through the data pool, and must not wait for a
+        # connection that other locked sections are holding.
+        self._db = db
+        self._state = threading.local()
+
+    @contextmanager
+    def hold(self, *workspace_ids: str) -> Iterator[None]:
+        held = held_by_thread(self._state)
+        wanted = sorted(set(workspace_ids) - held)
+        if not wanted:
+            yield
+            return
+        with self._db.pool.connection() as conn:
+            locked: list[str] = []
+            try:
+                # Sorted, so two workers locking the same workspaces cannot deadlock.
+                for workspace_id in wanted:
+                    conn.execute("SELECT pg_advisory_lock(hashtextextended(%s, 0))", (f"workspace:{workspace_id}",))
+                    locked.append(workspace_id)
+                    held.add(workspace_id)
+                yield
+            finally:
+                for workspace_id in reversed(locked):
+                    held.discard(workspace_id)
+                    conn.execute("SELECT pg_advisory_unlock(hashtextextended(%s, 0))", (f"workspace:{workspace_id}",))
+
+
+def build_postgres_repositories(settings: Settings, dsn: str | None = None) -> Repositories:
+    db = PostgresDatabase(
+        dsn or settings.database_url,
+        min_size=settings.database_pool_min_size,
+        max_size=settings.database_pool_max_size,
+    )
+    audit_logs = PostgresAuditLogRepository(
+        db,
+        batch_size=settings.audit_write_batch_size,
+        flush_interval_seconds=settings.audit_write_flush_ms / 1000,
+    )
+
+    lock_db = PostgresDatabase(
+        dsn or settings.database_url,
+        min_size=1,
+        max_size=settings.database_pool_max_size,
+    )
+
+    def close() -> None:
+        audit_logs.close()
+        db.close()
+        lock_db.close()
+
+    return Repositories(
+        backend="postgres",
+        users=PostgresUserRepository(db),
+        workspaces=PostgresWorkspaceRepository(db),
+        projects=PostgresProjectRepository(db),
+        tasks=PostgresTaskRepository(db),
+        artifacts=PostgresArtifactRepository(db),
+        agent_runs=PostgresAgentRunRepository(db),
+        audit_logs=audit_logs,
+        approvals=PostgresRecordRepository(db, "approval"),
+        decisions=PostgresRecordRepository(db, "decision"),
+        council_sessions=PostgresRecordRepository(db, "council_session"),
+        entries=PostgresEntryRepository(db),
+        locks=PostgresWorkspaceLocks(lock_db),
+        on_close=close,
+    )
@@ -0,0 +1,533 @@
+"""Redis repositories, so several API worker processes share every workspace collection.
+
+Records are JSON strings under ``<prefix>:<table>:<id>``. Per-workspace and per-task indexes are
+sorted sets with every score 0: Redis orders equal scores by member, and ids are time-ordered
+(see ``app.core.ids``), so ``ZRANGE`` returns records in creation order without a sort. Audit rows
+are indexed by ``created_at`` (epoch microseconds as the score) for time-range queries.
+
+Timestamps are written as ISO strings; the typed records convert them back to datetimes on read.
+
+Entry values are JSON under ``<prefix>:entry:<collection>:<key>``; entry rows are a hash per key
+plus the same kind of lex-ordered id index. Workspace locks are ``SET NX`` keys with an expiry, so
+a worker that dies holding one blocks the workspace for ``_LOCK_TIMEOUT`` seconds at most.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable, Collection, Iterator, Mapping
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from typing import Any
+
+import redis
+from redis.exceptions import LockError
+
+from app.core.config import Settings
+from app.core.pagination import matching, take
+from app.core.records import AgentRunRecord, AuditRecord, TaskRecord, as_datetime
+from app.repositories.base import ROW_TYPES, Record, Repositories, held_by_thread
+
+logger = logging.getLogger(__name__)
+
+_AUDIT_PAGE = 500
+_SCAN_BATCH = 200
+# Critical sections are a few round trips; the expiry only matters when a worker dies holding one.
+_LOCK_TIMEOUT = 30.0
+_LOCK_WAIT = 10.0
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, set | frozenset | tuple):
+        return list(value)
+    return str(value)
+
+
+def _dumps(record: Mapping[str, Any]) -> str:
+    return json.dumps(dict(record), default=_default, separators=(",", ":"))
+
+
+def _dumps_value(value: Any) -> str:
+    return json.dumps(value, default=_default, separators=(",", ":"))
+
+
+def _micros(value: datetime | str) -> int:
+    moment = as_datetime(value)
+    return int(moment.timestamp()) * 1_000_000 + moment.microsecond
+
+
+class RedisTable:
+    """One entity type: JSON records plus ``workspace_id`` / ``task_id`` id indexes."""
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        prefix: str,
+        name: str,
+        factory: Callable[[dict[str, Any]], Record] = dict,
+    ) -> None:
+        self._client = client
+        self._prefix = f"{prefix}:{name}"
+        self._factory = factory
+
+    def key(self, record_id: str) -> str:
+        return f"{self._prefix}:{record_id}"
+
+    def index_key(self, index: str, value: str) -> str:
+        return f"{self._prefix}:by_{index}:{value}"
+
+    def get(self, record_id: str) -> Record | None:
+        raw = self._client.get(self.key(record_id))
+        return self._factory(json.loads(raw)) if raw is not None else None
+
+    def put(self, record: Record) -> None:
+        # ``workspace_id`` / ``task_id`` never change, so re-adding the index entries is a no-op on save.
+        record_id = str(record["id"])
+        pipe = self._client.pipeline(transaction=True)
+        pipe.set(self.key(record_id), _dumps(record))
+        for index in ("workspace_id", "task_id"):
+            value = record.get(index)
+            if value is not None:
+                pipe.zadd(self.index_key(index, str(value)), {record_id: 0})
+        pipe.execute()
+
+    def ids(self, index: str, value: str) -> list[str]:
+        return list(self._client.zrange(self.index_key(index, value), 0, -1))
+
+    def exists(self, index: str, value: str) -> bool:
+        return bool(self._client.zcard(self.index_key(index, value)))
+
+    def many(self, record_ids: list[str]) -> list[Record]:
+        if not record_ids:
+            return []
+        rows = self._client.mget([self.key(record_id) for record_id in record_ids])
+        return [self._factory(json.loads(raw)) for raw in rows if raw is not None]
+
+    def list(self, index: str, value: str) -> list[Record]:
+        return self.many(self.ids(index, value))
+
+    def scan(self, index: str, value: str, *, after: str | None = None) -> Iterator[Record]:
+        """Records in id order past the ``after`` id, read ``_SCAN_BATCH`` at a time with ``ZRANGEBYLEX``."""
+        key = self.index_key(index, value)
+        low = f"({after}" if after is not None else "-"
+        while True:
+            ids = self._client.zrangebylex(key, low, "+", start=0, num=_SCAN_BATCH)
+            yield from self.many(ids)
+            if len(ids) < _SCAN_BATCH:
+                return
+            low = f"({ids[-1]}"
+
+
+class RedisUserRepository:
+    def __init__(self, client: redis.Redis, prefix: str) -> None:
+        self._client = client
+        self._table = RedisTable(client, prefix, "user")
+        self._by_username = f"{prefix}:user:by_username"
+
+    def get(self, user_id: str) -> Record | None:
+        return self._table.get(user_id)
+
+    def get_by_username(self, username: str) -> Record | None:
+        user_id = self._client.hget(self._by_username, username)
+        return self._table.get(user_id) if user_id is not None else None
+
+    def add(self, record: Record) -> None:
+        self._table.put(record)
+        self._client.hset(self._by_username, str(record["username"]), str(record["id"]))
+
+
+class RedisWorkspaceRepository:
+    """Roles live in ``members:<workspace>`` hashes; join order in sorted sets scored by join time."""
+
+    def __init__(self, client: redis.Redis, prefix: str) -> None:
+        self._client = client
+        self._prefix = prefix
+        self._table = RedisTable(client, prefix, "workspace")
+
+    def _roles(self, workspace_id: str) -> str:
+        return f"{self._prefix}:members:{workspace_id}"
+
+    def _member_order(self, workspace_id: str) -> str:
+        return f"{self._prefix}:members:{workspace_id}:order"
+
+    def _user_workspaces(self, user_id: str) -> str:
+        return f"{self._prefix}:user_workspaces:{user_id}"
+
+    def get(self, workspace_id: str) -> Record | None:
+        return self._table.get(workspace_id)
+
+    def add(self, record: Record) -> None:
+        self._table.put(record)
+
+    def save(self, record: Record) -> None:
+        self._table.put(record)
+
+    def membership(self, workspace_id: str, user_id: str) -> Record | None:
+        role = self._client.hget(self._roles(workspace_id), user_id)
+        return {"workspace_id": workspace_id, "user_id": user_id, "role": role} if role is not None else None
+
+    def list_members(self, workspace_id: str) -> list[Record]:
+        user_ids = self._client.zrange(self._member_order(workspace_id), 0, -1)
+        if not user_ids:
+            return []
+        roles = self._client.hmget(self._roles(workspace_id), user_ids)
+        return [
+            {"workspace_id": workspace_id, "user_id": user_id, "role": role}
+            for user_id, role in zip(user_ids, roles, strict=True)
+            if role is not None
+        ]
+
+    def list_for_user(self, user_id: str) -> list[Record]:
+        return self._table.many(list(self._client.zrange(self._user_workspaces(user_id), 0, -1)))
+
+    def add_member(self, workspace_id: str, user_id: str, role: str) -> Record:
+        joined_at = time.time()
+        pipe = self._client.pipeline(transaction=True)
+        pipe.hsetnx(self._roles(workspace_id), user_id, role)
+        pipe.zadd(self._member_order(workspace_id), {user_id: joined_at}, nx=True)
+        pipe.zadd(self._user_workspaces(user_id), {workspace_id: joined_at}, nx=True)
+        pipe.execute()
+        member = self.membership(workspace_id, user_id)
+        assert member is not None
+        return member
+
+    def remove_member(self, workspace_id: str, user_id: str) -> Record | None:
+        pipe = self._client.pipeline(transaction=True)
+        pipe.hget(self._roles(workspace_id), user_id)
+        pipe.hdel(self._roles(workspace_id), user_id)
+        pipe.zrem(self._member_order(workspace_id), user_id)
+        pipe.zrem(self._user_workspaces(user_id), workspace_id)
+        role = pipe.execute()[0]
+        return {"workspace_id": workspace_id, "user_id": user_id, "role": role} if role is not None else None
+
+
+class RedisProjectRepository:
+    def __init__(self, client: redis.Redis, prefix: str) -> None:
+        self._table = RedisTable(client, prefix, "project")
+
+    def get(self, project_id: str) -> Record | None:
+        return self._table.get(project_id)
+
+    def add(self, record: Record) -> None:
+        self._table.put(record)
+
+    def list_by_workspace(self, workspace_id: str) -> list[Record]:
+        return self._table.list("workspace_id", workspace_id)
+
+
+class RedisTaskRepository:
+    def __init__(self, client: redis.Redis, prefix: str) -> None:
+        self._table = RedisTable(client, prefix, "task", TaskRecord.from_mapping)
+
+    def get(self, task_id: str) -> Record | None:
+        return self._table.get(task_id)
+
+    def add(self, record: Record) -> None:
+        self._table.put(record)
+
+    def save(self, record: Record) -> None:
+        self._table.put(record)
+
+    def list_by_workspace(
+        self,
+        workspace_id: str,
+        *,
+        status: str | None = None,
+        assignee: str | None = None,
+        priority: str | None = None,
+        project_id: str | None = None,
+        created_after: datetime | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        tasks = self._table.scan("workspace_id", workspace_id, after=after)
+        if assignee is not None:
+            tasks = (task for task in tasks if assignee in (task.get("assignee_user_id"), task.get("assignee_agent_role")))
+        return take(
+            matching(tasks, created_after=created_after, status=status, priority=priority, project_id=project_id),
+            limit,
+        )
+
+    def reassign_status(self, workspace_id: str, from_status: str, to_status: str) -> int:
+        moved = 0
+        for task in self.list_by_workspace(workspace_id, status=from_status):
+            task["status"] = to_status
+            task["updated_at"] = datetime.now(UTC)
+            self.save(task)
+            moved += 1
+        return moved
+
+
+class RedisArtifactRepository:
+    def __init__(self, client: redis.Redis, prefix: str) -> None:
+        self._table = RedisTable(client, prefix, "artifact")
+
+    def get(self, artifact_id: str) -> Record | None:
+        return self._table.get(artifact_id)
+
+    def add(self, record: Record) -> None:
+        self._table.put(record)
+
+    def save(self, record: Record) -> None:
+        self._table.put(record)
+
+    def list_by_workspace(
+        self,
+        workspace_id: str,
+        *,
+        type: str | None = None,
+        task_id: str | None = None,
+        created_after: datetime | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        artifacts = self._table.scan("workspace_id", workspace_id, after=after)
+        return take(matching(artifacts, created_after=created_after, type=type, task_id=task_id), limit)
+
+    def list_by_task(self, task_id: str) -> list[Record]:
+        return self._table.list("task_id", task_id)
+
+    def exists_for_task(self, task_id: str) -> bool:
+        return self._table.exists("task_id", task_id)
+
+
+class RedisAgentRunRepository:
+    def __init__(self, client: redis.Redis, prefix: str) -> None:
+        self._table = RedisTable(client, prefix, "agent_run", AgentRunRecord.from_mapping)
+
+    def get(self, run_id: str) -> Record | None:
+        return self._table.get(run_id)
+
+    def add(self, record: Record) -> None:
+        self._table.put(record)
+
+    def save(self, record: Record) -> None:
+        self._table.put(record)
+
+    def list_by_workspace(
+        self,
+        workspace_id: str,
+        *,
+        status: str | None = None,
+        task_id: str | None = None,
+        created_after: datetime | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        runs = self._table.scan("workspace_id", workspace_id, after=after)
+        return take(matching(runs, created_after=created_after, status=status, task_id=task_id), limit)
+
+    def list_by_task(self, task_id: str) -> list[Record]:
+        return self._table.list("task_id", task_id)
+
+
+class RedisAuditLogRepository:
+    """Rows in one hash; ``all`` / ``workspace`` / ``entity`` sorted sets scored by ``created_at``."""
+
+    def __init__(self, client: redis.Redis, prefix: str) -> None:
+        self._client = client
+        self._prefix = f"{prefix}:audit"
+        self._rows = f"{self._prefix}:rows"
+
+    def _index(self, *parts: str) -> str:
+        return ":".join((self._prefix, *parts))
+
+    def append(self, row: Record) -> None:
+        record = AuditRecord.from_mapping(row)
+        score = _micros(record.created_at)
+        pipe = self._client.pipeline(transaction=True)
+        pipe.hset(self._rows, record.id, _dumps(record))
+        pipe.zadd(self._index("all"), {record.id: score})
+        pipe.zadd(self._index("workspace", record.workspace_id), {record.id: score})
+        pipe.zadd(self._index("entity", record.entity_type, str(record.entity_id)), {record.id: score})
+        pipe.execute()
+
+    def flush(self) -> None:
+        return None
+
+    def _scan(self, index: str, low: str | int, high: str | int, newest_first: bool) -> Iterator[AuditRecord]:
+        offset = 0
+        while True:
+            if newest_first:
+                ids = self._client.zrevrangebyscore(index, high, low, start=offset, num=_AUDIT_PAGE)
+            else:
+                ids = self._client.zrangebyscore(index, low, high, start=offset, num=_AUDIT_PAGE)
+            if not ids:
+                return
+            for raw in self._client.hmget(self._rows, ids):
+                if raw is not None:
+                    yield AuditRecord.from_mapping(json.loads(raw))
+            if len(ids) < _AUDIT_PAGE:
+                return
+            offset += len(ids)
+
+    def query(
+        self,
+        *,
+        workspace_id: str | None = None,
+        entity_type: str | None = None,
+        entity_id: str | None = None,
+        actions: Collection[str] | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> list[Record]:
+        if entity_type is not None and entity_id is not None:
+            index = self._index("entity", entity_type, entity_id)
+        elif workspace_id is not None:
+            index = self._index("workspace", workspace_id)
+        else:
+            index = self._index("all")
+        low: str | int = _micros(since) if since is not None else "-inf"
+        high: str | int = f"({_micros(until)}" if until is not None else "+inf"
+        wanted = set(actions) if actions else None
+
+        def matches(row: AuditRecord) -> bool:
+            return (
+                (workspace_id is None or row.workspace_id == workspace_id)
+                and (entity_type is None or row.entity_type == entity_type)
+                and (entity_id is None or row.entity_id == entity_id)
+                and (wanted is None or row.action in wanted)
+            )
+
+        if limit is None:
+            return [row for row in self._scan(index, low, high, newest_first=False) if matches(row)]
+        newest: list[Record] = []
+        if limit > 0:
+            for row in self._scan(index, low, high, newest_first=True):
+                if matches(row):
+                    newest.append(row)
+                    if len(newest) >= limit:
+                        break
+        newest.reverse()
+        return newest
+
+
+class RedisRecordRepository:
+    def __init__(self, client: redis.Redis, prefix: str, name: str) -> None:
+        self._table = RedisTable(client, prefix, name)
+
+    def get(self, record_id: str) -> Record | None:
+        return self._table.get(record_id)
+
+    def put(self, record: Record) -> None:
+        self._table.put(record)
+
+    def iter_workspace(self, workspace_id: str, *, after: str | None = None) -> Iterator[Record]:
+        return self._table.scan("workspace_id", workspace_id, after=after)
+
+
+class RedisEntryRepository:
+    def __init__(self, client: redis.Redis, prefix: str) -> None:
+        self._client = client
+        self._prefix = prefix
+
+    def _key(self, collection: str, key: str) -> str:
+        return f"{self._prefix}:entry:{collection}:{key}"
+
+    def _rows_key(self, collection: str, key: str) -> str:
+        return f"{self._prefix}:entry_rows:{collection}:{key}"
+
+    def _row_ids_key(self, collection: str, key: str) -> str:
+        return f"{self._prefix}:entry_rows:{collection}:{key}:ids"
+
+    def get(self, collection: str, key: str) -> Any | None:
+        raw = self._client.get(self._key(collection, key))
+        return json.loads(raw) if raw is not None else None
+
+    def put(self, collection: str, key: str, value: Any) -> None:
+        if value is None:
+            self._client.delete(self._key(collection, key))
+        else:
+            self._client.set(self._key(collection, key), _dumps_value(value))
+
+    def append(self, collection: str, key: str, row: Record) -> None:
+        row_id = str(row["id"])
+        pipe = self._client.pipeline(transaction=True)
+        pipe.hset(self._rows_key(collection, key), row_id, _dumps(row))
+        pipe.zadd(self._row_ids_key(collection, key), {row_id: 0})
+        pipe.execute()
+
+    def _many(self, collection: str, key: str, row_ids: list[str]) -> list[Record]:
+        if not row_ids:
+            return []
+        factory = ROW_TYPES.get(collection, dict)
+        raw_rows = self._client.hmget(self._rows_key(collection, key), row_ids)
+        return [factory(json.loads(raw)) for raw in raw_rows if raw is not None]
+
+    def rows(self, collection: str, key: str, *, after: str | None = None) -> Iterator[Record]:
+        index = self._row_ids_key(collection, key)
+        low = f"({after}" if after is not None else "-"
+        while True:
+            row_ids = self._client.zrangebylex(index, low, "+", start=0, num=_SCAN_BATCH)
+            yield from self._many(collection, key, row_ids)
+            if len(row_ids) < _SCAN_BATCH:
+                return
+            low = f"({row_ids[-1]}"
+
+    def tail(self, collection: str, key: str, count: int) -> list[Record]:
+        if count <= 0:
+            return []
+        return self._many(collection, key, list(self._client.zrange(self._row_ids_key(collection, key), -count, -1)))
+
+
+class RedisWorkspaceLocks:
+    """One lock key per workspace, re-entrant within a thread like the memory store's locks."""
+
+    def __init__(self, client: redis.Redis, prefix: str) -> None:
+        self._client = client
+        self._prefix = f"{prefix}:workspace_lock"
+        self._state = threading.local()
+
+    @contextmanager
+    def hold(self, *workspace_ids: str) -> Iterator[None]:
+        held = held_by_thread(self._state)
+        # Taken in sorted order, as ``ShardLocks.hold`` does, so two workers cannot deadlock.
+        wanted = sorted(set(workspace_ids) - held)
+        acquired: list[tuple[str, Any]] = []
+        try:
+            for workspace_id in wanted:
+                lock = self._client.lock(
+                    f"{self._prefix}:{workspace_id}",
+                    timeout=_LOCK_TIMEOUT,
+                    blocking_timeout=_LOCK_WAIT,
+                    thread_local=False,
+                )
+                if not lock.acquire():
+                    raise RuntimeError(f"Timed out waiting for the lock of workspace {workspace_id}")
+                acquired.append((workspace_id, lock))
+                held.add(workspace_id)
+            yield
+        finally:
+            for workspace_id, lock in reversed(acquired):
+                held.discard(workspace_id)
+                try:
+                    lock.release()
+                except LockError:
+                    logger.warning("workspace_lock_expired workspace=%s", workspace_id)
+
+
+def build_redis_repositories(settings: Settings, url: str | None = None) -> Repositories:
+    client = redis.Redis.from_url(url or settings.redis_url, decode_responses=True)
+    prefix = settings.redis_key_prefix
+    return Repositories(
+        backend="redis",
+        users=RedisUserRepository(client, prefix),
+        workspaces=RedisWorkspaceRepository(client, prefix),
+        projects=RedisProjectRepository(client, prefix),
+        tasks=RedisTaskRepository(client, prefix),
+        artifacts=RedisArtifactRepository(client, prefix),
+        agent_runs=RedisAgentRunRepository(client, prefix),
+        audit_logs=RedisAuditLogRepository(client, prefix),
+        approvals=RedisRecordRepository(client, prefix, "approval"),
+        decisions=RedisRecordRepository(client, prefix, "decision"),
+        council_sessions=RedisRecordRepository(client, prefix, "council_session"),
+        entries=RedisEntryRepository(client, prefix),
+        locks=RedisWorkspaceLocks(client, prefix),
+        on_close=client.close,
+    )
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
 
 from app.core.store import STORE
 from app.domain.schemas import DecisionArtifactOut
+from app.repositories import REPOSITORIES
 from app.services.agents.confidence import compute_confidence
 
 
@@ -30,7 +32,7 @@ class CouncilService:
             "final_decision": None,
             "rationale": None,
         }
-        STORE.decisions[decision_id] = decision
+        await asyncio.to_thread(REPOSITORIES.decisions.put, decision)
         return DecisionArtifactOut(**decision)
 
 
@@ -8,8 +8,11 @@ from typing import Any
 import httpx
 from jose import jwt
 
+from app.core.archive import ARCHIVES
 from app.core.config import get_settings
 from app.core.store import STORE
+from app.repositories import REPOSITORIES
+from app.services.orchestration.projections import PROJECTIONS
 
 logger = logging.getLogger(__name__)
 
@@ -32,21 +35,36 @@ def get_agent_service_client() -> httpx.AsyncClient:
 @dataclass(slots=True)
 class WorkspaceAssistantService:
     def _recent_history(self, workspace_id: str, limit: int = 12) -> list[dict[str, Any]]:
-        return list(STORE.workspace_assistant_messages.get(workspace_id, []))[-limit:]
+        history = REPOSITORIES.entries.tail("workspace_assistant_messages", workspace_id, limit)
+        if len(history) < limit:
+            # Older messages may have been moved to the archive by retention.
+            seen = {item["id"] for item in history}
+            archived = ARCHIVES.tail("workspace_assistant_messages", workspace_id, limit)
+            history = [item for item in archived if item["id"] not in seen][len(history) - limit :] + history
+        return history
 
     def _workspace_context(self, workspace_id: str) -> tuple[list[str], str]:
-        tasks = [task for task in STORE.tasks.values() if str(task.get("workspace_id")) == workspace_id]
-        completed_tasks = [task for task in tasks if str(task.get("status")) == "done"][:6]
-        open_tasks = [task for task in tasks if str(task.get("status")) != "done"][:8]
-        files = STORE.workspace_files.get(workspace_id, [])[:8]
-        artifacts = [item for item in STORE.artifacts.values() if str(item.get("workspace_id")) == workspace_id][:6]
-        members = STORE.workspace_members.get(workspace_id, [])
-        profiles = STORE.workspace_member_profiles.get(workspace_id, {})
+        task_counts = PROJECTIONS.counts(workspace_id).tasks
+        completed_tasks = REPOSITORIES.tasks.list_by_workspace(workspace_id, status="done", limit=6)
+        # The oldest open tasks: the first few of each open status, merged in id (creation) order.
+        open_tasks = sorted(
+            (
+                task
+                for status_key in task_counts
+                if status_key != "done"
+                for task in REPOSITORIES.tasks.list_by_workspace(workspace_id, status=status_key, limit=8)
+            ),
+            key=lambda task: str(task["id"]),
+        )[:8]
+        files = (REPOSITORIES.entries.get("workspace_files", workspace_id) or [])[:8]
+        artifacts = REPOSITORIES.artifacts.list_by_workspace(workspace_id)[:6]
+        members = REPOSITORIES.workspaces.list_members(workspace_id)
+        profiles = REPOSITORIES.entries.get("workspace_member_profiles", workspace_id) or {}
 
         context_labels = [
             f"members:{len(members)}",
-            f"tasks:{len(tasks)}",
-            f"completed_tasks:{len(completed_tasks)}",
+            f"tasks:{task_counts.total()}",
+            f"completed_tasks:{task_counts['done']}",
             f"files:{len(files)}",
             f"artifacts:{len(artifacts)}",
         ]
@@ -54,7 +72,7 @@ class WorkspaceAssistantService:
         member_lines: list[str] = []
         for member in members:
             user_id = str(member.get("user_id"))
-            user = STORE.users.get(user_id)
+            user = REPOSITORIES.users.get(user_id)
             profile = profiles.get(user_id, {})
             member_lines.append(
                 f"- {profile.get('nickname') or (user or {}).get('username') or user_id} ({member.get('role')})"
@@ -96,7 +114,7 @@ class WorkspaceAssistantService:
             "created_at": STORE.now_iso(),
             "metadata": metadata or {},
         }
-        STORE.workspace_assistant_messages[workspace_id].append(item)
+        REPOSITORIES.entries.append("workspace_assistant_messages", workspace_id, item)
         return item
 
     async def chat(
@@ -130,8 +148,8 @@ class WorkspaceAssistantService:
                 conversation_history.append({"role": role, "content": content})
 
         task_context = ""
-        if task_id and task_id in STORE.tasks:
-            task = STORE.tasks[task_id]
+        task = REPOSITORIES.tasks.get(task_id) if task_id else None
+        if task is not None:
             task_context = (
                 "\nFocused task:\n"
                 f"- title: {task.get('title')}\n"
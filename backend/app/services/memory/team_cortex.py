@@ -2,8 +2,11 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+from app.core.archive import ARCHIVES
+from app.core.records import EvidenceEntry
 from app.core.store import STORE
 from app.domain.schemas import EvidenceRef
+from app.repositories import REPOSITORIES
 
 
 @dataclass(slots=True)
@@ -19,18 +22,20 @@ class TeamCortexService:
         confidence: float,
     ) -> EvidenceRef:
         record_id = STORE.new_id()
-        STORE.evidence_entries.append(
-            {
-                "id": record_id,
-                "workspace_id": workspace_id,
-                "task_id": task_id,
-                "run_id": run_id,
-                "claim": claim,
-                "source_type": source_type,
-                "source_ref": source_ref,
-                "confidence": confidence,
-                "created_at": STORE.now_iso(),
-            }
+        REPOSITORIES.entries.append(
+            "evidence_entries",
+            workspace_id,
+            EvidenceEntry(
+                id=record_id,
+                workspace_id=workspace_id,
+                task_id=task_id,
+                run_id=run_id,
+                claim=claim,
+                source_type=source_type,
+                source_ref=source_ref,
+                confidence=confidence,
+                created_at=STORE.now(),
+            ),
         )
         return EvidenceRef(
             id=record_id,
@@ -39,8 +44,11 @@ class TeamCortexService:
             confidence=confidence,
         )
 
-    def by_task(self, task_id: str) -> list[dict[str, object]]:
-        return [entry for entry in STORE.evidence_entries if entry.get("task_id") == task_id]
+    def by_task(self, workspace_id: str, task_id: str) -> list[EvidenceEntry]:
+        live = [
+            entry for entry in REPOSITORIES.entries.rows("evidence_entries", workspace_id) if entry.task_id == task_id
+        ]
+        return ARCHIVES.with_archived("evidence_entries", task_id, live)
 
 
 TEAM_CORTEX = TeamCortexService()
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+from app.core.records import AuditRecord
 from app.core.store import STORE
 from app.domain.schemas import ApprovalStatus
+from app.repositories import REPOSITORIES
 
 EXTERNAL_WRITE_ACTIONS = {
     "github.create_pr",
@@ -25,18 +27,18 @@ def create_audit(
     entity_id: str,
     payload: dict[str, object] | None = None,
 ) -> None:
-    STORE.audit_logs.append(
-        {
-            "id": STORE.new_id(),
-            "workspace_id": workspace_id,
-            "actor_type": actor_type,
-            "actor_id": actor_id,
-            "action": action,
-            "entity_type": entity_type,
-            "entity_id": entity_id,
-            "payload": payload or {},
-            "created_at": STORE.now_iso(),
-        }
+    REPOSITORIES.audit_logs.append(
+        AuditRecord(
+            id=STORE.new_id(),
+            workspace_id=workspace_id,
+            actor_type=actor_type,
+            actor_id=actor_id,
+            action=action,
+            entity_type=entity_type,
+            entity_id=entity_id,
+            payload=payload or {},
+            created_at=STORE.now(),
+        )
     )
 
 
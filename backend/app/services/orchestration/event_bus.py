@@ -1,11 +1,22 @@
 from __future__ import annotations
 
 import asyncio
-from collections import defaultdict
-from dataclasses import dataclass
+import json
+import threading
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
-from typing import Any
-from uuid import uuid4
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Protocol
+
+from app.core.config import Settings, get_settings
+from app.core.ids import uuid7
+from app.core.metrics import METRICS, MetricsRegistry
+
+if TYPE_CHECKING:
+    from app.core.shared_state import RedisFanout
+    from app.core.store import InMemoryStore
 
 
 @dataclass(slots=True)
@@ -15,34 +26,519 @@ class Event:
     workspace_id: str
     payload: dict[str, Any]
     created_at: datetime
+    # Position in this process's log of the workspace; assigned when the event is appended.
+    offset: int = -1
+    # ``as_message()`` as JSON, encoded once and shared by every subscriber and frame.
+    encoded: str | None = field(default=None, repr=False, compare=False)
+
+    def to_json(self) -> str:
+        if self.encoded is None:
+            self.encoded = json.dumps(self.as_message(), default=str, separators=(",", ":"))
+        return self.encoded
+
+    def as_message(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "workspace_id": self.workspace_id,
+            "payload": self.payload,
+            "created_at": self.created_at.isoformat(),
+        }
+
+    @classmethod
+    def from_message(cls, data: dict[str, Any]) -> Event:
+        return cls(
+            id=str(data["id"]),
+            type=str(data["type"]),
+            workspace_id=str(data["workspace_id"]),
+            payload=dict(data.get("payload") or {}),
+            created_at=datetime.fromisoformat(str(data["created_at"])),
+        )
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def matches_type(event_type: str, patterns: tuple[str, ...]) -> bool:
+    """No patterns match everything; ``"task.*"`` matches types starting with ``"task."``."""
+    if not patterns:
+        return True
+    return any(
+        event_type.startswith(pattern[:-1]) if pattern.endswith("*") else event_type == pattern
+        for pattern in patterns
+    )
+
+
+@dataclass(slots=True, frozen=True)
+class EventFilter:
+    """What a subscriber wants: event type patterns and entity ids its payloads must carry."""
+
+    types: tuple[str, ...] = ()
+    ids: tuple[tuple[str, str], ...] = ()
+
+    @classmethod
+    def parse(cls, types: str | None, ids: dict[str, str]) -> EventFilter | None:
+        """From ``types=task.*,approval.*`` and ``*_id`` values, e.g. ``{"project_id": "p1"}``."""
+        patterns = tuple(item.strip() for item in (types or "").split(",") if item.strip())
+        wanted = tuple(sorted((key, value) for key, value in ids.items() if key.endswith("_id")))
+        if not patterns and not wanted:
+            return None
+        return cls(patterns, wanted)
+
+    def matches(self, event: Event) -> bool:
+        if not matches_type(event.type, self.types):
+            return False
+        payload = event.payload
+        return all(key in payload and str(payload[key]) == value for key, value in self.ids)
+
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+
+class SubscriptionClosed(Exception):
+    pass
+
+
+class SlowConsumer(SubscriptionClosed):
+    """The subscriber fell ``queue_size`` events behind under the ``disconnect`` policy."""
+
+
+def _coalesce_key(event: Event) -> tuple[Any, ...]:
+    # Events about the same entities supersede each other: clients refetch by id on receipt.
+    ids = tuple((key, str(value)) for key, value in sorted(event.payload.items()) if key.endswith("_id"))
+    return (event.type, ids)
+
+
+def coalesce_events(events: list[Event]) -> list[Event]:
+    """Keep only the newest event per ``_coalesce_key``, in the order those newest events arrived."""
+    latest = {_coalesce_key(event): index for index, event in enumerate(events)}
+    if len(latest) == len(events):
+        return events
+    return [event for index, event in enumerate(events) if latest[_coalesce_key(event)] == index]
+
+
+class Subscription:
+    """Bounded queue of one subscriber. ``offer`` and ``get`` run on the subscriber's event loop."""
+
+    def __init__(
+        self,
+        workspace_id: str,
+        *,
+        max_size: int,
+        policy: str,
+        loop: asyncio.AbstractEventLoop | None,
+        metrics: MetricsRegistry,
+        event_filter: EventFilter | None = None,
+    ) -> None:
+        self.workspace_id = workspace_id
+        self.loop = loop
+        self.filter = event_filter
+        self._max_size = max(max_size, 1)
+        self._policy = policy
+        self._metrics = metrics
+        self._metric = f"events.{workspace_id}"
+        self._pending: deque[Event] = deque()
+        self._ready = asyncio.Event()
+        self._closed: type[SubscriptionClosed] | None = None
+        # Set by ``subscribe`` when a resume point could not be replayed.
+        self.resync_required = False
+
+    def qsize(self) -> int:
+        return len(self._pending)
+
+    def offer(self, event: Event) -> None:
+        if self._closed is not None:
+            return
+        if len(self._pending) >= self._max_size and not self._make_room(event):
+            return
+        self._pending.append(event)
+        self._metrics.add_gauge(f"{self._metric}.queue_depth", 1)
+        self._ready.set()
+
+    def _make_room(self, event: Event) -> bool:
+        """Apply the slow-consumer policy to a full queue; ``False`` means ``event`` is not queued."""
+        if self._policy == "disconnect":
+            self._metrics.inc(f"{self._metric}.slow_disconnects")
+            self.close(SlowConsumer)
+            return False
+        if self._policy == "coalesce":
+            key = _coalesce_key(event)
+            for index, queued in enumerate(self._pending):
+                if _coalesce_key(queued) == key:
+                    del self._pending[index]
+                    self._metrics.add_gauge(f"{self._metric}.queue_depth", -1)
+                    self._metrics.inc(f"{self._metric}.coalesced")
+                    return True
+        self._pending.popleft()
+        self._metrics.add_gauge(f"{self._metric}.queue_depth", -1)
+        self._metrics.inc(f"{self._metric}.dropped")
+        return True
+
+    def get_nowait(self) -> Event:
+        if not self._pending:
+            if self._closed is not None:
+                raise self._closed()
+            raise asyncio.QueueEmpty
+        self._metrics.add_gauge(f"{self._metric}.queue_depth", -1)
+        return self._pending.popleft()
+
+    async def get(self) -> Event:
+        while not self._pending:
+            if self._closed is not None:
+                raise self._closed()
+            self._ready.clear()
+            await self._ready.wait()
+        return self.get_nowait()
+
+    async def get_batch(self, max_events: int, window: float = 0.0) -> list[Event]:
+        """Wait for an event, then gather more for up to ``window`` seconds, at most ``max_events``."""
+        batch = [await self.get()]
+        if window > 0:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + window
+            while len(self._pending) < max_events - 1 and self._closed is None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._ready.clear()
+                try:
+                    await asyncio.wait_for(self._ready.wait(), remaining)
+                except TimeoutError:
+                    break
+        while self._pending and len(batch) < max_events:
+            batch.append(self.get_nowait())
+        return batch
+
+    def close(self, reason: type[SubscriptionClosed] = SubscriptionClosed) -> None:
+        """Wake the consumer with ``reason``; queued events are discarded."""
+        if self._closed is not None:
+            return
+        self._closed = reason
+        self._metrics.add_gauge(f"{self._metric}.queue_depth", -len(self._pending))
+        self._pending.clear()
+        self._ready.set()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed is not None
+
+
+class WorkspaceEventLog:
+    """The last ``window`` events of one workspace, addressed by offset and findable by event id.
+
+    Offsets count every event this process has seen for the workspace, its own and those relayed
+    from other workers, so they are per process; clients resume by event id instead.
+    """
+
+    def __init__(self, window: int) -> None:
+        self.lock = threading.Lock()
+        self._window = max(window, 0)
+        self._events: deque[Event] = deque()
+        self._offsets: dict[str, int] = {}
+        self.next_offset = 0
+
+    def append(self, event: Event) -> None:
+        event.offset = self.next_offset
+        self.next_offset += 1
+        if not self._window:
+            return
+        self._events.append(event)
+        self._offsets[event.id] = event.offset
+        if len(self._events) > self._window:
+            del self._offsets[self._events.popleft().id]
+
+    def after(self, event_id: str) -> list[Event] | None:
+        """Events published after ``event_id``, or ``None`` when it is no longer (or never was) in the window."""
+        offset = self._offsets.get(event_id)
+        if offset is None:
+            return None
+        first = self.next_offset - len(self._events)
+        return list(islice(self._events, offset + 1 - first, None))
+
+    @property
+    def last_event_id(self) -> str | None:
+        return self._events[-1].id if self._events else None
+
+
+class OutboxReader(Protocol):
+    # Outbox position up to which the reader has acknowledged events.
+    position: int
 
 
 class InMemoryEventBus:
-    def __init__(self) -> None:
-        self._queues: dict[str, list[asyncio.Queue[Event]]] = defaultdict(list)
+    # Whether events published here reach subscribers on other workers without pub/sub fan-out.
+    distributed = False
+
+    def __init__(
+        self,
+        *,
+        queue_size: int | None = None,
+        slow_consumer_policy: str | None = None,
+        replay_window: int | None = None,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        settings = get_settings()
+        self.queue_size = queue_size if queue_size is not None else settings.event_queue_size
+        self.replay_window = replay_window if replay_window is not None else settings.event_replay_window
+        self.slow_consumer_policy = slow_consumer_policy or settings.event_slow_consumer_policy
+        if self.slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unsupported slow consumer policy: {self.slow_consumer_policy}")
+        self._metrics = metrics
+        # Replaced, never mutated, under ``_lock``: ``publish`` iterates it from the threadpool.
+        self._subscriptions: dict[str, tuple[Subscription, ...]] = {}
+        self._logs: dict[str, WorkspaceEventLog] = {}
+        self._lock = threading.Lock()
         self._outbox: list[Event] = []
+        # Number of events trimmed from the head of the outbox by retention.
+        self._outbox_offset = 0
+        # Consumers reading the outbox; retention never trims past the slowest one's acked position.
+        self._outbox_readers: list[OutboxReader] = []
+        # Set by ``persist_outbox``; serializes outbox appends so journal order is outbox order.
+        self._outbox_store: InMemoryStore | None = None
+        self._outbox_lock = threading.Lock()
+        self._fanout: RedisFanout | None = None
+        self._publish_listeners: list[Callable[[Event], None]] = []
+        self._event_listeners: list[Callable[[Event], None]] = []
+
+    def start(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def on_publish(self, listener: Callable[[Event], None]) -> None:
+        """Call ``listener(event)`` on the publishing thread after each event enters the outbox."""
+        self._publish_listeners.append(listener)
+
+    def off_publish(self, listener: Callable[[Event], None]) -> None:
+        with self._lock:
+            # Replaced rather than mutated: ``publish`` iterates it without the lock.
+            self._publish_listeners = [item for item in self._publish_listeners if item != listener]
+
+    def on_event(self, listener: Callable[[Event], None]) -> None:
+        """Call ``listener(event)`` for every event this process sees, its own and other workers'."""
+        self._event_listeners.append(listener)
+
+    def attach_fanout(self, fanout: RedisFanout) -> None:
+        """Also deliver events to subscribers connected to other workers (see ``app.core.shared_state``)."""
+        self._fanout = fanout
+        fanout.on("events", self._receive_remote)
+
+    def _log(self, workspace_id: str) -> WorkspaceEventLog:
+        log = self._logs.get(workspace_id)
+        if log is None:
+            with self._lock:
+                log = self._logs.setdefault(workspace_id, WorkspaceEventLog(self.replay_window))
+        return log
 
     def publish(self, event_type: str, workspace_id: str, payload: dict[str, Any]) -> Event:
         event = Event(
-            id=str(uuid4()),
+            id=uuid7(),
             type=event_type,
             workspace_id=workspace_id,
             payload=payload,
             created_at=datetime.now(UTC),
         )
-        self._outbox.append(event)
-        for queue in self._queues[workspace_id]:
-            queue.put_nowait(event)
+        if self._outbox_store is not None:
+            with self._outbox_lock:
+                self._outbox_store.append_row("event_outbox", event)
+        else:
+            self._outbox.append(event)
+        self._append(event)
+        if self._fanout is not None:
+            self._fanout.publish("events", workspace_id, event.as_message())
+        for listener in self._publish_listeners:
+            listener(event)
         return event
 
-    def subscribe(self, workspace_id: str) -> asyncio.Queue[Event]:
-        queue: asyncio.Queue[Event] = asyncio.Queue()
-        self._queues[workspace_id].append(queue)
-        return queue
+    def _receive_remote(self, workspace_id: str, data: dict[str, Any]) -> None:
+        # Remote events reach the local log and subscribers only; the originating worker owns the outbox entry.
+        self._append(Event.from_message(data))
+
+    def _append(self, event: Event) -> None:
+        # Log order is delivery order: subscribers and replays never see events out of sequence.
+        log = self._log(event.workspace_id)
+        with log.lock:
+            log.append(event)
+            self._deliver(event)
+        for listener in self._event_listeners:
+            listener(event)
+
+    def _deliver(self, event: Event) -> None:
+        current = _running_loop()
+        for subscription in self._subscriptions.get(event.workspace_id, ()):
+            if subscription.filter is not None and not subscription.filter.matches(event):
+                continue
+            loop = subscription.loop
+            if loop is None or loop is current:
+                subscription.offer(event)
+                continue
+            try:
+                # Subscription queues belong to their loop; threadpool publishers hand events over.
+                loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down.
+                continue
+
+    def subscribe(
+        self,
+        workspace_id: str,
+        *,
+        last_event_id: str | None = None,
+        event_filter: EventFilter | None = None,
+    ) -> Subscription:
+        """Subscribe to new events; with ``last_event_id``, first replay those published after it.
+
+        If that event has left the replay window, or more events followed it than a subscriber
+        queue holds, nothing is replayed and ``subscription.resync_required`` is set instead.
+        With ``event_filter`` only matching events are delivered or replayed.
+        """
+        subscription = Subscription(
+            workspace_id,
+            max_size=self.queue_size,
+            policy=self.slow_consumer_policy,
+            loop=_running_loop(),
+            metrics=self._metrics,
+            event_filter=event_filter,
+        )
+        log = self._log(workspace_id)
+        # Holding the log lock makes replay and registration atomic with respect to publishers.
+        with log.lock:
+            if last_event_id is not None:
+                missed = log.after(last_event_id)
+                if missed is not None and event_filter is not None:
+                    missed = [event for event in missed if event_filter.matches(event)]
+                if missed is None or len(missed) > self.queue_size:
+                    subscription.resync_required = True
+                    self._metrics.inc(f"events.{workspace_id}.resyncs")
+                else:
+                    for event in missed:
+                        subscription.offer(event)
+                    self._metrics.inc(f"events.{workspace_id}.replayed", len(missed))
+            with self._lock:
+                self._subscriptions[workspace_id] = (*self._subscriptions.get(workspace_id, ()), subscription)
+                count = len(self._subscriptions[workspace_id])
+        self._metrics.set_gauge(f"events.{workspace_id}.subscribers", count)
+        return subscription
+
+    def last_event_id(self, workspace_id: str) -> str | None:
+        log = self._logs.get(workspace_id)
+        return log.last_event_id if log is not None else None
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        workspace_id = subscription.workspace_id
+        with self._lock:
+            remaining = tuple(item for item in self._subscriptions.get(workspace_id, ()) if item is not subscription)
+            if remaining:
+                self._subscriptions[workspace_id] = remaining
+            else:
+                self._subscriptions.pop(workspace_id, None)
+        self._metrics.set_gauge(f"events.{workspace_id}.subscribers", len(remaining))
+
+    def subscriber_count(self, workspace_id: str) -> int:
+        return len(self._subscriptions.get(workspace_id, ()))
 
     @property
     def outbox(self) -> list[Event]:
         return self._outbox
 
+    def add_outbox_reader(self, reader: OutboxReader) -> None:
+        with self._lock:
+            self._outbox_readers = [*self._outbox_readers, reader]
+
+    def remove_outbox_reader(self, reader: OutboxReader) -> None:
+        with self._lock:
+            self._outbox_readers = [item for item in self._outbox_readers if item is not reader]
+
+    def trimmable_outbox(self) -> int:
+        """How many events at the head of the outbox every registered reader has acknowledged."""
+        with self._lock:
+            return self._trimmable_locked()
+
+    def _trimmable_locked(self) -> int:
+        if not self._outbox_readers:
+            return len(self._outbox)
+        slowest = min(reader.position for reader in self._outbox_readers)
+        return min(max(slowest - self._outbox_offset, 0), len(self._outbox))
+
+    def trim_outbox(self, count: int) -> None:
+        with self._lock:
+            count = min(count, self._trimmable_locked())
+            if self._outbox_store is not None:
+                # After any append still being journaled, so replay never re-adds an evicted event.
+                with self._outbox_lock:
+                    self._outbox_store.evict_rows("event_outbox", count)
+            else:
+                del self._outbox[:count]
+            self._outbox_offset += count
+
+    def persist_outbox(self, store: InMemoryStore) -> None:
+        """Keep the outbox and consumer checkpoints in ``store``, whose journal makes them survive a restart.
+
+        Call before anything is published; the store's recovery then restores the outbox in place.
+        """
+        with self._lock:
+            self._outbox = store.event_outbox
+            self._outbox_store = store
+
+    @property
+    def outbox_persisted(self) -> bool:
+        return self._outbox_store is not None
+
+    def outbox_checkpoint(self, name: str) -> int:
+        """Outbox position just past the last event ``name`` acknowledged before a restart, else 0."""
+        if self._outbox_store is None:
+            return 0
+        event_id = self._outbox_store.consumer_positions.get(name)
+        if event_id is None:
+            return 0
+        with self._lock:
+            for index in range(len(self._outbox) - 1, -1, -1):
+                if self._outbox[index].id == event_id:
+                    return self._outbox_offset + index + 1
+        # Trimmed while the consumer was not running: resume from the oldest retained event.
+        return 0
+
+    def save_outbox_checkpoint(self, name: str, position: int) -> None:
+        """Record that ``name`` has acknowledged every outbox event before ``position``."""
+        store = self._outbox_store
+        if store is None:
+            return
+        with self._lock:
+            index = position - self._outbox_offset - 1
+            if not 0 <= index < len(self._outbox):
+                return
+            event_id = self._outbox[index].id
+        with store.workspace_lock(f"consumer:{name}"):
+            store.consumer_positions[name] = event_id
+            store.journal_entry("consumer_positions", name)
+
+    def events_since(self, position: int) -> tuple[list[Event], int]:
+        """Events at outbox positions ``>= position`` still in memory, and the next position."""
+        with self._lock:
+            start = max(position - self._outbox_offset, 0)
+            events = self._outbox[start:]
+            return events, self._outbox_offset + start + len(events)
+
+
+def build_event_bus(settings: Settings) -> InMemoryEventBus:
+    backend = settings.event_bus_backend.strip().lower()
+    if backend == "memory":
+        return InMemoryEventBus()
+    if backend != "redis_streams":
+        raise ValueError(f"Unsupported event bus backend: {backend}")
+    from app.services.orchestration.redis_streams import RedisStreamsEventBus
+
+    return RedisStreamsEventBus(
+        settings.redis_url,
+        prefix=settings.redis_key_prefix,
+        max_len=settings.event_stream_max_len,
+    )
+
 
-EVENT_BUS = InMemoryEventBus()
+EVENT_BUS = build_event_bus(get_settings())
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
 from typing import Any
 
+from app.core.records import AgentRunRecord, TimelineStage
 from app.core.store import STORE
 from app.domain.schemas import AgentRunCreateIn, RunStatus
+from app.repositories import REPOSITORIES
 from app.services.agents.runtime import AGENT_RUNTIME
 from app.services.orchestration.event_bus import EVENT_BUS
 
@@ -23,21 +26,21 @@ class OrchestratorService:
         summary: str,
         status: str = "completed",
         metadata: dict[str, Any] | None = None,
-    ) -> dict[str, object]:
-        entry = {
-            "id": STORE.new_id(),
-            "run_id": run_id,
-            "task_id": task_id,
-            "workspace_id": workspace_id,
-            "stage": stage,
-            "agent_role": role_key,
-            "title": title,
-            "summary": summary,
-            "status": status,
-            "metadata": metadata or {},
-            "created_at": STORE.now_iso(),
-        }
-        STORE.agent_run_timelines[run_id].append(entry)
+    ) -> TimelineStage:
+        entry = TimelineStage(
+            id=STORE.new_id(),
+            run_id=run_id,
+            task_id=task_id,
+            workspace_id=workspace_id,
+            stage=stage,
+            agent_role=role_key,
+            title=title,
+            summary=summary,
+            status=status,
+            metadata=metadata or {},
+            created_at=STORE.now(),
+        )
+        REPOSITORIES.entries.append("agent_run_timelines", run_id, entry)
         EVENT_BUS.publish(
             "agent.run.stage",
             workspace_id,
@@ -50,21 +53,30 @@ class OrchestratorService:
         )
         return entry
 
-    async def execute(self, request: AgentRunCreateIn) -> dict[str, object]:
+    def _evidence_count(self, workspace_id: str, task_id: str | None) -> int:
+        return sum(
+            1
+            for item in REPOSITORIES.entries.rows("evidence_entries", workspace_id)
+            if task_id is None or item.task_id == task_id
+        )
+
+    async def execute(self, request: AgentRunCreateIn) -> AgentRunRecord:
         run_id = STORE.new_id()
-        record = {
-            "id": run_id,
-            "workspace_id": request.workspace_id,
-            "task_id": request.task_id,
-            "role_key": request.role_key,
-            "status": RunStatus.running.value,
-            "created_at": STORE.now_iso(),
-            "updated_at": STORE.now_iso(),
-            "output": None,
-        }
-        STORE.agent_runs[run_id] = record
-        EVENT_BUS.publish("agent.run.started", request.workspace_id, {"run_id": run_id})
-        self._append_timeline_stage(
+        now = STORE.now()
+        record = AgentRunRecord(
+            id=run_id,
+            workspace_id=request.workspace_id,
+            task_id=request.task_id,
+            role_key=request.role_key,
+            status=RunStatus.running.value,
+            created_at=now,
+            updated_at=now,
+        )
+        # Repository and journal writes block (a Postgres round trip, an fsync); keep them off the loop.
+        await asyncio.to_thread(REPOSITORIES.agent_runs.add, record)
+        EVENT_BUS.publish("agent.run.started", request.workspace_id, {"run_id": run_id, "status": record.status})
+        await asyncio.to_thread(
+            self._append_timeline_stage,
             run_id=run_id,
             workspace_id=request.workspace_id,
             task_id=request.task_id,
@@ -73,7 +85,8 @@ class OrchestratorService:
             title="Routing",
             summary="Classified request and selected execution path.",
         )
-        self._append_timeline_stage(
+        await asyncio.to_thread(
+            self._append_timeline_stage,
             run_id=run_id,
             workspace_id=request.workspace_id,
             task_id=request.task_id,
@@ -83,15 +96,9 @@ class OrchestratorService:
             summary="Built staged execution plan with risk checks.",
         )
 
-        evidence_count = len(
-            [
-                item
-                for item in STORE.evidence_entries
-                if str(item.get("workspace_id")) == request.workspace_id
-                and (request.task_id is None or str(item.get("task_id")) == request.task_id)
-            ]
-        )
-        self._append_timeline_stage(
+        evidence_count = await asyncio.to_thread(self._evidence_count, request.workspace_id, request.task_id)
+        await asyncio.to_thread(
+            self._append_timeline_stage,
             run_id=run_id,
             workspace_id=request.workspace_id,
             task_id=request.task_id,
@@ -102,7 +109,8 @@ class OrchestratorService:
             metadata={"evidence_count": evidence_count},
         )
 
-        self._append_timeline_stage(
+        await asyncio.to_thread(
+            self._append_timeline_stage,
             run_id=run_id,
             workspace_id=request.workspace_id,
             task_id=request.task_id,
@@ -118,7 +126,8 @@ class OrchestratorService:
             workspace_id=request.workspace_id,
             task_id=request.task_id,
         )
-        self._append_timeline_stage(
+        await asyncio.to_thread(
+            self._append_timeline_stage,
             run_id=run_id,
             workspace_id=request.workspace_id,
             task_id=request.task_id,
@@ -133,7 +142,8 @@ class OrchestratorService:
         )
 
         status = RunStatus.completed.value if output.confidence_score >= 0.7 else RunStatus.failed.value
-        self._append_timeline_stage(
+        await asyncio.to_thread(
+            self._append_timeline_stage,
             run_id=run_id,
             workspace_id=request.workspace_id,
             task_id=request.task_id,
@@ -143,7 +153,8 @@ class OrchestratorService:
             summary="Checked unsupported claims and contradictions.",
             metadata={"review_flags": output.review_flags},
         )
-        self._append_timeline_stage(
+        await asyncio.to_thread(
+            self._append_timeline_stage,
             run_id=run_id,
             workspace_id=request.workspace_id,
             task_id=request.task_id,
@@ -154,7 +165,8 @@ class OrchestratorService:
             metadata={"confidence_score": output.confidence_score},
             status="completed" if status == RunStatus.completed.value else "abstained",
         )
-        self._append_timeline_stage(
+        await asyncio.to_thread(
+            self._append_timeline_stage,
             run_id=run_id,
             workspace_id=request.workspace_id,
             task_id=request.task_id,
@@ -164,10 +176,12 @@ class OrchestratorService:
             summary="No external write action requested; no human gate required.",
         )
 
-        record["output"] = output.model_dump(mode="json")
-        record["status"] = status
-        record["updated_at"] = STORE.now_iso()
-        self._append_timeline_stage(
+        record.output = output.model_dump(mode="json")
+        record.status = status
+        record.updated_at = STORE.now()
+        await asyncio.to_thread(REPOSITORIES.agent_runs.save, record)
+        await asyncio.to_thread(
+            self._append_timeline_stage,
             run_id=run_id,
             workspace_id=request.workspace_id,
             task_id=request.task_id,
@@ -190,6 +204,7 @@ class OrchestratorService:
             {
                 "run_id": run_id,
                 "status": status,
+                "previous_status": RunStatus.running.value,
                 "confidence": output.confidence_score,
                 "open_questions": output.open_questions,
             },
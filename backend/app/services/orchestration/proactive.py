@@ -3,7 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
 
-from app.core.store import STORE
+from app.core.records import as_datetime
+from app.repositories import REPOSITORIES
 
 
 @dataclass(slots=True)
@@ -18,12 +19,8 @@ class ProactiveEngine:
     def detect_stalled_tasks(self, workspace_id: str, threshold_days: int = 3) -> list[ProactiveSignal]:
         now = datetime.now(UTC)
         signals: list[ProactiveSignal] = []
-        for task in STORE.tasks.values():
-            if task["workspace_id"] != workspace_id:
-                continue
-            if task["status"] != "in_progress":
-                continue
-            updated_at = datetime.fromisoformat(task["updated_at"])
+        for task in REPOSITORIES.tasks.list_by_workspace(workspace_id, status="in_progress"):
+            updated_at = as_datetime(task["updated_at"])
             if updated_at < (now - timedelta(days=threshold_days)):
                 signals.append(
                     ProactiveSignal(
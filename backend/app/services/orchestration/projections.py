@@ -0,0 +1,221 @@
+"""Workspace dashboard counts, kept current from the event stream.
+
+Task, approval, action-required and agent-run events carry the entity's id and new ``status``. Each
+workspace keeps every entity's last known status and derives its counts from those, so applying an
+event moves at most one count, and applying it twice, or for a write a scan already saw, changes
+nothing. Reading a workspace's summary costs the same however many records it holds.
+
+A workspace is seeded with one scan the first time its counts are read. Events that arrive while
+the scan runs are held back and applied on top of it, which is safe whichever side of the scan
+their write fell on.
+
+Counts are per process. They follow every event this process sees: its own and, with
+``SHARED_STATE_BACKEND=redis``, other workers'. With the Redis Streams bus a worker only sees other
+workers' events for workspaces it has subscribers for, so summaries for other workspaces can lag
+until the process restarts.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+
+from app.repositories import REPOSITORIES
+from app.services.orchestration.event_bus import Event, InMemoryEventBus
+
+# Event type -> (family, payload key of the entity id).
+_ENTITY_EVENTS = {
+    "task.created": ("tasks", "task_id"),
+    "task.updated": ("tasks", "task_id"),
+    "approval.requested": ("approvals", "approval_id"),
+    "approval.approved": ("approvals", "approval_id"),
+    "approval.rejected": ("approvals", "approval_id"),
+    "workspace.action_required.created": ("actions", "action_id"),
+    "workspace.action_required.updated": ("actions", "action_id"),
+    "agent.run.started": ("runs", "run_id"),
+    "agent.run.completed": ("runs", "run_id"),
+    "agent.run.escalated": ("runs", "run_id"),
+}
+_STATUS_REMOVED = "workspace.task_status.removed"
+_CLOSED_ACTION = "done"
+
+
+def _move(counts: Counter[str], previous: str | None, current: str | None) -> None:
+    if previous is not None:
+        counts[previous] -= 1
+        if counts[previous] <= 0:
+            del counts[previous]
+    if current is not None:
+        counts[current] += 1
+
+
+@dataclass(slots=True)
+class WorkspaceCounts:
+    tasks: Counter[str] = field(default_factory=Counter)
+    approvals: Counter[str] = field(default_factory=Counter)
+    actions: Counter[str] = field(default_factory=Counter)
+    # Actions not yet done, by target user id ("" for actions addressed to nobody in particular).
+    open_actions_by_user: Counter[str] = field(default_factory=Counter)
+    runs: Counter[str] = field(default_factory=Counter)
+    last_event_id: str | None = None
+    updated_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+
+@dataclass(slots=True)
+class _Statuses:
+    """Last known status per entity id and the counts derived from it."""
+
+    by_id: dict[str, str] = field(default_factory=dict)
+    counts: Counter[str] = field(default_factory=Counter)
+
+    def set(self, entity_id: str, status: str) -> str | None:
+        """Record ``status`` for ``entity_id``; returns the status it replaced."""
+        previous = self.by_id.get(entity_id)
+        if previous != status:
+            self.by_id[entity_id] = status
+            _move(self.counts, previous, status)
+        return previous
+
+    def rename(self, old: str, new: str) -> None:
+        for entity_id, status in self.by_id.items():
+            if status == old:
+                self.by_id[entity_id] = new
+        moved = self.counts.pop(old, 0)
+        if moved:
+            self.counts[new] += moved
+
+
+@dataclass(slots=True)
+class _WorkspaceState:
+    tasks: _Statuses = field(default_factory=_Statuses)
+    approvals: _Statuses = field(default_factory=_Statuses)
+    actions: _Statuses = field(default_factory=_Statuses)
+    runs: _Statuses = field(default_factory=_Statuses)
+    action_targets: dict[str, str] = field(default_factory=dict)
+    open_actions_by_user: Counter[str] = field(default_factory=Counter)
+    last_event_id: str | None = None
+    updated_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+    def set_action(self, action_id: str, status: str, target_user_id: str) -> None:
+        previous = self.actions.set(action_id, status)
+        user = self.action_targets.setdefault(action_id, target_user_id)
+        was_open = previous is not None and previous != _CLOSED_ACTION
+        is_open = status != _CLOSED_ACTION
+        if was_open != is_open:
+            _move(self.open_actions_by_user, None if is_open else user, user if is_open else None)
+
+    def apply(self, event: Event) -> None:
+        payload = event.payload
+        if event.type == _STATUS_REMOVED:
+            self.tasks.rename(str(payload["key"]), str(payload["reassigned_to"]))
+        else:
+            family, id_key = _ENTITY_EVENTS[event.type]
+            entity_id, current = payload.get(id_key), payload.get("status")
+            if entity_id is None or current is None:
+                return
+            if family == "actions":
+                self.set_action(str(entity_id), str(current), str(payload.get("target_user_id") or ""))
+            else:
+                getattr(self, family).set(str(entity_id), str(current))
+        self.last_event_id = event.id
+        self.updated_at = event.created_at
+
+    def counts(self) -> WorkspaceCounts:
+        return WorkspaceCounts(
+            tasks=Counter(self.tasks.counts),
+            approvals=Counter(self.approvals.counts),
+            actions=Counter(self.actions.counts),
+            open_actions_by_user=Counter(self.open_actions_by_user),
+            runs=Counter(self.runs.counts),
+            last_event_id=self.last_event_id,
+            updated_at=self.updated_at,
+        )
+
+
+@dataclass(slots=True)
+class _Seeding:
+    seeders: int = 0
+    # Events that arrived for the workspace while it was being scanned, in arrival order.
+    events: list[Event] = field(default_factory=list)
+
+
+class WorkspaceProjections:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._workspaces: dict[str, _WorkspaceState] = {}
+        self._seeding: dict[str, _Seeding] = {}
+
+    def attach(self, bus: InMemoryEventBus) -> None:
+        bus.on_event(self.apply)
+
+    def apply(self, event: Event) -> None:
+        if event.type not in _ENTITY_EVENTS and event.type != _STATUS_REMOVED:
+            return
+        with self._lock:
+            state = self._workspaces.get(event.workspace_id)
+            if state is not None:
+                state.apply(event)
+                return
+            seeding = self._seeding.get(event.workspace_id)
+            if seeding is not None:
+                seeding.events.append(event)
+
+    def counts(self, workspace_id: str) -> WorkspaceCounts:
+        """A copy of the workspace's counts, seeding them with a scan on first use."""
+        with self._lock:
+            state = self._workspaces.get(workspace_id)
+            if state is not None:
+                return state.counts()
+            seeding = self._seeding.setdefault(workspace_id, _Seeding())
+            seeding.seeders += 1
+            # Concurrent seeders share the buffer; the first to finish installs its scan.
+            start = len(seeding.events)
+        # Scanned without the lock so publishers in other workspaces never wait on it.
+        try:
+            seeded = self._seed(workspace_id)
+        except BaseException:
+            with self._lock:
+                self._end_seeding(workspace_id, seeding)
+            raise
+        with self._lock:
+            self._end_seeding(workspace_id, seeding)
+            state = self._workspaces.get(workspace_id)
+            if state is None:
+                # An event's write is either in the scan, where re-applying its status is a no-op,
+                # or after it, where applying it is the update the scan missed.
+                for event in seeding.events[start:]:
+                    seeded.apply(event)
+                state = self._workspaces[workspace_id] = seeded
+            return state.counts()
+
+    def _end_seeding(self, workspace_id: str, seeding: _Seeding) -> None:
+        seeding.seeders -= 1
+        if not seeding.seeders:
+            self._seeding.pop(workspace_id, None)
+
+    def forget(self, workspace_id: str | None = None) -> None:
+        with self._lock:
+            if workspace_id is None:
+                self._workspaces.clear()
+            else:
+                self._workspaces.pop(workspace_id, None)
+
+    @staticmethod
+    def _seed(workspace_id: str) -> _WorkspaceState:
+        state = _WorkspaceState()
+        for task in REPOSITORIES.tasks.list_by_workspace(workspace_id):
+            state.tasks.set(str(task["id"]), str(task["status"]))
+        for approval in REPOSITORIES.approvals.iter_workspace(workspace_id):
+            state.approvals.set(str(approval["id"]), str(approval["status"]))
+        for run in REPOSITORIES.agent_runs.list_by_workspace(workspace_id):
+            state.runs.set(str(run["id"]), str(run["status"]))
+        actions: list[dict[str, Any]] = REPOSITORIES.entries.get("workspace_actions_required", workspace_id) or []
+        for action in actions:
+            state.set_action(str(action["id"]), str(action["status"]), str(action.get("target_user_id") or ""))
+        return state
+
+
+PROJECTIONS = WorkspaceProjections()
@@ -0,0 +1,305 @@
+"""Event bus backed by Redis Streams, selected with ``EVENT_BUS_BACKEND=redis_streams``.
+
+Every workspace has a stream ``<prefix>:events:<workspace>``; the set ``<prefix>:event_streams``
+lists them. API workers keep the in-memory bus behaviour for their own subscribers and, in
+addition:
+
+* ``publish`` enqueues the event and a sender thread appends queued events with pipelined ``XADD``
+  (streams are capped at ``EVENT_STREAM_MAX_LEN`` entries, approximately), so request handlers
+  never wait on Redis;
+* a reader thread runs ``XREAD`` over the streams of workspaces that have local subscribers and
+  hands events other workers appended to local subscribers.
+
+Background workers read every stream as members of a consumer group (``StreamGroupConsumer``):
+each event goes to one member of the group, is acknowledged once handled, and events a member read
+but never acknowledged are read again when it restarts.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any
+from uuid import uuid4
+
+import redis
+
+from app.core.config import Settings
+from app.core.metrics import METRICS, MetricsRegistry
+from app.services.orchestration.event_bus import Event, InMemoryEventBus
+
+logger = logging.getLogger(__name__)
+
+_SEND_BATCH = 256
+_READ_BATCH = 500
+_BLOCK_MS = 200
+_RETRY_SECONDS = 1.0
+_REFRESH_SECONDS = 5.0
+
+
+def stream_key(prefix: str, workspace_id: str) -> str:
+    return f"{prefix}:events:{workspace_id}"
+
+
+def streams_key(prefix: str) -> str:
+    return f"{prefix}:event_streams"
+
+
+def _encode(event: Event, origin: str) -> dict[str, str]:
+    return {"event": event.to_json(), "origin": origin}
+
+
+def _decode(fields: dict[str, str]) -> Event:
+    event = Event.from_message(json.loads(fields["event"]))
+    event.encoded = fields["event"]
+    return event
+
+
+class RedisStreamsEventBus(InMemoryEventBus):
+    distributed = True
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        prefix: str = "kobo",
+        max_len: int = 100_000,
+        node_id: str | None = None,
+        metrics: MetricsRegistry = METRICS,
+        **options: Any,
+    ) -> None:
+        super().__init__(metrics=metrics, **options)
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.node_id = node_id or uuid4().hex
+        self.prefix = prefix
+        self.max_len = max_len
+        self._outgoing: queue.SimpleQueue[Event | None] = queue.SimpleQueue()
+        self._registered: set[str] = set()
+        # Last stream entry id read per workspace with local subscribers; owned by the reader thread.
+        self._cursors: dict[str, str] = {}
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def publish(self, event_type: str, workspace_id: str, payload: dict[str, Any]) -> Event:
+        event = super().publish(event_type, workspace_id, payload)
+        self._outgoing.put(event)
+        return event
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._read, name="kobo-streams-read", daemon=True),
+            threading.Thread(target=self._send, name="kobo-streams-send", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._outgoing.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        self.client.close()
+
+    def _send(self) -> None:
+        while True:
+            item = self._outgoing.get()
+            batch: list[Event] = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= _SEND_BATCH:
+                    break
+                try:
+                    item = self._outgoing.get_nowait()
+                except queue.Empty:
+                    item = None
+            if batch:
+                self._send_batch(batch)
+            if item is None and self._stop.is_set():
+                return
+
+    def _send_batch(self, batch: list[Event]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        new_workspaces = {event.workspace_id for event in batch} - self._registered
+        if new_workspaces:
+            pipe.sadd(streams_key(self.prefix), *new_workspaces)
+        for event in batch:
+            pipe.xadd(
+                stream_key(self.prefix, event.workspace_id),
+                _encode(event, self.node_id),
+                maxlen=self.max_len,
+                approximate=True,
+            )
+        try:
+            pipe.execute()
+        except redis.RedisError:
+            logger.exception("event_stream_append_failed events=%s", len(batch))
+            self._metrics.inc("events.stream.append_errors")
+            self._metrics.inc("events.stream.dropped", len(batch))
+            return
+        self._registered |= new_workspaces
+        self._metrics.inc("events.stream.appended", len(batch))
+
+    def _read(self) -> None:
+        while not self._stop.is_set():
+            try:
+                streams = self._streams_to_read()
+                if not streams:
+                    self._stop.wait(_BLOCK_MS / 1000)
+                    continue
+                response = self.client.xread(streams, count=_READ_BATCH, block=_BLOCK_MS)
+            except redis.RedisError:
+                logger.exception("event_stream_read_failed node=%s", self.node_id)
+                self._metrics.inc("events.stream.read_errors")
+                self._stop.wait(_RETRY_SECONDS)
+                continue
+            for key, entries in response or ():
+                workspace_id = key[len(stream_key(self.prefix, "")) :]
+                for entry_id, fields in entries:
+                    self._cursors[workspace_id] = entry_id
+                    self._receive_entry(fields)
+
+    def _streams_to_read(self) -> dict[str, str]:
+        # Workspaces are followed while they have local subscribers. A newly followed stream starts
+        # at its current last entry; earlier events reach clients through replay or a refetch.
+        with self._lock:
+            wanted = set(self._subscriptions)
+        for workspace_id in set(self._cursors) - wanted:
+            del self._cursors[workspace_id]
+        for workspace_id in wanted - set(self._cursors):
+            last = self.client.xrevrange(stream_key(self.prefix, workspace_id), count=1)
+            self._cursors[workspace_id] = last[0][0] if last else "0-0"
+        return {stream_key(self.prefix, workspace_id): cursor for workspace_id, cursor in self._cursors.items()}
+
+    def _receive_entry(self, fields: dict[str, str]) -> None:
+        if fields.get("origin") == self.node_id:
+            return
+        try:
+            event = _decode(fields)
+        except (KeyError, ValueError):
+            self._metrics.inc("events.stream.malformed")
+            return
+        self._metrics.inc("events.stream.received")
+        self._append(event)
+
+
+@dataclass(slots=True)
+class StreamEntry:
+    stream: str
+    entry_id: str
+    event: Event
+
+
+class StreamGroupConsumer:
+    """One member of a consumer group reading every workspace stream."""
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        *,
+        prefix: str = "kobo",
+        group: str = "kobo-workers",
+        consumer: str | None = None,
+        batch_size: int = _READ_BATCH,
+        block_ms: int = 1000,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.group = group
+        self.consumer = consumer or uuid4().hex
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self._metrics = metrics
+        # Read position per stream: "0" re-reads this consumer's unacknowledged entries (after a
+        # restart), ">" reads entries never delivered to the group.
+        self._positions: dict[str, str] = {}
+        self._refreshed_at = 0.0
+
+    def refresh(self) -> None:
+        """Join the group on streams created since the last refresh."""
+        for workspace_id in self.client.smembers(streams_key(self.prefix)):
+            key = stream_key(self.prefix, workspace_id)
+            if key in self._positions:
+                continue
+            try:
+                self.client.xgroup_create(key, self.group, id="0", mkstream=True)
+            except redis.ResponseError as exc:
+                if "BUSYGROUP" not in str(exc):
+                    raise
+            self._positions[key] = "0"
+        self._refreshed_at = time.monotonic()
+
+    def read(self) -> list[StreamEntry]:
+        """Up to ``batch_size`` entries per stream, waiting up to ``block_ms`` when there are none."""
+        if time.monotonic() - self._refreshed_at >= _REFRESH_SECONDS:
+            self.refresh()
+        if not self._positions:
+            time.sleep(self.block_ms / 1000)
+            return []
+        catching_up = any(position != ">" for position in self._positions.values())
+        response = self.client.xreadgroup(
+            self.group,
+            self.consumer,
+            dict(self._positions),
+            count=self.batch_size,
+            block=None if catching_up else self.block_ms,
+        )
+        entries: list[StreamEntry] = []
+        returned: set[str] = set()
+        for key, items in response or ():
+            for entry_id, fields in items:
+                returned.add(key)
+                if fields is None:
+                    # Trimmed from the stream while pending; nothing left to handle.
+                    self.client.xack(key, self.group, entry_id)
+                    continue
+                if self._positions[key] != ">":
+                    self._positions[key] = entry_id
+                try:
+                    entries.append(StreamEntry(key, entry_id, _decode(fields)))
+                except (KeyError, ValueError):
+                    self._metrics.inc("events.stream.malformed")
+                    self.client.xack(key, self.group, entry_id)
+        for key, position in self._positions.items():
+            if position != ">" and key not in returned:
+                self._positions[key] = ">"
+        if catching_up and not returned:
+            # Nothing was left pending: go straight on to new entries.
+            return self.read()
+        self._metrics.inc("events.stream.consumed", len(entries))
+        return entries
+
+    def ack(self, entries: list[StreamEntry]) -> None:
+        by_stream: dict[str, list[str]] = defaultdict(list)
+        for entry in entries:
+            by_stream[entry.stream].append(entry.entry_id)
+        if not by_stream:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for key, entry_ids in by_stream.items():
+            pipe.xack(key, self.group, *entry_ids)
+        pipe.execute()
+
+
+def build_stream_consumer(
+    settings: Settings, *, group: str | None = None, batch_size: int = _READ_BATCH
+) -> StreamGroupConsumer:
+    client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+    return StreamGroupConsumer(
+        client,
+        prefix=settings.redis_key_prefix,
+        group=group or settings.event_stream_group,
+        # A stable name lets a restarted worker pick up the entries it read but never acknowledged.
+        consumer=settings.event_stream_consumer or socket.gethostname(),
+        batch_size=batch_size,
+    )
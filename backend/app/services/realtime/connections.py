@@ -0,0 +1,115 @@
+"""WebSocket connection limits and liveness for the workspace sockets.
+
+Both ``/events`` and ``/presence`` take a slot from ``CONNECTIONS`` after accepting: beyond
+``WEBSOCKET_MAX_PER_USER`` sockets for one user the new one is closed with 1008, beyond
+``WEBSOCKET_MAX_PER_WORKSPACE`` for one workspace with 1013 (0 lifts either limit). Limits are per
+worker process.
+
+Every ``WEBSOCKET_HEARTBEAT_SECONDS`` without other traffic the server sends ``{"type": "ping"}``;
+clients answer ``{"type": "pong"}`` (any message counts). A socket the server has not heard from for
+``WEBSOCKET_IDLE_TIMEOUT_SECONDS`` is presumed half-open and closed with 1001, and its subscription
+or room slot released. Active sockets are reported as ``websockets.active``,
+``websockets.<kind>.active`` and ``websockets.workspaces.<workspace>.active`` gauges.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from app.core.config import get_settings
+from app.core.metrics import METRICS, MetricsRegistry
+
+PING = '{"type":"ping"}'
+CLOSE_IDLE = 1001
+CLOSE_USER_LIMIT = 1008
+CLOSE_WORKSPACE_LIMIT = 1013
+
+
+@dataclass(slots=True)
+class Liveness:
+    idle_timeout: float
+    last_seen: float = field(default_factory=time.monotonic)
+
+    def touch(self) -> None:
+        self.last_seen = time.monotonic()
+
+    def expired(self) -> bool:
+        return self.idle_timeout > 0 and time.monotonic() - self.last_seen > self.idle_timeout
+
+
+@dataclass(frozen=True, slots=True)
+class ConnectionLease:
+    workspace_id: str
+    user_id: str
+    kind: str
+
+
+class ConnectionRegistry:
+    def __init__(
+        self,
+        *,
+        max_per_workspace: int = 0,
+        max_per_user: int = 0,
+        heartbeat_seconds: float = 20.0,
+        idle_timeout_seconds: float = 60.0,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.max_per_workspace = max_per_workspace
+        self.max_per_user = max_per_user
+        self.heartbeat_seconds = heartbeat_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._metrics = metrics
+        self._lock = threading.Lock()
+        self._by_workspace: Counter[str] = Counter()
+        self._by_user: Counter[str] = Counter()
+        self._by_kind: Counter[str] = Counter()
+
+    def acquire(self, workspace_id: str, user_id: str, kind: str) -> ConnectionLease | int:
+        """A lease for a new socket, or the close code to reject it with."""
+        with self._lock:
+            if self.max_per_user and self._by_user[user_id] >= self.max_per_user:
+                self._metrics.inc("websockets.rejected.user_limit")
+                return CLOSE_USER_LIMIT
+            if self.max_per_workspace and self._by_workspace[workspace_id] >= self.max_per_workspace:
+                self._metrics.inc("websockets.rejected.workspace_limit")
+                return CLOSE_WORKSPACE_LIMIT
+            self._by_workspace[workspace_id] += 1
+            self._by_user[user_id] += 1
+            self._by_kind[kind] += 1
+            self._report(workspace_id, kind)
+        return ConnectionLease(workspace_id, user_id, kind)
+
+    def release(self, lease: ConnectionLease) -> None:
+        with self._lock:
+            for counts, key in (
+                (self._by_workspace, lease.workspace_id),
+                (self._by_user, lease.user_id),
+                (self._by_kind, lease.kind),
+            ):
+                counts[key] -= 1
+                if counts[key] <= 0:
+                    del counts[key]
+            self._report(lease.workspace_id, lease.kind)
+
+    def liveness(self) -> Liveness:
+        return Liveness(self.idle_timeout_seconds)
+
+    def active(self, workspace_id: str | None = None) -> int:
+        with self._lock:
+            return self._by_workspace[workspace_id] if workspace_id is not None else self._by_workspace.total()
+
+    def _report(self, workspace_id: str, kind: str) -> None:
+        self._metrics.set_gauge("websockets.active", self._by_workspace.total())
+        self._metrics.set_gauge(f"websockets.{kind}.active", self._by_kind[kind])
+        self._metrics.set_gauge(f"websockets.workspaces.{workspace_id}.active", self._by_workspace[workspace_id])
+
+
+CONNECTIONS = ConnectionRegistry(
+    max_per_workspace=get_settings().websocket_max_per_workspace,
+    max_per_user=get_settings().websocket_max_per_user,
+    heartbeat_seconds=get_settings().websocket_heartbeat_seconds,
+    idle_timeout_seconds=get_settings().websocket_idle_timeout_seconds,
+)
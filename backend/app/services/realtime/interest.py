@@ -0,0 +1,215 @@
+"""Spatial interest and compact encodings for Office-mode presence.
+
+Positions are percentages of the office map. ``SpatialGrid`` buckets participants into square cells
+so a socket that only shows part of the map (its *view*) is matched against the participants in the
+cells it overlaps rather than the whole room.
+
+Delta frames carry only the fields that changed since the socket last heard about a participant,
+with ``x``/``y`` quantized to ``1 / POSITION_SCALE`` of a percent and sent as integers. Binary frames
+pack position and status changes of participants the socket already knows by their room slot:
+
+    u8 kind (1) | u16 count | count x (u16 slot | u8 mask | u16 x? | u16 y? | u8 status?)
+
+little-endian, where ``mask`` bits 1, 2 and 4 say which of x, y and status follow.
+"""
+
+from __future__ import annotations
+
+import math
+import struct
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+POSITION_SCALE = 100
+STATUSES = ("offline", "online", "working", "idle")
+ENCODINGS = ("full", "delta", "binary")
+
+BINARY_UPDATES = 1
+_HEADER = struct.Struct("<BH")
+_ENTRY = struct.Struct("<HB")
+_COORD = struct.Struct("<H")
+_STATUS = struct.Struct("<B")
+_MASK_X, _MASK_Y, _MASK_STATUS = 1, 2, 4
+_MAX_SLOT = 0xFFFF
+
+Cell = tuple[int, int]
+
+
+@dataclass(frozen=True, slots=True)
+class View:
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+
+    @classmethod
+    def parse(cls, value: Any) -> View | None:
+        """``"x0,y0,x1,y1"`` or ``{"x0": ..., "y0": ..., "x1": ..., "y1": ...}``; None for anything else."""
+        try:
+            if isinstance(value, str):
+                x0, y0, x1, y1 = (float(part) for part in value.split(","))
+            elif isinstance(value, dict):
+                x0, y0, x1, y1 = (float(value[key]) for key in ("x0", "y0", "x1", "y1"))
+            else:
+                return None
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not all(math.isfinite(number) for number in (x0, y0, x1, y1)):
+            return None
+        return cls(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+    def contains(self, participant: dict[str, Any]) -> bool:
+        x, y = float(participant.get("x", 0.0)), float(participant.get("y", 0.0))
+        return self.x0 <= x <= self.x1 and self.y0 <= y <= self.y1
+
+
+class SpatialGrid:
+    def __init__(self, cell_size: float = 10.0) -> None:
+        self.cell_size = cell_size
+        self._cells: dict[Cell, set[str]] = {}
+        self._where: dict[str, Cell] = {}
+
+    def cell(self, participant: dict[str, Any]) -> Cell:
+        return (
+            int(float(participant.get("x", 0.0)) // self.cell_size),
+            int(float(participant.get("y", 0.0)) // self.cell_size),
+        )
+
+    def move(self, participant: dict[str, Any]) -> Cell | None:
+        """File the participant under its current cell; returns the cell it was in before."""
+        participant_id = str(participant["id"])
+        cell = self.cell(participant)
+        previous = self._where.get(participant_id)
+        if previous != cell:
+            if previous is not None:
+                self._discard(participant_id, previous)
+            self._cells.setdefault(cell, set()).add(participant_id)
+            self._where[participant_id] = cell
+        return previous
+
+    def remove(self, participant_id: str) -> Cell | None:
+        previous = self._where.pop(participant_id, None)
+        if previous is not None:
+            self._discard(participant_id, previous)
+        return previous
+
+    def covered(self, view: View) -> Iterator[Cell]:
+        for cx in range(int(view.x0 // self.cell_size), int(view.x1 // self.cell_size) + 1):
+            for cy in range(int(view.y0 // self.cell_size), int(view.y1 // self.cell_size) + 1):
+                yield (cx, cy)
+
+    def query(self, view: View) -> set[str]:
+        """Ids in the cells the view overlaps; callers still check ``view.contains``."""
+        found: set[str] = set()
+        for cell in self.covered(view):
+            found.update(self._cells.get(cell, ()))
+        return found
+
+    def _discard(self, participant_id: str, cell: Cell) -> None:
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(participant_id)
+            if not members:
+                del self._cells[cell]
+
+
+def quantize(participant: dict[str, Any]) -> dict[str, Any]:
+    state = dict(participant)
+    for key in ("x", "y"):
+        if key in state:
+            state[key] = round(float(state[key]) * POSITION_SCALE)
+    return state
+
+
+def diff(known: dict[str, Any] | None, state: dict[str, Any]) -> dict[str, Any]:
+    """Fields of ``state`` that differ from ``known`` (all of them when unknown), always with ``id``."""
+    if known is None:
+        return dict(state)
+    changed = {key: value for key, value in state.items() if known.get(key) != value}
+    if changed:
+        changed["id"] = state["id"]
+    return changed
+
+
+@dataclass(slots=True)
+class BinaryUpdate:
+    slot: int
+    x: int | None = None
+    y: int | None = None
+    status: str | None = None
+
+
+def binary_update(slot: int | None, delta: dict[str, Any]) -> BinaryUpdate | None:
+    """The delta as a binary entry, or None when it carries anything a binary frame cannot."""
+    if slot is None or slot > _MAX_SLOT or not set(delta) <= {"id", "x", "y", "status"}:
+        return None
+    status = delta.get("status")
+    if status is not None and status not in STATUSES:
+        return None
+    for key in ("x", "y"):
+        if key in delta and not 0 <= delta[key] <= 0xFFFF:
+            return None
+    return BinaryUpdate(slot, delta.get("x"), delta.get("y"), status)
+
+
+def encode_binary(updates: Iterable[BinaryUpdate]) -> bytes:
+    body = bytearray()
+    count = 0
+    for update in updates:
+        mask = (
+            (_MASK_X if update.x is not None else 0)
+            | (_MASK_Y if update.y is not None else 0)
+            | (_MASK_STATUS if update.status is not None else 0)
+        )
+        body += _ENTRY.pack(update.slot, mask)
+        if update.x is not None:
+            body += _COORD.pack(update.x)
+        if update.y is not None:
+            body += _COORD.pack(update.y)
+        if update.status is not None:
+            body += _STATUS.pack(STATUSES.index(update.status))
+        count += 1
+    return _HEADER.pack(BINARY_UPDATES, count) + bytes(body)
+
+
+def decode_binary(frame: bytes) -> list[BinaryUpdate]:
+    kind, count = _HEADER.unpack_from(frame)
+    if kind != BINARY_UPDATES:
+        raise ValueError(f"Unknown presence frame kind: {kind}")
+    offset = _HEADER.size
+    updates: list[BinaryUpdate] = []
+    for _ in range(count):
+        slot, mask = _ENTRY.unpack_from(frame, offset)
+        offset += _ENTRY.size
+        update = BinaryUpdate(slot)
+        if mask & _MASK_X:
+            (update.x,) = _COORD.unpack_from(frame, offset)
+            offset += _COORD.size
+        if mask & _MASK_Y:
+            (update.y,) = _COORD.unpack_from(frame, offset)
+            offset += _COORD.size
+        if mask & _MASK_STATUS:
+            (code,) = _STATUS.unpack_from(frame, offset)
+            update.status = STATUSES[code]
+            offset += _STATUS.size
+        updates.append(update)
+    return updates
+
+
+@dataclass(slots=True)
+class Interest:
+    """What one socket asked for and what it has been told."""
+
+    encoding: str = "full"
+    view: View | None = None
+    # Participant id -> the (quantized, for delta and binary) state this socket last received.
+    known: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def shares_frames(self) -> bool:
+        # Full-format sockets watching the whole map all receive the same frame.
+        return self.encoding == "full" and self.view is None
+
+    def sees(self, participant: dict[str, Any]) -> bool:
+        return self.view is None or self.view.contains(participant)
@@ -0,0 +1,114 @@
+"""Write-behind of Office-mode positions to workspace member profiles.
+
+A ``presence.move`` only records the position here; it reaches the workspace member profiles
+once the participant has been still for ``PRESENCE_POSITION_IDLE_SECONDS``, at the latest
+``PRESENCE_POSITION_MAX_DELAY_SECONDS`` after the first unsaved move, when they leave and at
+shutdown. A session of continuous movement costs a handful of profile writes instead of one per move.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from app.core.config import get_settings
+from app.core.metrics import METRICS, MetricsRegistry
+from app.repositories import REPOSITORIES
+
+logger = logging.getLogger(__name__)
+
+PositionWriter = Callable[[str, str, float, float], None]
+
+
+def store_position(workspace_id: str, user_id: str, x: float, y: float) -> None:
+    with REPOSITORIES.workspace_lock(workspace_id):
+        profiles = REPOSITORIES.entries.get("workspace_member_profiles", workspace_id) or {}
+        profile = profiles.setdefault(user_id, {})
+        profile["x"] = x
+        profile["y"] = y
+        REPOSITORIES.entries.put("workspace_member_profiles", workspace_id, profiles)
+
+
+@dataclass(slots=True)
+class _Pending:
+    x: float
+    y: float
+    first_at: float
+    last_at: float
+
+
+class PositionWriteBehind:
+    def __init__(
+        self,
+        write: PositionWriter = store_position,
+        *,
+        idle_seconds: float = 2.0,
+        max_delay_seconds: float = 30.0,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self._write = write
+        self.idle_seconds = idle_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._metrics = metrics
+        self._pending: dict[tuple[str, str], _Pending] = {}
+        self._flusher: asyncio.Task[None] | None = None
+
+    def record(self, workspace_id: str, user_id: str, x: float, y: float) -> None:
+        now = time.monotonic()
+        key = (workspace_id, user_id)
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = _Pending(x, y, now, now)
+        else:
+            pending.x, pending.y, pending.last_at = x, y, now
+        self._metrics.inc("presence.position_moves")
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_due(), name="presence-positions")
+
+    def latest(self, workspace_id: str, user_id: str) -> tuple[float, float] | None:
+        """The unsaved position, if any; newer than what the profile holds."""
+        pending = self._pending.get((workspace_id, user_id))
+        return (pending.x, pending.y) if pending is not None else None
+
+    async def flush(self, workspace_id: str, user_id: str) -> None:
+        pending = self._pending.pop((workspace_id, user_id), None)
+        if pending is not None:
+            # The write takes the workspace lock and may fsync the journal; keep it off the loop.
+            await asyncio.to_thread(self._save, workspace_id, user_id, pending)
+
+    def flush_all(self) -> None:
+        pending, self._pending = self._pending, {}
+        for (workspace_id, user_id), position in pending.items():
+            self._save(workspace_id, user_id, position)
+
+    def _save(self, workspace_id: str, user_id: str, pending: _Pending) -> None:
+        try:
+            self._write(workspace_id, user_id, pending.x, pending.y)
+        except Exception:
+            logger.exception("presence_position_write_failed workspace=%s user=%s", workspace_id, user_id)
+            self._metrics.inc("presence.position_write_errors")
+            return
+        self._metrics.inc("presence.position_writes")
+
+    async def _flush_due(self) -> None:
+        interval = max(min(self.idle_seconds, self.max_delay_seconds) / 2, 0.01)
+        # Runs while positions are waiting; the next move after everything is saved starts it again.
+        while self._pending:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            due = [
+                key
+                for key, pending in self._pending.items()
+                if now - pending.last_at >= self.idle_seconds or now - pending.first_at >= self.max_delay_seconds
+            ]
+            for key in due:
+                await self.flush(*key)
+
+
+POSITIONS = PositionWriteBehind(
+    idle_seconds=get_settings().presence_position_idle_seconds,
+    max_delay_seconds=get_settings().presence_position_max_delay_seconds,
+)
@@ -0,0 +1,481 @@
+"""Workspace presence rooms for ``/ws/workspaces/{id}/presence``.
+
+Each worker process holds the sockets connected to it. With shared state attached, joins, moves and
+leaves are also written to the Redis presence directory and fanned out, so clients on different
+workers see each other; messages from other workers are re-broadcast to local sockets only.
+
+Joins and leaves are broadcast as they happen. Moves and status changes only mark the participant
+changed: a per-room tick (``PRESENCE_TICK_HZ`` times a second) sends the latest state of everyone
+who changed since the previous tick as one ``{"type": "presence.batch", "participants": [...]}``
+frame, so a room costs one send per client per tick however many people are moving. A room's tick
+only runs while someone is moving. With a tick rate of 0 every update is broadcast immediately as
+``presence.updated``.
+
+Broadcasting never waits on a socket. Each connection has a buffer of up to
+``PRESENCE_SEND_BUFFER`` frames and its own writer task, so clients are written to concurrently and a
+slow one only delays itself. A client that lets its buffer fill, or takes longer than
+``PRESENCE_SEND_TIMEOUT_SECONDS`` to accept a frame, is evicted: dropped from the room and closed
+with 1013 so it reconnects and gets a fresh snapshot.
+
+By default a socket receives the frames above for the whole room. A socket can instead ask for
+``?encoding=delta`` (``presence.delta`` frames with changed fields only and quantized coordinates)
+or ``?encoding=binary`` (position and status changes as binary frames, see
+``app.services.realtime.interest``), and for a view (``?view=x0,y0,x1,y1`` or a ``presence.view``
+message) so it only hears about participants inside that part of the map; people leaving the view
+are listed under ``removed``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.core.config import get_settings
+from app.core.metrics import METRICS, MetricsRegistry
+from app.core.shared_state import SharedState
+from app.services.realtime.connections import PING
+from app.services.realtime.interest import (
+    POSITION_SCALE,
+    Cell,
+    Interest,
+    SpatialGrid,
+    View,
+    binary_update,
+    diff,
+    encode_binary,
+    quantize,
+)
+
+logger = logging.getLogger(__name__)
+
+# A send taking longer than this share of the timeout is counted in ``presence.slow_sends``.
+_SLOW_SEND_FRACTION = 0.25
+_CLOSE_TIMEOUT_SECONDS = 1.0
+
+
+class PresenceConnection:
+    """One socket's outbound frames, written in order by a task of its own."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        interest: Interest,
+        *,
+        buffer_size: int,
+        send_timeout: float,
+        on_evict: Callable[[PresenceConnection, str], None],
+        metrics: MetricsRegistry,
+    ) -> None:
+        self.websocket = websocket
+        self.interest = interest
+        self._queue: asyncio.Queue[str | bytes] = asyncio.Queue(maxsize=buffer_size)
+        self._send_timeout = send_timeout
+        self._on_evict = on_evict
+        self._metrics = metrics
+        self._writer = asyncio.create_task(self._write(), name="presence-writer")
+
+    def offer(self, message: str | bytes) -> bool:
+        """Queue a frame; False when the buffer is full."""
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self) -> None:
+        self._writer.cancel()
+
+    async def _write(self) -> None:
+        while True:
+            message = await self._queue.get()
+            started = time.perf_counter()
+            send = self.websocket.send_bytes(message) if isinstance(message, bytes) else self.websocket.send_text(message)
+            try:
+                await asyncio.wait_for(send, self._send_timeout or None)
+            except TimeoutError:
+                self._metrics.inc("presence.send_timeouts")
+                self._on_evict(self, "timeout")
+                return
+            except (RuntimeError, OSError, WebSocketDisconnect):
+                # Already closed; the endpoint's receive loop sees the disconnect and leaves the room.
+                self._on_evict(self, "closed")
+                return
+            elapsed = time.perf_counter() - started
+            self._metrics.inc("presence.sends")
+            self._metrics.inc("presence.send_seconds", elapsed)
+            if self._send_timeout and elapsed > self._send_timeout * _SLOW_SEND_FRACTION:
+                self._metrics.inc("presence.slow_sends")
+
+
+@dataclass
+class PresenceRoom:
+    connections: dict[WebSocket, PresenceConnection] = field(default_factory=dict)
+    # Participants connected to this worker.
+    participants: dict[str, dict[str, Any]] = field(default_factory=dict)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Participants updated since the last tick, by id; only their latest state is sent.
+    changed: dict[str, dict[str, Any]] = field(default_factory=dict)
+    tick: asyncio.Task[None] | None = None
+    # Latest state of everyone this worker has sent to the room, its own and other workers', filed
+    # by position; binary frames refer to them by slot.
+    states: dict[str, dict[str, Any]] = field(default_factory=dict)
+    grid: SpatialGrid = field(default_factory=SpatialGrid)
+    slots: dict[str, int] = field(default_factory=dict)
+    next_slot: int = 0
+
+
+class PresenceHub:
+    def __init__(
+        self,
+        *,
+        tick_hz: float = 0.0,
+        send_buffer: int = 32,
+        send_timeout: float = 5.0,
+        cell_size: float = 10.0,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.rooms: dict[str, PresenceRoom] = {}
+        self.cell_size = cell_size
+        self.tick_interval = 1.0 / tick_hz if tick_hz > 0 else 0.0
+        self.send_buffer = send_buffer
+        self.send_timeout = send_timeout
+        self._metrics = metrics
+        self._shared: SharedState | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def attach(self, shared: SharedState) -> None:
+        self._shared = shared
+        shared.fanout.on("presence", self._receive_remote)
+
+    def room(self, workspace_id: str) -> PresenceRoom:
+        if workspace_id not in self.rooms:
+            self.rooms[workspace_id] = PresenceRoom(grid=SpatialGrid(self.cell_size))
+        return self.rooms[workspace_id]
+
+    async def join(
+        self,
+        workspace_id: str,
+        websocket: WebSocket,
+        participant: dict[str, Any],
+        *,
+        encoding: str = "full",
+        view: View | None = None,
+    ) -> None:
+        self._loop = asyncio.get_running_loop()
+        room = self.room(workspace_id)
+        connection = PresenceConnection(
+            websocket,
+            Interest(encoding, view),
+            buffer_size=self.send_buffer,
+            send_timeout=self.send_timeout,
+            on_evict=lambda evicted, reason: self._evict(workspace_id, evicted, reason),
+            metrics=self._metrics,
+        )
+        async with room.lock:
+            room.connections[websocket] = connection
+            room.participants[str(participant["id"])] = participant
+        if self._shared is not None:
+            await asyncio.to_thread(self._shared.presence.put, workspace_id, dict(participant))
+
+    async def update(self, workspace_id: str, participant: dict[str, Any]) -> None:
+        room = self.room(workspace_id)
+        participant_id = str(participant["id"])
+        room.participants[participant_id] = participant
+        if not self.tick_interval:
+            if self._shared is not None:
+                await asyncio.to_thread(self._shared.presence.put, workspace_id, dict(participant))
+            await self.broadcast(workspace_id, {"type": "presence.updated", "participant": participant})
+            return
+        room.changed[participant_id] = dict(participant)
+        if room.tick is None or room.tick.done():
+            room.tick = asyncio.create_task(self._run_tick(workspace_id, room), name=f"presence-tick:{workspace_id}")
+
+    async def leave(self, workspace_id: str, websocket: WebSocket, participant_id: str) -> None:
+        room = self.room(workspace_id)
+        async with room.lock:
+            connection = room.connections.pop(websocket, None)
+            if connection is not None:
+                connection.close()
+            room.participants.pop(participant_id, None)
+            room.changed.pop(participant_id, None)
+            if not room.connections and self.rooms.get(workspace_id) is room:
+                # An empty room is dropped; a running tick notices and stops.
+                del self.rooms[workspace_id]
+        if self._shared is not None:
+            await asyncio.to_thread(self._shared.presence.remove, workspace_id, participant_id)
+
+    async def participants(self, workspace_id: str) -> list[dict[str, Any]]:
+        room = self.rooms.get(workspace_id)
+        local = room.participants if room is not None else {}
+        if self._shared is None:
+            return list(local.values())
+        shared = await asyncio.to_thread(self._shared.presence.participants, workspace_id)
+        # Local entries win: they may be newer than what this worker last wrote to the directory.
+        merged = {str(item["id"]): item for item in shared}
+        merged.update(local)
+        return list(merged.values())
+
+    def snapshot(self, workspace_id: str, websocket: WebSocket, participants: list[dict[str, Any]]) -> None:
+        """Queue a ``presence.snapshot`` of what the socket can see, behind anything broadcast before it.
+
+        Participants from other workers are filed in the room so later moves find them; agents
+        (``kind == "agent"``) are only filtered by the view.
+        """
+        room = self.rooms.get(workspace_id)
+        connection = room.connections.get(websocket) if room is not None else None
+        if room is None or connection is None:
+            return
+        interest = connection.interest
+        visible: list[dict[str, Any]] = []
+        for participant in map(dict, participants):
+            if participant.get("kind") != "agent":
+                self._track(room, participant)
+            if not interest.sees(participant):
+                continue
+            if interest.encoding == "full":
+                visible.append(participant)
+                if not interest.shares_frames:
+                    interest.known[str(participant["id"])] = participant
+                continue
+            state = quantize(participant)
+            if participant.get("kind") != "agent":
+                interest.known[str(participant["id"])] = state
+                if interest.encoding == "binary":
+                    state = {**state, "n": room.slots[str(participant["id"])]}
+            visible.append(state)
+        payload: dict[str, Any] = {"type": "presence.snapshot", "participants": visible}
+        if interest.encoding != "full":
+            payload["scale"] = POSITION_SCALE
+        if not connection.offer(json.dumps(payload)):
+            self._evict(workspace_id, connection, "overflow")
+
+    def set_view(self, workspace_id: str, websocket: WebSocket, view: View | None) -> None:
+        """Narrow (or, with None, widen) what one socket hears about, telling it who came into or left view."""
+        room = self.rooms.get(workspace_id)
+        connection = room.connections.get(websocket) if room is not None else None
+        if room is None or connection is None:
+            return
+        interest = connection.interest
+        if interest.shares_frames:
+            # Until now the socket received every frame of the room, so it knows everyone.
+            interest.known = dict(room.states)
+        interest.view = view
+        candidates = room.states.keys() if view is None else room.grid.query(view)
+        visible = [room.states[participant_id] for participant_id in candidates]
+        gone = [participant_id for participant_id in interest.known if participant_id not in candidates]
+        frames = self._frames(room, interest, visible, gone)
+        if interest.shares_frames:
+            interest.known.clear()
+        self._offer(workspace_id, connection, frames)
+
+    def ping(self, workspace_id: str, websocket: WebSocket) -> None:
+        """Queue a heartbeat behind the socket's pending frames."""
+        room = self.rooms.get(workspace_id)
+        connection = room.connections.get(websocket) if room is not None else None
+        if connection is not None:
+            self._offer(workspace_id, connection, [PING])
+
+    async def broadcast(self, workspace_id: str, payload: dict[str, Any]) -> None:
+        self._deliver(workspace_id, payload)
+        if self._shared is not None:
+            self._shared.fanout.publish("presence", workspace_id, payload)
+
+    async def flush(self, workspace_id: str) -> int:
+        """Broadcast everyone changed since the last tick as one batch; returns how many were sent."""
+        room = self.rooms.get(workspace_id)
+        if room is None or not room.changed:
+            return 0
+        changed, room.changed = room.changed, {}
+        participants = list(changed.values())
+        if self._shared is not None:
+            await asyncio.to_thread(self._shared.presence.put_many, workspace_id, participants)
+        await self.broadcast(workspace_id, {"type": "presence.batch", "participants": participants})
+        self._metrics.inc("presence.batches")
+        self._metrics.inc("presence.batched_updates", len(participants))
+        return len(participants)
+
+    async def _run_tick(self, workspace_id: str, room: PresenceRoom) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        try:
+            # Runs while people keep moving; the next update after a quiet tick starts it again.
+            while self.rooms.get(workspace_id) is room:
+                # Scheduled against a fixed cadence so a slow broadcast does not stretch every tick.
+                deadline += self.tick_interval
+                await asyncio.sleep(max(0.0, deadline - loop.time()))
+                try:
+                    if not await self.flush(workspace_id):
+                        return
+                except Exception:
+                    logger.exception("presence_tick_failed workspace=%s", workspace_id)
+                if loop.time() > deadline + self.tick_interval:
+                    self._metrics.inc("presence.ticks_late")
+                    deadline = loop.time()
+        finally:
+            room.tick = None
+
+    def _deliver(self, workspace_id: str, payload: dict[str, Any]) -> None:
+        """Send a room payload, local or from another worker, to this worker's sockets."""
+        room = self.rooms.get(workspace_id)
+        if room is None:
+            return
+        kind = payload.get("type")
+        # Copied: local payloads may hold the endpoint's own participant dict, which it keeps mutating.
+        if kind == "presence.batch":
+            updates, removed = [dict(item) for item in payload.get("participants") or ()], []
+        elif kind in ("presence.joined", "presence.updated") and isinstance(payload.get("participant"), dict):
+            updates, removed = [dict(payload["participant"])], []
+        elif kind == "presence.left":
+            updates, removed = [], [str(payload.get("participant_id"))]
+        else:
+            updates, removed = [], []
+        # Each change is filed under the cells it moved between, so a view only looks at its own cells.
+        touched: dict[Cell, list[dict[str, Any]]] = {}
+        for participant in updates:
+            previous = self._track(room, participant)
+            touched.setdefault(room.grid.cell(participant), []).append(participant)
+            if previous is not None and previous != room.grid.cell(participant):
+                touched.setdefault(previous, []).append(participant)
+        for participant_id in removed:
+            room.states.pop(participant_id, None)
+            room.slots.pop(participant_id, None)
+            room.grid.remove(participant_id)
+
+        shared: str | None = None
+        # Quantized once per change rather than once per socket.
+        quantized: dict[int, dict[str, Any]] = {}
+        for connection in tuple(room.connections.values()):
+            interest = connection.interest
+            if interest.shares_frames:
+                shared = shared if shared is not None else json.dumps(payload)
+                self._offer(workspace_id, connection, [shared])
+                continue
+            if interest.view is None:
+                candidates = updates
+            else:
+                seen: set[int] = set()
+                candidates = []
+                for cell in room.grid.covered(interest.view):
+                    for participant in touched.get(cell, ()):
+                        if id(participant) not in seen:
+                            seen.add(id(participant))
+                            candidates.append(participant)
+            gone = [participant_id for participant_id in removed if participant_id in interest.known]
+            if candidates or gone:
+                self._offer(workspace_id, connection, self._frames(room, interest, candidates, gone, quantized))
+
+    def _track(self, room: PresenceRoom, participant: dict[str, Any]) -> Cell | None:
+        participant_id = str(participant["id"])
+        room.states[participant_id] = participant
+        if participant_id not in room.slots:
+            room.slots[participant_id] = room.next_slot
+            room.next_slot += 1
+        return room.grid.move(participant)
+
+    @staticmethod
+    def _frames(
+        room: PresenceRoom,
+        interest: Interest,
+        participants: list[dict[str, Any]],
+        gone: list[str],
+        quantized: dict[int, dict[str, Any]] | None = None,
+    ) -> list[str | bytes]:
+        """What a socket with its own interest should be sent about these participants."""
+        removed = list(gone)
+        changes: list[dict[str, Any]] = []
+        moves = []
+        for participant in participants:
+            participant_id = str(participant["id"])
+            if not interest.sees(participant):
+                if interest.known.pop(participant_id, None) is not None:
+                    removed.append(participant_id)
+                continue
+            if interest.encoding == "full":
+                state = participant
+            elif quantized is None:
+                state = quantize(participant)
+            else:
+                state = quantized.get(id(participant)) or quantized.setdefault(id(participant), quantize(participant))
+            known = interest.known.get(participant_id)
+            delta = diff(known, state)
+            if not delta:
+                continue
+            interest.known[participant_id] = state
+            if interest.encoding == "full":
+                changes.append(participant)
+                continue
+            slot = room.slots.get(participant_id)
+            move = binary_update(slot, delta) if interest.encoding == "binary" and known is not None else None
+            if move is not None:
+                moves.append(move)
+            elif interest.encoding == "binary" and slot is not None:
+                changes.append({**delta, "n": slot})
+            else:
+                changes.append(delta)
+        for participant_id in gone:
+            interest.known.pop(participant_id, None)
+
+        frames: list[str | bytes] = []
+        if changes or removed:
+            if interest.encoding == "full":
+                payload: dict[str, Any] = {"type": "presence.batch", "participants": changes}
+            else:
+                payload = {"type": "presence.delta", "updates": changes}
+            if removed:
+                payload["removed"] = removed
+            frames.append(json.dumps(payload))
+        # After the JSON frame, which introduces any slots the binary one refers to.
+        if moves:
+            frames.append(encode_binary(moves))
+        return frames
+
+    def _offer(self, workspace_id: str, connection: PresenceConnection, frames: list[str | bytes]) -> None:
+        for frame in frames:
+            if not connection.offer(frame):
+                self._evict(workspace_id, connection, "overflow")
+                return
+
+    def _evict(self, workspace_id: str, connection: PresenceConnection, reason: str) -> None:
+        room = self.rooms.get(workspace_id)
+        if room is None or room.connections.get(connection.websocket) is not connection:
+            return
+        del room.connections[connection.websocket]
+        connection.close()
+        if reason == "closed":
+            return
+        self._metrics.inc("presence.evictions")
+        self._metrics.inc(f"presence.evictions.{reason}")
+        logger.info("presence_client_evicted workspace=%s reason=%s", workspace_id, reason)
+        asyncio.get_running_loop().create_task(self._close(connection.websocket))
+
+    @staticmethod
+    async def _close(websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), _CLOSE_TIMEOUT_SECONDS)
+        except (TimeoutError, RuntimeError, OSError):
+            pass
+
+    def _receive_remote(self, workspace_id: str, payload: dict[str, Any]) -> None:
+        loop = self._loop
+        room = self.rooms.get(workspace_id)
+        if loop is None or room is None or not room.connections:
+            return
+        try:
+            loop.call_soon_threadsafe(self._deliver, workspace_id, payload)
+        except RuntimeError:
+            logger.debug("presence_remote_dropped workspace=%s", workspace_id)
+
+
+PRESENCE = PresenceHub(
+    tick_hz=get_settings().presence_tick_hz,
+    send_buffer=get_settings().presence_send_buffer,
+    send_timeout=get_settings().presence_send_timeout_seconds,
+    cell_size=get_settings().presence_interest_cell_size,
+)
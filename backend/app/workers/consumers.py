@@ -0,0 +1,341 @@
+"""Event consumers: registered handlers fed batches of workspace events off the request path.
+
+Handlers register with ``CONSUMERS.register(name, event_types=..., batch_size=..., concurrency=...)``
+(see ``app.workers.handlers``) and receive a list of events; a sync handler runs in a thread, an
+``async`` one on the runtime's loop. Each consumer reads its own copy of the stream:
+
+* on the in-memory bus, the API process's outbox, woken by ``publish`` rather than polled. With
+  ``STORE_DATA_DIR`` set the outbox and each consumer's last acknowledged event are journaled with
+  the store, so a restart resumes where the consumer stopped; without it both are process-local.
+  The standalone runner (``python -m app.workers.runner``) cannot see another process's outbox and
+  requires ``EVENT_BUS_BACKEND=redis_streams``;
+* with ``EVENT_BUS_BACKEND=redis_streams``, every workspace stream through a consumer group named
+  ``<EVENT_STREAM_GROUP>.<consumer>``, so consumers progress independently and several runners
+  share a consumer's work.
+
+Up to ``concurrency`` batches of a consumer are handled at once. A consumer's position only moves
+past a batch once it and every batch before it are done, so a restart neither skips events nor
+handles them again beyond the batches that were in flight. A failing batch is retried with backoff
+and then skipped (``consumers.<name>.failed``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterator, Sequence
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any, Protocol
+
+from app.core.config import Settings
+from app.core.metrics import METRICS, MetricsRegistry
+from app.services.orchestration.event_bus import Event, InMemoryEventBus, matches_type
+
+if TYPE_CHECKING:
+    from app.services.orchestration.redis_streams import StreamGroupConsumer
+
+logger = logging.getLogger(__name__)
+
+BatchHandler = Callable[[list[Event]], Awaitable[None] | None]
+
+RETRY_DELAYS = (0.5, 2.0, 10.0)
+_IDLE_WAKE_SECONDS = 1.0
+
+
+@dataclass(slots=True)
+class Consumer:
+    name: str
+    handler: BatchHandler
+    # Empty accepts every event; "task.*" accepts types starting with "task.".
+    event_types: tuple[str, ...] = ()
+    batch_size: int = 100
+    concurrency: int = 1
+
+    def accepts(self, event_type: str) -> bool:
+        return matches_type(event_type, self.event_types)
+
+
+class ConsumerRegistry:
+    def __init__(self) -> None:
+        self._consumers: dict[str, Consumer] = {}
+
+    def register(
+        self,
+        name: str,
+        *,
+        event_types: Sequence[str] = (),
+        batch_size: int = 100,
+        concurrency: int = 1,
+    ) -> Callable[[BatchHandler], BatchHandler]:
+        if batch_size < 1 or concurrency < 1:
+            raise ValueError("batch_size and concurrency must be at least 1")
+
+        def decorator(handler: BatchHandler) -> BatchHandler:
+            if name in self._consumers:
+                raise ValueError(f"Consumer already registered: {name}")
+            self._consumers[name] = Consumer(name, handler, tuple(event_types), batch_size, concurrency)
+            return handler
+
+        return decorator
+
+    def __iter__(self) -> Iterator[Consumer]:
+        return iter(tuple(self._consumers.values()))
+
+    def __len__(self) -> int:
+        return len(self._consumers)
+
+
+CONSUMERS = ConsumerRegistry()
+
+
+@dataclass(slots=True)
+class Delivery:
+    event: Event
+    # Source-specific position handed back to ``ack``.
+    token: Any
+
+
+class EventSource(Protocol):
+    async def read(self, max_count: int) -> list[Delivery]: ...
+
+    async def ack(self, deliveries: list[Delivery]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class OutboxSource:
+    """Reads the in-memory bus outbox from a position; ``read`` waits for the next ``publish``.
+
+    The position starts from the checkpoint the bus kept for ``name`` (see ``persist_outbox``).
+    """
+
+    def __init__(self, bus: InMemoryEventBus, *, name: str = "", metrics: MetricsRegistry = METRICS) -> None:
+        self._bus = bus
+        self._name = name
+        self._metrics = metrics
+        self.position = bus.outbox_checkpoint(name) if name else 0
+        self._next = self.position
+        self._wake: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        bus.on_publish(self._notify)
+        bus.add_outbox_reader(self)
+
+    def _notify(self, event: Event) -> None:
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            # The runtime's loop has shut down.
+            pass
+
+    async def read(self, max_count: int) -> list[Delivery]:
+        if self._wake is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+        while True:
+            self._wake.clear()
+            events, end = self._bus.events_since(self._next)
+            start = end - len(events)
+            if start > self._next:
+                # Retention trimmed the outbox past this consumer's position.
+                self._metrics.inc(f"consumers.{self._name}.skipped", start - self._next)
+            if events:
+                batch = events[:max_count]
+                self._next = start + len(batch)
+                return [Delivery(event, start + index + 1) for index, event in enumerate(batch)]
+            self._next = start
+            # The timeout only guards against a lost wake-up; publishes wake the reader directly.
+            try:
+                await asyncio.wait_for(self._wake.wait(), _IDLE_WAKE_SECONDS)
+            except TimeoutError:
+                pass
+
+    async def ack(self, deliveries: list[Delivery]) -> None:
+        if deliveries:
+            self.position = max(self.position, deliveries[-1].token)
+            if self._name and self._bus.outbox_persisted:
+                # Journaled like any store write, which may fsync; keep it off the loop.
+                await asyncio.to_thread(self._bus.save_outbox_checkpoint, self._name, self.position)
+
+    def backlog(self) -> int:
+        _, end = self._bus.events_since(self.position)
+        return end - self.position
+
+    def close(self) -> None:
+        self._wake = None
+        self._bus.off_publish(self._notify)
+        self._bus.remove_outbox_reader(self)
+
+
+class StreamSource:
+    """Reads every workspace stream through one consumer group; ``ack`` is ``XACK``."""
+
+    def __init__(self, consumer: StreamGroupConsumer) -> None:
+        self._consumer = consumer
+
+    async def read(self, max_count: int) -> list[Delivery]:
+        # XREADGROUP blocks in Redis until entries arrive (up to block_ms), so this does not poll.
+        entries = await asyncio.to_thread(self._consumer.read)
+        return [Delivery(entry.event, entry) for entry in entries]
+
+    async def ack(self, deliveries: list[Delivery]) -> None:
+        await asyncio.to_thread(self._consumer.ack, [delivery.token for delivery in deliveries])
+
+    def close(self) -> None:
+        self._consumer.client.close()
+
+
+@dataclass(slots=True)
+class _Batch:
+    deliveries: list[Delivery]
+    task: asyncio.Task[None]
+
+
+@dataclass(slots=True)
+class _ConsumerState:
+    consumer: Consumer
+    source: EventSource
+    slots: asyncio.Semaphore
+    in_flight: deque[_Batch] = field(default_factory=deque)
+    commit_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ConsumerRuntime:
+    def __init__(
+        self,
+        consumers: Sequence[Consumer],
+        source_factory: Callable[[Consumer], EventSource],
+        *,
+        retry_delays: Sequence[float] = RETRY_DELAYS,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.consumers = list(consumers)
+        self._source_factory = source_factory
+        self._retry_delays = tuple(retry_delays)
+        self._metrics = metrics
+        self.sources: dict[str, EventSource] = {}
+        self._states: list[_ConsumerState] = []
+        self._tasks: list[asyncio.Task[None]] = []
+
+    async def run(self) -> None:
+        self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    def start(self) -> None:
+        """Start every consumer on the running loop."""
+        if self._tasks:
+            return
+        for consumer in self.consumers:
+            source = self._source_factory(consumer)
+            self.sources[consumer.name] = source
+            state = _ConsumerState(consumer, source, asyncio.Semaphore(consumer.concurrency))
+            self._states.append(state)
+            self._tasks.append(asyncio.create_task(self._consume(state), name=f"consumer:{consumer.name}"))
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for state in self._states:
+            tasks.extend(batch.task for batch in state.in_flight)
+        self._states = []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for source in self.sources.values():
+            source.close()
+        self.sources.clear()
+
+    async def _consume(self, state: _ConsumerState) -> None:
+        name = state.consumer.name
+        while True:
+            await state.slots.acquire()
+            try:
+                deliveries = await state.source.read(state.consumer.batch_size)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                state.slots.release()
+                logger.exception("consumer_read_failed name=%s", name)
+                self._metrics.inc(f"consumers.{name}.read_errors")
+                await asyncio.sleep(self._retry_delays[0] if self._retry_delays else 1.0)
+                continue
+            if not deliveries:
+                state.slots.release()
+                continue
+            events = [delivery.event for delivery in deliveries if state.consumer.accepts(delivery.event.type)]
+            batch = _Batch(deliveries, asyncio.create_task(self._handle(state.consumer, events)))
+            state.in_flight.append(batch)
+            self._metrics.set_gauge(f"consumers.{name}.pending_batches", len(state.in_flight))
+            batch.task.add_done_callback(lambda _: self._on_batch_done(state))
+
+    def _on_batch_done(self, state: _ConsumerState) -> None:
+        state.slots.release()
+        asyncio.ensure_future(self._commit(state))
+
+    async def _commit(self, state: _ConsumerState) -> None:
+        # Positions advance in read order: a batch finishing early waits for the ones before it.
+        async with state.commit_lock:
+            ready: list[Delivery] = []
+            # A batch cancelled by ``stop`` is never acknowledged, nor is anything read after it.
+            while state.in_flight and state.in_flight[0].task.done() and not state.in_flight[0].task.cancelled():
+                ready.extend(state.in_flight.popleft().deliveries)
+            if not ready:
+                return
+            name = state.consumer.name
+            try:
+                await state.source.ack(ready)
+            except Exception:
+                # Unacknowledged events are delivered again; handlers see them at least once.
+                logger.exception("consumer_ack_failed name=%s events=%s", name, len(ready))
+                self._metrics.inc(f"consumers.{name}.ack_errors")
+            self._metrics.set_gauge(f"consumers.{name}.pending_batches", len(state.in_flight))
+            lag = (datetime.now(UTC) - ready[-1].event.created_at).total_seconds()
+            self._metrics.set_gauge(f"consumers.{name}.lag_seconds", max(lag, 0.0))
+            backlog = getattr(state.source, "backlog", None)
+            if backlog is not None:
+                self._metrics.set_gauge(f"consumers.{name}.backlog", backlog())
+
+    async def _handle(self, consumer: Consumer, events: list[Event]) -> None:
+        if not events:
+            return
+        for attempt in range(len(self._retry_delays) + 1):
+            try:
+                if inspect.iscoroutinefunction(consumer.handler):
+                    await consumer.handler(events)
+                else:
+                    await asyncio.to_thread(consumer.handler, events)
+            except Exception:
+                logger.exception("consumer_failed name=%s attempt=%s events=%s", consumer.name, attempt + 1, len(events))
+                if attempt == len(self._retry_delays):
+                    self._metrics.inc(f"consumers.{consumer.name}.failed", len(events))
+                    return
+                self._metrics.inc(f"consumers.{consumer.name}.retries")
+                await asyncio.sleep(self._retry_delays[attempt])
+            else:
+                self._metrics.inc(f"consumers.{consumer.name}.processed", len(events))
+                self._metrics.inc(f"consumers.{consumer.name}.batches")
+                return
+
+
+def build_consumer_runtime(
+    settings: Settings, bus: InMemoryEventBus, registry: ConsumerRegistry = CONSUMERS
+) -> ConsumerRuntime:
+    import app.workers.handlers  # noqa: F401  (registers the built-in consumers)
+
+    backend = settings.event_bus_backend.strip().lower()
+    if backend == "redis_streams":
+        from app.services.orchestration.redis_streams import build_stream_consumer
+
+        def stream_source(consumer: Consumer) -> EventSource:
+            group = f"{settings.event_stream_group}.{consumer.name}"
+            return StreamSource(build_stream_consumer(settings, group=group, batch_size=consumer.batch_size))
+
+        return ConsumerRuntime(list(registry), stream_source)
+    return ConsumerRuntime(list(registry), lambda consumer: OutboxSource(bus, name=consumer.name))
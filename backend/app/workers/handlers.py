@@ -0,0 +1,16 @@
+"""Consumers run by ``app.workers.runner``; importing this module registers them on ``CONSUMERS``."""
+
+from __future__ import annotations
+
+import logging
+
+from app.services.orchestration.event_bus import Event
+from app.workers.consumers import CONSUMERS
+
+logger = logging.getLogger(__name__)
+
+
+@CONSUMERS.register("event_log", batch_size=200)
+def log_events(events: list[Event]) -> None:
+    for event in events:
+        logger.info("processed event id=%s type=%s workspace=%s", event.id, event.type, event.workspace_id)
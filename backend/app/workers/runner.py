@@ -1,23 +1,24 @@
 from __future__ import annotations
 
 import asyncio
-import logging
 
+from app.core.config import get_settings
+from app.core.logging import configure_logging
 from app.services.orchestration.event_bus import EVENT_BUS
+from app.workers.consumers import build_consumer_runtime
 
-logger = logging.getLogger(__name__)
 
-
-async def outbox_logger() -> None:
-    index = 0
-    while True:
-        await asyncio.sleep(2)
-        outbox = EVENT_BUS.outbox
-        if len(outbox) > index:
-            for event in outbox[index:]:
-                logger.info("processed event id=%s type=%s workspace=%s", event.id, event.type, event.workspace_id)
-            index = len(outbox)
+async def main() -> None:
+    configure_logging()
+    settings = get_settings()
+    if settings.event_bus_backend.strip().lower() != "redis_streams":
+        # The in-memory outbox lives in the API process; a separate runner would read an empty one.
+        raise RuntimeError(
+            "The standalone event runner requires EVENT_BUS_BACKEND=redis_streams; "
+            "with the in-memory bus, run consumers in the API process (EVENT_CONSUMERS_IN_API=true)"
+        )
+    await build_consumer_runtime(settings, EVENT_BUS).run()
 
 
 if __name__ == "__main__":
-    asyncio.run(outbox_logger())
+    asyncio.run(main())
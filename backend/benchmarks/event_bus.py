@@ -0,0 +1,135 @@
+"""Publish cost and delivery latency of the in-memory and Redis Streams event buses.
+
+    uv run python -m benchmarks.event_bus --redis-url redis://localhost:6379/15 --events 20000
+
+Publishers call ``publish`` from threadpool threads, as the sync routes do, spread over a number of
+workspaces; every workspace has subscribers on an event loop. ``memory`` delivers within one
+process. ``redis_streams`` runs two buses in this process standing in for two API workers: events
+are published on one and the reported latency is for subscribers of the other, so it includes the
+batched ``XADD`` and the peer's ``XREAD`` (the publishing bus has no subscribers of its own, so its
+publish rate leaves out local delivery). It then drains the streams through a consumer group the
+way background workers do. Keys use a throwaway prefix and are deleted afterwards.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from uuid import uuid4
+
+from app.core.metrics import MetricsRegistry
+from app.services.orchestration.event_bus import InMemoryEventBus, Subscription
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def _drain(subscription: Subscription, expected: int, latencies: list[float]) -> None:
+    for _ in range(expected):
+        event = await subscription.get()
+        latencies.append((datetime.now(UTC) - event.created_at).total_seconds() * 1000)
+
+
+async def _measure(
+    publisher: InMemoryEventBus, receiver: InMemoryEventBus, args: argparse.Namespace
+) -> tuple[float, list[float]]:
+    workspaces = [f"ws-{index:03d}" for index in range(args.workspaces)]
+    per_workspace = args.events // len(workspaces)
+    subscriptions = [receiver.subscribe(workspace_id) for workspace_id in workspaces for _ in range(args.subscribers)]
+    # Give a streams reader time to start following the new workspaces.
+    await asyncio.sleep(0.5 if receiver is not publisher else 0)
+    latencies: list[float] = []
+    drains = [asyncio.create_task(_drain(subscription, per_workspace, latencies)) for subscription in subscriptions]
+
+    def publish(workspace_id: str) -> None:
+        for index in range(per_workspace):
+            publisher.publish("task.updated", workspace_id, {"task_id": f"t{index}", "status": "in_progress"})
+
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        await asyncio.gather(*(loop.run_in_executor(pool, publish, workspace_id) for workspace_id in workspaces))
+    publish_seconds = time.perf_counter() - started
+    await asyncio.wait_for(asyncio.gather(*drains), timeout=args.timeout)
+    return per_workspace * len(workspaces) / publish_seconds, latencies
+
+
+def _report(mode: str, publish_rate: float, latencies: list[float]) -> None:
+    print(
+        f"{mode:>14}  publish {publish_rate:>10,.0f} events/s   delivered {len(latencies):>8,}   "
+        f"p50 {_percentile(latencies, 0.5):7.2f} ms   p99 {_percentile(latencies, 0.99):7.2f} ms   "
+        f"mean {statistics.fmean(latencies) if latencies else 0.0:7.2f} ms"
+    )
+
+
+def _run_memory(args: argparse.Namespace) -> None:
+    bus = InMemoryEventBus(queue_size=args.events, metrics=MetricsRegistry())
+    publish_rate, latencies = asyncio.run(_measure(bus, bus, args))
+    _report("memory", publish_rate, latencies)
+
+
+def _run_streams(args: argparse.Namespace) -> None:
+    import redis
+
+    from app.services.orchestration.redis_streams import RedisStreamsEventBus, StreamGroupConsumer
+
+    prefix = f"kobo-bench-{uuid4().hex[:8]}"
+    buses = [
+        RedisStreamsEventBus(args.redis_url, prefix=prefix, node_id=name, queue_size=args.events, metrics=MetricsRegistry())
+        for name in ("a", "b")
+    ]
+    for bus in buses:
+        bus.start()
+    client = redis.Redis.from_url(args.redis_url, decode_responses=True)
+    try:
+        publish_rate, latencies = asyncio.run(_measure(buses[0], buses[1], args))
+        _report("redis_streams", publish_rate, latencies)
+
+        consumer = StreamGroupConsumer(client, prefix=prefix, batch_size=args.batch, block_ms=100, metrics=MetricsRegistry())
+        consumer.refresh()
+        expected = args.events // args.workspaces * args.workspaces
+        consumed = 0
+        started = time.perf_counter()
+        while consumed < expected:
+            entries = consumer.read()
+            consumer.ack(entries)
+            consumed += len(entries)
+        elapsed = time.perf_counter() - started
+        print(f"{'consumer group':>14}  drained {consumed:,} events in {elapsed:.2f}s ({consumed / elapsed:,.0f} events/s)")
+    finally:
+        for bus in buses:
+            bus.close()
+        keys = list(client.scan_iter(f"{prefix}:*"))
+        if keys:
+            client.delete(*keys)
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20_000, help="total events across all workspaces")
+    parser.add_argument("--workspaces", type=int, default=20)
+    parser.add_argument("--subscribers", type=int, default=2, help="subscribers per workspace")
+    parser.add_argument("--threads", type=int, default=8, help="publishing threads")
+    parser.add_argument("--batch", type=int, default=500, help="consumer group read size per stream")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds to wait for delivery")
+    parser.add_argument("--redis-url", default="", help="Redis for the redis_streams mode; skipped when empty")
+    args = parser.parse_args()
+
+    _run_memory(args)
+    if args.redis_url:
+        _run_streams(args)
+    else:
+        print(f"{'redis_streams':>14}  skipped (no --redis-url)")
+
+
+if __name__ == "__main__":
+    main()
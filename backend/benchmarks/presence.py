@@ -0,0 +1,148 @@
+"""Cost of Office-mode presence as rooms grow, with moves broadcast immediately or batched per tick.
+
+    uv run python -m benchmarks.presence --sizes 10,50,100,200 --move-hz 20 --seconds 3
+
+Every participant of a room moves ``--move-hz`` times a second through ``PresenceHub.update``, as
+``presence.move`` messages do; sockets are in-process fakes that decode each frame. For each room size
+the benchmark runs with a tick rate of 0 (every move is sent to every socket), with ``--tick-hz``,
+and with ``--tick-hz`` plus the compact ``--encoding`` and a ``--view-size`` square view around each
+client. It reports the moves the loop managed against the target, frames and bytes sent per second, event-loop
+CPU, how stale a participant's position is when a client receives it and how many clients were
+evicted for falling ``--send-buffer`` frames behind.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from app.core.metrics import MetricsRegistry
+from app.services.realtime.interest import ENCODINGS, View, decode_binary
+from app.services.realtime.presence import PresenceHub
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class _Socket:
+    def __init__(self, stats: dict[str, Any], hub: PresenceHub, sample: bool) -> None:
+        self._stats = stats
+        self._hub = hub
+        self._sample = sample
+
+    async def send_text(self, message: str) -> None:
+        self._stats["frames"] += 1
+        self._stats["bytes"] += len(message)
+        if self._sample:
+            frame = json.loads(message)
+            items = frame.get("participants") or frame.get("updates") or [frame.get("participant") or {}]
+            self._record(str(item.get("id")) for item in items)
+
+    async def send_bytes(self, message: bytes) -> None:
+        self._stats["frames"] += 1
+        self._stats["bytes"] += len(message)
+        if self._sample:
+            slots = {slot: participant_id for participant_id, slot in self._hub.rooms["bench"].slots.items()}
+            self._record(slots.get(update.slot, "") for update in decode_binary(message))
+
+    async def close(self, code: int = 1000) -> None:
+        self._stats["evicted"] += 1
+
+    def _record(self, participant_ids: Iterable[str]) -> None:
+        now = time.perf_counter()
+        moved_at = self._stats["moved_at"]
+        self._stats["staleness"].extend((now - moved_at[pid]) * 1000 for pid in participant_ids if pid in moved_at)
+
+
+async def _room(size: int, tick_hz: float, encoding: str, view_size: float, args: argparse.Namespace) -> dict[str, Any]:
+    hub = PresenceHub(tick_hz=tick_hz, send_buffer=args.send_buffer, metrics=MetricsRegistry())
+    stats: dict[str, Any] = {"frames": 0, "bytes": 0, "moves": 0, "evicted": 0, "staleness": [], "moved_at": {}}
+    rng = random.Random(size)
+    participants = [
+        {"id": f"user:{index}", "kind": "user", "name": f"User {index}", "status": "online",
+         "x": rng.uniform(2, 98), "y": rng.uniform(2, 95), "avatar_key": "char2"}
+        for index in range(size)
+    ]
+    sockets = []
+    for index, participant in enumerate(participants):
+        view = None
+        if view_size:
+            half = view_size / 2
+            view = View(participant["x"] - half, participant["y"] - half, participant["x"] + half, participant["y"] + half)
+        # One socket decodes its frames to measure staleness; the rest only count them.
+        socket = _Socket(stats, hub, sample=index == 0)
+        await hub.join("bench", socket, participant, encoding=encoding, view=view)  # type: ignore[arg-type]
+        sockets.append(socket)
+    for socket in sockets:
+        hub.snapshot("bench", socket, participants)  # type: ignore[arg-type]
+    await asyncio.sleep(0.05)
+    stats.update(frames=0, bytes=0)
+
+    stop = time.perf_counter() + args.seconds
+
+    async def move(participant: dict[str, Any], offset: float) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + offset
+        while time.perf_counter() < stop:
+            deadline += 1.0 / args.move_hz
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            participant["x"] = min(98.0, max(2.0, participant["x"] + rng.uniform(-0.5, 0.5)))
+            participant["y"] = min(95.0, max(2.0, participant["y"] + rng.uniform(-0.5, 0.5)))
+            stats["moved_at"][participant["id"]] = time.perf_counter()
+            await hub.update("bench", participant)
+            stats["moves"] += 1
+
+    cpu_started, started = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(move(participant, index / size / args.move_hz) for index, participant in enumerate(participants)))
+    await hub.flush("bench")
+    # Let the connections' writers drain what was queued.
+    await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    stats["elapsed"] = elapsed
+    stats["cpu"] = (time.process_time() - cpu_started) / elapsed
+    return stats
+
+
+def _report(size: int, mode: str, stats: dict[str, Any], args: argparse.Namespace) -> None:
+    elapsed = stats["elapsed"]
+    target = size * args.move_hz
+    print(
+        f"{size:>5}  {mode:>22}  moves {stats['moves'] / elapsed:>8,.0f}/s of {target:>6,.0f}   "
+        f"frames {stats['frames'] / elapsed:>10,.0f}/s   {stats['bytes'] / elapsed / 1024:>9,.0f} KiB/s   "
+        f"cpu {stats['cpu']:>4.0%}   staleness p50 {_percentile(stats['staleness'], 0.5):7.1f} ms   "
+        f"p99 {_percentile(stats['staleness'], 0.99):7.1f} ms   evicted {stats['evicted']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,50,100,200", help="comma-separated room sizes")
+    parser.add_argument("--move-hz", type=float, default=20.0, help="moves per participant per second")
+    parser.add_argument("--tick-hz", type=float, default=15.0, help="batched tick rate to compare")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="binary", help="encoding of the third, batched run")
+    parser.add_argument("--view-size", type=float, default=30.0, help="side of each client's view in map percent; 0 for the whole map")
+    parser.add_argument("--send-buffer", type=int, default=32, help="frames queued per socket before eviction")
+    parser.add_argument("--seconds", type=float, default=3.0, help="duration per run")
+    args = parser.parse_args()
+
+    runs = [("immediate", 0.0, "full", 0.0), (f"tick {args.tick_hz:g} Hz", args.tick_hz, "full", 0.0)]
+    if args.encoding != "full" or args.view_size:
+        view = f" view {args.view_size:g}" if args.view_size else ""
+        runs.append((f"tick {args.encoding}{view}", args.tick_hz, args.encoding, args.view_size))
+    print(f"{'room':>5}  {'mode':>22}")
+    for size in (int(value) for value in args.sizes.split(",") if value.strip()):
+        for mode, tick_hz, encoding, view_size in runs:
+            _report(size, mode, asyncio.run(_room(size, tick_hz, encoding, view_size, args)), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Bytes per entity for legacy dict rows vs the typed records in ``app.core.records``.
+
+    uv run python -m benchmarks.record_memory --count 100000
+
+Both shapes are built from freshly allocated strings, as they are when values arrive through a
+request body or a WAL replay, and measured with ``tracemalloc`` (container, field values and any
+per-row strings; interned/shared values are counted once).
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import tracemalloc
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from app.core.records import AuditRecord, EvidenceEntry, TaskRecord, TimelineStage
+
+BASE_TIME = datetime(2026, 1, 1, tzinfo=UTC)
+STATUSES = ("todo", "in_progress", "review", "done")
+PRIORITIES = ("low", "medium", "high", "urgent")
+ACTIONS = ("task.create", "task.update", "agent.run", "approval.approve")
+STAGES = ("router", "planner", "retrieve", "execute", "critic", "verifier")
+WORKSPACES = 100
+
+
+def _fresh(value: str) -> str:
+    # A new str object with the same contents, like one decoded from JSON.
+    return "".join(list(value))
+
+
+def _task(index: int) -> dict[str, Any]:
+    timestamp = BASE_TIME + timedelta(milliseconds=index)
+    return {
+        "id": f"00000000-0000-4000-8000-{index:012d}",
+        "workspace_id": _fresh(f"ws-{index % WORKSPACES:04d}"),
+        "project_id": None,
+        "title": f"Task {index}",
+        "description": None,
+        "status": _fresh(STATUSES[index % len(STATUSES)]),
+        "priority": _fresh(PRIORITIES[index % len(PRIORITIES)]),
+        "acceptance_criteria": [],
+        "assignee_user_id": None,
+        "assignee_agent_role": _fresh("builder"),
+        "proof_exempt": False,
+        "created_at": timestamp,
+        "updated_at": timestamp,
+    }
+
+
+def _audit(index: int) -> dict[str, Any]:
+    return {
+        "id": f"00000000-0000-4000-9000-{index:012d}",
+        "workspace_id": _fresh(f"ws-{index % WORKSPACES:04d}"),
+        "actor_type": _fresh("user"),
+        "actor_id": _fresh(f"user-{index % 50:04d}"),
+        "action": _fresh(ACTIONS[index % len(ACTIONS)]),
+        "entity_type": _fresh("task"),
+        "entity_id": f"task-{index // 10:08d}",
+        "payload": {},
+        "created_at": BASE_TIME + timedelta(milliseconds=index),
+    }
+
+
+def _evidence(index: int) -> dict[str, Any]:
+    return {
+        "id": f"00000000-0000-4000-a000-{index:012d}",
+        "workspace_id": _fresh(f"ws-{index % WORKSPACES:04d}"),
+        "task_id": _fresh(f"task-{index // 10:08d}"),
+        "run_id": _fresh(f"run-{index // 5:08d}"),
+        "claim": f"Claim {index}",
+        "source_type": _fresh("artifact"),
+        "source_ref": f"artifact-{index}",
+        "confidence": 0.8,
+        "created_at": BASE_TIME + timedelta(milliseconds=index),
+    }
+
+
+def _stage(index: int) -> dict[str, Any]:
+    return {
+        "id": f"00000000-0000-4000-b000-{index:012d}",
+        "run_id": _fresh(f"run-{index // len(STAGES):08d}"),
+        "task_id": _fresh(f"task-{index // 60:08d}"),
+        "workspace_id": _fresh(f"ws-{index % WORKSPACES:04d}"),
+        "stage": _fresh(STAGES[index % len(STAGES)]),
+        "agent_role": _fresh("builder"),
+        "title": _fresh("Planning"),
+        "summary": _fresh("Built staged execution plan with risk checks."),
+        "status": _fresh("completed"),
+        "metadata": {},
+        "created_at": BASE_TIME + timedelta(milliseconds=index),
+    }
+
+
+def _legacy(row: dict[str, Any]) -> dict[str, Any]:
+    # The previous representation: plain dicts with ISO-8601 timestamp strings.
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+
+def _measure(build: Callable[[int], Any], count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    rows = [build(index) for index in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return (after - before) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    entities: list[tuple[str, Callable[[int], dict[str, Any]], Any]] = [
+        ("task", _task, TaskRecord),
+        ("audit row", _audit, AuditRecord),
+        ("evidence entry", _evidence, EvidenceEntry),
+        ("timeline stage", _stage, TimelineStage),
+    ]
+    print(f"count={args.count:,}")
+    print(f"{'entity':<16} {'dict + ISO (B)':>15} {'record (B)':>11} {'saved':>7}")
+    for name, make, record_type in entities:
+        legacy = _measure(lambda index: _legacy(make(index)), args.count)
+        typed = _measure(lambda index: record_type.from_mapping(make(index)), args.count)
+        print(f"{name:<16} {legacy:>15.0f} {typed:>11.0f} {100 * (legacy - typed) / legacy:>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Concurrent writers against the in-memory store, with and without workspace locks.
+
+    uv run python -m benchmarks.store_concurrency --threads 16 --workspaces 64 --ops 20000
+
+Worker threads call the sync route handlers directly, as FastAPI's threadpool does: subtask
+create/reorder/delete/list, task status add/reorder, plus member churn that crosses workspaces.
+Each mode runs the same workload and then checks the store's invariants (contiguous subtask and
+status orders, no lost writes, membership indexes matching member lists). ``none`` disables
+locking to show what the locks prevent; ``global`` is a single lock for the whole store;
+``sharded`` is the default per-workspace pool. The thread switch interval is lowered so
+interleavings that are rare in production show up within one run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from fastapi import HTTPException
+
+from app.api.v1 import tasks as task_routes
+from app.api.v1 import workspaces as workspace_routes
+from app.core.locks import DEFAULT_SHARDS, ShardLocks
+from app.core.metrics import METRICS
+from app.core.records import TaskRecord
+from app.core.store import STORE
+from app.domain.schemas import (
+    TaskStatusCreateIn,
+    TaskStatusUpdateIn,
+    TaskSubtaskCreateIn,
+    TaskSubtaskUpdateIn,
+)
+from app.repositories import REPOSITORIES
+
+_COUNTS_LOCK = threading.Lock()
+
+
+class _NoLocks(ShardLocks):
+    @contextmanager
+    def hold(self, *keys: str) -> Iterator[None]:
+        yield
+
+
+def _reset() -> None:
+    for name in (
+        "users",
+        "users_by_username",
+        "workspaces",
+        "workspace_members",
+        "user_memberships",
+        "workspace_task_statuses",
+        "tasks",
+        "task_subtasks",
+        "workspace_actions_required",
+    ):
+        getattr(STORE, name).clear()
+
+
+def _setup(workspaces: int, tasks_per_workspace: int) -> tuple[dict[str, object], list[str], dict[str, list[str]]]:
+    owner: dict[str, object] = {"id": "owner", "username": "owner"}
+    REPOSITORIES.users.add(dict(owner))
+    workspace_ids: list[str] = []
+    tasks: dict[str, list[str]] = {}
+    now = STORE.now()
+    for index in range(workspaces):
+        workspace_id = f"ws-{index:04d}"
+        REPOSITORIES.workspaces.add({"id": workspace_id, "name": workspace_id, "invite_token": workspace_id})
+        REPOSITORIES.workspaces.add_member(workspace_id, "owner", "owner")
+        STORE.workspace_task_statuses[workspace_id] = [dict(item) for item in workspace_routes.DEFAULT_TASK_STATUSES]
+        workspace_ids.append(workspace_id)
+        tasks[workspace_id] = []
+        for _ in range(tasks_per_workspace):
+            task_id = STORE.new_id()
+            REPOSITORIES.tasks.add(
+                TaskRecord(
+                    id=task_id,
+                    workspace_id=workspace_id,
+                    title="Task",
+                    status="todo",
+                    priority="medium",
+                    created_at=now,
+                    updated_at=now,
+                )
+            )
+            tasks[workspace_id].append(task_id)
+    return owner, workspace_ids, tasks
+
+
+def _worker(
+    seed: int,
+    ops: int,
+    owner: dict[str, object],
+    workspace_ids: list[str],
+    tasks: dict[str, list[str]],
+    counts: Counter[str],
+    errors: list[BaseException],
+) -> None:
+    rng = random.Random(seed)
+    local: Counter[str] = Counter()
+    churn_user = f"churn-{seed}"
+    try:
+        for op in range(ops):
+            workspace_id = rng.choice(workspace_ids)
+            task_id = rng.choice(tasks[workspace_id])
+            roll = rng.random()
+            try:
+                if roll < 0.35:
+                    task_routes.create_subtask(
+                        task_id, TaskSubtaskCreateIn(title="s", order=rng.randrange(8)), user=owner
+                    )
+                    local["subtasks_created"] += 1
+                elif roll < 0.55:
+                    items = STORE.task_subtasks.get(task_id) or []
+                    if items:
+                        subtask_id = str(rng.choice(items)["id"])
+                        task_routes.update_subtask(
+                            task_id, subtask_id, TaskSubtaskUpdateIn(order=rng.randrange(8)), user=owner
+                        )
+                elif roll < 0.65:
+                    items = STORE.task_subtasks.get(task_id) or []
+                    if items:
+                        task_routes.delete_subtask(task_id, str(rng.choice(items)["id"]), user=owner)
+                        local["subtasks_deleted"] += 1
+                elif roll < 0.80:
+                    task_routes.list_subtasks(task_id, user=owner)
+                elif roll < 0.85:
+                    key = f"s{seed}-{op}"
+                    workspace_routes.add_task_status(workspace_id, TaskStatusCreateIn(key=key, label=key), user=owner)
+                    local["statuses_added"] += 1
+                elif roll < 0.92:
+                    statuses = STORE.workspace_task_statuses.get(workspace_id) or []
+                    if statuses:
+                        workspace_routes.update_task_status(
+                            workspace_id,
+                            str(rng.choice(statuses)["key"]),
+                            TaskStatusUpdateIn(order=rng.randrange(len(statuses))),
+                            user=owner,
+                        )
+                elif roll < 0.96:
+                    REPOSITORIES.workspaces.add_member(workspace_id, churn_user, "member")
+                else:
+                    REPOSITORIES.workspaces.remove_member(workspace_id, churn_user)
+            except HTTPException:
+                # A subtask picked from a snapshot may already be gone; that is expected.
+                local["http_errors"] += 1
+    except BaseException as exc:
+        errors.append(exc)
+    with _COUNTS_LOCK:
+        counts.update(local)
+
+
+def _violations(workspace_ids: list[str], tasks: dict[str, list[str]], counts: Counter[str]) -> list[str]:
+    problems: list[str] = []
+    subtasks = 0
+    for task_ids in tasks.values():
+        for task_id in task_ids:
+            items = STORE.task_subtasks.get(task_id) or []
+            subtasks += len(items)
+            if [item["order"] for item in items] != list(range(len(items))):
+                problems.append(f"subtask order gap on {task_id}")
+            if len({item["id"] for item in items}) != len(items):
+                problems.append(f"duplicate subtask on {task_id}")
+    expected = counts["subtasks_created"] - counts["subtasks_deleted"]
+    if subtasks != expected:
+        problems.append(f"lost subtask writes: {subtasks} stored, {expected} expected")
+    statuses = 0
+    for workspace_id in workspace_ids:
+        items = STORE.workspace_task_statuses.get(workspace_id) or []
+        statuses += len(items)
+        if [item["order"] for item in items] != list(range(len(items))):
+            problems.append(f"status order gap on {workspace_id}")
+    expected = counts["statuses_added"] + len(workspace_ids) * len(workspace_routes.DEFAULT_TASK_STATUSES)
+    if statuses != expected:
+        problems.append(f"lost status writes: {statuses} stored, {expected} expected")
+    for workspace_id in workspace_ids:
+        for member in STORE.workspace_members.get(workspace_id, []):
+            if STORE.membership(workspace_id, str(member["user_id"])) is not member:
+                problems.append(f"membership index out of sync on {workspace_id}")
+    for user_id, memberships in STORE.user_memberships.items():
+        for workspace_id, member in memberships.items():
+            if not any(item is member for item in STORE.workspace_members.get(workspace_id, [])):
+                problems.append(f"dangling membership {user_id}@{workspace_id}")
+    return problems
+
+
+def _run(mode: str, args: argparse.Namespace) -> None:
+    _reset()
+    locks = {"none": _NoLocks(1), "global": ShardLocks(1), "sharded": ShardLocks(args.shards)}[mode]
+    STORE.set_locks(locks)
+    METRICS.reset()
+    owner, workspace_ids, tasks = _setup(args.workspaces, args.tasks_per_workspace)
+    counts: Counter[str] = Counter()
+    errors: list[BaseException] = []
+    per_thread = args.ops // args.threads
+    threads = [
+        threading.Thread(
+            target=_worker, args=(args.seed + index, per_thread, owner, workspace_ids, tasks, counts, errors)
+        )
+        for index in range(args.threads)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    problems = _violations(workspace_ids, tasks, counts)
+    print(
+        f"{mode:<8} {per_thread * args.threads / elapsed:>10,.0f} ops/s"
+        f" {int(METRICS.counter('store.shard_lock.contended')):>10,} contended"
+        f" {len(errors):>5} crashed {len(problems):>6} violations"
+    )
+    for problem in problems[:3]:
+        print(f"         - {problem}")
+    for exc in errors[:3]:
+        print(f"         ! {type(exc).__name__}: {exc}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--workspaces", type=int, default=64)
+    parser.add_argument("--tasks-per-workspace", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=20_000, help="total operations across all threads")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS)
+    parser.add_argument("--switch-interval", type=float, default=1e-5, help="sys.setswitchinterval seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--modes", nargs="+", choices=("none", "global", "sharded"), default=["none", "global", "sharded"])
+    args = parser.parse_args()
+
+    sys.setswitchinterval(args.switch_interval)
+    print(
+        f"threads={args.threads} workspaces={args.workspaces} ops={args.ops:,} shards={args.shards}"
+        f" switch_interval={args.switch_interval}"
+    )
+    for mode in args.modes:
+        _run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Recovery time and steady-state write overhead of the store snapshot + WAL.
+
+    uv run python -m benchmarks.store_persistence --tasks 1000000 --audit-rows 10000000
+
+Writes go through the same paths the API uses (``IndexedTable`` puts, task saves and
+``AuditLog.append``). Each phase drops the previous store so peak memory stays at roughly one
+populated store.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import shutil
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from functools import partial
+from pathlib import Path
+
+from app.core.persistence import StorePersistence
+from app.core.store import InMemoryStore
+
+BASE_TIME = datetime(2026, 1, 1, tzinfo=UTC)
+WORKSPACES = 100
+
+
+def _populate(store: InMemoryStore, tasks: int, audit_rows: int) -> None:
+    for index in range(tasks):
+        created_at = (BASE_TIME + timedelta(milliseconds=index)).isoformat()
+        store.tasks[f"task-{index}"] = {
+            "id": f"task-{index}",
+            "workspace_id": f"ws-{index % WORKSPACES}",
+            "project_id": None,
+            "title": f"Task {index}",
+            "description": None,
+            "status": "todo",
+            "priority": "medium",
+            "acceptance_criteria": [],
+            "assignee_user_id": None,
+            "assignee_agent_role": None,
+            "proof_exempt": False,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+    for index in range(audit_rows):
+        store.audit_logs.append(
+            {
+                "id": f"log-{index}",
+                "workspace_id": f"ws-{index % WORKSPACES}",
+                "actor_type": "user",
+                "actor_id": "user-1",
+                "action": "task.update",
+                "entity_type": "task",
+                "entity_id": f"task-{index % max(tasks, 1)}",
+                "payload": {"status": "in_progress"},
+                "created_at": (BASE_TIME + timedelta(microseconds=index)).isoformat(),
+            }
+        )
+
+
+def _timed(label: str, fn: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<44} {elapsed:>9.3f}s")
+    return elapsed
+
+
+def _dir_size(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.iterdir())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--audit-rows", type=int, default=10_000_000)
+    parser.add_argument("--sync-ms", type=int, default=50)
+    parser.add_argument("--dir", type=Path, default=None, help="data directory (default: temporary)")
+    args = parser.parse_args()
+
+    directory = args.dir or Path(tempfile.mkdtemp(prefix="kobo-store-bench-"))
+    shutil.rmtree(directory, ignore_errors=True)
+    print(f"tasks={args.tasks:,} audit_rows={args.audit_rows:,} sync_ms={args.sync_ms} dir={directory}")
+
+    baseline_store = InMemoryStore()
+    baseline = _timed("write, no persistence", partial(_populate, baseline_store, args.tasks, args.audit_rows))
+    del baseline_store
+    gc.collect()
+
+    store = InMemoryStore()
+    persistence = StorePersistence(store, directory, snapshot_interval_seconds=0, sync_ms=args.sync_ms)
+    persistence.open()
+    journaled = _timed("write, WAL enabled", partial(_populate, store, args.tasks, args.audit_rows))
+    _timed("WAL final flush", persistence.flush)
+    ops = args.tasks + args.audit_rows
+    print(f"{'WAL write overhead':<44} {100 * (journaled - baseline) / max(baseline, 1e-9):>8.1f}%")
+    print(f"{'per-op overhead':<44} {1e6 * (journaled - baseline) / max(ops, 1):>8.2f}us")
+    print(f"{'WAL size':<44} {_dir_size(directory) / 2**20:>8.1f}MiB")
+
+    persistence.close(snapshot=False)
+    del store, persistence
+    gc.collect()
+    recovered = InMemoryStore()
+    stats = StorePersistence(recovered, directory).recover()
+    print(f"{'recovery, WAL replay only':<44} {stats.replay_seconds:>9.3f}s ({stats.replayed_ops:,} ops)")
+
+    persistence = StorePersistence(recovered, directory, snapshot_interval_seconds=0, sync_ms=args.sync_ms)
+    persistence.open(background=False)
+    snapshot = persistence.snapshot()
+    print(f"{'snapshot write':<44} {snapshot.seconds:>9.3f}s ({snapshot.bytes_written / 2**20:.1f}MiB)")
+    persistence.close(snapshot=False)
+    del recovered, persistence
+    gc.collect()
+
+    restored = InMemoryStore()
+    stats = StorePersistence(restored, directory).recover()
+    print(f"{'recovery, snapshot load':<44} {stats.snapshot_seconds:>9.3f}s")
+    assert len(restored.tasks) == args.tasks and len(restored.audit_logs) == args.audit_rows
+
+    if args.dir is None:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,571 @@
+"""End-to-end load test of the workspace WebSockets: event fan-out and Office-mode presence.
+
+    uv run python -m benchmarks.ws_fanout --event-clients 2000 --presence-clients 400 --workspaces 20
+    uv run python -m benchmarks.ws_fanout --transport uvicorn --event-clients 5000 --seconds 10
+
+Runs the FastAPI app in this process (startup and shutdown included) and opens ``--event-clients``
+sockets on ``/ws/workspaces/{id}/events`` and ``--presence-clients`` on ``/presence``, spread
+round-robin over ``--workspaces``, each as its own workspace member. Every workspace gets
+``--publish-hz`` ``EVENT_BUS.publish`` calls a second from threadpool threads, as the sync routes
+make them, and every presence client sends ``--move-hz`` ``presence.move`` messages a second.
+Clients answer pings like the frontend does.
+
+``asgi`` talks to the app through the ASGI WebSocket protocol on this event loop, so it measures the
+application (auth, subscriptions, ``EVENT_BUS`` delivery, ``PresenceHub`` ticks and writers) without
+any network or framing cost; ``uvicorn`` serves the app on a loopback port from a thread and
+connects real ``websockets`` clients, closer to what hardware has to carry. Raise ``ulimit -n``
+above the client count for the latter.
+
+It reports frames and bytes delivered per second, how far behind their targets publishing and
+moving fell, event delivery latency (``created_at`` to receipt) and presence staleness (move sent to
+received) percentiles from every ``--sample-every``-th client, server CPU and RSS. In ``asgi`` mode
+CPU is the whole process, clients included; in ``uvicorn`` mode it is also given for the server
+thread alone. App settings come from the environment as usual (``PRESENCE_TICK_HZ``,
+``EVENT_FRAME_WINDOW_MS``, ...); the per-workspace connection limit is lifted unless
+``--max-per-workspace`` is given. Sockets are opened ``--connect-rate`` a second; 0 opens them all
+at once, like every client reconnecting after a deploy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import threading
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
+from datetime import UTC, datetime
+from typing import Any, Protocol
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from app.core.config import get_settings
+from app.core.metrics import METRICS
+from app.core.security import create_token
+from app.main import app
+from app.repositories import REPOSITORIES
+from app.services.orchestration.event_bus import EVENT_BUS
+from app.services.realtime.connections import CONNECTIONS, PING
+from app.services.realtime.interest import ENCODINGS, decode_binary
+
+PONG = '{"type":"pong"}'
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _rss_mib() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return _peak_rss_mib()
+
+
+def _peak_rss_mib() -> float:
+    # Linux reports kilobytes.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _Client(Protocol):
+    close_code: int | None
+
+    async def connect(self) -> bool: ...
+
+    async def recv(self) -> str | bytes | None: ...
+
+    async def send(self, text: str) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class _AsgiClient:
+    """A WebSocket client speaking ASGI to the app directly."""
+
+    def __init__(self, path: str, query: dict[str, str], token: str) -> None:
+        self._scope: dict[str, Any] = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "scheme": "ws",
+            "server": ("bench", 80),
+            "client": ("127.0.0.1", 0),
+            "root_path": "",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(query).encode(),
+            "headers": [(b"cookie", f"{get_settings().access_cookie_name}={token}".encode())],
+            "subprotocols": [],
+        }
+        self._inbound: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._outbound: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._task: asyncio.Task[None] | None = None
+        self.close_code: int | None = None
+
+    async def connect(self) -> bool:
+        self._inbound.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self._run())
+        return await self.recv() == ""
+
+    async def _run(self) -> None:
+        try:
+            await app(self._scope, self._inbound.get, self._outbound.put)
+        finally:
+            self._outbound.put_nowait({"type": "websocket.close", "code": 1006})
+
+    async def recv(self) -> str | bytes | None:
+        """The next frame; ``""`` for the accept and None once the app has closed the socket."""
+        if self.close_code is not None:
+            return None
+        message = await self._outbound.get()
+        if message["type"] == "websocket.accept":
+            return ""
+        if message["type"] == "websocket.send":
+            return message["text"] if message.get("text") is not None else message["bytes"]
+        self.close_code = int(message.get("code", 1000))
+        return None
+
+    async def send(self, text: str) -> None:
+        self._inbound.put_nowait({"type": "websocket.receive", "text": text})
+
+    async def close(self) -> None:
+        self._inbound.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        if self._task is not None:
+            with suppress(Exception):
+                await asyncio.wait_for(self._task, 5.0)
+
+
+class _NetworkClient:
+    def __init__(self, base_url: str, path: str, query: dict[str, str], token: str) -> None:
+        self._url = f"{base_url}{path}?{urlencode(query)}"
+        self._cookie = f"{get_settings().access_cookie_name}={token}"
+        self._socket: Any = None
+        self.close_code: int | None = None
+
+    async def connect(self) -> bool:
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import InvalidStatus
+
+        try:
+            self._socket = await connect(
+                self._url,
+                additional_headers={"Cookie": self._cookie},
+                max_size=None,
+                ping_interval=None,
+                open_timeout=60,
+            )
+        except (InvalidStatus, OSError, TimeoutError):
+            self.close_code = 1006
+            return False
+        return True
+
+    async def recv(self) -> str | bytes | None:
+        from websockets.exceptions import ConnectionClosed
+
+        try:
+            return await self._socket.recv()
+        except ConnectionClosed as exc:
+            self.close_code = exc.rcvd.code if exc.rcvd is not None else 1006
+            return None
+
+    async def send(self, text: str) -> None:
+        from websockets.exceptions import ConnectionClosed
+
+        with suppress(ConnectionClosed):
+            await self._socket.send(text)
+
+    async def close(self) -> None:
+        if self._socket is not None:
+            with suppress(Exception):
+                await asyncio.wait_for(self._socket.close(), 5.0)
+
+
+class _Run:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.measuring = False
+        self.stopping = False
+        self.closing = False
+        self.stats: Counter[str] = Counter()
+        self.closes: Counter[int] = Counter()
+        self.latencies: list[float] = []
+        self.staleness: list[float] = []
+        self.moved_at: dict[str, float] = {}
+        self.published: Counter[str] = Counter()
+        self.received: Counter[str] = Counter()
+
+    def count(self, kind: str, frame: str | bytes) -> None:
+        if self.measuring:
+            self.stats[f"{kind}_frames"] += 1
+            self.stats[f"{kind}_bytes"] += len(frame)
+
+    async def events_client(self, client: _Client, workspace_id: str, sampled: bool) -> None:
+        while (frame := await client.recv()) is not None:
+            if frame == PING:
+                await client.send(PONG)
+                continue
+            self.count("event", frame)
+            if not sampled or not self.measuring:
+                continue
+            data = json.loads(frame)
+            now = datetime.now(UTC)
+            for event in data["events"] if data.get("type") == "events.batch" else [data]:
+                if event.get("type") == "task.updated":
+                    self.received[workspace_id] += 1
+                    self.latencies.append(
+                        (now - datetime.fromisoformat(event["created_at"])).total_seconds() * 1000
+                    )
+        self._closed(client)
+
+    async def presence_client(
+        self, client: _Client, participant_id: str, sampled: bool, rng: random.Random
+    ) -> None:
+        mover = asyncio.create_task(self._move(client, participant_id, rng))
+        slots: dict[int, str] = {}
+        try:
+            while (frame := await client.recv()) is not None:
+                if frame == PING:
+                    await client.send(PONG)
+                    continue
+                self.count("presence", frame)
+                if not sampled:
+                    continue
+                if isinstance(frame, bytes):
+                    seen = [slots.get(update.slot, "") for update in decode_binary(frame)]
+                else:
+                    data = json.loads(frame)
+                    items = (
+                        data.get("participants")
+                        or data.get("updates")
+                        or [data.get("participant") or {}]
+                    )
+                    # Delta and binary sockets learn participants' slots from ``n``.
+                    slots.update((item["n"], str(item.get("id"))) for item in items if "n" in item)
+                    seen = [str(item.get("id")) for item in items if "x" in item or "y" in item]
+                if self.measuring:
+                    now = time.perf_counter()
+                    self.staleness.extend(
+                        (now - self.moved_at[seen_id]) * 1000
+                        for seen_id in seen
+                        if seen_id in self.moved_at
+                    )
+        finally:
+            mover.cancel()
+            self._closed(client)
+
+    def _closed(self, client: _Client) -> None:
+        # Only closes by the server count; the sockets the harness closes at the end do not.
+        if not self.closing:
+            self.closes[client.close_code or 1000] += 1
+
+    async def _move(self, client: _Client, participant_id: str, rng: random.Random) -> None:
+        x, y = rng.uniform(2, 98), rng.uniform(2, 95)
+        loop = asyncio.get_running_loop()
+        while not self.measuring:
+            await asyncio.sleep(0.01)
+        deadline = loop.time() + rng.random() / self.args.move_hz
+        while not self.stopping:
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            if self.stopping:
+                break
+            deadline += 1.0 / self.args.move_hz
+            x = min(98.0, max(2.0, x + rng.uniform(-0.5, 0.5)))
+            y = min(95.0, max(2.0, y + rng.uniform(-0.5, 0.5)))
+            self.moved_at[participant_id] = time.perf_counter()
+            await client.send(json.dumps({"type": "presence.move", "x": x, "y": y}))
+            self.stats["moves"] += 1
+
+    def publish(self, workspace_ids: list[str]) -> None:
+        """Publish to ``workspace_ids`` in turn from this thread, ``--publish-hz`` a second each."""
+        interval = 1.0 / (self.args.publish_hz * len(workspace_ids))
+        deadline = time.perf_counter() + random.random() * interval
+        index = 0
+        while not self.stopping:
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if self.stopping:
+                break
+            deadline += interval
+            workspace_id = workspace_ids[index % len(workspace_ids)]
+            index += 1
+            payload = {"task_id": f"bench-{self.published[workspace_id]}", "status": "in_progress"}
+            EVENT_BUS.publish("task.updated", workspace_id, payload)
+            self.published[workspace_id] += 1
+
+
+def _seed(args: argparse.Namespace) -> tuple[list[str], list[tuple[str, str]]]:
+    """Workspaces and one member per client, with their access tokens."""
+    prefix = f"bench-{uuid4().hex[:6]}"
+    workspace_ids = [f"{prefix}-ws-{index:03d}" for index in range(args.workspaces)]
+    for workspace_id in workspace_ids:
+        REPOSITORIES.workspaces.add(
+            {"id": workspace_id, "name": workspace_id, "invite_token": workspace_id}
+        )
+    members: list[tuple[str, str]] = []
+    minutes = get_settings().access_token_expire_minutes
+    for index in range(max(args.event_clients, args.presence_clients)):
+        user_id = f"{prefix}-user-{index:05d}"
+        REPOSITORIES.users.add({"id": user_id, "username": user_id})
+        REPOSITORIES.workspaces.add_member(
+            workspace_ids[index % len(workspace_ids)], user_id, "member"
+        )
+        members.append((user_id, create_token(user_id, minutes, "access")))
+    return workspace_ids, members
+
+
+@asynccontextmanager
+async def _lifespan() -> AsyncIterator[None]:
+    inbound: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+    outbound: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+    task = asyncio.create_task(
+        app(
+            {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, inbound.get, outbound.put
+        )
+    )
+    inbound.put_nowait({"type": "lifespan.startup"})
+    started = await outbound.get()
+    if started["type"] != "lifespan.startup.complete":
+        raise RuntimeError(f"App startup failed: {started}")
+    try:
+        yield
+    finally:
+        inbound.put_nowait({"type": "lifespan.shutdown"})
+        await outbound.get()
+        await task
+
+
+class _Server:
+    """uvicorn serving the app from a thread of this process."""
+
+    def __init__(self, port: int) -> None:
+        import uvicorn
+
+        self._server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+        )
+        self._thread = threading.Thread(target=self._server.run, name="uvicorn", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("uvicorn failed to start")
+            time.sleep(0.05)
+
+    def cpu_seconds(self) -> float:
+        assert self._thread.ident is not None
+        return time.clock_gettime(time.pthread_getcpuclockid(self._thread.ident))
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=30)
+
+
+async def _open(run: _Run, clients: list[_Client], runners: list[Any]) -> list[asyncio.Task[None]]:
+    limit = asyncio.Semaphore(run.args.connect_concurrency)
+
+    async def start(client: _Client, runner: Any, delay: float) -> asyncio.Task[None] | None:
+        await asyncio.sleep(delay)
+        async with limit:
+            if not await client.connect():
+                run.closes[client.close_code or 1006] += 1
+                return None
+        return asyncio.create_task(runner)
+
+    rate = run.args.connect_rate
+    started = await asyncio.gather(
+        *(
+            start(client, runner, index / rate if rate else 0.0)
+            for index, (client, runner) in enumerate(zip(clients, runners, strict=True))
+        )
+    )
+    for runner, task in zip(runners, started, strict=True):
+        if task is None:
+            runner.close()
+    return [task for task in started if task is not None]
+
+
+async def _measure(args: argparse.Namespace, make_client: Any, server: _Server | None) -> None:
+    run = _Run(args)
+    workspace_ids, members = _seed(args)
+    rng = random.Random(7)
+    rss_before = _rss_mib()
+
+    clients: list[_Client] = []
+    runners: list[Any] = []
+    for index in range(args.event_clients):
+        workspace_id = workspace_ids[index % len(workspace_ids)]
+        client = make_client(f"/ws/workspaces/{workspace_id}/events", {}, members[index][1])
+        clients.append(client)
+        runners.append(
+            run.events_client(client, workspace_id, sampled=index % args.sample_every == 0)
+        )
+    for index in range(args.presence_clients):
+        workspace_id = workspace_ids[index % len(workspace_ids)]
+        user_id, token = members[index]
+        client = make_client(
+            f"/ws/workspaces/{workspace_id}/presence", {"encoding": args.encoding}, token
+        )
+        clients.append(client)
+        runners.append(
+            run.presence_client(
+                client,
+                f"user:{user_id}",
+                index % args.sample_every == 0,
+                random.Random(rng.random()),
+            )
+        )
+
+    # Joins broadcast to the whole room: at a high ``--connect-rate`` (a reconnect storm) large rooms
+    # evict clients before measuring starts.
+    evictions, reaped = METRICS.counter("presence.evictions"), METRICS.counter("websockets.reaped")
+    connect_started = time.perf_counter()
+    tasks = await _open(run, clients, runners)
+    connect_seconds = time.perf_counter() - connect_started
+    await asyncio.sleep(args.warmup)
+    rss_connected = _rss_mib()
+    print(
+        f"connected {len(tasks):,} of {len(clients):,} sockets in {connect_seconds:.1f}s   "
+        f"rss {rss_before:,.0f} -> {rss_connected:,.0f} MiB "
+        f"({(rss_connected - rss_before) * 1024 / max(len(tasks), 1):.1f} KiB per socket)"
+    )
+
+    cpu_started = time.process_time()
+    server_cpu_started = server.cpu_seconds() if server is not None else 0.0
+    run.measuring = True
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    threads = min(args.threads, len(workspace_ids))
+    with ThreadPoolExecutor(threads) as pool:
+        # Each thread owns a share of the workspaces, so their counts are only written by it.
+        shares = [workspace_ids[offset::threads] for offset in range(threads)]
+        publishers = [loop.run_in_executor(pool, run.publish, share) for share in shares]
+        await asyncio.sleep(args.seconds)
+        run.stopping = True
+        active = time.perf_counter() - started
+        await asyncio.gather(*publishers)
+    # Let what was published and moved reach the clients.
+    await asyncio.sleep(args.drain)
+    run.measuring = False
+    elapsed = time.perf_counter() - started
+    cpu = (time.process_time() - cpu_started) / elapsed
+    server_cpu = (
+        (server.cpu_seconds() - server_cpu_started) / elapsed if server is not None else None
+    )
+
+    run.closing = True
+    for client in clients:
+        await client.close()
+    await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=30)
+
+    sampled = list(range(0, args.event_clients, args.sample_every))
+    expected = sum(run.published[workspace_ids[index % len(workspace_ids)]] for index in sampled)
+    published = sum(run.published.values())
+    if args.event_clients:
+        print(
+            f"events    published {published / active:>9,.0f}/s of {args.publish_hz * len(workspace_ids):>7,.0f}   "
+            f"frames {run.stats['event_frames'] / elapsed:>10,.0f}/s   {run.stats['event_bytes'] / elapsed / 2**20:>8,.1f} MiB/s   "
+            f"received {sum(run.received.values()):,}/{expected:,} sampled   "
+            f"latency p50 {_percentile(run.latencies, 0.5):7.1f}  p90 {_percentile(run.latencies, 0.9):7.1f}  "
+            f"p99 {_percentile(run.latencies, 0.99):7.1f}  max {max(run.latencies, default=0.0):7.1f} ms"
+        )
+    if args.presence_clients:
+        print(
+            f"presence  moves     {run.stats['moves'] / active:>9,.0f}/s of {args.move_hz * args.presence_clients:>7,.0f}   "
+            f"frames {run.stats['presence_frames'] / elapsed:>10,.0f}/s   {run.stats['presence_bytes'] / elapsed / 2**20:>8,.1f} MiB/s   "
+            f"evicted {METRICS.counter('presence.evictions') - evictions:,}   "
+            f"staleness p50 {_percentile(run.staleness, 0.5):7.1f}  p90 {_percentile(run.staleness, 0.9):7.1f}  "
+            f"p99 {_percentile(run.staleness, 0.99):7.1f}  max {max(run.staleness, default=0.0):7.1f} ms"
+        )
+    rss = _rss_mib()
+    print(
+        f"server    cpu {cpu:.0%}"
+        + (f" (server thread {server_cpu:.0%})" if server_cpu is not None else "")
+        + f"   rss {rss:,.0f} MiB (peak {max(rss, _peak_rss_mib()):,.0f} MiB)   reaped {METRICS.counter('websockets.reaped') - reaped}   "
+        f"closes {dict(sorted(run.closes.items()))}"
+    )
+
+
+async def _run_asgi(args: argparse.Namespace) -> None:
+    async with _lifespan():
+        await _measure(args, _AsgiClient, None)
+
+
+async def _run_uvicorn(args: argparse.Namespace, server: _Server) -> None:
+    base_url = f"ws://127.0.0.1:{args.port}"
+    await _measure(
+        args, lambda path, query, token: _NetworkClient(base_url, path, query, token), server
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--event-clients", type=int, default=2000)
+    parser.add_argument("--presence-clients", type=int, default=400)
+    parser.add_argument("--workspaces", type=int, default=20)
+    parser.add_argument(
+        "--publish-hz", type=float, default=20.0, help="events published per workspace per second"
+    )
+    parser.add_argument(
+        "--move-hz", type=float, default=5.0, help="moves per presence client per second"
+    )
+    parser.add_argument(
+        "--encoding",
+        choices=ENCODINGS,
+        default="full",
+        help="presence encoding the clients ask for",
+    )
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument(
+        "--warmup", type=float, default=1.0, help="seconds between connecting and measuring"
+    )
+    parser.add_argument(
+        "--drain", type=float, default=1.0, help="seconds to keep receiving after publishing stops"
+    )
+    parser.add_argument(
+        "--sample-every", type=int, default=10, help="decode frames of every n-th client"
+    )
+    parser.add_argument("--threads", type=int, default=8, help="publishing threads")
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="handshakes in flight")
+    parser.add_argument(
+        "--connect-rate",
+        type=float,
+        default=200.0,
+        help="sockets opened per second; 0 for all at once",
+    )
+    parser.add_argument(
+        "--max-per-workspace", type=int, default=0, help="WEBSOCKET_MAX_PER_WORKSPACE for the run"
+    )
+    parser.add_argument(
+        "--port", type=int, default=8765, help="loopback port for --transport uvicorn"
+    )
+    args = parser.parse_args()
+
+    CONNECTIONS.max_per_workspace = args.max_per_workspace
+    if args.transport == "asgi":
+        asyncio.run(_run_asgi(args))
+        return
+    server = _Server(args.port)
+    server.start()
+    try:
+        asyncio.run(_run_uvicorn(args, server))
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
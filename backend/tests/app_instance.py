@@ -0,0 +1,96 @@
+"""One API instance for the multi-worker tests, run as its own process.
+
+``app.main`` is imported under the environment the process was started with (``STORE_BACKEND``,
+``SHARED_STATE_BACKEND``, ``REDIS_KEY_PREFIX``...) and served through a ``TestClient``. Commands
+arrive as JSON lines on stdin and each gets one JSON line back on stdout:
+
+- ``{"op": "request", "method": "POST", "path": "...", "json": {...}}`` -> ``{"status", "body"}``
+- ``{"op": "open", "name": "events", "path": "/ws/..."}`` opens a websocket and queues what it receives
+- ``{"op": "expect", "name": "events", "types": [...], "contains": "...", "timeout": 10}`` returns the
+  first queued message of one of ``types`` whose JSON contains ``contains``, or ``{"timeout": true}``
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import sys
+import threading
+import time
+from typing import Any
+
+from fastapi.testclient import TestClient
+from starlette.testclient import WebSocketTestSession
+
+# Replies own stdout; the app's logging goes to stderr with everything else.
+_REPLIES = sys.stdout
+sys.stdout = sys.stderr
+
+from app.main import app  # noqa: E402
+
+
+class _Socket:
+    def __init__(self, session: WebSocketTestSession) -> None:
+        self.session = session
+        self.received: queue.Queue[dict[str, Any]] = queue.Queue()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self) -> None:
+        while True:
+            try:
+                message = self.session.receive_json()
+            except Exception:
+                return
+            if isinstance(message, dict) and message.get("type") == "ping":
+                self.session.send_json({"type": "pong"})
+                continue
+            self.received.put(message)
+
+    def expect(self, types: list[str], contains: str, timeout: float) -> dict[str, Any]:
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                message = self.received.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if message.get("type") in types and contains in json.dumps(message):
+                return message
+        return {"timeout": True}
+
+
+def _handle(client: TestClient, sockets: dict[str, _Socket], command: dict[str, Any]) -> dict[str, Any]:
+    op = command["op"]
+    if op == "request":
+        response = client.request(command["method"], command["path"], json=command.get("json"))
+        body = response.json() if response.content else None
+        return {"status": response.status_code, "body": body}
+    if op == "open":
+        sockets[command["name"]] = _Socket(client.websocket_connect(command["path"]).__enter__())
+        return {"ok": True}
+    if op == "expect":
+        socket = sockets[command["name"]]
+        return socket.expect(command["types"], command.get("contains", ""), float(command.get("timeout", 10)))
+    raise ValueError(f"Unknown op {op!r}")
+
+
+def _reply(payload: dict[str, Any]) -> None:
+    _REPLIES.write(json.dumps(payload, default=str) + "\n")
+    _REPLIES.flush()
+
+
+def main() -> None:
+    # Entering the client runs the app's startup, which starts the Redis fan-out.
+    with TestClient(app) as client:
+        sockets: dict[str, _Socket] = {}
+        _reply({"ready": True})
+        try:
+            for line in sys.stdin:
+                _reply(_handle(client, sockets, json.loads(line)))
+        finally:
+            for socket in sockets.values():
+                socket.session.__exit__(None, None, None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
+import time
+from typing import Any
 from uuid import uuid4
 
+import pytest
 from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
 
+from app.core.metrics import METRICS
 from app.core.store import STORE
 from app.main import app
+from app.services.orchestration.event_bus import EVENT_BUS
+from app.services.orchestration.projections import PROJECTIONS, WorkspaceProjections
+from app.services.realtime.connections import CONNECTIONS
+from app.services.realtime.presence import PRESENCE
 
 client = TestClient(app)
 
@@ -221,3 +230,213 @@ def test_subtasks_crud_agent_delete_and_assistant_voice_token() -> None:
     assert payload["workspace_id"] == workspace_id
     assert payload["room"].startswith("kobo-")
     assert isinstance(payload["token"], str) and len(payload["token"]) > 20
+
+
+def test_list_endpoints_page_with_cursor_and_filter() -> None:
+    _ = auth_headers()
+    workspace_id = client.post("/api/v1/workspaces", json={"name": "Paged", "slug": "paged"}).json()["id"]
+    created = [
+        client.post(
+            "/api/v1/tasks",
+            json={"workspace_id": workspace_id, "title": f"Task {index}", "priority": "high" if index % 2 else "low"},
+        ).json()["id"]
+        for index in range(5)
+    ]
+
+    everything = client.get("/api/v1/tasks", params={"workspace_id": workspace_id})
+    assert [task["id"] for task in everything.json()] == created
+    assert "x-next-cursor" not in everything.headers
+
+    seen: list[str] = []
+    params: dict[str, object] = {"workspace_id": workspace_id, "limit": 2}
+    while True:
+        page = client.get("/api/v1/tasks", params=params)
+        assert page.status_code == 200
+        assert len(page.json()) <= 2
+        seen.extend(task["id"] for task in page.json())
+        cursor = page.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        params["after"] = cursor
+    assert seen == created
+
+    high = client.get("/api/v1/tasks", params={"workspace_id": workspace_id, "priority": "high", "limit": 1})
+    assert [task["id"] for task in high.json()] == [created[1]]
+    rest = client.get(
+        "/api/v1/tasks",
+        params={"workspace_id": workspace_id, "priority": "high", "after": high.headers["x-next-cursor"]},
+    )
+    assert [task["id"] for task in rest.json()] == [created[3]]
+
+    comment_ids = [
+        client.post(f"/api/v1/tasks/{created[0]}/comments", json={"content": f"c{index}"}).json()["id"] for index in range(3)
+    ]
+    first = client.get(f"/api/v1/tasks/{created[0]}/comments", params={"limit": 2})
+    assert [item["id"] for item in first.json()] == comment_ids[:2]
+    second = client.get(f"/api/v1/tasks/{created[0]}/comments", params={"after": first.headers["x-next-cursor"]})
+    assert [item["id"] for item in second.json()] == comment_ids[2:]
+    assert client.get("/api/v1/tasks", params={"workspace_id": workspace_id, "limit": 0}).status_code == 422
+
+
+def test_workspace_summary_follows_mutations() -> None:
+    _ = auth_headers()
+    user_id = client.get("/api/v1/auth/me").json()["id"]
+    workspace_id = client.post("/api/v1/workspaces", json={"name": "Counts", "slug": "counts"}).json()["id"]
+    client.post("/api/v1/tasks", json={"workspace_id": workspace_id, "title": "Before seeding"})
+
+    summary = client.get(f"/api/v1/workspaces/{workspace_id}/summary").json()
+    assert (summary["tasks_total"], summary["tasks_by_status"]) == (1, {"todo": 1})
+
+    task_id = client.post(
+        "/api/v1/tasks", json={"workspace_id": workspace_id, "title": "Mine", "assignee_user_id": user_id}
+    ).json()["id"]
+    assert client.patch(f"/api/v1/tasks/{task_id}", json={"status": "in_progress"}).status_code == 200
+    plan = {"action_type": "github.create_pr", "target": "repo", "summary": "Open a PR"}
+    approvals = [
+        client.post("/api/v1/approvals", json={"workspace_id": workspace_id, "action_plan": plan}).json()["id"]
+        for _ in range(2)
+    ]
+    client.post(f"/api/v1/approvals/{approvals[0]}/approve", json={"note": "ok"})
+    client.post(f"/api/v1/approvals/{approvals[0]}/approve", json={"note": "again"})
+
+    summary = client.get(f"/api/v1/workspaces/{workspace_id}/summary").json()
+    assert summary["tasks_total"] == 2
+    assert summary["tasks_by_status"] == {"todo": 1, "in_progress": 1}
+    assert summary["pending_approvals"] == 1
+    assert summary["open_actions_by_user"] == {user_id: 1} and summary["open_actions_required"] == 1
+
+    action_id = client.get(f"/api/v1/workspaces/{workspace_id}/actions-required").json()[0]["id"]
+    client.patch(f"/api/v1/workspaces/{workspace_id}/actions-required/{action_id}", json={"status": "done"})
+    assert client.get(f"/api/v1/workspaces/{workspace_id}/summary").json()["open_actions_required"] == 0
+
+
+def test_summary_seed_counts_writes_around_the_scan_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    _ = auth_headers()
+    workspace_id = client.post("/api/v1/workspaces", json={"name": "Seed", "slug": "seed"}).json()["id"]
+    task_ids = [
+        client.post("/api/v1/tasks", json={"workspace_id": workspace_id, "title": title}).json()["id"]
+        for title in ("Seen", "Missed")
+    ]
+    PROJECTIONS.forget(workspace_id)
+    scan = WorkspaceProjections._seed
+
+    def racing_scan(scanned_workspace_id: str) -> Any:
+        # The first update is written before the scan reads it but its event arrives afterwards;
+        # the second is written after the scan read its task.
+        STORE.tasks[task_ids[0]]["status"] = "in_progress"
+        state = scan(scanned_workspace_id)
+        EVENT_BUS.publish("task.updated", workspace_id, {"task_id": task_ids[0], "status": "in_progress"})
+        assert client.patch(f"/api/v1/tasks/{task_ids[1]}", json={"status": "review"}).status_code == 200
+        return state
+
+    monkeypatch.setattr(WorkspaceProjections, "_seed", staticmethod(racing_scan))
+    assert PROJECTIONS.counts(workspace_id).tasks == {"in_progress": 1, "review": 1}
+    # Events delivered twice, or late, do not move the counts again.
+    EVENT_BUS.publish("task.updated", workspace_id, {"task_id": task_ids[1], "status": "review"})
+    assert PROJECTIONS.counts(workspace_id).tasks == {"in_progress": 1, "review": 1}
+
+
+def test_events_socket_applies_type_and_entity_filters() -> None:
+    _ = auth_headers()
+    workspace_id = client.post("/api/v1/workspaces", json={"name": "Filtered", "slug": "filtered"}).json()["id"]
+    project_id = client.post("/api/v1/projects", json={"workspace_id": workspace_id, "name": "Alpha"}).json()["id"]
+    url = f"/ws/workspaces/{workspace_id}/events?types=task.created&project_id={project_id}"
+    with client.websocket_connect(url) as websocket:
+        client.post("/api/v1/tasks", json={"workspace_id": workspace_id, "title": "Elsewhere"})
+        task_id = client.post(
+            "/api/v1/tasks", json={"workspace_id": workspace_id, "title": "Here", "project_id": project_id}
+        ).json()["id"]
+        message = websocket.receive_json()
+        assert (message["type"], message["payload"]["task_id"]) == ("task.created", task_id)
+
+
+def test_events_socket_unsubscribes_on_disconnect() -> None:
+    _ = auth_headers()
+    workspace_id = client.post("/api/v1/workspaces", json={"name": "Live", "slug": "live"}).json()["id"]
+    with client.websocket_connect(f"/ws/workspaces/{workspace_id}/events") as websocket:
+        client.post("/api/v1/tasks", json={"workspace_id": workspace_id, "title": "Ping"})
+        assert websocket.receive_json()["type"] == "task.created"
+        assert EVENT_BUS.subscriber_count(workspace_id) == 1
+    deadline = time.monotonic() + 2
+    while EVENT_BUS.subscriber_count(workspace_id) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert EVENT_BUS.subscriber_count(workspace_id) == 0
+
+
+def test_sockets_are_pinged_reaped_when_silent_and_limited_per_user() -> None:
+    _ = auth_headers()
+    workspace_id = client.post("/api/v1/workspaces", json={"name": "Beats", "slug": "beats"}).json()["id"]
+    saved = (CONNECTIONS.heartbeat_seconds, CONNECTIONS.idle_timeout_seconds, CONNECTIONS.max_per_user)
+    CONNECTIONS.heartbeat_seconds, CONNECTIONS.idle_timeout_seconds, CONNECTIONS.max_per_user = 0.05, 0.3, 2
+    try:
+        with client.websocket_connect(f"/ws/workspaces/{workspace_id}/events") as events:
+            assert events.receive_json() == {"type": "ping"}
+            # Answering keeps the socket open past the idle timeout.
+            for _ in range(8):
+                events.send_json({"type": "pong"})
+                assert events.receive_json() == {"type": "ping"}
+            assert CONNECTIONS.active(workspace_id) == 1
+
+            with client.websocket_connect(f"/ws/workspaces/{workspace_id}/presence") as presence:
+                assert presence.receive_json()["type"] == "presence.snapshot"
+                with client.websocket_connect(f"/ws/workspaces/{workspace_id}/events") as third:
+                    with pytest.raises(WebSocketDisconnect) as refused:
+                        third.receive_json()
+                    assert refused.value.code == 1008
+                # A silent presence socket is closed as idle once pings go unanswered.
+                with pytest.raises(WebSocketDisconnect) as reaped:
+                    while True:
+                        presence.receive_json()
+                assert reaped.value.code == 1001
+    finally:
+        CONNECTIONS.heartbeat_seconds, CONNECTIONS.idle_timeout_seconds, CONNECTIONS.max_per_user = saved
+    deadline = time.monotonic() + 2
+    while CONNECTIONS.active(workspace_id) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert CONNECTIONS.active(workspace_id) == 0
+    assert METRICS.counter("websockets.reaped") >= 1
+    assert METRICS.counter("websockets.rejected.user_limit") >= 1
+
+
+def test_busy_event_sockets_are_pinged_and_kept_while_they_answer() -> None:
+    _ = auth_headers()
+    workspace_id = client.post("/api/v1/workspaces", json={"name": "Busy", "slug": "busy"}).json()["id"]
+    saved = (CONNECTIONS.heartbeat_seconds, CONNECTIONS.idle_timeout_seconds)
+    CONNECTIONS.heartbeat_seconds, CONNECTIONS.idle_timeout_seconds = 0.1, 0.3
+    try:
+        with client.websocket_connect(f"/ws/workspaces/{workspace_id}/events") as answering:
+            pings = 0
+            deadline = time.monotonic() + 1.0
+            # Events never stop long enough for a heartbeat to time out on its own.
+            while time.monotonic() < deadline:
+                EVENT_BUS.publish("task.updated", workspace_id, {"task_id": uuid4().hex})
+                frame = answering.receive_json()
+                if frame == {"type": "ping"}:
+                    pings += 1
+                    answering.send_json({"type": "pong"})
+            assert pings >= 3
+            assert CONNECTIONS.active(workspace_id) == 1
+
+        with client.websocket_connect(f"/ws/workspaces/{workspace_id}/events") as silent:
+            with pytest.raises(WebSocketDisconnect) as reaped:
+                while True:
+                    EVENT_BUS.publish("task.updated", workspace_id, {"task_id": uuid4().hex})
+                    silent.receive_json()
+            assert reaped.value.code == 1001
+    finally:
+        CONNECTIONS.heartbeat_seconds, CONNECTIONS.idle_timeout_seconds = saved
+
+
+def test_presence_lease_is_released_when_joining_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+    _ = auth_headers()
+    workspace_id = client.post("/api/v1/workspaces", json={"name": "Leak", "slug": "leak"}).json()["id"]
+
+    async def failing_join(*args: object, **kwargs: object) -> None:
+        raise ConnectionError("shared state unavailable")
+
+    monkeypatch.setattr(PRESENCE, "join", failing_join)
+    with pytest.raises(ConnectionError):
+        with client.websocket_connect(f"/ws/workspaces/{workspace_id}/presence") as presence:
+            presence.receive_json()
+    assert CONNECTIONS.active(workspace_id) == 0
+    assert workspace_id not in PRESENCE.rooms
@@ -0,0 +1,147 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from app.core.config import Settings
+from app.core.metrics import MetricsRegistry
+from app.core.persistence import StorePersistence
+from app.core.store import InMemoryStore
+from app.services.orchestration.event_bus import Event, InMemoryEventBus
+from app.workers import runner
+from app.workers.consumers import ConsumerRegistry, ConsumerRuntime, OutboxSource
+
+
+def _bus() -> InMemoryEventBus:
+    return InMemoryEventBus(metrics=MetricsRegistry())
+
+
+async def _until(predicate, timeout: float = 5.0) -> None:  # noqa: ANN001
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+def test_consumers_get_filtered_batches_pushed_by_publish_and_checkpoint() -> None:
+    bus = _bus()
+    metrics = MetricsRegistry()
+    registry = ConsumerRegistry()
+    tasks: list[list[str]] = []
+    everything: list[str] = []
+
+    @registry.register("tasks", event_types=["task.*"], batch_size=2)
+    async def handle_tasks(events: list[Event]) -> None:
+        tasks.append([event.type for event in events])
+
+    @registry.register("all", batch_size=100)
+    def handle_all(events: list[Event]) -> None:
+        everything.extend(event.id for event in events)
+
+    async def scenario() -> dict[str, OutboxSource]:
+        runtime = ConsumerRuntime(list(registry), lambda consumer: OutboxSource(bus, name=consumer.name, metrics=metrics), metrics=metrics)
+        runtime.start()
+        sources = dict(runtime.sources)
+        await asyncio.sleep(0.05)
+        # Published from the threadpool, as sync routes do; readers wake without polling.
+        for event_type in ("task.created", "approval.requested", "task.updated", "task.deleted"):
+            await asyncio.to_thread(bus.publish, event_type, "w1", {})
+        await _until(lambda: len(everything) == 4 and sources["tasks"].position == 4)
+        await runtime.stop()
+        return sources
+
+    sources = asyncio.run(scenario())
+    assert [event_type for batch in tasks for event_type in batch] == ["task.created", "task.updated", "task.deleted"]
+    assert everything == [event.id for event in bus.outbox]
+    assert sources["all"].position == 4 and sources["all"].backlog() == 0
+    assert metrics.counter("consumers.tasks.processed") == 3
+    assert metrics.gauge("consumers.tasks.lag_seconds") is not None
+    assert metrics.gauge("consumers.all.backlog") == 0
+
+
+def test_concurrent_batches_commit_in_order_and_failures_are_retried_then_skipped() -> None:
+    bus = _bus()
+    metrics = MetricsRegistry()
+    registry = ConsumerRegistry()
+    release = asyncio.Event()
+    attempts: dict[str, int] = {}
+
+    @registry.register("slow", batch_size=1, concurrency=3)
+    async def handle(events: list[Event]) -> None:
+        index = events[0].payload["index"]
+        if index == 0:
+            await release.wait()
+        if index == 2:
+            attempts["poison"] = attempts.get("poison", 0) + 1
+            raise RuntimeError("boom")
+
+    async def scenario() -> OutboxSource:
+        runtime = ConsumerRuntime(
+            list(registry), lambda consumer: OutboxSource(bus, name=consumer.name, metrics=metrics), retry_delays=(0, 0), metrics=metrics
+        )
+        runtime.start()
+        source = runtime.sources["slow"]
+        for index in range(4):
+            bus.publish("task.updated", "w1", {"index": index})
+        await _until(lambda: metrics.counter("consumers.slow.failed") == 1)
+        # Batches 1-3 are done but the first is still running: the position stays put.
+        await _until(lambda: metrics.counter("consumers.slow.processed") == 2)
+        assert source.position == 0
+        assert metrics.gauge("consumers.slow.pending_batches") == 4
+        release.set()
+        await _until(lambda: source.position == 4)
+        await runtime.stop()
+        return source
+
+    asyncio.run(scenario())
+    assert attempts["poison"] == 3
+    assert metrics.counter("consumers.slow.retries") == 2
+    assert metrics.counter("consumers.slow.processed") == 3
+
+
+def test_outbox_positions_survive_a_restart_and_close_unregisters_the_reader(tmp_path: Path) -> None:
+    handled: list[int] = []
+
+    def run(bus: InMemoryEventBus, publish: range, expected: int) -> None:
+        registry = ConsumerRegistry()
+
+        @registry.register("indexer")
+        def handle(events: list[Event]) -> None:
+            handled.extend(event.payload["index"] for event in events)
+
+        async def scenario() -> None:
+            runtime = ConsumerRuntime(list(registry), lambda consumer: OutboxSource(bus, name=consumer.name))
+            runtime.start()
+            for index in publish:
+                bus.publish("task.updated", "w1", {"index": index})
+            await _until(lambda: len(handled) == expected and runtime.sources["indexer"].position == len(bus.outbox))
+            await runtime.stop()
+
+        asyncio.run(scenario())
+
+    store = InMemoryStore()
+    persistence = StorePersistence(store, tmp_path, sync_ms=0)
+    persistence.open(background=False)
+    bus = _bus()
+    bus.persist_outbox(store)
+    listeners = len(bus._publish_listeners)
+    run(bus, range(3), 3)
+    assert len(bus._publish_listeners) == listeners
+    bus.publish("task.updated", "w1", {"index": 3})
+    persistence.close()
+
+    # After a restart the consumer skips what it acknowledged and picks up the event it missed.
+    store = InMemoryStore()
+    persistence = StorePersistence(store, tmp_path, sync_ms=0)
+    bus = _bus()
+    bus.persist_outbox(store)
+    persistence.open(background=False)
+    assert [event.payload["index"] for event in bus.outbox] == [0, 1, 2, 3]
+    run(bus, range(4, 5), 5)
+    persistence.close()
+    assert handled == [0, 1, 2, 3, 4]
+
+
+def test_standalone_runner_requires_redis_streams(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(runner, "get_settings", lambda: Settings(event_bus_backend="memory"))
+    with pytest.raises(RuntimeError, match="redis_streams"):
+        asyncio.run(runner.main())
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from app.core.metrics import MetricsRegistry
+from app.services.orchestration.event_bus import (
+    EventFilter,
+    InMemoryEventBus,
+    SlowConsumer,
+    SubscriptionClosed,
+    coalesce_events,
+)
+
+
+def _bus(policy: str, metrics: MetricsRegistry) -> InMemoryEventBus:
+    return InMemoryEventBus(queue_size=3, slow_consumer_policy=policy, metrics=metrics)
+
+
+def test_drop_oldest_keeps_newest_events_and_counts_drops() -> None:
+    metrics = MetricsRegistry()
+    bus = _bus("drop_oldest", metrics)
+    subscription = bus.subscribe("w1")
+    for index in range(5):
+        bus.publish("task.updated", "w1", {"task_id": f"t{index}"})
+
+    assert [subscription.get_nowait().payload["task_id"] for _ in range(3)] == ["t2", "t3", "t4"]
+    assert metrics.counter("events.w1.dropped") == 2
+    assert metrics.gauge("events.w1.queue_depth") == 0
+
+
+def test_coalesce_replaces_queued_events_about_the_same_entity() -> None:
+    metrics = MetricsRegistry()
+    bus = _bus("coalesce", metrics)
+    subscription = bus.subscribe("w1")
+    bus.publish("task.updated", "w1", {"task_id": "t1"})
+    bus.publish("task.updated", "w1", {"task_id": "t2"})
+    bus.publish("task.created", "w1", {"task_id": "t3"})
+    latest = bus.publish("task.updated", "w1", {"task_id": "t1"})
+    bus.publish("task.updated", "w1", {"task_id": "t4"})
+
+    drained = [subscription.get_nowait() for _ in range(subscription.qsize())]
+    assert [event.payload["task_id"] for event in drained] == ["t3", "t1", "t4"]
+    assert drained[1].id == latest.id
+    assert metrics.counter("events.w1.coalesced") == 1
+    assert metrics.counter("events.w1.dropped") == 1
+
+
+def test_disconnect_policy_closes_slow_subscriber_and_unsubscribe_stops_delivery() -> None:
+    metrics = MetricsRegistry()
+    bus = _bus("disconnect", metrics)
+    slow = bus.subscribe("w1")
+    other = bus.subscribe("w1")
+    assert metrics.gauge("events.w1.subscribers") == 2
+    for index in range(4):
+        bus.publish("task.updated", "w1", {"task_id": f"t{index}"})
+
+    with pytest.raises(SlowConsumer):
+        asyncio.run(slow.get())
+    assert metrics.counter("events.w1.slow_disconnects") == 2
+
+    bus.unsubscribe(slow)
+    bus.unsubscribe(other)
+    assert bus.subscriber_count("w1") == 0
+    assert metrics.gauge("events.w1.subscribers") == 0
+    bus.publish("task.updated", "w1", {"task_id": "t9"})
+    with pytest.raises(SubscriptionClosed):
+        other.get_nowait()
+
+
+def test_resume_replays_missed_events_or_requires_resync() -> None:
+    bus = InMemoryEventBus(queue_size=10, slow_consumer_policy="drop_oldest", replay_window=4, metrics=MetricsRegistry())
+    events = [bus.publish("task.updated", "w1", {"task_id": f"t{index}"}) for index in range(6)]
+    bus.publish("task.updated", "w2", {"task_id": "other"})
+    assert [event.offset for event in events] == list(range(6))
+
+    resumed = bus.subscribe("w1", last_event_id=events[3].id)
+    assert not resumed.resync_required
+    live = bus.publish("task.created", "w1", {"task_id": "t6"})
+    assert [resumed.get_nowait().id for _ in range(resumed.qsize())] == [events[4].id, events[5].id, live.id]
+
+    caught_up = bus.subscribe("w1", last_event_id=live.id)
+    assert not caught_up.resync_required and caught_up.qsize() == 0
+
+    # events[1] has left the four-event window; unknown ids are treated the same way.
+    for last_event_id in (events[1].id, "unknown"):
+        stale = bus.subscribe("w1", last_event_id=last_event_id)
+        assert stale.resync_required and stale.qsize() == 0
+
+    small = InMemoryEventBus(queue_size=2, slow_consumer_policy="drop_oldest", replay_window=10, metrics=MetricsRegistry())
+    first = small.publish("task.updated", "w1", {})
+    for _ in range(3):
+        small.publish("task.updated", "w1", {})
+    assert small.subscribe("w1", last_event_id=first.id).resync_required
+
+
+def test_get_batch_gathers_events_within_the_window_and_coalesce_keeps_newest() -> None:
+    bus = InMemoryEventBus(queue_size=100, slow_consumer_policy="drop_oldest", metrics=MetricsRegistry())
+
+    async def scenario() -> tuple[list[list[str]], list[str]]:
+        subscription = bus.subscribe("w1")
+        loop = asyncio.get_running_loop()
+        bus.publish("agent.run.started", "w1", {"run_id": "r1"})
+        for stage in ("plan", "build", "review"):
+            loop.call_later(0.005, bus.publish, "agent.run.stage", "w1", {"run_id": "r1", "stage": stage})
+        loop.call_later(0.3, bus.publish, "agent.run.completed", "w1", {"run_id": "r1"})
+        first = await subscription.get_batch(100, window=0.05)
+        second = await subscription.get_batch(100, window=0.05)
+        capped = [bus.publish("task.updated", "w1", {"task_id": f"t{index}"}) for index in range(3)]
+        third = await subscription.get_batch(2, window=0.05)
+        assert [event.id for event in third] == [event.id for event in capped[:2]]
+        return [[event.type for event in batch] for batch in (first, second)], [
+            event.payload.get("stage", "") for event in coalesce_events(first)
+        ]
+
+    frames, coalesced_stages = asyncio.run(scenario())
+    assert frames == [
+        ["agent.run.started", "agent.run.stage", "agent.run.stage", "agent.run.stage"],
+        ["agent.run.completed"],
+    ]
+    assert coalesced_stages == ["", "review"]
+
+
+def test_filtered_subscribers_skip_unwanted_events_and_share_one_encoding() -> None:
+    bus = InMemoryEventBus(queue_size=10, slow_consumer_policy="drop_oldest", metrics=MetricsRegistry())
+    everything = bus.subscribe("w1")
+    project_tasks = bus.subscribe("w1", event_filter=EventFilter.parse("task.*", {"project_id": "p1"}))
+    one_run = bus.subscribe("w1", event_filter=EventFilter.parse(None, {"run_id": "r1"}))
+    assert EventFilter.parse(" ", {"last": "x"}) is None
+
+    first = bus.publish("task.created", "w1", {"task_id": "t1", "project_id": "p1"})
+    bus.publish("task.created", "w1", {"task_id": "t2", "project_id": "p2"})
+    bus.publish("agent.run.stage", "w1", {"run_id": "r1", "task_id": "t1"})
+    bus.publish("approval.requested", "w1", {"approval_id": "a1"})
+
+    assert everything.qsize() == 4
+    assert [project_tasks.get_nowait().id] == [first.id] and project_tasks.qsize() == 0
+    assert one_run.get_nowait().type == "agent.run.stage" and one_run.qsize() == 0
+    assert everything.get_nowait().to_json() is first.to_json()
+
+    resumed = bus.subscribe("w1", last_event_id=first.id, event_filter=EventFilter.parse("approval.*", {}))
+    assert [resumed.get_nowait().type for _ in range(resumed.qsize())] == ["approval.requested"]
@@ -0,0 +1,231 @@
+import asyncio
+import json
+from typing import Any
+
+from app.core.metrics import MetricsRegistry
+from app.services.realtime.connections import (
+    CLOSE_USER_LIMIT,
+    CLOSE_WORKSPACE_LIMIT,
+    ConnectionLease,
+    ConnectionRegistry,
+)
+from app.services.realtime.interest import (
+    BinaryUpdate,
+    SpatialGrid,
+    View,
+    decode_binary,
+    encode_binary,
+)
+from app.services.realtime.positions import PositionWriteBehind
+from app.services.realtime.presence import PresenceHub
+
+
+class _Socket:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.sent: list[dict[str, Any]] = []
+        self.binary: list[bytes] = []
+        self.delay = delay
+        self.close_code: int | None = None
+
+    async def send_text(self, message: str) -> None:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(message))
+
+    async def send_bytes(self, message: bytes) -> None:
+        self.binary.append(message)
+
+    async def close(self, code: int = 1000) -> None:
+        self.close_code = code
+
+
+def _participant(index: int, x: float = 10.0, y: float = 10.0) -> dict[str, Any]:
+    return {"id": f"user:{index}", "kind": "user", "status": "online", "x": x, "y": y}
+
+
+def test_moves_within_a_tick_reach_each_socket_as_one_batch_with_latest_state() -> None:
+    async def scenario() -> None:
+        metrics = MetricsRegistry()
+        hub = PresenceHub(tick_hz=20, metrics=metrics)
+        sockets = [_Socket() for _ in range(3)]
+        participants = [_participant(index) for index in range(3)]
+        for socket, participant in zip(sockets, participants, strict=True):
+            await hub.join("w1", socket, participant)  # type: ignore[arg-type]
+
+        for step in range(5):
+            for participant in participants:
+                participant["x"] = 10.0 + step
+                await hub.update("w1", participant)
+        assert all(not socket.sent for socket in sockets)
+
+        await asyncio.sleep(0.12)
+        for socket in sockets:
+            assert [frame["type"] for frame in socket.sent] == ["presence.batch"]
+            batch = socket.sent[0]["participants"]
+            assert sorted(item["id"] for item in batch) == ["user:0", "user:1", "user:2"]
+            assert {item["x"] for item in batch} == {14.0}
+        assert metrics.counter("presence.batches") == 1
+        assert metrics.counter("presence.batched_updates") == 3
+        # Nothing moved since: the tick stopped instead of sending empty frames.
+        assert hub.rooms["w1"].tick is None
+
+        await hub.leave("w1", sockets[0], "user:0")  # type: ignore[arg-type]
+        participants[1]["status"] = "idle"
+        await hub.update("w1", participants[1])
+        await hub.flush("w1")
+        await asyncio.sleep(0.01)
+        assert sockets[0].sent[-1]["type"] == "presence.batch" and len(sockets[0].sent) == 1
+        assert sockets[2].sent[-1]["participants"] == [participants[1]]
+
+    asyncio.run(scenario())
+
+
+def test_tick_rate_zero_broadcasts_every_update() -> None:
+    async def scenario() -> None:
+        hub = PresenceHub(tick_hz=0, metrics=MetricsRegistry())
+        socket = _Socket()
+        participant = _participant(1)
+        await hub.join("w1", socket, participant)  # type: ignore[arg-type]
+        for step in range(3):
+            participant["x"] = float(step)
+            await hub.update("w1", participant)
+        await asyncio.sleep(0.01)
+        assert [frame["type"] for frame in socket.sent] == ["presence.updated"] * 3
+
+    asyncio.run(scenario())
+
+
+def test_stalled_clients_are_evicted_without_delaying_the_room() -> None:
+    async def scenario() -> None:
+        metrics = MetricsRegistry()
+        hub = PresenceHub(tick_hz=0, send_buffer=8, send_timeout=0.03, metrics=metrics)
+        fast, stalled, flooded = _Socket(), _Socket(delay=10), _Socket(delay=0.015)
+        for index, socket in enumerate((fast, stalled, flooded)):
+            await hub.join("w1", socket, _participant(index))  # type: ignore[arg-type]
+
+        for step in range(20):
+            await hub.broadcast("w1", {"type": "presence.updated", "step": step})
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.1)
+
+        # The stalled socket never held up the others.
+        assert [frame["step"] for frame in fast.sent] == list(range(20))
+        assert stalled.close_code == 1013 and not stalled.sent
+        assert flooded.close_code == 1013 and len(flooded.sent) < 20
+        assert set(hub.rooms["w1"].connections) == {fast}
+        assert metrics.counter("presence.evictions") == 2
+        assert metrics.counter("presence.evictions.timeout") == 1
+        assert metrics.counter("presence.evictions.overflow") == 1
+        assert metrics.counter("presence.sends") >= 20
+
+    asyncio.run(scenario())
+
+
+def test_grid_finds_participants_by_view_and_binary_frames_round_trip() -> None:
+    grid = SpatialGrid(cell_size=10)
+    near, far = _participant(1, 12, 14), _participant(2, 80, 80)
+    grid.move(near)
+    grid.move(far)
+    view = View.parse("0,0,30,30")
+    assert view is not None and grid.query(view) == {"user:1"}
+    far.update(x=25, y=5)
+    assert grid.move(far) == (8, 8)
+    assert grid.query(view) == {"user:1", "user:2"}
+    assert View.parse("1,2,nan,4") is None and View.parse({"x0": 1}) is None
+
+    updates = [BinaryUpdate(3, x=1250, y=6000), BinaryUpdate(70, status="idle"), BinaryUpdate(4, y=0)]
+    frame = encode_binary(updates)
+    assert decode_binary(frame) == updates
+    assert len(frame) == 3 + (3 + 4) + (3 + 1) + (3 + 2)
+
+
+def test_views_and_delta_encodings_only_carry_what_each_socket_needs() -> None:
+    async def scenario() -> None:
+        hub = PresenceHub(tick_hz=20, cell_size=10, metrics=MetricsRegistry())
+        everyone, corner, delta, binary = _Socket(), _Socket(), _Socket(), _Socket()
+        people = [_participant(index, 10.0 + index, 10.0) for index in range(4)]
+        await hub.join("w1", everyone, people[0])  # type: ignore[arg-type]
+        await hub.join("w1", corner, people[1], view=View(0, 0, 20, 20))  # type: ignore[arg-type]
+        await hub.join("w1", delta, people[2], encoding="delta")  # type: ignore[arg-type]
+        await hub.join("w1", binary, people[3], encoding="binary")  # type: ignore[arg-type]
+        for socket in (everyone, corner, delta, binary):
+            hub.snapshot("w1", socket, people)  # type: ignore[arg-type]
+        await asyncio.sleep(0.01)
+        assert binary.sent[0]["scale"] == 100
+        assert [item["x"] for item in delta.sent[0]["participants"]] == [1000, 1100, 1200, 1300]
+        assert [item["n"] for item in binary.sent[0]["participants"]] == [0, 1, 2, 3]
+
+        # user:0 walks out of the corner view; user:1 only nudges its status.
+        people[0]["x"] = 55.0
+        people[1]["status"] = "working"
+        await hub.update("w1", people[0])
+        await hub.update("w1", people[1])
+        await hub.flush("w1")
+        await asyncio.sleep(0.01)
+
+        assert everyone.sent[-1]["type"] == "presence.batch" and len(everyone.sent[-1]["participants"]) == 2
+        assert corner.sent[-1] == {"type": "presence.batch", "participants": [people[1]], "removed": ["user:0"]}
+        assert delta.sent[-1] == {
+            "type": "presence.delta",
+            "updates": [{"id": "user:0", "x": 5500}, {"id": "user:1", "status": "working"}],
+        }
+        assert len(binary.sent) == 1
+        assert decode_binary(binary.binary[-1]) == [BinaryUpdate(0, x=5500), BinaryUpdate(1, status="working")]
+
+        # Widening the view brings user:0 back; leaving drops it from every socket that knew it.
+        hub.set_view("w1", corner, None)  # type: ignore[arg-type]
+        await hub.broadcast("w1", {"type": "presence.left", "participant_id": "user:3"})
+        await asyncio.sleep(0.01)
+        assert corner.sent[-2]["participants"][0]["id"] == "user:0"
+        assert corner.sent[-1] == {"type": "presence.left", "participant_id": "user:3"}
+        assert delta.sent[-1] == {"type": "presence.delta", "updates": [], "removed": ["user:3"]}
+
+    asyncio.run(scenario())
+
+
+def test_positions_are_written_once_idle_at_the_latest_after_max_delay_and_on_leave() -> None:
+    async def scenario() -> None:
+        writes: list[tuple[str, str, float, float]] = []
+        metrics = MetricsRegistry()
+        positions = PositionWriteBehind(
+            lambda *args: writes.append(args), idle_seconds=0.05, max_delay_seconds=0.2, metrics=metrics
+        )
+        for step in range(100):
+            positions.record("w1", "u1", float(step), 5.0)
+        assert writes == [] and positions.latest("w1", "u1") == (99.0, 5.0)
+        await asyncio.sleep(0.1)
+        assert writes == [("w1", "u1", 99.0, 5.0)] and positions.latest("w1", "u1") is None
+
+        # Someone who never stops is still saved every max_delay_seconds.
+        writes.clear()
+        for step in range(30):
+            positions.record("w1", "u2", float(step), 1.0)
+            await asyncio.sleep(0.01)
+        assert 1 <= len(writes) <= 2 and writes[0][1] == "u2"
+
+        positions.record("w1", "u3", 7.0, 8.0)
+        await positions.flush("w1", "u3")
+        assert writes[-1] == ("w1", "u3", 7.0, 8.0)
+        positions.flush_all()
+        assert metrics.counter("presence.position_moves") == 131
+        assert metrics.counter("presence.position_writes") == len(writes) + 1
+
+    asyncio.run(scenario())
+
+
+def test_connection_registry_enforces_limits_and_reports_gauges() -> None:
+    metrics = MetricsRegistry()
+    registry = ConnectionRegistry(max_per_workspace=2, max_per_user=2, metrics=metrics)
+    first = registry.acquire("w1", "u1", "events")
+    second = registry.acquire("w1", "u2", "presence")
+    assert isinstance(first, ConnectionLease) and isinstance(second, ConnectionLease)
+    assert registry.acquire("w1", "u3", "events") == CLOSE_WORKSPACE_LIMIT
+    assert isinstance(registry.acquire("w2", "u1", "events"), ConnectionLease)
+    assert registry.acquire("w3", "u1", "presence") == CLOSE_USER_LIMIT
+    assert metrics.gauge("websockets.workspaces.w1.active") == 2
+    assert metrics.gauge("websockets.events.active") == 2
+
+    registry.release(first)
+    assert registry.active("w1") == 1 and registry.active() == 2
+    assert metrics.gauge("websockets.workspaces.w1.active") == 1
+    assert metrics.counter("websockets.rejected.workspace_limit") == 1
@@ -0,0 +1,519 @@
+"""Runs against a disposable Redis, e.g. the compose ``redis`` service:
+
+    KOBO_TEST_REDIS_URL=redis://localhost:6379/15 uv run pytest tests/test_redis_shared_state.py
+
+Every Redis test uses its own key prefix and deletes its keys afterwards.
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+import pytest
+
+redis = pytest.importorskip("redis")
+
+from app.core.config import Settings, get_settings  # noqa: E402
+from app.core.metrics import MetricsRegistry  # noqa: E402
+from app.core.shared_state import RedisFanout, RedisPresenceDirectory, SharedState  # noqa: E402
+from app.repositories.base import Repositories  # noqa: E402
+from app.services.orchestration.event_bus import InMemoryEventBus  # noqa: E402
+
+REDIS_URL = os.getenv("KOBO_TEST_REDIS_URL")
+
+requires_redis = pytest.mark.skipif(not REDIS_URL, reason="KOBO_TEST_REDIS_URL is not set")
+
+
+@pytest.fixture()
+def settings() -> Iterator[Settings]:
+    prefix = f"kobo-test-{uuid4().hex[:8]}"
+    yield get_settings().model_copy(update={"redis_url": REDIS_URL, "redis_key_prefix": prefix})
+    client = redis.Redis.from_url(REDIS_URL)
+    keys = list(client.scan_iter(f"{prefix}:*"))
+    if keys:
+        client.delete(*keys)
+    client.close()
+
+
+@pytest.fixture()
+def repositories(settings: Settings) -> Iterator[Repositories]:
+    from app.repositories.redis import build_redis_repositories
+
+    repos = build_redis_repositories(settings)
+    try:
+        yield repos
+    finally:
+        repos.close()
+
+
+def _iso(offset_seconds: int = 0) -> str:
+    return (datetime(2026, 1, 1, tzinfo=UTC) + timedelta(seconds=offset_seconds)).isoformat()
+
+
+@requires_redis
+def test_redis_repositories_round_trip(repositories: Repositories) -> None:
+    repositories.users.add({"id": "u1", "username": "owner", "password_hash": "x", "created_at": _iso()})
+    repositories.workspaces.add({"id": "w1", "name": "Acme", "invite_token": "tok", "created_at": _iso()})
+    repositories.workspaces.add_member("w1", "u1", "owner")
+    assert repositories.workspaces.add_member("w1", "u1", "member")["role"] == "owner"
+    repositories.workspaces.add_member("w1", "u2", "member")
+    assert [member["user_id"] for member in repositories.workspaces.list_members("w1")] == ["u1", "u2"]
+    assert [workspace["id"] for workspace in repositories.workspaces.list_for_user("u1")] == ["w1"]
+    assert repositories.users.get_by_username("owner")["id"] == "u1"
+    assert repositories.workspaces.remove_member("w1", "u2")["role"] == "member"
+    assert repositories.workspaces.remove_member("w1", "u2") is None
+    assert repositories.workspaces.list_for_user("u2") == []
+
+    for index, status in enumerate(["todo", "in_progress", "in_progress"]):
+        repositories.tasks.add(
+            {
+                "id": f"t{index}",
+                "workspace_id": "w1",
+                "title": f"Task {index}",
+                "status": status,
+                "priority": "high",
+                "acceptance_criteria": ["ship it"],
+                "created_at": _iso(index),
+                "updated_at": _iso(index),
+            }
+        )
+    assert [task["id"] for task in repositories.tasks.list_by_workspace("w1", status="in_progress")] == ["t1", "t2"]
+    task = repositories.tasks.get("t0")
+    assert task is not None and task["acceptance_criteria"] == ["ship it"]
+    assert isinstance(task["created_at"], datetime)
+    task["status"] = "done"
+    repositories.tasks.save(task)
+    assert repositories.tasks.get("t0")["status"] == "done"
+    assert repositories.tasks.reassign_status("w1", "in_progress", "todo") == 2
+    assert [task["id"] for task in repositories.tasks.list_by_workspace("w1")] == ["t0", "t1", "t2"]
+
+    repositories.artifacts.add(
+        {"id": "a1", "workspace_id": "w1", "task_id": "t0", "type": "spec", "title": "Spec", "content": "", "created_at": _iso()}
+    )
+    assert repositories.artifacts.exists_for_task("t0")
+    assert not repositories.artifacts.exists_for_task("t1")
+    assert [artifact["id"] for artifact in repositories.artifacts.list_by_task("t0")] == ["a1"]
+
+    run = {"id": "r1", "workspace_id": "w1", "task_id": "t0", "role_key": "builder", "status": "running", "created_at": _iso()}
+    repositories.agent_runs.add(run)
+    run.update(status="completed", output={"confidence_score": 0.8}, updated_at=_iso(5))
+    repositories.agent_runs.save(run)
+    assert [item["status"] for item in repositories.agent_runs.list_by_workspace("w1", status="completed")] == [
+        "completed"
+    ]
+
+
+@requires_redis
+def test_redis_audit_log_query(repositories: Repositories) -> None:
+    for index in range(5):
+        repositories.audit_logs.append(
+            {
+                "id": f"log-{index}",
+                "workspace_id": "w1",
+                "actor_type": "user",
+                "actor_id": "u1",
+                "action": "task.update" if index else "task.create",
+                "entity_type": "task",
+                "entity_id": "t1",
+                "payload": {"index": index},
+                "created_at": _iso(index),
+            }
+        )
+
+    logs = repositories.audit_logs.query(entity_type="task", entity_id="t1")
+    assert [log["id"] for log in logs] == [f"log-{index}" for index in range(5)]
+    assert logs[0]["payload"] == {"index": 0}
+    assert [log["id"] for log in repositories.audit_logs.query(workspace_id="w1", actions=["task.create"])] == ["log-0"]
+    assert [log["id"] for log in repositories.audit_logs.query(workspace_id="w1", actions=["task.update"], limit=2)] == [
+        "log-3",
+        "log-4",
+    ]
+    since = datetime(2026, 1, 1, 0, 0, 1, tzinfo=UTC)
+    until = datetime(2026, 1, 1, 0, 0, 3, tzinfo=UTC)
+    assert [log["id"] for log in repositories.audit_logs.query(workspace_id="w1", since=since, until=until)] == [
+        "log-1",
+        "log-2",
+    ]
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:  # noqa: ANN001
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@requires_redis
+def test_events_and_presence_reach_other_workers(settings: Settings) -> None:
+    nodes = [RedisFanout(REDIS_URL, prefix=settings.redis_key_prefix, node_id=name) for name in ("a", "b")]
+    buses = [InMemoryEventBus(), InMemoryEventBus()]
+    for bus, fanout in zip(buses, nodes, strict=True):
+        bus.attach_fanout(fanout)
+        fanout.start()
+    try:
+        local = buses[0].subscribe("w1")
+        remote = buses[1].subscribe("w1")
+        other_workspace = buses[1].subscribe("w2")
+
+        event = buses[0].publish("task.updated", "w1", {"task_id": "t1"})
+
+        assert _wait_for(lambda: remote.qsize() == 1)
+        received = remote.get_nowait()
+        assert (received.id, received.type, received.payload) == (event.id, "task.updated", {"task_id": "t1"})
+        assert received.created_at == event.created_at
+        # The publishing worker delivers locally once and ignores its own echo from Redis.
+        time.sleep(0.1)
+        assert local.qsize() == 1 and other_workspace.qsize() == 0
+        assert len(buses[0].outbox) == 1 and buses[1].outbox == []
+
+        directory_a = RedisPresenceDirectory(nodes[0].client, prefix=settings.redis_key_prefix)
+        directory_b = RedisPresenceDirectory(nodes[1].client, prefix=settings.redis_key_prefix)
+        directory_a.put("w1", {"id": "user:u1", "x": 10.0})
+        directory_b.put("w1", {"id": "user:u2", "x": 20.0})
+        assert sorted(item["id"] for item in directory_a.participants("w1")) == ["user:u1", "user:u2"]
+        directory_b.remove("w1", "user:u2")
+        assert [item["id"] for item in directory_a.participants("w1")] == ["user:u1"]
+    finally:
+        for fanout in nodes:
+            fanout.close()
+
+
+@requires_redis
+def test_redis_entries_and_records_are_shared(settings: Settings, repositories: Repositories) -> None:
+    from app.core.records import TimelineStage
+    from app.repositories.redis import build_redis_repositories
+
+    other = build_redis_repositories(settings)
+    try:
+        repositories.entries.put("workspace_task_statuses", "w1", [{"key": "todo", "order": 0}])
+        assert other.entries.get("workspace_task_statuses", "w1") == [{"key": "todo", "order": 0}]
+        other.entries.put("workspace_task_statuses", "w1", None)
+        assert repositories.entries.get("workspace_task_statuses", "w1") is None
+
+        for index in (2, 0, 1):
+            repositories.entries.append(
+                "task_comments", "t1", {"id": f"c{index}", "workspace_id": "w1", "content": str(index)}
+            )
+        assert [row["id"] for row in other.entries.rows("task_comments", "t1")] == ["c0", "c1", "c2"]
+        assert [row["id"] for row in other.entries.rows("task_comments", "t1", after="c0")] == ["c1", "c2"]
+        assert [row["id"] for row in other.entries.tail("task_comments", "t1", 2)] == ["c1", "c2"]
+
+        repositories.entries.append(
+            "agent_run_timelines",
+            "r1",
+            TimelineStage(
+                id="s1",
+                run_id="r1",
+                task_id=None,
+                workspace_id="w1",
+                stage="plan",
+                agent_role="builder",
+                title="Plan",
+                summary="",
+                status="completed",
+                metadata={},
+                created_at=datetime(2026, 1, 1, tzinfo=UTC),
+            ),
+        )
+        (stage,) = other.entries.rows("agent_run_timelines", "r1")
+        assert isinstance(stage, TimelineStage) and stage.created_at == datetime(2026, 1, 1, tzinfo=UTC)
+
+        repositories.approvals.put({"id": "ap1", "workspace_id": "w1", "status": "pending", "created_at": _iso()})
+        repositories.approvals.put({"id": "ap2", "workspace_id": "w2", "status": "pending", "created_at": _iso()})
+        assert [item["id"] for item in other.approvals.iter_workspace("w1")] == ["ap1"]
+        assert other.approvals.get("ap2")["workspace_id"] == "w2"
+    finally:
+        other.close()
+
+
+@requires_redis
+def test_redis_workspace_lock_excludes_other_workers(settings: Settings, repositories: Repositories) -> None:
+    from app.repositories.redis import build_redis_repositories
+
+    other = build_redis_repositories(settings)
+    entered = threading.Event()
+    try:
+        with repositories.workspace_lock("w1"):
+            # Re-entrant within the holding thread, as the memory store's locks are.
+            with repositories.workspace_lock("w1", "w2"):
+                pass
+
+            def contend() -> None:
+                with other.workspace_lock("w2", "w1"):
+                    entered.set()
+
+            worker = threading.Thread(target=contend)
+            worker.start()
+            assert not entered.wait(0.3)
+        assert entered.wait(5)
+        worker.join(timeout=5)
+    finally:
+        other.close()
+
+
+class _Socket:
+    def __init__(self) -> None:
+        self.sent: list[dict[str, Any]] = []
+
+    async def send_text(self, message: str) -> None:
+        self.sent.append(json.loads(message))
+
+
+@requires_redis
+def test_presence_rooms_span_workers_with_one_relay_per_tick(settings: Settings) -> None:
+    from app.services.realtime.presence import PresenceHub
+
+    prefix = settings.redis_key_prefix
+    metrics = [MetricsRegistry(), MetricsRegistry()]
+    fanouts = [RedisFanout(REDIS_URL, prefix=prefix, node_id=name, metrics=metrics[index]) for index, name in enumerate("ab")]
+    shared = [
+        SharedState(fanout, RedisPresenceDirectory(fanout.client, prefix=prefix, node_id=fanout.node_id, node_ttl=0.3))
+        for fanout in fanouts
+    ]
+    hubs = [PresenceHub(tick_hz=20, metrics=MetricsRegistry()), PresenceHub(tick_hz=20, metrics=MetricsRegistry())]
+    for hub, state in zip(hubs, shared, strict=True):
+        hub.attach(state)
+        state.start()
+
+    async def scenario() -> None:
+        movers = [{"id": f"user:a{index}", "kind": "user", "status": "online", "x": 10.0, "y": 10.0} for index in range(2)]
+        watcher = {"id": "user:b1", "kind": "user", "status": "online", "x": 50.0, "y": 50.0}
+        socket_b = _Socket()
+        for mover in movers:
+            await hubs[0].join("w1", _Socket(), mover)  # type: ignore[arg-type]
+        await hubs[1].join("w1", socket_b, watcher)  # type: ignore[arg-type]
+        # Each worker's snapshot merges the other's participants from the directory.
+        assert sorted(item["id"] for item in await hubs[1].participants("w1")) == ["user:a0", "user:a1", "user:b1"]
+
+        published = metrics[0].counter("fanout.published")
+        for step in range(20):
+            for mover in movers:
+                mover["x"] = 10.0 + step
+                await hubs[0].update("w1", mover)
+        await asyncio.sleep(0.3)
+        batches = [frame for frame in socket_b.sent if frame["type"] == "presence.batch"]
+        assert len(batches) == 1
+        assert sorted((item["id"], item["x"]) for item in batches[0]["participants"]) == [("user:a0", 29.0), ("user:a1", 29.0)]
+        # Forty moves were relayed as a single message.
+        assert metrics[0].counter("fanout.published") - published == 1
+
+    try:
+        asyncio.run(scenario())
+        # Worker "a" stops heartbeating without cleaning up, as if it crashed.
+        shared[0].presence._stop.set()
+        time.sleep(0.5)
+        assert [item["id"] for item in shared[1].presence.participants("w1")] == ["user:b1"]
+        assert fanouts[1].client.hlen(f"{prefix}:presence:w1") == 1
+    finally:
+        for state in shared:
+            state.close()
+
+
+def test_subscriber_on_event_loop_receives_threadpool_publishes() -> None:
+    bus = InMemoryEventBus()
+
+    async def scenario() -> str:
+        queue = bus.subscribe("w1")
+        await asyncio.to_thread(bus.publish, "task.created", "w1", {})
+        event = await asyncio.wait_for(queue.get(), timeout=2)
+        return event.type
+
+    assert asyncio.run(scenario()) == "task.created"
+
+
+@requires_redis
+def test_redis_streams_bus_delivers_across_workers_and_to_consumer_group(settings: Settings) -> None:
+    from app.services.orchestration.redis_streams import (
+        RedisStreamsEventBus,
+        StreamGroupConsumer,
+        stream_key,
+        streams_key,
+    )
+
+    prefix = settings.redis_key_prefix
+    buses = [RedisStreamsEventBus(REDIS_URL, prefix=prefix, node_id=name) for name in ("a", "b")]
+    for bus in buses:
+        bus.start()
+    consumers = [
+        StreamGroupConsumer(redis.Redis.from_url(REDIS_URL, decode_responses=True), prefix=prefix, consumer=name, block_ms=50)
+        for name in ("c1", "c2")
+    ]
+    try:
+        local = buses[0].subscribe("w1")
+        remote = buses[1].subscribe("w1")
+        time.sleep(0.5)  # let the reader of ``b`` start following w1
+        events = [buses[0].publish("task.updated", "w1", {"task_id": f"t{index}"}) for index in range(3)]
+        buses[0].publish("task.created", "w2", {"task_id": "other"})
+
+        assert _wait_for(lambda: remote.qsize() == 3)
+        assert [remote.get_nowait().id for _ in range(3)] == [event.id for event in events]
+        assert local.qsize() == 3
+        assert buses[0].distributed and buses[1].outbox == []
+
+        # Each entry goes to one member of the group; unacknowledged entries come back after a restart.
+        assert _wait_for(lambda: consumers[0].client.scard(streams_key(prefix)) == 2)
+        first = consumers[0].read()
+        assert sorted(entry.event.workspace_id for entry in first) == ["w1", "w1", "w1", "w2"]
+        consumers[1].refresh()
+        assert consumers[1].read() == []
+        restarted = StreamGroupConsumer(consumers[0].client, prefix=prefix, consumer="c1", block_ms=50)
+        restarted.refresh()
+        redelivered = restarted.read()
+        assert sorted(entry.entry_id for entry in redelivered) == sorted(entry.entry_id for entry in first)
+        restarted.ack(redelivered)
+        assert consumers[0].client.xpending(stream_key(prefix, "w1"), "kobo-workers")["pending"] == 0
+    finally:
+        for bus in buses:
+            bus.close()
+        for consumer in consumers:
+            consumer.client.close()
+
+
+@requires_redis
+def test_stream_consumers_resume_after_restart_without_reprocessing(settings: Settings) -> None:
+    from app.services.orchestration.redis_streams import RedisStreamsEventBus
+    from app.workers.consumers import ConsumerRegistry, ConsumerRuntime, StreamSource
+
+    streams_settings = settings.model_copy(update={"event_bus_backend": "redis_streams", "event_stream_consumer": "runner-1"})
+    bus = RedisStreamsEventBus(REDIS_URL, prefix=settings.redis_key_prefix)
+    bus.start()
+    handled: list[str] = []
+    registry = ConsumerRegistry()
+
+    @registry.register("audit", event_types=["task.*"], batch_size=10)
+    def handle(events: list) -> None:  # noqa: ANN001
+        handled.extend(event.id for event in events)
+
+    def run_once(expected: int) -> None:
+        from app.services.orchestration.redis_streams import build_stream_consumer
+
+        def source(consumer):  # noqa: ANN001, ANN202
+            stream_consumer = build_stream_consumer(streams_settings, group=f"test.{consumer.name}")
+            stream_consumer.block_ms = 50
+            return StreamSource(stream_consumer)
+
+        async def scenario() -> None:
+            runtime = ConsumerRuntime(list(registry), source)
+            runtime.start()
+            try:
+                async with asyncio.timeout(10):
+                    while len(handled) < expected:
+                        await asyncio.sleep(0.02)
+                await asyncio.sleep(0.2)
+            finally:
+                await runtime.stop()
+
+        asyncio.run(scenario())
+
+    try:
+        first = [bus.publish("task.created", "w1", {}) for _ in range(3)]
+        bus.publish("approval.requested", "w2", {})
+        run_once(3)
+        second = [bus.publish("task.updated", "w2", {})]
+        run_once(4)
+        assert handled == [event.id for event in first + second]
+    finally:
+        bus.close()
+
+
+class _AppInstance:
+    """``tests/app_instance.py`` in its own process: a separate API worker with its own singletons."""
+
+    def __init__(self, env: dict[str, str]) -> None:
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "tests.app_instance"],
+            cwd=Path(__file__).parents[1],
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        assert self._read() == {"ready": True}
+
+    def _read(self) -> dict[str, Any]:
+        line = self._process.stdout.readline()
+        assert line, "app instance exited"
+        return json.loads(line)
+
+    def command(self, **command: Any) -> dict[str, Any]:
+        self._process.stdin.write(json.dumps(command) + "\n")
+        self._process.stdin.flush()
+        return self._read()
+
+    def request(self, method: str, path: str, body: dict[str, Any] | None = None) -> Any:
+        reply = self.command(op="request", method=method, path=path, json=body)
+        assert reply["status"] == 200, reply
+        return reply["body"]
+
+    def close(self) -> None:
+        self._process.stdin.close()
+        try:
+            self._process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+
+
+@requires_redis
+def test_two_api_instances_share_one_redis(settings: Settings) -> None:
+    env = {
+        **os.environ,
+        "STORE_BACKEND": "redis",
+        "SHARED_STATE_BACKEND": "redis",
+        "REDIS_URL": str(REDIS_URL),
+        "REDIS_KEY_PREFIX": settings.redis_key_prefix,
+        "STORE_DATA_DIR": "",
+    }
+    first = _AppInstance(env)
+    try:
+        second = _AppInstance(env)
+        try:
+            ada = first.request("POST", "/api/v1/auth/register", {"username": "ada", "password": "Password123!"})
+            grace = second.request("POST", "/api/v1/auth/register", {"username": "grace", "password": "Password123!"})
+            workspace_id = first.request("POST", "/api/v1/workspaces", {"name": "Acme", "slug": "acme"})["id"]
+
+            # The invite is written by the first instance and accepted through the second.
+            token = first.request("GET", f"/api/v1/workspaces/{workspace_id}/invite-link")["token"]
+            second.request("POST", f"/api/v1/workspaces/invitations/{token}/accept")
+            members = first.request("GET", f"/api/v1/workspaces/{workspace_id}/members")
+            assert {member["user_id"] for member in members} == {ada["user"]["id"], grace["user"]["id"]}
+
+            second.command(op="open", name="events", path=f"/ws/workspaces/{workspace_id}/events")
+            task = first.request(
+                "POST", "/api/v1/tasks", {"workspace_id": workspace_id, "title": "Ship", "acceptance_criteria": []}
+            )
+            created = second.command(op="expect", name="events", types=["task.created"], contains=task["id"])
+            assert created.get("workspace_id") == workspace_id
+
+            second.request("POST", f"/api/v1/tasks/{task['id']}/comments", {"content": "on it"})
+            comments = first.request("GET", f"/api/v1/tasks/{task['id']}/comments")
+            assert [comment["content"] for comment in comments] == ["on it"]
+
+            # One room across both instances: each side sees the participant connected to the other.
+            ada_id, grace_id = f"user:{ada['user']['id']}", f"user:{grace['user']['id']}"
+            first.command(op="open", name="presence", path=f"/ws/workspaces/{workspace_id}/presence")
+            assert "timeout" not in first.command(
+                op="expect", name="presence", types=["presence.snapshot"], contains=ada_id
+            )
+            second.command(op="open", name="presence", path=f"/ws/workspaces/{workspace_id}/presence")
+            assert "timeout" not in second.command(
+                op="expect", name="presence", types=["presence.snapshot"], contains=ada_id
+            )
+            assert "timeout" not in first.command(
+                op="expect", name="presence", types=["presence.joined", "presence.batch"], contains=grace_id
+            )
+        finally:
+            second.close()
+    finally:
+        first.close()
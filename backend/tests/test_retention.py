@@ -0,0 +1,296 @@
+import asyncio
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from app.core.archive import ArchiveRegistry
+from app.core.audit_log import AuditLog
+from app.core.config import Settings
+from app.core.metrics import MetricsRegistry
+from app.core.records import EvidenceEntry
+from app.core.retention import (
+    AuditLogRetention,
+    Compactor,
+    ListRetention,
+    PartitionedRetention,
+    RetentionPolicy,
+    build_compactor,
+)
+from app.core.store import InMemoryStore
+from app.services.orchestration.event_bus import InMemoryEventBus
+from app.workers.consumers import OutboxSource
+
+BASE = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def _audit(index: int) -> dict[str, object]:
+    return {
+        "id": f"log-{index}",
+        "workspace_id": f"w{index % 2}",
+        "actor_type": "user",
+        "actor_id": "u1",
+        "action": "task.update",
+        "entity_type": "task",
+        "entity_id": f"t{index % 3}",
+        "payload": {},
+        "created_at": BASE + timedelta(minutes=index),
+    }
+
+
+def test_audit_segments_are_archived_and_still_queryable(tmp_path: Path) -> None:
+    log = AuditLog(segment_size=4)
+    for index in range(10):
+        log.append(_audit(index))
+    archives = ArchiveRegistry()
+    metrics = MetricsRegistry()
+    retention = AuditLogRetention(log)
+    compactor = Compactor(
+        [(retention, RetentionPolicy(max_count=3))],
+        archive_dir=tmp_path,
+        archives=archives,
+        metrics=metrics,
+    )
+    compactor.open()
+
+    [stats] = compactor.run_once(now=BASE)
+    assert stats.rows_evicted == 8
+    assert len(log) == 2 and log.base_position == 8 and log.next_position == 10
+    assert metrics.counter("retention.audit_logs.rows_archived") == 8
+    assert metrics.counter("retention.audit_logs.bytes_reclaimed") > 0
+
+    assert [row["id"] for row in log.query(entity_type="task", entity_id="t0")] == [
+        "log-0",
+        "log-3",
+        "log-6",
+        "log-9",
+    ]
+    assert [row["id"] for row in log.query(workspace_id="w1", limit=3)] == [
+        "log-5",
+        "log-7",
+        "log-9",
+    ]
+    assert [row["id"] for row in log.query(since=BASE + timedelta(minutes=7))] == [
+        "log-7",
+        "log-8",
+        "log-9",
+    ]
+
+    # A store recovered from a snapshot taken before the eviction skips the archived positions.
+    recovered = AuditLog(segment_size=4)
+    AuditLogRetention(recovered).attach_archive(archives.get("audit_logs"))
+    recovered.restore({"base": 0, "rows": [_audit(index) for index in range(10)]})
+    assert [row["id"] for row in recovered] == ["log-8", "log-9"]
+    assert len(recovered.query(entity_type="task", entity_id="t1")) == 3
+
+
+class _CountingArchive:
+    def __init__(self, archive: Any) -> None:
+        self._archive = archive
+        self.loaded: list[int] = []
+
+    def segments(self, **filters: Any) -> Any:
+        return self._archive.segments(**filters)
+
+    def load(self, seq: int) -> Any:
+        self.loaded.append(seq)
+        return self._archive.load(seq)
+
+
+def test_limited_audit_queries_read_only_the_newest_archived_segments(tmp_path: Path) -> None:
+    log = AuditLog(segment_size=4)
+    compactor = Compactor(
+        [(AuditLogRetention(log), RetentionPolicy(max_count=3))],
+        archive_dir=tmp_path,
+        archives=ArchiveRegistry(),
+        metrics=MetricsRegistry(),
+    )
+    compactor.open()
+    # One compaction per sealed segment, so the archive holds three segments of four rows.
+    for index in range(14):
+        log.append(_audit(index))
+        if index % 4 == 0 and index:
+            compactor.run_once(now=BASE)
+    assert log.base_position == 12
+    assert log.archive is not None
+    archive = log.archive = _CountingArchive(log.archive)
+
+    assert [row["id"] for row in log.query(limit=3)] == ["log-11", "log-12", "log-13"]
+    assert archive.loaded == [3]
+    assert [row["id"] for row in log.query(limit=7)] == [f"log-{index}" for index in range(7, 14)]
+    assert archive.loaded == [3, 3, 2]
+    assert len(log.query()) == 14 and archive.loaded[3:] == [3, 2, 1]
+
+
+def test_list_and_partitioned_collections_evict_oldest_rows(tmp_path: Path) -> None:
+    evidence = [
+        EvidenceEntry(
+            id=f"e{index}",
+            workspace_id="w1",
+            task_id=f"t{index % 2}",
+            claim="c",
+            source_type="artifact",
+            source_ref="a",
+            confidence=0.9,
+            created_at=BASE + timedelta(days=index),
+        )
+        for index in range(6)
+    ]
+    messages = {
+        "w1": [{"id": f"m1-{i}", "created_at": BASE + timedelta(hours=2 * i)} for i in range(3)],
+        "w2": [
+            {"id": f"m2-{i}", "created_at": BASE + timedelta(hours=2 * i + 1)} for i in range(3)
+        ],
+    }
+    timelines = {
+        "r1": [{"id": "s1", "created_at": BASE}],
+        "r2": [{"id": "s2", "created_at": BASE + timedelta(days=10)}],
+    }
+    archives = ArchiveRegistry()
+    compactor = Compactor(
+        [
+            (
+                ListRetention("evidence_entries", lambda: evidence, lambda row: row.task_id),
+                RetentionPolicy(max_age_seconds=3 * 86400),
+            ),
+            (PartitionedRetention("messages", lambda: messages), RetentionPolicy(max_count=2)),
+            (
+                PartitionedRetention("timelines", lambda: timelines, whole_partitions=True),
+                RetentionPolicy(max_age_seconds=86400),
+            ),
+        ],
+        archive_dir=tmp_path,
+        archives=archives,
+        metrics=MetricsRegistry(),
+    )
+    compactor.open()
+    compactor.run_once(now=BASE + timedelta(days=5))
+
+    assert [entry.id for entry in evidence] == ["e2", "e3", "e4", "e5"]
+    assert [
+        row.id
+        for row in archives.with_archived(
+            "evidence_entries", "t0", [e for e in evidence if e.task_id == "t0"]
+        )
+    ] == [
+        "e0",
+        "e2",
+        "e4",
+    ]
+    assert {key: [row["id"] for row in rows] for key, rows in messages.items()} == {
+        "w1": ["m1-2"],
+        "w2": ["m2-2"],
+    }
+    assert [row["id"] for row in archives.tail("messages", "w1", 2)] == ["m1-0", "m1-1"]
+    assert list(timelines) == ["r2"]
+    assert [row["id"] for row in archives.read("timelines", "r1")] == ["s1"]
+
+
+def test_outbox_trim_keeps_positions_stable() -> None:
+    bus = InMemoryEventBus()
+    for index in range(5):
+        bus.publish("task.updated", "w1", {"index": index})
+    events, position = bus.events_since(0)
+    assert len(events) == 5 and position == 5
+
+    bus.trim_outbox(3)
+    bus.publish("task.updated", "w1", {"index": 5})
+    events, position = bus.events_since(position)
+    assert [event.payload["index"] for event in events] == [5] and position == 6
+    events, _ = bus.events_since(1)
+    assert [event.payload["index"] for event in events] == [3, 4, 5]
+
+
+def test_outbox_retention_stops_at_the_slowest_consumer(tmp_path: Path) -> None:
+    bus = InMemoryEventBus()
+    fast, slow = OutboxSource(bus, name="fast"), OutboxSource(bus, name="slow")
+    for index in range(6):
+        bus.publish("task.updated", "w1", {"index": index})
+
+    async def consume(source: OutboxSource, count: int) -> None:
+        await source.ack(await source.read(count))
+
+    asyncio.run(consume(fast, 6))
+    asyncio.run(consume(slow, 2))
+    assert bus.trimmable_outbox() == 2
+
+    compactor = Compactor(
+        [
+            (
+                ListRetention(
+                    "event_outbox",
+                    lambda: bus.outbox,
+                    lambda event: event.workspace_id,
+                    trim=bus.trim_outbox,
+                    limit=bus.trimmable_outbox,
+                ),
+                RetentionPolicy(max_count=1),
+            )
+        ],
+        archive_dir=tmp_path,
+        archives=ArchiveRegistry(),
+        metrics=MetricsRegistry(),
+    )
+    compactor.open()
+    compactor.run_once(now=BASE)
+    events, _ = bus.events_since(slow.position)
+    assert [event.payload["index"] for event in events] == [2, 3, 4, 5]
+
+    slow.close()
+    compactor.run_once(now=BASE)
+    assert len(bus.outbox) == 1
+
+
+def test_archived_collections_are_only_bounded_when_an_archive_directory_resolves(tmp_path: Path) -> None:
+    store = InMemoryStore()
+    for index in range(5):
+        store.append_row(
+            "evidence_entries",
+            EvidenceEntry(
+                id=f"e{index}",
+                workspace_id="w1",
+                claim="c",
+                source_type="doc",
+                source_ref="r",
+                confidence=0.5,
+                created_at=BASE + timedelta(minutes=index),
+            ),
+        )
+    policies = {"evidence_entries": {"max_count": 2}, "event_outbox": {"max_count": 2}}
+    bus = InMemoryEventBus()
+    for index in range(5):
+        bus.publish("task.updated", "w1", {"index": index})
+
+    compactor = build_compactor(Settings(retention_policies=policies, store_data_dir=""), store, outbox=bus)
+    assert compactor is not None
+    compactor.run_once(now=BASE)
+    assert len(store.evidence_entries) == 5 and len(bus.outbox) == 2
+
+    compactor = build_compactor(Settings(retention_policies=policies, store_data_dir=str(tmp_path)), store, outbox=bus)
+    assert compactor is not None
+    compactor.open()
+    compactor.run_once(now=BASE)
+    compactor.close()
+    assert [entry.id for entry in store.evidence_entries] == ["e3", "e4"]
+
+
+def test_partition_commits_hold_the_writers_lock_and_keep_late_rows() -> None:
+    messages = {
+        "w1": [{"id": f"m{i}", "workspace_id": "w1", "created_at": BASE + timedelta(hours=i)} for i in range(3)]
+    }
+    held: list[list[str]] = []
+
+    @contextmanager
+    def lock(rows: list[Any]) -> Iterator[None]:
+        held.append([row["id"] for row in rows])
+        # A row minted earlier lands at the head while the compactor is archiving.
+        messages["w1"].insert(0, {"id": "late", "workspace_id": "w1", "created_at": BASE + timedelta(hours=5)})
+        yield
+
+    retention = PartitionedRetention("messages", lambda: messages, lock=lock)
+    plan = retention.plan(None, 2)
+    assert plan is not None
+    plan.commit()
+    assert held == [["m0", "m1"]]
+    assert [row["id"] for row in messages["w1"]] == ["late", "m2"]
@@ -0,0 +1,180 @@
+import pickle
+import sys
+import threading
+from datetime import UTC, datetime
+
+from app.core.audit_log import AuditLog
+from app.core.ids import insert_by_id, page_after, uuid7, uuid7_time
+from app.core.locks import ShardLocks
+from app.core.records import TaskRecord
+from app.core.store import IndexedTable, InMemoryStore
+
+
+def test_indexed_table_tracks_workspace_and_task_buckets() -> None:
+    table = IndexedTable()
+    table["a1"] = {"id": "a1", "workspace_id": "w1", "task_id": "t1"}
+    table["a2"] = {"id": "a2", "workspace_id": "w1", "task_id": None}
+    table["a3"] = {"id": "a3", "workspace_id": "w2", "task_id": "t2"}
+
+    assert [item["id"] for item in table.by_workspace("w1")] == ["a1", "a2"]
+    assert [item["id"] for item in table.by_task("t2")] == ["a3"]
+    assert table.has_task("t1")
+    assert table.count_by_workspace("w2") == 1
+
+    table["a1"] = {"id": "a1", "workspace_id": "w2", "task_id": "t2"}
+    assert [item["id"] for item in table.by_workspace("w1")] == ["a2"]
+    assert not table.has_task("t1")
+
+    table.pop("a3")
+    del table["a1"]
+    assert table.by_workspace("w2") == []
+    assert table.by_task("t2") == []
+    assert table.by_workspace("missing") == []
+
+
+def test_audit_log_entity_time_range_and_action_filters() -> None:
+    log = AuditLog(segment_size=2)
+    for index, action in enumerate(["task.create", "task.update", "task.update", "artifact.create"]):
+        log.append(
+            {
+                "id": f"row-{index}",
+                "workspace_id": "w1",
+                "actor_type": "user",
+                "actor_id": "u1",
+                "action": action,
+                "entity_type": "artifact" if action.startswith("artifact") else "task",
+                "entity_id": "a1" if action.startswith("artifact") else "t1",
+                "payload": {},
+                "created_at": f"2026-01-0{index + 1}T00:00:00+00:00",
+            }
+        )
+
+    assert len(log) == 4
+    assert len(log.segments) == 2
+    assert [row["id"] for row in log.by_entity("task", "t1")] == ["row-0", "row-1", "row-2"]
+    assert [row["id"] for row in log.by_entity("task", "t1", limit=1)] == ["row-2"]
+    assert [row["id"] for row in log.by_entity("task", "t1", actions=["task.update"])] == ["row-1", "row-2"]
+    assert [
+        row["id"]
+        for row in log.query(
+            workspace_id="w1",
+            since=datetime(2026, 1, 2, tzinfo=UTC),
+            until=datetime(2026, 1, 4, tzinfo=UTC),
+        )
+    ] == ["row-1", "row-2"]
+    assert [row["id"] for row in log.query(workspace_id="w1", actions=["artifact.create", "task.create"])] == [
+        "row-0",
+        "row-3",
+    ]
+    assert [row["id"] for row in log.query(since="2026-01-04T00:00:00+00:00")] == ["row-3"]
+
+
+def test_membership_index_stays_in_sync_with_member_lists() -> None:
+    store = InMemoryStore()
+    owner = store.add_member("w1", "u1", "owner")
+    store.add_member("w2", "u1", "member")
+    store.add_member("w1", "u2", "member")
+
+    assert store.add_member("w1", "u1", "member") is owner
+    assert store.membership("w1", "u1") == {"workspace_id": "w1", "user_id": "u1", "role": "owner"}
+    assert store.user_workspace_ids("u1") == ["w1", "w2"]
+    assert len(store.workspace_members["w1"]) == 2
+
+    assert store.remove_member("w1", "u2") is not None
+    assert store.membership("w1", "u2") is None
+    assert store.user_workspace_ids("u2") == []
+    assert [member["user_id"] for member in store.workspace_members["w1"]] == ["u1"]
+    assert store.remove_member("w1", "u2") is None
+
+
+def test_task_record_keeps_dict_interface_and_interns_enum_fields() -> None:
+    task = TaskRecord.from_mapping(
+        {
+            "id": "t1",
+            "workspace_id": "".join(["w", "1"]),
+            "title": "Ship",
+            "status": "".join(["in_", "progress"]),
+            "priority": "high",
+            "created_at": "2026-01-01T00:00:00+00:00",
+            "updated_at": "2026-01-01T00:00:00",
+            "legacy_flag": True,
+        }
+    )
+    assert task["created_at"] == task.updated_at == datetime(2026, 1, 1, tzinfo=UTC)
+    assert task["legacy_flag"] is True and "legacy_flag" in task
+    assert task.get("missing") is None and "missing" not in task
+    assert dict(task)["status"] == "in_progress"
+
+    task["status"] = "".join(["do", "ne"])
+    task["updated_at"] = "2026-01-02T00:00:00+00:00"
+    assert task.status is sys.intern("done")
+    assert task.updated_at == datetime(2026, 1, 2, tzinfo=UTC)
+
+    restored = pickle.loads(pickle.dumps(task))
+    assert restored == task
+    assert restored.workspace_id is task.workspace_id
+
+
+def test_uuid7_ids_sort_in_creation_order_and_page_by_cursor() -> None:
+    started = datetime.now(UTC).replace(microsecond=0)
+    ids = [uuid7() for _ in range(5000)]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    created = uuid7_time(ids[0])
+    assert created is not None and created >= started
+    assert uuid7_time("not-an-id") is None
+
+    table = IndexedTable()
+    for record_id in reversed(ids[:10]):
+        table[record_id] = {"id": record_id, "workspace_id": "w1", "task_id": None}
+    assert [item["id"] for item in table.by_workspace("w1")] == ids[:10]
+    assert [item["id"] for item in table.by_workspace("w1", after=ids[3], limit=2)] == ids[4:6]
+    assert table.by_workspace("w1", after=ids[9]) == []
+
+    records = [{"id": record_id} for record_id in ids[:10]]
+    assert page_after(records, ids[7], None) == records[8:]
+    assert page_after(records, None, 3) == records[:3]
+
+
+def test_rows_minted_before_a_later_writer_stay_in_cursor_order() -> None:
+    early, middle, late = uuid7(), uuid7(), uuid7()
+    rows: list[dict[str, str]] = []
+    # ``early`` was minted first but its writer reached the lock last.
+    for record_id in (middle, late, early):
+        insert_by_id(rows, {"id": record_id})
+    assert [row["id"] for row in rows] == [early, middle, late]
+    assert page_after(rows, early, None) == rows[1:]
+
+
+def test_concurrent_workspace_writes_keep_indexes_consistent() -> None:
+    locks = ShardLocks(8)
+    assert locks.shard_of("w1") == ShardLocks(8).shard_of("w1")
+    with locks.hold("w1", "w2", "w1"), locks.hold("w2"):
+        pass
+
+    store = InMemoryStore(locks=locks)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def writer(worker: int) -> None:
+        for index in range(300):
+            workspace_id = f"w{index % 4}"
+            store.tasks[f"t{worker}-{index}"] = {"id": f"t{worker}-{index}", "workspace_id": workspace_id}
+            store.add_member(workspace_id, f"u{worker}", "member")
+            if index % 3 == 0:
+                store.remove_member(f"w{(index + 1) % 4}", f"u{worker}")
+
+    try:
+        threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert sum(store.tasks.count_by_workspace(f"w{index}") for index in range(4)) == len(store.tasks) == 2400
+    for workspace_id, members in store.workspace_members.items():
+        assert len({member["user_id"] for member in members}) == len(members)
+        assert all(store.membership(workspace_id, str(member["user_id"])) is member for member in members)
+    for user_id, memberships in store.user_memberships.items():
+        assert all(any(item is member for item in store.workspace_members[ws]) for ws, member in memberships.items())
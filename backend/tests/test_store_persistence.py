@@ -0,0 +1,168 @@
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.persistence import StorePersistence
+from app.core.store import STORE, InMemoryStore
+from app.main import app
+
+
+def _task(task_id: str, status: str = "todo") -> dict[str, object]:
+    return {"id": task_id, "workspace_id": "w1", "task_id": None, "title": task_id, "status": status}
+
+
+def _audit(index: int) -> dict[str, object]:
+    return {
+        "id": f"log-{index}",
+        "workspace_id": "w1",
+        "actor_type": "user",
+        "actor_id": "u1",
+        "action": "task.update",
+        "entity_type": "task",
+        "entity_id": "t1",
+        "payload": {},
+        "created_at": f"2026-01-01T00:00:{index:02d}+00:00",
+    }
+
+
+def _recover(directory: Path) -> InMemoryStore:
+    store = InMemoryStore()
+    StorePersistence(store, directory).recover()
+    return store
+
+
+def test_wal_replay_restores_journaled_mutations(tmp_path: Path) -> None:
+    store = InMemoryStore()
+    persistence = StorePersistence(store, tmp_path, sync_ms=0)
+    persistence.open(background=False)
+    store.users["u1"] = {"id": "u1", "username": "owner"}
+    store.users_by_username["owner"] = "u1"
+    store.add_member("w1", "u1", "owner")
+    store.add_member("w1", "u2", "member")
+    store.remove_member("w1", "u2")
+    store.tasks["t1"] = _task("t1")
+    store.tasks["t2"] = _task("t2")
+    store.tasks["t1"]["status"] = "done"
+    store.tasks["t1"] = store.tasks["t1"]
+    del store.tasks["t2"]
+    store.audit_logs.append(_audit(0))
+    # Simulated crash: no close(), no snapshot.
+
+    recovered = _recover(tmp_path)
+    assert recovered.users_by_username == {"owner": "u1"}
+    assert recovered.membership("w1", "u1") == {"workspace_id": "w1", "user_id": "u1", "role": "owner"}
+    assert recovered.membership("w1", "u2") is None
+    assert [task["status"] for task in recovered.tasks.by_workspace("w1")] == ["done"]
+    assert [row["id"] for row in recovered.audit_logs] == ["log-0"]
+
+
+def test_snapshot_truncates_wal_and_recovery_skips_torn_tail(tmp_path: Path) -> None:
+    store = InMemoryStore()
+    persistence = StorePersistence(store, tmp_path, sync_ms=0)
+    persistence.open(background=False)
+    store.tasks["t1"] = _task("t1")
+    store.audit_logs.append(_audit(0))
+    store.workspace_files["w1"].append({"id": "f1"})
+
+    stats = persistence.snapshot()
+    assert stats.segments_removed == 1
+    assert [path.name for path in sorted(tmp_path.iterdir())] == [
+        "LOCK",
+        f"snapshot-{stats.seq:010d}.bin",
+        f"wal-{stats.seq:010d}.log",
+    ]
+
+    store.tasks["t2"] = _task("t2")
+    store.audit_logs.append(_audit(1))
+    persistence.flush()
+    with open(tmp_path / f"wal-{stats.seq:010d}.log", "ab") as handle:
+        handle.write(b"\x40\x00\x00\x00partial")
+
+    recovered = _recover(tmp_path)
+    assert sorted(recovered.tasks) == ["t1", "t2"]
+    assert [row["id"] for row in recovered.audit_logs] == ["log-0", "log-1"]
+    assert recovered.workspace_files["w1"] == [{"id": "f1"}]
+
+    persistence.close()
+    again = _recover(tmp_path)
+    assert len(again.audit_logs) == 2
+    assert sorted(again.tasks) == ["t1", "t2"]
+
+
+def test_in_place_collections_and_evidence_are_journaled(tmp_path: Path) -> None:
+    store = InMemoryStore()
+    persistence = StorePersistence(store, tmp_path, sync_ms=0)
+    persistence.open(background=False)
+    store.task_comments["t1"].append({"id": "c1", "content": "first"})
+    store.journal_entry("task_comments", "t1")
+    store.workspace_task_statuses["w1"] = [{"key": "todo", "order": 0}]
+    store.journal_entry("workspace_task_statuses", "w1")
+    store.workspace_task_statuses["w1"][0]["order"] = 3
+    store.journal_entry("workspace_task_statuses", "w1")
+    store.workspace_invites["tok"] = {"workspace_id": "w1"}
+    store.journal_entry("workspace_invites", "tok")
+    store.workspace_invites.pop("tok")
+    store.journal_entry("workspace_invites", "tok")
+    store.append_row("evidence_entries", {"id": "e1"})
+    store.append_row("evidence_entries", {"id": "e2"})
+    store.evict_rows("evidence_entries", 1)
+    # Simulated crash: no close(), no snapshot.
+
+    recovered = _recover(tmp_path)
+    assert recovered.task_comments["t1"] == [{"id": "c1", "content": "first"}]
+    assert recovered.workspace_task_statuses["w1"] == [{"key": "todo", "order": 3}]
+    assert "tok" not in recovered.workspace_invites
+    assert recovered.evidence_entries == [{"id": "e2"}]
+
+
+def test_appends_already_in_the_snapshot_are_not_replayed_twice() -> None:
+    store = InMemoryStore()
+    store.restore({"evidence_entries": [{"id": "e1"}]})
+    # A snapshot taken while writes continued holds e1 and the next segment journals it too.
+    store.apply(("append", "evidence_entries", {"id": "e1"}))
+    store.apply(("append", "evidence_entries", {"id": "e2"}))
+    store.apply(("evict", "evidence_entries", ["e1"]))
+    store.apply(("append", "evidence_entries", {"id": "e2"}))
+    assert store.evidence_entries == [{"id": "e2"}]
+
+
+def test_api_writes_to_snapshot_only_collections_survive_a_crash(tmp_path: Path) -> None:
+    api_client = TestClient(app)
+    persistence = StorePersistence(STORE, tmp_path, sync_ms=0)
+    persistence.open(background=False)
+    try:
+        username = f"wal-{uuid4().hex[:8]}"
+        assert api_client.post("/api/v1/auth/register", json={"username": username, "password": "Password123!"}).status_code == 200
+        workspace_id = api_client.post(
+            "/api/v1/workspaces", json={"name": "WAL", "slug": f"wal-{uuid4().hex[:6]}", "template": "Feature Sprint"}
+        ).json()["id"]
+        task_id = api_client.post("/api/v1/tasks", json={"workspace_id": workspace_id, "title": "Durable"}).json()["id"]
+        assert api_client.post(f"/api/v1/tasks/{task_id}/comments", json={"content": "keep me"}).status_code == 200
+        assert api_client.post(f"/api/v1/tasks/{task_id}/subtasks", json={"title": "Step"}).status_code == 200
+        assert api_client.post(
+            f"/api/v1/workspaces/{workspace_id}/task-statuses", json={"key": "qa", "label": "QA"}
+        ).status_code == 200
+        user_id = STORE.users_by_username[username]
+    finally:
+        # Simulated crash: the journal is detached without writing a snapshot.
+        persistence.close(snapshot=False)
+
+    recovered = _recover(tmp_path)
+    assert [comment["content"] for comment in recovered.task_comments[task_id]] == ["keep me"]
+    assert [subtask["title"] for subtask in recovered.task_subtasks[task_id]] == ["Step"]
+    assert "qa" in {item["key"] for item in recovered.workspace_task_statuses[workspace_id]}
+    assert user_id in recovered.workspace_member_profiles[workspace_id]
+
+
+def test_a_data_directory_is_opened_by_one_process_at_a_time(tmp_path: Path) -> None:
+    first = StorePersistence(InMemoryStore(), tmp_path, sync_ms=0)
+    first.open(background=False)
+    second = StorePersistence(InMemoryStore(), tmp_path, sync_ms=0)
+    with pytest.raises(RuntimeError, match="in use by another process"):
+        second.open(background=False)
+
+    first.close()
+    second.open(background=False)
+    second.close()
@@ -14,26 +14,137 @@ function resolveDefaultWsBaseUrl() {
 
 export const WS_BASE_URL = import.meta.env.VITE_WS_BASE_URL ?? resolveDefaultWsBaseUrl()
 
-export function openWorkspaceSocket(workspaceId: string, onMessage: (data: unknown) => void): WebSocket {
-  const ws = new WebSocket(`${WS_BASE_URL}/ws/workspaces/${workspaceId}/events`)
-  ws.onmessage = (event) => {
-    try {
-      onMessage(JSON.parse(event.data) as unknown)
-    } catch {
-      onMessage(event.data)
+function isEventBatch(data: unknown): data is { type: 'events.batch'; events: unknown[] } {
+  return (
+    typeof data === 'object' &&
+    data !== null &&
+    (data as { type?: unknown }).type === 'events.batch' &&
+    Array.isArray((data as { events?: unknown }).events)
+  )
+}
+
+function isPing(data: unknown): boolean {
+  return typeof data === 'object' && data !== null && (data as { type?: unknown }).type === 'ping'
+}
+
+// The server closes sockets it has not heard from for a while; answering its pings keeps idle ones open.
+function answerPing(ws: WebSocket, data: unknown): boolean {
+  if (!isPing(data)) return false
+  if (ws.readyState === WebSocket.OPEN) ws.send(JSON.stringify({ type: 'pong' }))
+  return true
+}
+
+function isResyncRequired(data: unknown): boolean {
+  return (
+    typeof data === 'object' &&
+    data !== null &&
+    (data as { type?: unknown }).type === 'events.resync_required'
+  )
+}
+
+function eventId(data: unknown): string | null {
+  if (typeof data !== 'object' || data === null) return null
+  const id = (data as { id?: unknown }).id
+  return typeof id === 'string' ? id : null
+}
+
+// 1008: access was revoked; reconnecting would only be refused again.
+const CLOSE_POLICY_VIOLATION = 1008
+const RECONNECT_BASE_MS = 500
+const RECONNECT_MAX_MS = 15000
+
+export interface WorkspaceSocketOptions {
+  // The server could not replay what was missed while disconnected; state derived from events is stale.
+  onResync?: () => void
+  onClose?: (event: CloseEvent) => void
+}
+
+export interface WorkspaceEventSocket {
+  close: () => void
+}
+
+export function openWorkspaceSocket(
+  workspaceId: string,
+  onMessage: (data: unknown) => void,
+  options: WorkspaceSocketOptions = {},
+): WorkspaceEventSocket {
+  let ws: WebSocket | null = null
+  let lastEventId: string | null = null
+  let attempts = 0
+  let closed = false
+  let retryTimer: ReturnType<typeof setTimeout> | null = null
+
+  const deliver = (item: unknown) => {
+    const id = eventId(item)
+    if (id !== null) lastEventId = id
+    onMessage(item)
+  }
+
+  const connect = () => {
+    // Reconnects resume after the last event handled, so nothing is refetched unless the server asks.
+    const query = lastEventId === null ? '' : `?last_event_id=${encodeURIComponent(lastEventId)}`
+    const current = new WebSocket(`${WS_BASE_URL}/ws/workspaces/${workspaceId}/events${query}`)
+    ws = current
+    current.onopen = () => {
+      attempts = 0
+    }
+    current.onmessage = (event) => {
+      let data: unknown
+      try {
+        data = JSON.parse(event.data) as unknown
+      } catch {
+        onMessage(event.data)
+        return
+      }
+      if (answerPing(current, data)) return
+      if (isResyncRequired(data)) {
+        options.onResync?.()
+        return
+      }
+      // Events arriving close together share one frame; handlers still see them one at a time.
+      if (isEventBatch(data)) {
+        for (const item of data.events) {
+          deliver(item)
+        }
+        return
+      }
+      deliver(data)
+    }
+    current.onclose = (event) => {
+      if (ws === current) ws = null
+      if (closed) return
+      options.onClose?.(event)
+      if (event.code === CLOSE_POLICY_VIOLATION) return
+      const delay = Math.min(RECONNECT_BASE_MS * 2 ** attempts, RECONNECT_MAX_MS)
+      attempts += 1
+      retryTimer = setTimeout(connect, delay)
     }
   }
-  return ws
+
+  connect()
+  return {
+    close: () => {
+      closed = true
+      if (retryTimer) clearTimeout(retryTimer)
+      retryTimer = null
+      ws?.close()
+      ws = null
+    },
+  }
 }
 
 export function openWorkspacePresenceSocket(workspaceId: string, onMessage: (data: unknown) => void): WebSocket {
   const ws = new WebSocket(`${WS_BASE_URL}/ws/workspaces/${workspaceId}/presence`)
   ws.onmessage = (event) => {
+    let data: unknown
     try {
-      onMessage(JSON.parse(event.data) as unknown)
+      data = JSON.parse(event.data) as unknown
     } catch {
       onMessage(event.data)
+      return
     }
+    if (answerPing(ws, data)) return
+    onMessage(data)
   }
   return ws
 }